@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ombor -> texnik o'tkazmalari uchun yuklama testi (throughput benchmark)
+
+Test bazasida ishlating! Skript "BENCHMARK" materialini yaratadi, uni
+parallel ravishda bitta texnikka (yoki bir nechta texnikka) beradi va
+oxirida qoldiqlar manfiy emasligini, ombor + texnik yig'indisi o'zgarmaganini
+va jurnal (stock_movements) yozuvlari mos kelishini tekshiradi.
+
+    python benchmark_stock_transfer.py --stock 500 --transfers 1000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from decimal import Decimal
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.connections import get_connection, close_pool
+from database.basic.stock_ledger import (
+    issue_to_technician, return_to_warehouse, InsufficientStock,
+)
+
+
+async def prepare(stock: int, technicians: int):
+    """Benchmark materiali va texniklarni tayyorlash"""
+    conn = await get_connection()
+    try:
+        material_id = await conn.fetchval(
+            """
+            INSERT INTO materials (name, price, description, quantity, serial_number)
+            VALUES ($1, $2, 'Benchmark uchun', $3, $4)
+            RETURNING id
+            """,
+            f"BENCHMARK {int(time.time())}", Decimal("1.00"), stock, f"BENCH-{int(time.time())}"
+        )
+        tech_rows = await conn.fetch(
+            "SELECT id FROM users WHERE role = 'technician' ORDER BY id LIMIT $1",
+            technicians
+        )
+    finally:
+        await conn.close()
+    return material_id, [r["id"] for r in tech_rows]
+
+
+async def run_transfers(material_id: int, tech_ids, transfers: int, concurrency: int, qty: int):
+    """Parallel o'tkazmalar; (muvaffaqiyatli, rad etilgan, xato, soniya) qaytaradi"""
+    sem = asyncio.Semaphore(concurrency)
+    ok = rejected = failed = 0
+
+    async def one(i: int):
+        nonlocal ok, rejected, failed
+        async with sem:
+            try:
+                await issue_to_technician(tech_ids[i % len(tech_ids)], {material_id: qty})
+                ok += 1
+            except InsufficientStock:
+                rejected += 1
+            except Exception as e:
+                failed += 1
+                print(f"   ❌ #{i}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(transfers)))
+    return ok, rejected, failed, time.perf_counter() - started
+
+
+async def verify(material_id: int, stock: int, tech_ids, qty: int, ok: int) -> bool:
+    """Qoldiqlar va jurnalni tekshirish"""
+    conn = await get_connection()
+    try:
+        warehouse_qty = await conn.fetchval("SELECT quantity FROM materials WHERE id = $1", material_id)
+        tech_qty = await conn.fetchval(
+            "SELECT COALESCE(SUM(quantity), 0) FROM material_and_technician WHERE material_id = $1",
+            material_id
+        )
+        negative = await conn.fetchval(
+            "SELECT COUNT(*) FROM material_and_technician WHERE material_id = $1 AND quantity < 0",
+            material_id
+        )
+        ledger_qty = await conn.fetchval(
+            """
+            SELECT COALESCE(SUM(quantity), 0) FROM stock_movements
+            WHERE material_id = $1 AND from_type = 'warehouse' AND to_type = 'technician'
+            """,
+            material_id
+        )
+    finally:
+        await conn.close()
+
+    print(f"📦 Omborda qoldi: {warehouse_qty}")
+    print(f"👨‍🔧 Texniklarda: {tech_qty}")
+    print(f"📒 Jurnal bo'yicha berilgan: {ledger_qty}")
+
+    checks = {
+        "ombor qoldig'i manfiy emas": warehouse_qty >= 0,
+        "texnik qoldig'i manfiy emas": negative == 0,
+        "ombor + texnik = boshlang'ich": warehouse_qty + tech_qty == stock,
+        "berilgan = muvaffaqiyatli * miqdor": tech_qty == ok * qty,
+        "jurnal = berilgan": ledger_qty == tech_qty,
+    }
+    for name, passed in checks.items():
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return all(checks.values())
+
+
+async def cleanup(material_id: int, tech_ids):
+    """Texniklardagi benchmark materialini omborga qaytarish"""
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            """
+            SELECT user_id, quantity FROM material_and_technician
+            WHERE material_id = $1 AND user_id = ANY($2::int[]) AND quantity > 0
+            """,
+            material_id, list(tech_ids)
+        )
+    finally:
+        await conn.close()
+    for r in rows:
+        await return_to_warehouse(r["user_id"], {material_id: r["quantity"]})
+
+
+async def main():
+    """Asosiy funksiya"""
+    parser = argparse.ArgumentParser(description="Stock transfer benchmark")
+    parser.add_argument("--stock", type=int, default=500, help="boshlang'ich ombor qoldig'i")
+    parser.add_argument("--transfers", type=int, default=1000, help="o'tkazmalar soni")
+    parser.add_argument("--concurrency", type=int, default=20, help="bir vaqtdagi o'tkazmalar")
+    parser.add_argument("--qty", type=int, default=1, help="har bir o'tkazma miqdori")
+    parser.add_argument("--technicians", type=int, default=3, help="nechta texnikka berish")
+    parser.add_argument("--keep", action="store_true", help="texniklardagi qoldiqni qaytarmaslik")
+    args = parser.parse_args()
+
+    print("🏭 ALFABOT - Material o'tkazmalari benchmark")
+    print("=" * 50)
+
+    material_id, tech_ids = await prepare(args.stock, args.technicians)
+    if not tech_ids:
+        print("❌ Bazada texnik topilmadi.")
+        return
+    print(f"📋 Material #{material_id}, texniklar: {tech_ids}")
+    print(f"🔁 {args.transfers} ta o'tkazma, parallel: {args.concurrency}, miqdor: {args.qty}")
+
+    ok, rejected, failed, elapsed = await run_transfers(
+        material_id, tech_ids, args.transfers, args.concurrency, args.qty
+    )
+    print()
+    print(f"✅ Muvaffaqiyatli: {ok}")
+    print(f"⛔ Yetmagani uchun rad etildi: {rejected}")
+    print(f"❌ Xatolik: {failed}")
+    print(f"⏱  {elapsed:.2f} s, {args.transfers / elapsed:.1f} o'tkazma/s")
+    print()
+
+    passed = await verify(material_id, args.stock, tech_ids, args.qty, ok)
+    if not args.keep:
+        await cleanup(material_id, tech_ids)
+    await close_pool()
+
+    print()
+    print("🎉 Tekshiruvlar o'tdi!" if passed and not failed else "💥 Tekshiruvlar o'tmadi!")
+    if not passed or failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Operatsiya foydalanuvchi tomonidan to'xtatildi.")
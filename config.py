@@ -14,6 +14,37 @@ class Settings(BaseSettings):
     DB_NAME: Optional[str] = "alfaconnect_bot"
     ADMINS_ID: int
     MEDIA_ROOT: str = "media"
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 20
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_POOL_ACQUIRE_TIMEOUT: float = 10.0
+    RENDER_WORKERS: int = 2
+    RENDER_QUEUE_MAX: int = 16
+    RENDER_USE_PROCESSES: bool = True
+    FSM_STORAGE: str = "postgres"          # postgres | sqlite | memory
+    FSM_STATE_TTL: int = 172800            # soniya; 0 - muddatsiz
+    FSM_SQLITE_PATH: str = "data/fsm.sqlite3"
+    OUTBOX_GLOBAL_RATE: float = 25.0       # xabar/soniya (barcha chatlar)
+    OUTBOX_PRIVATE_RATE: float = 1.0       # xabar/soniya (bitta shaxsiy chat)
+    OUTBOX_GROUP_PER_MINUTE: int = 20      # xabar/daqiqa (bitta guruh)
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_CHATS: int = 32             # bir vaqtda yuborilayotgan chatlar
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_RETENTION_DAYS: int = 7
+    MEDIA_INGEST_CONCURRENCY: int = 3      # parallel yuklab olishlar
+    MEDIA_INGEST_BATCH_SIZE: int = 20
+    MEDIA_INGEST_MAX_ATTEMPTS: int = 5
+    ASSIGNMENT_STRATEGY: str = "least_loaded"   # least_loaded | weighted_rr
+    ASSIGNMENT_REGION_AFFINITY: bool = True
+    ASSIGNMENT_LOAD_TTL: float = 30.0           # nomzodlar/yuklama keshi, soniya
+    ORDER_COUNTERS_TTL: float = 15.0            # dashboard hisoblagichlari snapshot'i, soniya
+    WAREHOUSE_STATS_TTL: float = 300.0          # ombor statistikasi snapshot'i, soniya
+    DB_BUDGET_WINDOW: int = 2000                # update'lar oynasi (persentillar uchun)
+    DB_BUDGET_MAX_QUERIES: int = 25             # bundan ko'p so'rovli update - WARNING; 0 - o'chirilgan
+    DB_BUDGET_LOG_INTERVAL: float = 300.0       # log xulosasi, soniya; 0 - o'chirilgan
+    LOG_FORMAT: str = "text"               # text | json (logs/*.log fayllari)
+    LOG_SAMPLING: Dict[str, float] = {}    # logger prefiksi -> DEBUG/INFO ulushi (0..1)
 
     class Config:
         env_file = ".env"
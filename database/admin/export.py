@@ -1,12 +1,11 @@
 # database/admin/export.py
 
-import asyncpg
-from typing import List, Dict, Any
-from config import settings
+from typing import List, Dict, Any, AsyncIterator
+from database.connections import get_connection, iter_rows
 
 async def get_admin_users_for_export(user_type: str = "all") -> List[Dict[str, Any]]:
     """Admin uchun foydalanuvchilar ro'yxatini export qilish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Build query based on user type
         if user_type == "clients":
@@ -38,92 +37,104 @@ async def get_admin_users_for_export(user_type: str = "all") -> List[Dict[str, A
     finally:
         await conn.close()
 
+_CONNECTION_ORDERS_EXPORT_SQL = """
+    SELECT 
+        co.id,
+        co.application_number,
+        co.address,
+        co.region,
+        co.status,
+        co.is_active,
+        co.created_at,
+        co.updated_at,
+        u.full_name as client_name,
+        u.phone as client_phone,
+        t.name as tariff_name
+    FROM connection_orders co
+    LEFT JOIN users u ON u.id = co.user_id
+    LEFT JOIN tarif t ON t.id = co.tarif_id
+    ORDER BY co.created_at DESC
+"""
+
 async def get_admin_connection_orders_for_export() -> List[Dict[str, Any]]:
     """Admin uchun connection orders ro'yxatini export qilish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                co.id,
-                co.application_number,
-                co.address,
-                co.region,
-                co.status,
-                co.is_active,
-                co.created_at,
-                co.updated_at,
-                u.full_name as client_name,
-                u.phone as client_phone,
-                t.name as tariff_name
-            FROM connection_orders co
-            LEFT JOIN users u ON u.id = co.user_id
-            LEFT JOIN tarif t ON t.id = co.tarif_id
-            ORDER BY co.created_at DESC
-            """
-        )
+        rows = await conn.fetch(_CONNECTION_ORDERS_EXPORT_SQL)
         return [dict(row) for row in rows]
     finally:
         await conn.close()
 
+def iter_admin_connection_orders_for_export() -> AsyncIterator[Dict[str, Any]]:
+    """Admin uchun connection orders ro'yxatini export qilish - oqimli (server-side cursor)"""
+    return iter_rows(_CONNECTION_ORDERS_EXPORT_SQL)
+
+_TECHNICIAN_ORDERS_EXPORT_SQL = """
+    SELECT 
+        tech_orders.id,
+        tech_orders.application_number,
+        tech_orders.address,
+        tech_orders.region,
+        tech_orders.status,
+        tech_orders.is_active,
+        tech_orders.description,
+        tech_orders.created_at,
+        tech_orders.updated_at,
+        u.full_name as client_name,
+        u.phone as client_phone
+    FROM technician_orders tech_orders
+    LEFT JOIN users u ON u.id = tech_orders.user_id
+    ORDER BY tech_orders.created_at DESC
+"""
+
 async def get_admin_technician_orders_for_export() -> List[Dict[str, Any]]:
     """Admin uchun technician orders ro'yxatini export qilish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                tech_orders.id,
-                tech_orders.application_number,
-                tech_orders.address,
-                tech_orders.region,
-                tech_orders.status,
-                tech_orders.is_active,
-                tech_orders.description,
-                tech_orders.created_at,
-                tech_orders.updated_at,
-                u.full_name as client_name,
-                u.phone as client_phone
-            FROM technician_orders tech_orders
-            LEFT JOIN users u ON u.id = tech_orders.user_id
-            ORDER BY tech_orders.created_at DESC
-            """
-        )
+        rows = await conn.fetch(_TECHNICIAN_ORDERS_EXPORT_SQL)
         return [dict(row) for row in rows]
     finally:
         await conn.close()
 
+def iter_admin_technician_orders_for_export() -> AsyncIterator[Dict[str, Any]]:
+    """Admin uchun technician orders ro'yxatini export qilish - oqimli (server-side cursor)"""
+    return iter_rows(_TECHNICIAN_ORDERS_EXPORT_SQL)
+
+_STAFF_ORDERS_EXPORT_SQL = """
+    SELECT 
+        so.id,
+        so.application_number,
+        so.address,
+        so.region,
+        so.status,
+        so.is_active,
+        so.description,
+        so.phone,
+        so.created_at,
+        so.updated_at,
+        u.full_name as client_name,
+        u.phone as client_phone
+    FROM staff_orders so
+    LEFT JOIN users u ON u.id = so.user_id
+    ORDER BY so.created_at DESC
+"""
+
 async def get_admin_staff_orders_for_export() -> List[Dict[str, Any]]:
     """Admin uchun staff orders ro'yxatini export qilish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                so.id,
-                so.application_number,
-                so.address,
-                so.region,
-                so.status,
-                so.is_active,
-                so.description,
-                so.phone,
-                so.created_at,
-                so.updated_at,
-                u.full_name as client_name,
-                u.phone as client_phone
-            FROM staff_orders so
-            LEFT JOIN users u ON u.id = so.user_id
-            ORDER BY so.created_at DESC
-            """
-        )
+        rows = await conn.fetch(_STAFF_ORDERS_EXPORT_SQL)
         return [dict(row) for row in rows]
     finally:
         await conn.close()
 
+def iter_admin_staff_orders_for_export() -> AsyncIterator[Dict[str, Any]]:
+    """Admin uchun staff orders ro'yxatini export qilish - oqimli (server-side cursor)"""
+    return iter_rows(_STAFF_ORDERS_EXPORT_SQL)
+
 async def get_admin_statistics_for_export() -> Dict[str, Any]:
     """Admin uchun statistikalar"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
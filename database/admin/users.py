@@ -1,12 +1,14 @@
 # database/admin/users.py
 
-import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
+from database.connections import get_connection
+from database.basic.user import invalidate_user_cache
+from database.basic.phone import find_user_by_phone, phone_lookup_key
+from database.basic.search import search_users
 
 async def get_all_users_paginated(limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
     """Barcha foydalanuvchilar sahifalangan"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -33,7 +35,7 @@ async def get_all_users_paginated(limit: int = 20, offset: int = 0) -> List[Dict
 
 async def get_users_by_role_paginated(role: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
     """Rol bo'yicha foydalanuvchilar sahifalangan"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -61,48 +63,29 @@ async def get_users_by_role_paginated(role: str, limit: int = 20, offset: int =
 
 async def search_users_paginated(search_term: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
     """Foydalanuvchilarni qidirish sahifalangan"""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                id,
-                telegram_id,
-                username,
-                full_name,
-                phone,
-                role,
-                language,
-                is_blocked,
-                created_at,
-                updated_at
-            FROM users
-            WHERE 
-                full_name ILIKE $1 OR 
-                phone ILIKE $1 OR 
-                username ILIKE $1 OR
-                telegram_id::text ILIKE $1
-            ORDER BY created_at DESC
-            LIMIT $2 OFFSET $3
-            """,
-            f"%{search_term}%", limit, offset
-        )
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    # Telefon raqami kiritilgan bo'lsa - indeks bo'yicha bitta qidiruv
+    if phone_lookup_key(search_term):
+        user = await find_user_by_phone(search_term)
+        if user is not None:
+            return [user] if offset == 0 else []
+
+    return await search_users(search_term, limit=limit, offset=offset)
 
 async def toggle_user_block_status(user_id: int) -> bool:
     """Foydalanuvchini bloklash/blokdan chiqarish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        await conn.execute(
+        telegram_id = await conn.fetchval(
             """
             UPDATE users 
             SET is_blocked = NOT is_blocked, updated_at = NOW()
             WHERE id = $1
+            RETURNING telegram_id
             """,
             user_id
         )
+        if telegram_id is not None:
+            invalidate_user_cache(telegram_id)
         return True
     except Exception as e:
         print(f"Error toggling user block status: {e}")
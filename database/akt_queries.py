@@ -3,10 +3,9 @@
 AKT hujjatlari bilan ishlash uchun database query funksiyalari
 """
 
-import asyncpg
 from typing import Dict, Any, List, Optional
-from config import settings
 from datetime import datetime
+from database.connections import get_connection
 
 async def get_akt_data_by_request_id(request_id: int, request_type: str) -> Optional[Dict[str, Any]]:
     """
@@ -20,7 +19,7 @@ async def get_akt_data_by_request_id(request_id: int, request_type: str) -> Opti
     Returns:
         Dict: AKT uchun kerakli ma'lumotlar yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if request_type == 'connection':
             return await _get_connection_akt_data(conn, request_id)
@@ -170,7 +169,7 @@ async def get_materials_for_akt(request_id: int, request_type: str) -> List[Dict
     Returns:
         List: Materiallar ro'yxati
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Avval application_number ni olish
         app_number_query = """
@@ -220,7 +219,7 @@ async def get_rating_for_akt(request_id: int, request_type: str) -> Optional[Dic
     Returns:
         Dict: Rating ma'lumotlari yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get application_number from the order tables
         app_number_query = """
@@ -263,7 +262,7 @@ async def create_akt_document(request_id: int, request_type: str, akt_number: st
     Returns:
         bool: Muvaffaqiyatli saqlangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get application_number from the order tables
         app_number_query = """
@@ -328,7 +327,7 @@ async def mark_akt_sent(request_id: int, request_type: str, sent_at: datetime) -
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get application_number from the order tables
         app_number_query = """
@@ -372,7 +371,7 @@ async def check_akt_exists(request_id: int, request_type: str) -> bool:
     Returns:
         bool: AKT mavjud bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get application_number from the order tables
         app_number_query = """
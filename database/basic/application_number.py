@@ -0,0 +1,24 @@
+# database/basic/application_number.py
+# Ariza raqamlarini (CONN-B2C-0001, STAFF-TECH-B2B-0001, SMA-0001, ...) ajratish.
+# Har bir prefiks uchun application_number_counters jadvalida bitta qator bor
+# (042_application_number_counters.sql), shuning uchun raqam olish O(1) va
+# parallel insertlarda takrorlanmaydi.
+
+import asyncpg
+
+
+async def allocate_application_number(conn: asyncpg.Connection, prefix: str) -> str:
+    """Prefiks uchun keyingi ariza raqamini qaytaradi.
+
+    Args:
+        conn: Ochiq ulanish (insert bilan bir tranzaksiyada chaqirish mumkin)
+        prefix: Raqamsiz qism, masalan 'CONN-B2C', 'STAFF-TECH-B2B', 'SMA'
+
+    Returns:
+        str: '<prefix>-NNNN' ko'rinishidagi ariza raqami
+    """
+    next_number = await conn.fetchval(
+        "SELECT next_application_number($1)",
+        prefix
+    )
+    return f"{prefix}-{next_number:04d}"
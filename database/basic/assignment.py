@@ -0,0 +1,212 @@
+# database/basic/assignment.py
+# Hand-off'larda qabul qiluvchini avtomatik tanlash (biriktirish dvigateli)
+#
+# Ariza bir roldan ikkinchisiga o'tganda (CCS -> controller, operator ->
+# controller, texnik -> ombor va h.k.) connections'ga yoziladigan
+# recipient_id shu yerda tanlanadi. Avval har bir funksiya
+# "... WHERE role = 'controller' LIMIT 1" bilan doim bitta xodimni olardi.
+#
+# Nomzodlar (rol bo'yicha faol xodimlar, vazni va joriy yuklamasi) qisqa
+# muddat keshlanadi; har bir tanlovdan keyin keshdagi yuklama +1 qilinadi,
+# shuning uchun ketma-ket hand-off'lar DB'ga murojaatsiz taqsimlanadi.
+#
+# Strategiyalar:
+#   least_loaded - eng kam (yuklama / vazn), teng bo'lsa eng uzoq kutgan
+#   weighted_rr  - silliq vaznli round-robin (nginx algoritmi)
+# Region affinity: ariza regioni berilsa, avval shu regiondagi xodimlar
+# orasidan tanlanadi (bo'lmasa - barcha xodimlar). Yangi strategiya
+# register_strategy() bilan qo'shiladi.
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import asyncpg
+
+from config import settings
+from database.connections import get_connection
+from database.basic.region import region_code_to_id
+from utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+Candidate = Dict[str, Any]
+Strategy = Callable[[str, List[Candidate]], Candidate]
+
+# Rol -> (connections.recipient_status, faol deb hisoblanadigan ariza statuslari).
+# None - ariza yakunlanmagan/bekor qilinmagan bo'lsa faol.
+_ROLE_ACTIVE_STATUS: Dict[str, tuple] = {
+    "controller": ("in_controller", ("in_controller",)),
+    "callcenter_operator": ("in_call_center_operator", ("in_call_center_operator",)),
+    "callcenter_supervisor": ("in_call_center_supervisor", ("in_call_center_supervisor",)),
+    "junior_manager": ("in_junior_manager", ("in_junior_manager",)),
+    "manager": ("in_manager", ("in_manager",)),
+    "technician": ("in_technician", ("between_controller_technician", "in_technician", "in_technician_work")),
+    "warehouse": ("pending_warehouse", None),
+}
+
+_CANDIDATES_SQL = """
+    SELECT
+        u.id, u.telegram_id, u.language, u.region,
+        {weight} AS weight,
+        (
+            SELECT COUNT(DISTINCT concat(c.connection_id, ':', c.technician_id, ':', c.staff_id))
+            FROM connections c
+            LEFT JOIN connection_orders co ON co.id = c.connection_id
+            LEFT JOIN technician_orders tor ON tor.id = c.technician_id
+            LEFT JOIN staff_orders so ON so.id = c.staff_id
+            WHERE c.recipient_id = u.id
+              AND c.recipient_status = $2
+              AND COALESCE(co.is_active, tor.is_active, so.is_active, FALSE) = TRUE
+              AND (
+                    ($3::text[] IS NULL
+                     AND COALESCE(co.status::text, tor.status::text, so.status::text)
+                         NOT IN ('completed', 'cancelled'))
+                    OR COALESCE(co.status::text, tor.status::text, so.status::text) = ANY($3::text[])
+              )
+        ) AS load
+    FROM users u
+    WHERE u.role = $1
+      AND COALESCE(u.is_blocked, FALSE) = FALSE
+    ORDER BY u.id
+"""
+
+# Rol -> nomzodlar ro'yxati (yuklama joyida oshiriladi)
+_candidates = TTLCache(maxsize=16, ttl=settings.ASSIGNMENT_LOAD_TTL)
+
+# Tanlov holati: round-robin og'irliklari va oxirgi tanlov vaqti
+_rr_current: Dict[str, Dict[int, float]] = {}
+_last_pick: Dict[str, Dict[int, float]] = {}
+
+# 049 migratsiyasi qo'llanmagan bazada barcha vaznlar 1
+_weight_column = {"available": True}
+
+
+# ---------- Strategiyalar ----------
+
+def least_loaded(role: str, candidates: List[Candidate]) -> Candidate:
+    """Eng kam yuklama (vaznga nisbatan); tenglikda eng uzoq tanlanmagan xodim."""
+    picks = _last_pick.get(role, {})
+    return min(
+        candidates,
+        key=lambda c: (c["load"] / c["weight"], picks.get(c["id"], 0.0), c["id"]),
+    )
+
+
+def weighted_rr(role: str, candidates: List[Candidate]) -> Candidate:
+    """Silliq vaznli round-robin: vazni 2 bo'lgan xodim 2 barobar ko'p ariza oladi."""
+    current = _rr_current.setdefault(role, {})
+    total = 0
+    best = None
+    for c in candidates:
+        current[c["id"]] = current.get(c["id"], 0.0) + c["weight"]
+        total += c["weight"]
+        if best is None or current[c["id"]] > current[best["id"]]:
+            best = c
+    current[best["id"]] -= total
+    return best
+
+
+STRATEGIES: Dict[str, Strategy] = {
+    "least_loaded": least_loaded,
+    "weighted_rr": weighted_rr,
+}
+
+
+def register_strategy(name: str, strategy: Strategy) -> None:
+    """Yangi tanlash strategiyasini qo'shish (strategy(role, candidates) -> candidate)."""
+    STRATEGIES[name] = strategy
+
+
+# ---------- Nomzodlar va yuklama ----------
+
+async def _load_candidates(role: str, conn=None) -> List[Candidate]:
+    cached = _candidates.get(role, MISSING)
+    if cached is not MISSING:
+        return cached
+
+    recipient_status, statuses = _ROLE_ACTIVE_STATUS.get(role, (f"in_{role}", (f"in_{role}",)))
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_connection()
+    try:
+        rows = None
+        if _weight_column["available"]:
+            try:
+                # Savepoint: chaqiruvchi tranzaksiyasi xatodan keyin ham ishlayversin
+                async with conn.transaction():
+                    rows = await conn.fetch(
+                        _CANDIDATES_SQL.format(weight="u.assignment_weight"),
+                        role, recipient_status, list(statuses) if statuses else None
+                    )
+            except asyncpg.UndefinedColumnError:
+                # 049 migratsiyasi hali qo'llanmagan
+                logger.warning("users.assignment_weight missing, using equal weights")
+                _weight_column["available"] = False
+        if rows is None:
+            rows = await conn.fetch(
+                _CANDIDATES_SQL.format(weight="1"),
+                role, recipient_status, list(statuses) if statuses else None
+            )
+    finally:
+        if own_conn:
+            await conn.close()
+
+    candidates = [dict(r) for r in rows]
+    for c in candidates:
+        c["load"] = int(c["load"] or 0)
+        c["weight"] = int(c["weight"] if c["weight"] is not None else 1)
+    _candidates.set(role, candidates)
+    return candidates
+
+
+def invalidate_assignment_cache(role: Optional[str] = None) -> None:
+    """Nomzodlar keshini tozalash (xodim roli/vazni o'zgarganda)."""
+    if role is None:
+        _candidates.clear()
+    else:
+        _candidates.pop(role)
+
+
+# ---------- Tanlash ----------
+
+async def pick_recipient(
+    role: str,
+    *,
+    region: Any = None,
+    strategy: Optional[str] = None,
+    conn=None,
+) -> Optional[Candidate]:
+    """
+    ``role`` xodimlaridan hand-off qabul qiluvchini tanlash.
+
+    Qaytaradi: {"id", "telegram_id", "language", "region", "weight", "load"}
+    yoki None (faol xodim yo'q). ``conn`` berilsa, nomzodlar shu ulanish
+    orqali olinadi (chaqiruvchi tranzaksiyasi ichida).
+    """
+    candidates = [c for c in await _load_candidates(role, conn) if c["weight"] > 0]
+    if not candidates:
+        return None
+
+    region_id = region_code_to_id(region) if settings.ASSIGNMENT_REGION_AFFINITY else None
+    if region_id is not None:
+        local = [c for c in candidates if region_code_to_id(c["region"]) == region_id]
+        if local:
+            candidates = local
+
+    name = strategy or settings.ASSIGNMENT_STRATEGY
+    choose = STRATEGIES.get(name)
+    if choose is None:
+        logger.warning(f"Unknown assignment strategy {name!r}, using least_loaded")
+        choose = least_loaded
+
+    chosen = choose(role, candidates)
+    chosen["load"] += 1
+    _last_pick.setdefault(role, {})[chosen["id"]] = time.monotonic()
+    return dict(chosen)
+
+
+async def pick_recipient_id(role: str, **kwargs) -> Optional[int]:
+    """pick_recipient() -> faqat users.id"""
+    chosen = await pick_recipient(role, **kwargs)
+    return chosen["id"] if chosen else None
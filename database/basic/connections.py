@@ -1,12 +1,11 @@
 # database/basic/connections.py
 
-import asyncpg
 from typing import Optional, Dict, Any
-from config import settings
+from database.connections import get_connection
 
-async def get_connection(connection_id: int) -> Optional[Dict[str, Any]]:
+async def get_connection_by_id(connection_id: int) -> Optional[Dict[str, Any]]:
     """Connection ma'lumotlarini olish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
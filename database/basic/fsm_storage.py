@@ -0,0 +1,357 @@
+# database/basic/fsm_storage.py
+# aiogram FSM uchun doimiy (persistent) storage
+#
+# MemoryStorage bot qayta ishga tushganda barcha holatlarni yo'qotadi va
+# faqat bitta jarayonda ishlaydi. Bu yerda:
+#   - PostgresStorage  - fsm_storage jadvali (044_fsm_storage.sql), asosiy variant;
+#   - SQLiteStorage    - lokal fayl (development / bitta server uchun);
+# ikkalasi ham TTL bilan: expires_at o'tgan yozuv yo'q deb hisoblanadi.
+# Backend settings.FSM_STORAGE bilan tanlanadi (create_fsm_storage()).
+#
+# Ma'lumotlar JSON sifatida saqlanadi; datetime/date/time/timedelta/Decimal/
+# UUID qiymatlari belgilangan obyekt ko'rinishida yoziladi va o'qilganda
+# tiklanadi. aiogram obyektlari (masalan state'dagi message.location)
+# model_dump() orqali tur nomi bilan yoziladi va o'qilganda qayta quriladi.
+# asyncpg Record (handler'lar state'ga qo'yadigan ariza ro'yxatlari)
+# oddiy dict bo'lib saqlanadi. Noma'lum tur - TypeError.
+#
+# fsm_storage jadvali bo'lmasa (044 qo'llanmagan) PostgresStorage
+# MemoryStorage'ga o'tadi va ogohlantirish yozadi.
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Mapping, Optional
+from uuid import UUID
+
+import asyncpg
+from aiogram import types as aiogram_types
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Eskirgan yozuvlarni o'chirish oralig'i (soniya)
+PURGE_INTERVAL = 600
+
+
+def _storage_key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (key.bot_id, key.chat_id, key.user_id, key.thread_id,
+                     key.business_connection_id, key.destiny)
+    )
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return {"__datetime__": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"__date__": obj.isoformat()}
+    if isinstance(obj, dt_time):
+        return {"__time__": obj.isoformat()}
+    if isinstance(obj, timedelta):
+        return {"__timedelta__": obj.total_seconds()}
+    if isinstance(obj, Decimal):
+        return {"__decimal__": str(obj)}
+    if isinstance(obj, UUID):
+        return {"__uuid__": str(obj)}
+    if isinstance(obj, asyncpg.Record):
+        return _prepare(dict(obj))
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, aiogram_types.TelegramObject):
+        name = type(obj).__name__
+        if getattr(aiogram_types, name, None) is type(obj):
+            return {"__aiogram__": [name, obj.model_dump(mode="json", exclude_none=True)]}
+    # Matnga aylantirib saqlash qiymatni jimgina buzadi - handler xatoni ko'rsin
+    raise TypeError(f"FSM data value is not serializable: {type(obj).__name__}")
+
+
+def _prepare(obj: Any) -> Any:
+    """Satr bo'lmagan kalitli dict'lar (masalan {material_id: qty}) JSON'da kalit turini yo'qotmasligi uchun."""
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) for k in obj):
+            return {k: _prepare(v) for k, v in obj.items()}
+        return {"__items__": [[_prepare(k), _prepare(v)] for k, v in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return [_prepare(v) for v in obj]
+    return obj
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "__items__" in obj:
+            return {tuple(k) if isinstance(k, list) else k: v for k, v in obj["__items__"]}
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__date__" in obj:
+            return date.fromisoformat(obj["__date__"])
+        if "__time__" in obj:
+            return dt_time.fromisoformat(obj["__time__"])
+        if "__timedelta__" in obj:
+            return timedelta(seconds=obj["__timedelta__"])
+        if "__decimal__" in obj:
+            return Decimal(obj["__decimal__"])
+        if "__uuid__" in obj:
+            return UUID(obj["__uuid__"])
+        if "__aiogram__" in obj:
+            # Faqat aiogram.types dagi sinflar (bazadagi ixtiyoriy import yo'li emas)
+            name, data = obj["__aiogram__"]
+            model = getattr(aiogram_types, name, None)
+            if isinstance(model, type) and issubclass(model, aiogram_types.TelegramObject):
+                return model.model_validate(data)
+            logger.warning(f"Unknown aiogram type in FSM data: {name}")
+            return data
+    return obj
+
+
+def dumps_data(data: Mapping[str, Any]) -> str:
+    return json.dumps(_prepare(dict(data)), default=_encode, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_data(raw: Optional[str]) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    return json.loads(raw, object_hook=_decode)
+
+
+class PostgresStorage(BaseStorage):
+    """fsm_storage jadvalidagi FSM holati. ttl=None - muddatsiz.
+
+    Jadval topilmasa xotiradagi MemoryStorage'ga o'tadi (restartgacha).
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self._last_purge = 0.0
+        self._fallback: Optional[MemoryStorage] = None
+
+    async def _call(self, name: str, *args) -> Any:
+        if self._fallback is None:
+            try:
+                return await getattr(self, "_pg_" + name)(*args)
+            except asyncpg.UndefinedTableError:
+                logger.warning("fsm_storage table missing (migration 044), falling back to MemoryStorage")
+                self._fallback = MemoryStorage()
+        return await getattr(self._fallback, name)(*args)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._call("set_state", key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._call("get_state", key)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._call("set_data", key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return await self._call("get_data", key)
+
+    async def _maybe_purge(self, conn) -> None:
+        now = time.monotonic()
+        if self.ttl is None or now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            await conn.execute("DELETE FROM fsm_storage WHERE expires_at <= NOW()")
+        except Exception as e:
+            logger.warning(f"FSM storage purge failed: {e}")
+
+    async def _pg_set_state(self, key: StorageKey, state: StateType = None) -> None:
+        conn = await get_connection()
+        try:
+            # Muddati o'tgan yozuvdagi eski data yangi holatga o'tib qolmasligi kerak
+            await conn.execute(
+                """
+                INSERT INTO fsm_storage AS f (key, state, expires_at, updated_at)
+                VALUES ($1, $2, NOW() + make_interval(secs => $3::float8), NOW())
+                ON CONFLICT (key) DO UPDATE
+                    SET state = EXCLUDED.state,
+                        data = CASE WHEN f.expires_at <= NOW() THEN '{}'::jsonb ELSE f.data END,
+                        expires_at = EXCLUDED.expires_at,
+                        updated_at = NOW()
+                """,
+                _storage_key(key), _state_name(state), self.ttl
+            )
+            if state is None:
+                await conn.execute(
+                    "DELETE FROM fsm_storage WHERE key = $1 AND state IS NULL AND data = '{}'::jsonb",
+                    _storage_key(key)
+                )
+            await self._maybe_purge(conn)
+        finally:
+            await conn.close()
+
+    async def _pg_get_state(self, key: StorageKey) -> Optional[str]:
+        conn = await get_connection()
+        try:
+            return await conn.fetchval(
+                """
+                SELECT state FROM fsm_storage
+                WHERE key = $1 AND (expires_at IS NULL OR expires_at > NOW())
+                """,
+                _storage_key(key)
+            )
+        finally:
+            await conn.close()
+
+    async def _pg_set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                INSERT INTO fsm_storage AS f (key, data, expires_at, updated_at)
+                VALUES ($1, $2::jsonb, NOW() + make_interval(secs => $3::float8), NOW())
+                ON CONFLICT (key) DO UPDATE
+                    SET data = EXCLUDED.data,
+                        state = CASE WHEN f.expires_at <= NOW() THEN NULL ELSE f.state END,
+                        expires_at = EXCLUDED.expires_at,
+                        updated_at = NOW()
+                """,
+                _storage_key(key), dumps_data(data), self.ttl
+            )
+            if not data:
+                await conn.execute(
+                    "DELETE FROM fsm_storage WHERE key = $1 AND state IS NULL AND data = '{}'::jsonb",
+                    _storage_key(key)
+                )
+            await self._maybe_purge(conn)
+        finally:
+            await conn.close()
+
+    async def _pg_get_data(self, key: StorageKey) -> Dict[str, Any]:
+        conn = await get_connection()
+        try:
+            raw = await conn.fetchval(
+                """
+                SELECT data::text FROM fsm_storage
+                WHERE key = $1 AND (expires_at IS NULL OR expires_at > NOW())
+                """,
+                _storage_key(key)
+            )
+            return loads_data(raw)
+        finally:
+            await conn.close()
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteStorage(BaseStorage):
+    """Lokal SQLite fayldagi FSM holati (PostgresStorage bilan bir xil semantika)."""
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fsm_storage (
+                key         TEXT PRIMARY KEY,
+                state       TEXT,
+                data        TEXT NOT NULL DEFAULT '{}',
+                expires_at  REAL
+            )
+            """
+        )
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl is not None else None
+
+    def _run(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        if self.ttl is None or now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        self._run("DELETE FROM fsm_storage WHERE expires_at <= ?", (time.time(),))
+
+    def _set_state(self, key: str, state: Optional[str]) -> None:
+        now = time.time()
+        self._run(
+            """
+            INSERT INTO fsm_storage (key, state, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE
+                SET state = excluded.state,
+                    data = CASE WHEN fsm_storage.expires_at <= ? THEN '{}' ELSE fsm_storage.data END,
+                    expires_at = excluded.expires_at
+            """,
+            (key, state, self._expires_at(), now)
+        )
+        if state is None:
+            self._run("DELETE FROM fsm_storage WHERE key = ? AND state IS NULL AND data = '{}'", (key,))
+        self._purge()
+
+    def _set_data(self, key: str, raw: str) -> None:
+        now = time.time()
+        self._run(
+            """
+            INSERT INTO fsm_storage (key, data, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE
+                SET data = excluded.data,
+                    state = CASE WHEN fsm_storage.expires_at <= ? THEN NULL ELSE fsm_storage.state END,
+                    expires_at = excluded.expires_at
+            """,
+            (key, raw, self._expires_at(), now)
+        )
+        if raw == "{}":
+            self._run("DELETE FROM fsm_storage WHERE key = ? AND state IS NULL AND data = '{}'", (key,))
+        self._purge()
+
+    def _get(self, key: str, column: str) -> Any:
+        row = self._run(
+            f"SELECT {column} FROM fsm_storage WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        )
+        return row[0] if row else None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await asyncio.to_thread(self._set_state, _storage_key(key), _state_name(state))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await asyncio.to_thread(self._get, _storage_key(key), "state")
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await asyncio.to_thread(self._set_data, _storage_key(key), dumps_data(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return loads_data(await asyncio.to_thread(self._get, _storage_key(key), "data"))
+
+    async def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def create_fsm_storage() -> BaseStorage:
+    """settings.FSM_STORAGE bo'yicha storage: 'postgres' (standart), 'sqlite' yoki 'memory'."""
+    backend = (settings.FSM_STORAGE or "postgres").lower()
+    ttl = settings.FSM_STATE_TTL or None
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(settings.FSM_SQLITE_PATH, ttl=ttl)
+    return PostgresStorage(ttl=ttl)
@@ -1,6 +1,11 @@
-import asyncpg
-from config import settings
 from typing import Optional
+from database.connections import get_connection
+from utils.cache import TTLCache, MISSING
+
+# Foydalanuvchi tili keshi: telegram_id -> 'uz' | 'ru' | None.
+# update_user_language() keshni darhol yangilaydi (write-through), shuning
+# uchun TTL faqat boshqa yo'llar bilan o'zgargan qatorlar uchun himoya.
+_lang_cache = TTLCache(maxsize=8192, ttl=600)
 
 async def update_user_language(telegram_id: int, language: str) -> bool:
     """Foydalanuvchi tilini yangilaydi.
@@ -12,12 +17,17 @@ async def update_user_language(telegram_id: int, language: str) -> bool:
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET language = $1 WHERE telegram_id = $2',
             language, telegram_id
         )
+        if result == "UPDATE 1":
+            # data["user"] dagi language ham eskirmasligi uchun
+            from database.basic.user import invalidate_user_cache
+            invalidate_user_cache(telegram_id)
+            _lang_cache.set(telegram_id, language)
         return result == "UPDATE 1"
     except Exception as e:
         print(f"Til yangilashda xatolik: {e}")
@@ -26,7 +36,7 @@ async def update_user_language(telegram_id: int, language: str) -> bool:
         await conn.close()
 
 async def get_user_language(telegram_id: int) -> Optional[str]:
-    """Foydalanuvchi tilini oladi.
+    """Foydalanuvchi tilini oladi (keshdan, bo'lmasa DB'dan).
     
     Args:
         telegram_id: Telegram foydalanuvchi IDsi
@@ -34,15 +44,27 @@ async def get_user_language(telegram_id: int) -> Optional[str]:
     Returns:
         Optional[str]: Foydalanuvchi tili (uz yoki ru) yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    cached = _lang_cache.get(telegram_id, MISSING)
+    if cached is not MISSING:
+        return cached
+    conn = await get_connection()
     try:
         result = await conn.fetchval(
             'SELECT language FROM users WHERE telegram_id = $1',
             telegram_id
         )
+        _lang_cache.set(telegram_id, result)
         return result
     except Exception as e:
         print(f"Til olishda xatolik: {e}")
         return None
     finally:
-        await conn.close()
\ No newline at end of file
+        await conn.close()
+
+def remember_user_language(telegram_id: int, language: Optional[str]) -> None:
+    """DB'dan boshqa yo'l bilan o'qilgan tilni keshga qo'yish (qo'shimcha so'rovsiz)."""
+    _lang_cache.set(telegram_id, language)
+
+def forget_user_language(telegram_id: int) -> None:
+    """Til keshidan foydalanuvchini olib tashlash."""
+    _lang_cache.pop(telegram_id)
@@ -0,0 +1,175 @@
+# database/basic/order_counters.py
+# Dashboard hisoblagichlari: bitta guruhlangan so'rov -> snapshot
+#
+# Avval har bir dashboard 5-7 ta alohida COUNT(*) funksiyasini chaqirardi,
+# har biri o'z ulanishi bilan (manager, controller, CCS statistikasi).
+# Endi connection_orders, technician_orders va staff_orders bitta UNION ALL
+# so'rovida (manba, tur, status, is_active, user_id, bugun yaratilgan,
+# bugun yangilangan) bo'yicha guruhlanadi; natija qisqa muddat keshlanadi
+# va barcha hisoblagichlar shu snapshot'dan olinadi.
+#
+# Status o'zgartiruvchi funksiyalar @invalidates_order_counters bilan
+# belgilanadi (yoki invalidate_order_counters() ni chaqiradi) - keyingi
+# dashboard yangi snapshot quradi. Yangi arizalar TTL ichida ko'rinadi.
+
+import asyncio
+import functools
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from config import settings
+from database.connections import get_connection
+from utils.cache import TTLCache, MISSING
+
+# "Bugun" - sessiya vaqt zonasidagi yarim tundan boshlab (DATE(x) = CURRENT_DATE
+# bilan bir xil, lekin ustunga funksiya qo'llanmaydi)
+_SNAPSHOT_SQL = """
+    SELECT source, kind, status, is_active, user_id, created_today, updated_today,
+           COUNT(*) AS n
+    FROM (
+        SELECT 'connection' AS source, NULL::text AS kind, status::text AS status,
+               is_active, NULL::bigint AS user_id,
+               created_at >= CURRENT_DATE AS created_today,
+               updated_at >= CURRENT_DATE AS updated_today
+          FROM connection_orders
+        UNION ALL
+        SELECT 'technician', NULL::text, status::text,
+               is_active, NULL::bigint,
+               created_at >= CURRENT_DATE,
+               updated_at >= CURRENT_DATE
+          FROM technician_orders
+        UNION ALL
+        SELECT 'staff', type_of_zayavka::text, status::text,
+               is_active, user_id,
+               created_at >= CURRENT_DATE,
+               updated_at >= CURRENT_DATE
+          FROM staff_orders
+    ) t
+    GROUP BY source, kind, status, is_active, user_id, created_today, updated_today
+"""
+
+
+class CounterRow(NamedTuple):
+    source: str
+    kind: Optional[str]
+    status: str
+    is_active: Optional[bool]
+    user_id: Optional[int]
+    created_today: bool
+    updated_today: bool
+    n: int
+
+
+class OrderCounters:
+    """Guruhlangan qatorlar ustidan hisoblash (DB'ga murojaatsiz)."""
+
+    def __init__(self, rows: Iterable[CounterRow]):
+        self.rows: List[CounterRow] = list(rows)
+        self.taken_at = time.time()
+
+    def count(
+        self,
+        sources: Iterable[str] = ("connection", "technician", "staff"),
+        *,
+        kind: Optional[str] = None,
+        statuses: Optional[Iterable[str]] = None,
+        exclude: Iterable[str] = (),
+        active: Optional[bool] = True,
+        user_id: Optional[int] = None,
+        created_today: bool = False,
+        updated_today: bool = False,
+    ) -> int:
+        """
+        Shartga mos arizalar soni.
+
+        ``kind`` faqat staff_orders (type_of_zayavka) uchun; ``active`` -
+        True: COALESCE(is_active, TRUE), False: is_active = FALSE, None: barchasi.
+        """
+        sources = (sources,) if isinstance(sources, str) else tuple(sources)
+        statuses = (statuses,) if isinstance(statuses, str) else statuses
+        wanted = set(statuses) if statuses is not None else None
+        excluded = set(exclude)
+        total = 0
+        for r in self.rows:
+            if r.source not in sources:
+                continue
+            if kind is not None and r.source == "staff" and r.kind != kind:
+                continue
+            if wanted is not None and r.status not in wanted:
+                continue
+            if r.status in excluded:
+                continue
+            if active is True and r.is_active is False:
+                continue
+            if active is False and r.is_active is not False:
+                continue
+            if user_id is not None and r.user_id != user_id:
+                continue
+            if created_today and not r.created_today:
+                continue
+            if updated_today and not r.updated_today:
+                continue
+            total += r.n
+        return total
+
+    def group_by(self, field: str, source: str, *, active: Optional[bool] = True) -> Dict[Any, int]:
+        """``field`` (status / kind) bo'yicha taqsimot, kamayish tartibida."""
+        result: Dict[Any, int] = {}
+        for r in self.rows:
+            if r.source != source:
+                continue
+            if active is True and r.is_active is False:
+                continue
+            if active is False and r.is_active is not False:
+                continue
+            key = getattr(r, field)
+            result[key] = result.get(key, 0) + r.n
+        return dict(sorted(result.items(), key=lambda item: -item[1]))
+
+
+_snapshot = TTLCache(maxsize=1, ttl=settings.ORDER_COUNTERS_TTL)
+_build_lock = asyncio.Lock()
+
+
+async def get_order_counters() -> OrderCounters:
+    """Joriy snapshot (keshdan yoki bitta guruhlangan so'rov bilan)."""
+    cached = _snapshot.get("all", MISSING)
+    if cached is not MISSING:
+        return cached
+    async with _build_lock:
+        # Kutish paytida boshqa korutina qurib qo'ygan bo'lishi mumkin
+        cached = _snapshot.get("all", MISSING)
+        if cached is not MISSING:
+            return cached
+        conn = await get_connection()
+        try:
+            rows = await conn.fetch(_SNAPSHOT_SQL)
+        finally:
+            await conn.close()
+        counters = OrderCounters(
+            CounterRow(
+                r["source"], r["kind"], r["status"], r["is_active"], r["user_id"],
+                bool(r["created_today"]), bool(r["updated_today"]), int(r["n"]),
+            )
+            for r in rows
+        )
+        _snapshot.set("all", counters)
+        return counters
+
+
+def invalidate_order_counters() -> None:
+    """Snapshot'ni tashlash (ariza statusi o'zgarganda)."""
+    _snapshot.clear()
+
+
+def invalidates_order_counters(func):
+    """Async funksiya tugagach (muvaffaqiyatli yoki yo'q) snapshot'ni tashlash."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            invalidate_order_counters()
+
+    return wrapper
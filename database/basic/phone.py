@@ -2,9 +2,10 @@
 # Telefon raqamlari bilan bog'liq umumiy funksiyalar
 
 import re
-import asyncpg
 from typing import Optional, Dict, Any
-from config import settings
+
+import asyncpg
+from database.connections import get_connection
 
 # Telefon raqam validatsiyasi uchun regex
 _PHONE_RE = re.compile(
@@ -35,9 +36,37 @@ def normalize_phone(raw: str) -> Optional[str]:
     
     return raw if raw.startswith("+") else ("+" + digits if digits else None)
 
+def phone_lookup_key(raw: str) -> Optional[str]:
+    """
+    users.phone_normalized bilan taqqoslanadigan kalit (998XXXXXXXXX).
+    
+    Args:
+        raw: Qo'lda kiritilgan telefon raqam
+        
+    Returns:
+        Faqat raqamlardan iborat kalit yoki None agar raqam noto'g'ri bo'lsa
+    """
+    normalized = normalize_phone(raw)
+    if not normalized:
+        return None
+    digits = re.sub(r"[^\d]", "", normalized)
+    if len(digits) == 9:
+        digits = "998" + digits
+    return digits or None
+
+# Qidiruv ekranlari uchun umumiy ustunlar to'plami
+_USER_LOOKUP_COLUMNS = """
+    id, telegram_id, full_name, username, phone, language, region, address,
+    abonent_id, is_blocked, role, created_at
+"""
+
 async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     """
-    Telefon raqam orqali user topish.
+    Telefon raqam orqali user topish (call center, junior manager, manager,
+    controller va admin qidiruvlari uchun umumiy).
+    
+    users.phone_normalized indeksi bo'yicha qidiriladi; 047 migratsiyasi
+    qo'llanmagan bazada eski regexp_replace taqqoslashiga qaytadi.
     
     Args:
         phone: Qidiriladigan telefon raqam
@@ -45,20 +74,34 @@ async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     Returns:
         User ma'lumotlari yoki None
     """
-    normalized_phone = normalize_phone(phone)
-    if not normalized_phone:
+    key = phone_lookup_key(phone)
+    if not key:
         return None
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        row = await conn.fetchrow(
-            """
-            SELECT id, full_name, phone, username, telegram_id, role, language, is_blocked, created_at
-            FROM users
-            WHERE phone = $1
-            """,
-            normalized_phone
-        )
+        try:
+            row = await conn.fetchrow(
+                f"""
+                SELECT {_USER_LOOKUP_COLUMNS}
+                FROM users
+                WHERE phone_normalized = $1
+                ORDER BY id
+                LIMIT 1
+                """,
+                key
+            )
+        except asyncpg.UndefinedColumnError:
+            row = await conn.fetchrow(
+                f"""
+                SELECT {_USER_LOOKUP_COLUMNS}
+                FROM users
+                WHERE regexp_replace(phone, '[^0-9]', '', 'g') IN ($1, substr($1, 4))
+                ORDER BY id
+                LIMIT 1
+                """,
+                key
+            )
         return dict(row) if row else None
     finally:
         await conn.close()
@@ -1,8 +1,10 @@
 # database/basic/rating.py
 
-import asyncpg
+import logging
 from typing import Optional, Dict, Any
-from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
 
 async def save_rating(request_id: int, request_type: str, rating: int, comment: Optional[str] = None) -> bool:
     """
@@ -17,13 +19,13 @@ async def save_rating(request_id: int, request_type: str, rating: int, comment:
     Returns:
         bool: Muvaffaqiyatli saqlangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Ensure rating is integer and validate parameters
         rating = int(rating)
         
         # Debug: Print parameters
-        print(f"DEBUG: Saving rating - request_id: {request_id}, request_type: {request_type}, rating: {rating}, comment: {comment}")
+        logger.debug(f"Saving rating - request_id: {request_id}, request_type: {request_type}, rating: {rating}, comment: {comment}")
         
         # Validate parameters
         if not isinstance(request_id, int):
@@ -46,7 +48,7 @@ async def save_rating(request_id: int, request_type: str, rating: int, comment:
         """
         app_number_result = await conn.fetchrow(app_number_query, request_id)
         if not app_number_result:
-            print(f"DEBUG: No application_number found for request_id {request_id}")
+            logger.warning(f"No application_number found for request_id {request_id}")
             return False
         
         application_number = app_number_result['application_number']
@@ -62,7 +64,7 @@ async def save_rating(request_id: int, request_type: str, rating: int, comment:
         
         if existing:
             # Update existing rating
-            print(f"DEBUG: Updating existing rating with id: {existing['id']}")
+            logger.debug(f"Updating existing rating with id: {existing['id']}")
             await conn.execute(
                 """
                 UPDATE akt_ratings 
@@ -73,7 +75,7 @@ async def save_rating(request_id: int, request_type: str, rating: int, comment:
             )
         else:
             # Insert new rating
-            print(f"DEBUG: Inserting new rating")
+            logger.debug("Inserting new rating")
             await conn.execute(
                 """
                 INSERT INTO akt_ratings (application_number, rating, comment)
@@ -81,12 +83,10 @@ async def save_rating(request_id: int, request_type: str, rating: int, comment:
                 """,
                 application_number, rating, comment
             )
-        print(f"DEBUG: Rating saved successfully")
+        logger.debug("Rating saved successfully")
         return True
     except Exception as e:
-        print(f"Error saving rating: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error saving rating: {e}")
         return False
     finally:
         await conn.close()
@@ -98,7 +98,7 @@ async def get_rating_stats() -> Dict[str, Any]:
     Returns:
         Dict: Reyting statistikasi
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
@@ -115,7 +115,7 @@ async def get_rating_stats() -> Dict[str, Any]:
         )
         return dict(stats) if stats else {}
     except Exception as e:
-        print(f"Error getting rating stats: {e}")
+        logger.error(f"Error getting rating stats: {e}")
         return {}
     finally:
         await conn.close()
@@ -131,7 +131,7 @@ async def get_rating(request_id: int, request_type: str) -> Optional[Dict[str, A
     Returns:
         Dict: Reyting ma'lumotlari yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get application_number from the order tables
         app_number_query = """
@@ -158,7 +158,7 @@ async def get_rating(request_id: int, request_type: str) -> Optional[Dict[str, A
         )
         return dict(rating) if rating else None
     except Exception as e:
-        print(f"Error getting rating: {e}")
+        logger.error(f"Error getting rating: {e}")
         return None
     finally:
         await conn.close()
@@ -0,0 +1,29 @@
+# database/basic/region.py
+# Region kodlari: klaviaturalar / arizalar "toshkent_*" kodlarini, users.region
+# esa "tashkent_*" (setup_new.py CHECK) kodlarini ishlatadi - ikkalasi ham
+# bir xil ID ga aylanadi.
+
+from typing import Any, Dict, Optional
+
+REGION_CODE_TO_ID: Dict[str, int] = {
+    "toshkent_city": 1, "toshkent_region": 2, "andijon": 3, "fergana": 4, "namangan": 5,
+    "sirdaryo": 6, "jizzax": 7, "samarkand": 8, "bukhara": 9, "navoi": 10,
+    "kashkadarya": 11, "surkhandarya": 12, "khorezm": 13, "karakalpakstan": 14,
+}
+
+# users.region dagi yozilish
+_CODE_ALIASES = {
+    "tashkent_city": "toshkent_city",
+    "tashkent_region": "toshkent_region",
+}
+
+
+def region_code_to_id(value: Any) -> Optional[int]:
+    """Region ID (son) yoki kod (matn) -> ID; noma'lum bo'lsa None."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        code = str(value).strip().lower()
+        return REGION_CODE_TO_ID.get(_CODE_ALIASES.get(code, code))
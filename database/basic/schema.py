@@ -0,0 +1,127 @@
+# database/basic/schema.py
+# Sxema imkoniyatlari reyestri: ustunlar va enum qiymatlari (bir marta o'qiladi)
+#
+# Ba'zi kod yo'llari migratsiyalar qo'llanganiga qarab turlicha SQL yozadi
+# (masalan material_requests.updated_at bor-yo'qligi). Avval har bir
+# chaqiruvda information_schema so'ralardi - tranzaksiya ichida ham.
+# Endi katalog bot ishga tushganda (main.py) bir marta o'qiladi va
+# xotirada turadi; migratsiyadan keyin refresh_schema() qayta o'qiydi.
+# Reyestr yuklanmagan bo'lsa (skriptlar, testlar) get_schema() birinchi
+# murojaatda o'zi yuklaydi.
+
+import asyncio
+import logging
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Hot path'da tekshiriladigan jadvallar
+TRACKED_TABLES = (
+    "connections",
+    "connection_orders",
+    "technician_orders",
+    "staff_orders",
+    "users",
+    "materials",
+    "material_requests",
+    "material_and_technician",
+    "material_issued",
+)
+
+_COLUMNS_SQL = """
+    SELECT c.relname AS table_name, a.attname AS column_name
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public'
+      AND c.relname = ANY($1::text[])
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+"""
+
+_ENUMS_SQL = """
+    SELECT t.typname AS enum_name, e.enumlabel AS label
+    FROM pg_type t
+    JOIN pg_enum e ON e.enumtypid = t.oid
+    JOIN pg_namespace n ON n.oid = t.typnamespace
+    WHERE n.nspname = 'public'
+    ORDER BY t.typname, e.enumsortorder
+"""
+
+
+class SchemaRegistry:
+    """Ustunlar va enum'lar haqidagi keshlangan ma'lumot."""
+
+    def __init__(self, columns: Dict[str, FrozenSet[str]], enums: Dict[str, Tuple[str, ...]]):
+        self._columns = columns
+        self._enums = enums
+
+    def columns(self, table: str) -> FrozenSet[str]:
+        return self._columns.get(table, frozenset())
+
+    def has_table(self, table: str) -> bool:
+        return table in self._columns
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.columns(table)
+
+    def pick_column(self, table: str, candidates: Iterable[str]) -> Optional[str]:
+        """Nomzodlardan jadvalda mavjud birinchisi (yo'q bo'lsa None)."""
+        cols = self.columns(table)
+        for c in candidates:
+            if c in cols:
+                return c
+        return None
+
+    def enum_values(self, enum_name: str) -> Tuple[str, ...]:
+        return self._enums.get(enum_name, ())
+
+    def has_enum_value(self, enum_name: str, value: str) -> bool:
+        return value in self.enum_values(enum_name)
+
+
+_registry: Optional[SchemaRegistry] = None
+_load_lock = asyncio.Lock()
+
+
+async def refresh_schema(conn=None) -> SchemaRegistry:
+    """Katalogni qayta o'qish (ishga tushishda va migratsiyadan keyin)."""
+    global _registry
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_connection()
+    try:
+        col_rows = await conn.fetch(_COLUMNS_SQL, list(TRACKED_TABLES))
+        enum_rows = await conn.fetch(_ENUMS_SQL)
+    finally:
+        if own_conn:
+            await conn.close()
+
+    columns: Dict[str, set] = {}
+    for r in col_rows:
+        columns.setdefault(r["table_name"], set()).add(r["column_name"])
+    enums: Dict[str, list] = {}
+    for r in enum_rows:
+        enums.setdefault(r["enum_name"], []).append(r["label"])
+
+    _registry = SchemaRegistry(
+        {t: frozenset(c) for t, c in columns.items()},
+        {e: tuple(v) for e, v in enums.items()},
+    )
+    missing = [t for t in TRACKED_TABLES if t not in columns]
+    if missing:
+        logger.warning(f"Schema registry: tables not found: {', '.join(missing)}")
+    logger.info(f"Schema registry loaded: {len(columns)} tables, {len(enums)} enums")
+    return _registry
+
+
+async def get_schema(conn=None) -> SchemaRegistry:
+    """Joriy reyestr; hali yuklanmagan bo'lsa bir marta yuklanadi (``conn`` orqali)."""
+    if _registry is not None:
+        return _registry
+    async with _load_lock:
+        if _registry is not None:
+            return _registry
+        return await refresh_schema(conn)
@@ -0,0 +1,222 @@
+# database/basic/search.py
+# Mijozlar, arizalar va materiallar bo'yicha umumiy qidiruv (pg_trgm)
+#
+# Har bir qidiruv maqsadi (users / orders / materials) uchun matn maydonlari
+# 048_trigram_search.sql dagi GIN (gin_trgm_ops) indekslari bilan
+# qoplangan. Shart: maydon ILIKE '%so'z%' yoki so'z <% maydon
+# (word_similarity), ball: eng yaxshi word_similarity + 1 (to'liq
+# substring bo'lsa). Natija ball bo'yicha saralanadi va LIMIT/OFFSET bilan
+# sahifalanadi.
+#
+# pg_trgm o'rnatilmagan bazada xuddi shu ball utils/trigram.TrigramIndex
+# (xotiradagi indeks, qisqa muddat keshlanadi) orqali hisoblanadi.
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from database.connections import get_connection
+from utils.cache import TTLCache, MISSING
+from utils.trigram import DEFAULT_THRESHOLD, TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    source: str                     # jadval yoki subquery
+    key: str                        # noyob kalit ifodasi (fallback uchun)
+    fields: Tuple[str, ...]         # trigram indeksli matn ustunlari
+    columns: str                    # qaytariladigan ustunlar
+    order: str                      # teng ball bo'lganda tartib
+    exact_int: Optional[str] = None  # raqamli so'rov uchun aniq tenglik (masalan telegram_id)
+
+
+_ORDERS_SOURCE = """(
+    SELECT 'connection' AS order_type, id, application_number, address,
+           status::text AS status, created_at
+    FROM connection_orders WHERE COALESCE(is_active, TRUE) = TRUE
+    UNION ALL
+    SELECT 'technician', id, application_number, address, status::text, created_at
+    FROM technician_orders WHERE COALESCE(is_active, TRUE) = TRUE
+    UNION ALL
+    SELECT 'staff', id, application_number, address, status::text, created_at
+    FROM staff_orders WHERE COALESCE(is_active, TRUE) = TRUE
+)"""
+
+TARGETS: Dict[str, SearchTarget] = {
+    "users": SearchTarget(
+        source="users",
+        key="id",
+        fields=("full_name", "phone", "abonent_id", "username"),
+        columns="""id, telegram_id, full_name, username, phone, role, language, region,
+                   address, abonent_id, is_blocked, created_at, updated_at""",
+        order="created_at DESC",
+        exact_int="telegram_id",
+    ),
+    "orders": SearchTarget(
+        source=_ORDERS_SOURCE,
+        key="order_type || ':' || id",
+        fields=("application_number", "address"),
+        columns="order_type, id, application_number, address, status, created_at",
+        order="created_at DESC",
+    ),
+    "materials": SearchTarget(
+        source="materials",
+        key="id",
+        fields=("name", "serial_number"),
+        columns="id, name, price, description, quantity, serial_number, created_at, updated_at",
+        order="name",
+    ),
+}
+
+# pg_trgm mavjudligi: None - hali tekshirilmagan
+_trgm_state: Dict[str, Any] = {"available": None, "checked_at": 0.0}
+TRGM_RECHECK_SECONDS = 600
+
+# Fallback indekslari: target -> TrigramIndex
+_fallback_indexes = TTLCache(maxsize=len(TARGETS), ttl=120)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _build_sql(target: SearchTarget) -> str:
+    fields = [f"COALESCE(s.{f}::text, '')" for f in target.fields]
+    match = " OR ".join(
+        f"s.{f} ILIKE $2 OR $1 <% s.{f}" for f in target.fields
+    )
+    if target.exact_int:
+        match += f" OR s.{target.exact_int} = $5"
+    score = (
+        f"GREATEST({', '.join(f'word_similarity($1, {f})' for f in fields)})"
+        f" + CASE WHEN {' OR '.join(f'{f} ILIKE $2' for f in fields)} THEN 1 ELSE 0 END"
+    )
+    return f"""
+        SELECT {target.columns}, ({score})::float8 AS score
+        FROM {target.source} s
+        WHERE {match}
+        ORDER BY score DESC, {target.order}
+        LIMIT $3 OFFSET $4
+    """
+
+
+_SQL = {name: _build_sql(t) for name, t in TARGETS.items()}
+
+
+def _trgm_enabled() -> bool:
+    if _trgm_state["available"] is False:
+        if time.monotonic() - _trgm_state["checked_at"] < TRGM_RECHECK_SECONDS:
+            return False
+        _trgm_state["available"] = None
+    return True
+
+
+async def search(target: str, term: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    ``target`` ('users' | 'orders' | 'materials') bo'yicha reytingli qidiruv.
+
+    Har bir natijada ``score`` bor (katta - yaxshiroq mos).
+    """
+    spec = TARGETS[target]
+    term = (term or "").strip()
+    if not term:
+        return []
+
+    if _trgm_enabled():
+        exact = int(term) if spec.exact_int and term.isdigit() and len(term) <= 18 else None
+        args = [term, f"%{_escape_like(term)}%", limit, offset]
+        if spec.exact_int:
+            args.append(exact)
+        conn = await get_connection()
+        try:
+            rows = await conn.fetch(_SQL[target], *args)
+            _trgm_state["available"] = True
+            return [dict(r) for r in rows]
+        except (asyncpg.UndefinedFunctionError, asyncpg.UndefinedObjectError) as e:
+            # pg_trgm kengaytmasi yo'q (048 migratsiyasi qo'llanmagan)
+            logger.warning(f"pg_trgm unavailable, using in-memory trigram search: {e}")
+            _trgm_state["available"] = False
+            _trgm_state["checked_at"] = time.monotonic()
+        finally:
+            await conn.close()
+
+    return await _fallback_search(target, spec, term, limit, offset)
+
+
+async def _fallback_index(target: str, spec: SearchTarget) -> TrigramIndex:
+    index = _fallback_indexes.get(target, MISSING)
+    if index is not MISSING:
+        return index
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            f"SELECT ({spec.key})::text AS k, {', '.join(spec.fields)} FROM {spec.source} s"
+        )
+    finally:
+        await conn.close()
+    index = TrigramIndex()
+    for r in rows:
+        index.add(r["k"], [r[f] for f in spec.fields])
+    _fallback_indexes.set(target, index)
+    return index
+
+
+async def _fallback_search(target: str, spec: SearchTarget, term: str,
+                           limit: int, offset: int) -> List[Dict[str, Any]]:
+    index = await _fallback_index(target, spec)
+    hits = index.search(term, limit=limit, offset=offset, threshold=DEFAULT_THRESHOLD)
+    keys = [k for k, _ in hits]
+    conn = await get_connection()
+    try:
+        if spec.exact_int and term.isdigit() and len(term) <= 18 and offset == 0:
+            extra = await conn.fetchval(
+                f"SELECT ({spec.key})::text FROM {spec.source} s WHERE {spec.exact_int} = $1",
+                int(term)
+            )
+            if extra is not None and extra not in keys:
+                hits.insert(0, (extra, 1.0))
+                keys.insert(0, extra)
+        if not keys:
+            return []
+        rows = await conn.fetch(
+            f"""
+            SELECT {spec.columns}, ({spec.key})::text AS _key
+            FROM {spec.source} s
+            WHERE ({spec.key})::text = ANY($1::text[])
+            """,
+            keys
+        )
+    finally:
+        await conn.close()
+
+    by_key = {r["_key"]: r for r in rows}
+    result = []
+    for key, score in hits[:limit]:
+        row = by_key.get(key)
+        if row is None:
+            continue
+        item = dict(row)
+        item.pop("_key", None)
+        item["score"] = score
+        result.append(item)
+    return result
+
+
+async def search_users(term: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """Ism, telefon, abonent ID yoki username bo'yicha foydalanuvchilar."""
+    return await search("users", term, limit, offset)
+
+
+async def search_orders(term: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """Ariza raqami yoki manzil bo'yicha faol arizalar (ulanish / texnik / xodim)."""
+    return await search("orders", term, limit, offset)
+
+
+async def search_materials(term: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """Nomi yoki seriya raqami bo'yicha materiallar."""
+    return await search("materials", term, limit, offset)
@@ -0,0 +1,170 @@
+# database/basic/staff_activity.py
+# Xodimlar faoliyati (controller / manager / call center supervisor ekranlari uchun umumiy)
+#
+# Eski so'rovlar har bir xodim uchun butun order jadvallarini
+# (LEFT JOIN connection_orders co ON is_active) biriktirardi - natijada
+# users x orders x connections dekart ko'paytmasi hosil bo'lardi.
+# Bu yerda order jadvallari va connections faqat xodimlarga tegishli qatorlar
+# bo'yicha (user_id / sender_id / recipient_id indekslari orqali) bir marta
+# o'qiladi va (xodim, metrika, tur) bo'yicha guruhlanadi.
+
+from typing import Any, Dict, Iterable, List, Sequence
+from database.connections import get_connection
+
+# Qo'llab-quvvatlanadigan vaqt oynalari (created_at >= ...)
+TIME_FILTERS = ("today", "3days", "7days", "month", "total")
+
+ORDER_KINDS = ("conn", "tech", "staff")
+
+_STATS_SQL = """
+WITH params AS (
+    SELECT CASE $2::text
+               WHEN 'today' THEN CURRENT_DATE::timestamptz
+               WHEN '3days' THEN CURRENT_DATE - INTERVAL '3 days'
+               WHEN '7days' THEN CURRENT_DATE - INTERVAL '7 days'
+               WHEN 'month' THEN CURRENT_DATE - INTERVAL '30 days'
+               ELSE '-infinity'::timestamptz
+           END AS since
+),
+staff AS (
+    SELECT id FROM users WHERE role::text = ANY($1::text[])
+),
+created AS (
+    SELECT o.user_id AS staff_id, o.kind,
+           COUNT(*) AS cnt,
+           COUNT(*) FILTER (WHERE o.status NOT IN ('cancelled', 'completed')) AS active
+    FROM (
+        SELECT 'conn' AS kind, user_id, status::text AS status
+        FROM connection_orders, params
+        WHERE user_id IN (SELECT id FROM staff)
+          AND COALESCE(is_active, TRUE) = TRUE AND created_at >= params.since
+        UNION ALL
+        SELECT 'tech', user_id, status::text
+        FROM technician_orders, params
+        WHERE user_id IN (SELECT id FROM staff)
+          AND COALESCE(is_active, TRUE) = TRUE AND created_at >= params.since
+        UNION ALL
+        SELECT 'staff', user_id, status::text
+        FROM staff_orders, params
+        WHERE user_id IN (SELECT id FROM staff)
+          AND COALESCE(is_active, TRUE) = TRUE AND created_at >= params.since
+    ) o
+    GROUP BY o.user_id, o.kind
+),
+flows AS (
+    -- connections'ning xodimlarga tegishli qatorlari (bir marta o'qiladi)
+    SELECT
+        c.sender_id,
+        c.recipient_id,
+        c.recipient_status,
+        c.created_at,
+        CASE
+            WHEN c.connection_id IS NOT NULL THEN 'conn'
+            WHEN c.technician_id IS NOT NULL THEN 'tech'
+            WHEN c.staff_id IS NOT NULL THEN 'staff'
+        END AS kind,
+        COALESCE(c.connection_id, c.technician_id, c.staff_id) AS order_id,
+        COALESCE(co.status::text, tor.status::text, so.status::text) AS order_status,
+        COALESCE(co.is_active, tor.is_active, so.is_active, TRUE) AS order_active,
+        COALESCE(co.created_at, tor.created_at, so.created_at) AS order_created_at
+    FROM connections c
+    LEFT JOIN connection_orders co ON co.id = c.connection_id
+    LEFT JOIN technician_orders tor ON tor.id = c.technician_id
+    LEFT JOIN staff_orders so ON so.id = c.staff_id
+    WHERE c.sender_id IN (SELECT id FROM staff)
+       OR c.recipient_id IN (SELECT id FROM staff)
+),
+assigned AS (
+    SELECT f.recipient_id AS staff_id, f.kind,
+           COUNT(DISTINCT f.order_id) AS cnt,
+           COUNT(DISTINCT f.order_id) FILTER (
+               WHERE f.order_status NOT IN ('cancelled', 'completed')
+           ) AS active
+    FROM flows f, params
+    WHERE f.recipient_id IN (SELECT id FROM staff)
+      AND f.recipient_status = ANY($3::text[])
+      AND f.kind = ANY($4::text[])
+      AND f.order_active
+      AND f.order_created_at >= params.since
+    GROUP BY f.recipient_id, f.kind
+),
+sent AS (
+    SELECT f.sender_id AS staff_id, f.kind,
+           COUNT(*) AS cnt,
+           COUNT(*) FILTER (WHERE f.order_status NOT IN ('cancelled', 'completed')) AS active
+    FROM flows f, params
+    WHERE f.sender_id IN (SELECT id FROM staff)
+      AND f.kind IS NOT NULL
+      AND f.created_at >= params.since
+    GROUP BY f.sender_id, f.kind
+)
+SELECT 'created' AS metric, staff_id, kind, cnt, active FROM created
+UNION ALL
+SELECT 'assigned', staff_id, kind, cnt, active FROM assigned
+UNION ALL
+SELECT 'sent', staff_id, kind, cnt, active FROM sent
+"""
+
+
+def _empty_row(user: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(user)
+    for metric in ("created", "assigned", "sent"):
+        for kind in ORDER_KINDS:
+            row[f"{metric}_{kind}_count"] = 0
+    row["total_orders"] = 0
+    row["conn_count"] = 0
+    row["tech_count"] = 0
+    row["active_count"] = 0
+    return row
+
+
+async def fetch_staff_activity_stats(
+    roles: Sequence[str],
+    time_filter: str = "total",
+    assigned_statuses: Iterable[str] = (),
+    assigned_kinds: Iterable[str] = ORDER_KINDS,
+) -> List[Dict[str, Any]]:
+    """
+    Berilgan rollardagi xodimlar faoliyati.
+
+    Har bir xodim uchun: yaratgan (created_*), workflow orqali unga
+    kelgan (assigned_*, recipient_status in assigned_statuses) va u
+    yuborgan (sent_*) arizalar soni, tur bo'yicha (conn/tech/staff).
+
+    time_filter: 'today', '3days', '7days', 'month', 'total'
+    """
+    if time_filter not in TIME_FILTERS:
+        time_filter = "total"
+
+    conn = await get_connection()
+    try:
+        users = await conn.fetch(
+            """
+            SELECT id, full_name, phone, role, created_at
+            FROM users
+            WHERE role::text = ANY($1::text[])
+            """,
+            list(roles)
+        )
+        stats = await conn.fetch(
+            _STATS_SQL,
+            list(roles), time_filter, list(assigned_statuses), list(assigned_kinds)
+        )
+    finally:
+        await conn.close()
+
+    by_id = {u["id"]: _empty_row(dict(u)) for u in users}
+    for s in stats:
+        row = by_id.get(s["staff_id"])
+        if row is None:
+            continue
+        cnt = int(s["cnt"] or 0)
+        row[f"{s['metric']}_{s['kind']}_count"] += cnt
+        row["total_orders"] += cnt
+        row["active_count"] += int(s["active"] or 0)
+        if s["kind"] == "conn":
+            row["conn_count"] += cnt
+        elif s["kind"] == "tech":
+            row["tech_count"] += cnt
+
+    return sorted(by_id.values(), key=lambda r: (-r["total_orders"], r["full_name"] or ""))
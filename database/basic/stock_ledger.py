@@ -0,0 +1,316 @@
+# database/basic/stock_ledger.py
+# Material o'tkazmalari: ombor <-> texnik <-> ariza (stock_movements jurnali)
+#
+# Avval o'tkazmalar "qoldiqni o'qish -> Python'da solishtirish -> UPDATE"
+# ko'rinishida edi; parallel o'tkazmalarda qoldiq manfiy bo'lishi mumkin edi.
+# Endi bitta statement:
+#   debit  - manbadan shartli kamaytirish (quantity >= miqdor), qator qulfi
+#            ostida PostgreSQL shartni qayta tekshiradi;
+#   credit - qabul qiluvchiga qo'shish;
+#   ledger - stock_movements ga yozuv (053 migratsiyasi).
+# Qaysidir material yetmasa, butun savat bekor qilinadi (InsufficientStock).
+#
+# Qoldiqlar (materialized): ombor - materials.quantity, texnik -
+# material_and_technician.quantity; o'qish stock_holder_balances orqali.
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import asyncpg
+
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+WAREHOUSE = "warehouse"
+TECHNICIAN = "technician"
+ORDER = "order"
+
+Items = Union[Dict[int, int], Iterable[Tuple[int, int]]]
+
+
+class InsufficientStock(ValueError):
+    """Manbada yetarli material yo'q (butun o'tkazma bekor qilinadi)."""
+
+    def __init__(self, material_ids: List[int]):
+        self.material_ids = material_ids
+        super().__init__(f"Yetarli material yo'q: {', '.join(map(str, material_ids))}")
+
+
+_DEBIT = {
+    WAREHOUSE: """
+    debit AS (
+        UPDATE materials m
+           SET quantity = m.quantity - r.qty, updated_at = NOW()
+          FROM req r
+         WHERE m.id = r.material_id AND m.quantity >= r.qty
+        RETURNING m.id AS material_id, r.qty
+    )""",
+    TECHNICIAN: """
+    debit AS (
+        UPDATE material_and_technician t
+           SET quantity = t.quantity - r.qty
+          FROM req r
+         WHERE t.user_id = $3::bigint AND t.material_id = r.material_id AND t.quantity >= r.qty
+        RETURNING t.material_id, r.qty
+    )""",
+    # Ariza - qoldig'i yuritilmaydigan manba (masalan, bekor qilinganda qaytarish)
+    ORDER: """
+    debit AS (
+        SELECT r.material_id, r.qty FROM req r JOIN materials m ON m.id = r.material_id
+    )""",
+}
+
+_CREDIT = {
+    WAREHOUSE: """
+    credit AS (
+        UPDATE materials m
+           SET quantity = m.quantity + d.qty, updated_at = NOW()
+          FROM debit d
+         WHERE m.id = d.material_id
+        RETURNING m.id
+    )""",
+    TECHNICIAN: """
+    credit AS (
+        INSERT INTO material_and_technician (user_id, material_id, quantity)
+        SELECT $4::bigint, d.material_id, d.qty FROM debit d
+        ON CONFLICT (user_id, material_id)
+        DO UPDATE SET quantity = material_and_technician.quantity + EXCLUDED.quantity
+        RETURNING material_id
+    )""",
+    # Ariza - sarflangan material, qoldiq yo'q
+    ORDER: """
+    credit AS (
+        SELECT d.material_id FROM debit d
+    )""",
+}
+
+_LEDGER = """
+    ledger AS (
+        INSERT INTO stock_movements (material_id, quantity, from_type, from_id, to_type, to_id,
+                                     application_number, actor_id, reason)
+        SELECT d.material_id, d.qty, $8::text, $3::bigint, $9::text, $4::bigint,
+               $5::text, $6::bigint, $7::text
+          FROM debit d
+        RETURNING id
+    )"""
+
+_TRANSFER_SQL = """
+    WITH params AS (
+        SELECT $3::bigint, $4::bigint, $5::text, $6::bigint, $7::text, $8::text, $9::text
+    ),
+    req AS (
+        SELECT * FROM unnest($1::int[], $2::int[]) AS r(material_id, qty)
+    ),
+    {debit},
+    {credit}{ledger}
+    SELECT material_id, qty FROM debit
+"""
+
+# Savatdagi qatorlarni bir xil tartibda qulflash (parallel savatlarda deadlock bo'lmasin)
+_LOCK_SQL = {
+    WAREHOUSE: "SELECT id FROM materials WHERE id = ANY($1::int[]) ORDER BY id FOR UPDATE",
+    TECHNICIAN: """
+        SELECT id FROM material_and_technician
+        WHERE user_id = $2 AND material_id = ANY($1::int[])
+        ORDER BY material_id FOR UPDATE
+    """,
+}
+
+# 053 migratsiyasi qo'llanmagan bazada jurnalsiz ishlaymiz
+_ledger_table = {"available": True}
+
+
+def _transfer_sql(source: str, target: str, with_ledger: bool) -> str:
+    return _TRANSFER_SQL.format(
+        debit=_DEBIT[source],
+        credit=_CREDIT[target],
+        ledger=("," + _LEDGER) if with_ledger else "",
+    )
+
+
+def _normalize_items(items: Items) -> Dict[int, int]:
+    pairs = items.items() if isinstance(items, dict) else items
+    cart: Dict[int, int] = {}
+    for material_id, qty in pairs:
+        qty = int(qty)
+        if qty <= 0:
+            raise ValueError("Miqdor 0 dan katta bo'lishi kerak")
+        cart[int(material_id)] = cart.get(int(material_id), 0) + qty
+    if not cart:
+        raise ValueError("O'tkaziladigan material yo'q")
+    return cart
+
+
+async def transfer_stock(
+    items: Items,
+    *,
+    source: str,
+    target: str,
+    source_id: Optional[int] = None,
+    target_id: Optional[int] = None,
+    application_number: Optional[str] = None,
+    actor_id: Optional[int] = None,
+    reason: Optional[str] = None,
+    conn=None,
+) -> Dict[int, int]:
+    """
+    Materiallarni ``source`` dan ``target`` ga o'tkazish (hammasi yoki hech biri).
+
+    ``items`` - {material_id: qty} yoki (material_id, qty) juftliklari.
+    Texnik uchun ``source_id`` / ``target_id`` - users.id. ``conn`` berilsa,
+    chaqiruvchi tranzaksiyasi ichida (savepoint) bajariladi.
+    Qaytaradi: {material_id: qty}. Yetmasa - InsufficientStock.
+    """
+    if source not in _DEBIT or target not in _CREDIT:
+        raise ValueError(f"Noma'lum egasi: {source} -> {target}")
+    if source == target and source_id == target_id:
+        raise ValueError("Manba va qabul qiluvchi bir xil")
+    if TECHNICIAN in (source, target) and (source_id if source == TECHNICIAN else target_id) is None:
+        raise ValueError("Texnik ID berilmagan")
+
+    cart = _normalize_items(items)
+    material_ids = sorted(cart)
+    args = [
+        material_ids, [cart[mid] for mid in material_ids],
+        source_id, target_id, application_number, actor_id, reason, source, target,
+    ]
+
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_connection()
+    try:
+        async with conn.transaction():
+            if len(material_ids) > 1 and source in _LOCK_SQL:
+                if source == WAREHOUSE:
+                    await conn.execute(_LOCK_SQL[source], material_ids)
+                else:
+                    await conn.execute(_LOCK_SQL[source], material_ids, source_id)
+
+            rows = None
+            if _ledger_table["available"]:
+                try:
+                    async with conn.transaction():
+                        rows = await conn.fetch(_transfer_sql(source, target, True), *args)
+                except asyncpg.UndefinedTableError:
+                    logger.warning("stock_movements missing, transferring without ledger")
+                    _ledger_table["available"] = False
+            if rows is None:
+                rows = await conn.fetch(_transfer_sql(source, target, False), *args)
+
+            moved = {r["material_id"]: r["qty"] for r in rows}
+            short = [mid for mid in material_ids if mid not in moved]
+            if short:
+                # Tranzaksiya bekor qilinadi - qisman o'tkazma qolmaydi
+                raise InsufficientStock(short)
+    finally:
+        if own_conn:
+            await conn.close()
+
+    if source == WAREHOUSE or target == WAREHOUSE:
+        from database.warehouse.analytics import invalidate_warehouse_stats
+        invalidate_warehouse_stats()
+    return moved
+
+
+async def issue_to_technician(technician_id: int, items: Items, *, actor_id: Optional[int] = None,
+                              application_number: Optional[str] = None, conn=None) -> Dict[int, int]:
+    """Ombordan texnikka berish."""
+    return await transfer_stock(
+        items, source=WAREHOUSE, target=TECHNICIAN, target_id=technician_id,
+        actor_id=actor_id, application_number=application_number, reason="issue", conn=conn,
+    )
+
+
+async def return_to_warehouse(technician_id: int, items: Items, *, actor_id: Optional[int] = None,
+                              conn=None) -> Dict[int, int]:
+    """Texnikdan omborga qaytarish."""
+    return await transfer_stock(
+        items, source=TECHNICIAN, target=WAREHOUSE, source_id=technician_id,
+        actor_id=actor_id, reason="return", conn=conn,
+    )
+
+
+async def consume_for_order(technician_id: int, items: Items, application_number: str, *,
+                            actor_id: Optional[int] = None, conn=None) -> Dict[int, int]:
+    """Texnik qoldig'idan arizaga sarflash."""
+    return await transfer_stock(
+        items, source=TECHNICIAN, target=ORDER, source_id=technician_id,
+        application_number=application_number, actor_id=actor_id, reason="consume", conn=conn,
+    )
+
+
+async def return_from_order(technician_id: int, items: Items, application_number: str, *,
+                            actor_id: Optional[int] = None, conn=None) -> Dict[int, int]:
+    """Bekor qilingan arizaga sarflangan materialni texnikka qaytarish."""
+    return await transfer_stock(
+        items, source=ORDER, target=TECHNICIAN, target_id=technician_id,
+        application_number=application_number, actor_id=actor_id, reason="cancel", conn=conn,
+    )
+
+
+# View bo'lmasa (053 qo'llanmagan) - xuddi shu UNION to'g'ridan-to'g'ri
+_BALANCES_FALLBACK = """
+    (SELECT 'warehouse'::text AS holder_type, NULL::bigint AS holder_id,
+            m.id AS material_id, m.name, m.price, m.serial_number, m.quantity
+       FROM materials m
+     UNION ALL
+     SELECT 'technician'::text, t.user_id::bigint,
+            t.material_id, m.name, m.price, m.serial_number, t.quantity
+       FROM material_and_technician t
+       JOIN materials m ON m.id = t.material_id) b
+"""
+
+_BALANCES_SQL = """
+    SELECT material_id, name, price, serial_number, quantity
+    FROM {source}
+    WHERE holder_type = $1
+      AND holder_id IS NOT DISTINCT FROM $2::bigint
+      AND (NOT $3 OR quantity > 0)
+    ORDER BY name
+"""
+
+_balances_view = {"available": True}
+
+
+async def fetch_holder_balances(holder_type: str, holder_id: Optional[int] = None,
+                                only_positive: bool = True) -> List[Dict[str, Any]]:
+    """Egasi bo'yicha joriy qoldiqlar (stock_holder_balances)."""
+    args = (holder_type, holder_id, only_positive)
+    conn = await get_connection()
+    try:
+        if _balances_view["available"]:
+            try:
+                rows = await conn.fetch(_BALANCES_SQL.format(source="stock_holder_balances"), *args)
+                return [dict(r) for r in rows]
+            except asyncpg.UndefinedTableError:
+                logger.warning("stock_holder_balances view missing, using inline query")
+                _balances_view["available"] = False
+        rows = await conn.fetch(_BALANCES_SQL.format(source=_BALANCES_FALLBACK), *args)
+        return [dict(r) for r in rows]
+    finally:
+        await conn.close()
+
+
+async def fetch_movements(material_id: Optional[int] = None, *, holder_type: Optional[str] = None,
+                          holder_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """So'nggi harakatlar (material yoki egasi bo'yicha), yangidan eskiga."""
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            """
+            SELECT id, material_id, quantity, from_type, from_id, to_type, to_id,
+                   application_number, actor_id, reason, created_at
+            FROM stock_movements
+            WHERE ($1::int IS NULL OR material_id = $1)
+              AND ($2::text IS NULL
+                   OR (from_type = $2 AND from_id IS NOT DISTINCT FROM $3::bigint)
+                   OR (to_type = $2 AND to_id IS NOT DISTINCT FROM $3::bigint))
+            ORDER BY id DESC
+            LIMIT $4
+            """,
+            material_id, holder_type, holder_id, limit
+        )
+        return [dict(r) for r in rows]
+    finally:
+        await conn.close()
@@ -1,9 +1,21 @@
 # database/basic/user.py
 # Umumiy user bilan bog'liq queries (barcha rollar uchun)
 
-import asyncpg
+import logging
 from typing import List, Dict, Any, Optional
+
+import asyncpg
 from config import settings
+from database.connections import get_connection
+from database.basic.language import remember_user_language, forget_user_language
+from database.basic.assignment import invalidate_assignment_cache
+from utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# Routing (RoleFilter) uchun users qatorlari keshi: telegram_id -> row (yoki None).
+# Rol, blok holati yoki yangi user yaratilganda invalidate_user_cache() chaqiriladi.
+_user_cache = TTLCache(maxsize=4096, ttl=60)
 
 # =========================================================
 #  User yaratish va topish
@@ -23,8 +35,7 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
     # Bot o'zini bazaga saqlamasligi uchun tekshirish
     if telegram_id == settings.BOT_ID:
         return "client"  # Bot uchun default role qaytaradi, lekin bazaga saqlamaydi
-    
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             'SELECT role, full_name FROM users WHERE telegram_id = $1',
@@ -65,6 +76,7 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
                 """,
                 telegram_id, username, full_name
             )
+            invalidate_user_cache(telegram_id)
             return user_data['role']
     finally:
         await conn.close()
@@ -89,7 +101,7 @@ async def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """
     User ID orqali user ma'lumotlarini olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -121,7 +133,7 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     Telegram ID orqali user ma'lumotlarini olish.
     Barcha rollar uchun umumiy funksiya.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -144,16 +156,39 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
             """,
             telegram_id,
         )
+        if row:
+            remember_user_language(telegram_id, row["language"])
         return dict(row) if row else None
     finally:
         await conn.close()
 
+async def get_cached_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
+    """
+    get_user_by_telegram_id ning keshlangan varianti (routing va middleware uchun).
+    Kesh tegsa DB'ga murojaat bo'lmaydi; yo'q user ham (None) keshlanadi.
+    """
+    user = _user_cache.get(telegram_id, MISSING)
+    if user is MISSING:
+        user = await get_user_by_telegram_id(telegram_id)
+        _user_cache.set(telegram_id, user)
+    return user
+
+def invalidate_user_cache(telegram_id: Optional[int] = None) -> None:
+    """User keshini tozalash (telegram_id berilmasa - butunlay)."""
+    if telegram_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(telegram_id)
+        forget_user_language(telegram_id)
+    # Rol / blok holati hand-off nomzodlariga ham ta'sir qiladi
+    invalidate_assignment_cache()
+
 async def get_users_by_role(role: str) -> List[Dict[str, Any]]:
     """
     Role bo'yicha userlarni olish.
     Faqat faol (is_blocked=FALSE) userlarni qaytaradi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -177,7 +212,7 @@ async def ensure_user(telegram_id: int, full_name: str, username: str, role: str
     if telegram_id == settings.BOT_ID:
         return {"id": 0, "telegram_id": telegram_id, "full_name": full_name, "username": username, "role": role}
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Avval mavjudligini tekshiramiz
         existing = await conn.fetchrow(
@@ -196,6 +231,7 @@ async def ensure_user(telegram_id: int, full_name: str, username: str, role: str
             """,
             telegram_id, full_name, username, role
         )
+        invalidate_user_cache(telegram_id)
         return dict(new_user)
     finally:
         await conn.close()
@@ -204,63 +240,25 @@ async def ensure_user(telegram_id: int, full_name: str, username: str, role: str
 #  Telefon bilan ishlash
 # =========================================================
 
-import re
-
-_PHONE_RE = re.compile(
-    r"^\+?998\s?\d{2}\s?\d{3}\s?\d{2}\s?\d{2}$|^\+?998\d{9}$|^\d{9,12}$"
-)
-
-def normalize_phone(raw: str) -> Optional[str]:
-    """Telefon raqamini normalizatsiya qilish."""
-    raw = (raw or "").strip()
-    if not _PHONE_RE.match(raw):
-        return None
-    digits = re.sub(r"[^\d]", "", raw)
-    if digits.startswith("998") and len(digits) == 12:
-        return "+" + digits
-    if len(digits) == 9:
-        return "+998" + digits
-    return raw if raw.startswith("+") else ("+" + digits if digits else None)
-
-async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
-    """
-    Telefon bo'yicha users dagi yozuvni qidiradi (raqamlar bo'yicha taqqoslash).
-    """
-    phone_n = normalize_phone(phone)
-    if not phone_n:
-        return None
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        row = await conn.fetchrow(
-            """
-            SELECT id, telegram_id, full_name, username, phone, language, region, address,
-                   abonent_id, is_blocked, role
-              FROM users
-             WHERE regexp_replace(phone, '[^0-9]', '', 'g')
-                   = regexp_replace($1,   '[^0-9]', '', 'g')
-             LIMIT 1
-            """,
-            phone_n,
-        )
-        return dict(row) if row else None
-    finally:
-        await conn.close()
-
 async def update_user_phone_by_telegram_id(telegram_id: int, phone: str) -> bool:
     """Update user's phone by telegram_id; return True if updated."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET phone = $1 WHERE telegram_id = $2",
             phone, telegram_id
         )
         return result != 'UPDATE 0'
+    except asyncpg.UniqueViolationError:
+        # Raqam boshqa foydalanuvchiga tegishli (uq_users_phone_normalized)
+        logger.warning(f"Phone {phone} already belongs to another user (telegram_id={telegram_id})")
+        return False
     finally:
         await conn.close()
 
 async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
     """Return user's phone by telegram_id or None."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             "SELECT phone FROM users WHERE telegram_id = $1",
@@ -275,7 +273,7 @@ async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
 
 async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     """Foydalanuvchi to'liq ismini yangilaydi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET full_name = $1 WHERE telegram_id = $2',
@@ -287,7 +285,7 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
 
 async def update_user_address(telegram_id: int, address: str) -> bool:
     """Foydalanuvchi manzilini yangilaydi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET address = $1 WHERE telegram_id = $2',
@@ -299,7 +297,7 @@ async def update_user_address(telegram_id: int, address: str) -> bool:
 
 async def update_user_region(telegram_id: int, region: str) -> bool:
     """Foydalanuvchi regionini yangilaydi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET region = $1 WHERE telegram_id = $2',
@@ -332,7 +330,7 @@ async def update_user_username(telegram_id: int, username: Optional[str]) -> boo
         if not clean_username:  # Faqat @ yoki bo'sh string bo'lsa
             clean_username = None
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Avval mavjud username ni olish
         current_username = await conn.fetchval(
@@ -359,7 +357,7 @@ async def update_user_username(telegram_id: int, username: Optional[str]) -> boo
 
 async def is_user_blocked(telegram_id: int) -> bool:
     """Foydalanuvchi bloklanganligini tekshirish."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.fetchval(
             "SELECT COALESCE(is_blocked, FALSE) FROM users WHERE telegram_id = $1",
@@ -371,24 +369,26 @@ async def is_user_blocked(telegram_id: int) -> bool:
 
 async def block_user(telegram_id: int) -> bool:
     """Foydalanuvchini bloklash."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET is_blocked = TRUE WHERE telegram_id = $1",
             telegram_id
         )
+        invalidate_user_cache(telegram_id)
         return result != 'UPDATE 0'
     finally:
         await conn.close()
 
 async def unblock_user(telegram_id: int) -> bool:
     """Foydalanuvchini blokdan chiqarish."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET is_blocked = FALSE WHERE telegram_id = $1",
             telegram_id
         )
+        invalidate_user_cache(telegram_id)
         return result != 'UPDATE 0'
     finally:
         await conn.close()
@@ -399,7 +399,7 @@ async def unblock_user(telegram_id: int) -> bool:
 
 async def get_user_role(telegram_id: int) -> Optional[str]:
     """Foydalanuvchi roli."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             "SELECT role FROM users WHERE telegram_id = $1",
@@ -410,12 +410,13 @@ async def get_user_role(telegram_id: int) -> Optional[str]:
 
 async def update_user_role(telegram_id: int, role: str) -> bool:
     """Foydalanuvchi roli."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET role = $1 WHERE telegram_id = $2",
             role, telegram_id
         )
+        invalidate_user_cache(telegram_id)
         return result != 'UPDATE 0'
     finally:
         await conn.close()
@@ -426,7 +427,7 @@ async def update_user_role(telegram_id: int, role: str) -> bool:
 
 async def get_user_orders_count(telegram_id: int) -> int:
     """Get total count of user orders (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             "SELECT id FROM users WHERE telegram_id = $1",
@@ -453,7 +454,7 @@ async def get_user_orders_count(telegram_id: int) -> int:
 
 async def get_user_orders_paginated(telegram_id: int, offset: int = 0, limit: int = 1) -> list:
     """Get user orders with pagination (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             "SELECT id FROM users WHERE telegram_id = $1",
@@ -1,11 +1,8 @@
 # database/call_center/inbox.py
-import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
-
-# === Ulash funksiyasi ===
-async def get_connection():
-    return await asyncpg.connect(settings.DB_URL)
+from database.connections import get_connection
+from database.basic.assignment import pick_recipient_id
+from database.basic.order_counters import invalidates_order_counters
 
 # =========================================================
 # USER HELPER FUNCTIONS
@@ -46,22 +43,9 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     finally:
         await conn.close()
 
-async def get_any_controller_id() -> Optional[int]:
-    """Har qanday controller ID ni olish"""
-    conn = await get_connection()
-    try:
-        row = await conn.fetchrow(
-            """
-            SELECT id
-            FROM users
-            WHERE role = 'controller'
-            ORDER BY id ASC
-            LIMIT 1
-            """
-        )
-        return row["id"] if row else None
-    finally:
-        await conn.close()
+async def get_any_controller_id(region=None) -> Optional[int]:
+    """Hand-off uchun controller ID (database/basic/assignment.py orqali tanlanadi)"""
+    return await pick_recipient_id("controller", region=region)
 
 # =========================================================
 # OPERATOR ORDERS FUNCTIONS
@@ -170,6 +154,7 @@ async def get_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
 # ORDER STATUS FUNCTIONS
 # =========================================================
 
+@invalidates_order_counters
 async def update_order_status(order_id: int, status: str, is_active: bool = True) -> bool:
     """Ariza statusini yangilash"""
     conn = await get_connection()
@@ -1,44 +1,8 @@
 # database/call_center/orders.py
 import re
-import asyncpg
-from typing import Optional, Dict, Any
-from config import settings
-
-# ---------- TELEFON NORMALIZATSIYA ----------
-
-_PHONE_RE = re.compile(r"^\+?998\s?\d{2}\s?\d{3}\s?\d{2}\s?\d{2}$|^\+?998\d{9}$|^\d{9,12}$")
-
-def _normalize_phone(raw: str) -> Optional[str]:
-    raw = (raw or "").strip()
-    if not _PHONE_RE.match(raw):
-        return None
-    digits = re.sub(r"[^\d]", "", raw)
-    if digits.startswith("998") and len(digits) == 12:
-        return "+" + digits
-    if len(digits) == 9:
-        return "+998" + digits
-    return raw if raw.startswith("+") else ("+" + digits if digits else None)
-
-async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
-    phone_n = _normalize_phone(phone)
-    if not phone_n:
-        return None
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        row = await conn.fetchrow(
-            """
-            SELECT id, telegram_id, full_name, username, phone, language, region, address,
-                   abonent_id
-            FROM users
-            WHERE regexp_replace(phone, '[^0-9]', '', 'g')
-                  = regexp_replace($1,   '[^0-9]', '', 'g')
-            LIMIT 1
-            """,
-            phone_n,
-        )
-        return dict(row) if row else None
-    finally:
-        await conn.close()
+from typing import Optional
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number
 
 # ---------- TARIF BILAN ISHLASH ----------
 
@@ -67,7 +31,7 @@ async def get_or_create_tarif_by_code(tariff_code: Optional[str]) -> Optional[in
         base = re.sub(r"^tariff_", "", tariff_code)
         name = re.sub(r"_+", " ", base).title()
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow("SELECT id FROM public.tarif WHERE name = $1 LIMIT 1", name)
         if row:
@@ -92,7 +56,7 @@ async def staff_orders_create(
     tarif_id: Optional[int],
     business_type: str = "B2C"
 ) -> str:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Region ID ni region nomiga aylantirish (agar regions jadvali mavjud bo'lsa)
         region_name = f"Region_{region}"  # Default fallback
@@ -109,11 +73,7 @@ async def staff_orders_create(
             region_name = f"Region_{region}"
         
         # Application number generatsiya qilish - business_type ga qarab
-        next_number = await conn.fetchval(
-            "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-            f"STAFF-CONN-{business_type}-%"
-        )
-        application_number = f"STAFF-CONN-{business_type}-{next_number:04d}"
+        application_number = await allocate_application_number(conn, f"STAFF-CONN-{business_type}")
         
         row = await conn.fetchrow(
             """
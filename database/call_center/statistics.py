@@ -1,10 +1,6 @@
 # database/call_center/statistics.py
-import asyncpg
 from typing import Dict
-from config import settings
-
-async def get_connection():
-    return await asyncpg.connect(settings.DB_URL)
+from database.connections import get_connection
 
 async def get_user_id_by_telegram_id(tg_id: int) -> int | None:
     conn = await get_connection()
@@ -1,15 +1,14 @@
 # database/call_center_supervisor/export.py
-import asyncpg
-from config import settings
 from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime, timedelta
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
 async def get_ccs_connection_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch connection orders handled by call center supervisors for export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         
         # Get orders that are handled by call center operators under this supervisor
@@ -54,7 +53,7 @@ async def get_ccs_connection_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_ccs_operator_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch operator orders handled by call center supervisors for export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -99,7 +98,7 @@ async def get_ccs_operator_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_ccs_operators_for_export() -> List[Dict[str, Any]]:
     """Fetch operators under call center supervisors for export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -141,7 +140,7 @@ async def get_ccs_operators_for_export() -> List[Dict[str, Any]]:
 
 async def get_ccs_statistics_for_export() -> List[Dict[str, Any]]:
     """Fetch statistics for call center supervisors for export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get various statistics
         stats = {}
@@ -1,209 +1,232 @@
 # database/call_center_supervisor/inbox.py
-import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
+from database.connections import get_connection
+from database.basic.assignment import pick_recipient_id
+from database.basic.order_counters import invalidate_order_counters
+from utils.cache import TTLCache, MISSING
 
 # ---------- CCS INBOX FUNKSIYALARI ----------
 
 async def _conn():
     """Database connection"""
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
-# ==================== TECHNICIAN ORDERS (Controllerdan kelgan) ====================
+# ==================== NAVIGATSIYA (keyset + prefetch) ====================
+# Navbatlar (created_at, id) tartibida ko'riladi. Karta joriy ariza ID'si
+# (kursor) bo'yicha olinadi: "(created_at, id) >= kursor" sharti bilan
+# bir so'rovda kursor kartasi va undan keyingi CCS_PREFETCH ta karta
+# olinadi, har biri prev_id/next_id bilan. Oldindan olingan kartalar qisqa
+# muddat keshlanadi - "Oldinga" bosilganda ko'pincha DB'ga murojaat
+# bo'lmaydi. OFFSET yo'q, shuning uchun navbat o'zgarsa ham kartalar
+# siljimaydi; kursor arizasi navbatdan chiqib ketgan bo'lsa, undan
+# keyingisi ko'rsatiladi.
+#
+# Sonlar (COUNT) ham keshlanadi; CCS navbatidan arizani chiqaradigan har
+# bir o'zgartirishdan keyin ccs_invalidate_inbox_cache() chaqiriladi.
 
-async def ccs_count_technician_orders() -> int:
-    """Controllerdan kelgan texnik arizalar soni"""
-    conn = await _conn()
-    try:
-        count = await conn.fetchval("""
-            SELECT COUNT(*)
-            FROM technician_orders
-            WHERE status = 'in_call_center_supervisor'
-              AND is_active = TRUE
-        """)
-        return int(count or 0)
-    finally:
-        await conn.close()
+CCS_PREFETCH = 3
+_COUNTS_TTL = 30
+_CARDS_TTL = 20
 
-async def ccs_fetch_technician_orders(offset: int = 0, limit: int = 1) -> Optional[Dict[str, Any]]:
-    """Controllerdan kelgan texnik arizalarni olish"""
-    conn = await _conn()
-    try:
-        row = await conn.fetchrow("""
-            SELECT 
-                tech_orders.id,
-                tech_orders.application_number,
-                tech_orders.user_id,
-                tech_orders.region,
-                tech_orders.abonent_id,
-                tech_orders.address,
-                tech_orders.media,
-                tech_orders.description,
-                tech_orders.description_operator,
-                tech_orders.status,
-                tech_orders.created_at,
-                tech_orders.updated_at,
-                
-                -- Client ma'lumotlari
-                u.full_name as client_name,
-                u.phone as client_phone,
-                u.telegram_id as client_telegram_id,
-                
-                -- Media type
-                CASE 
-                    WHEN tech_orders.media IS NOT NULL THEN 'photo'
-                    ELSE NULL
-                END as media_type
-                
-            FROM technician_orders tech_orders
-            LEFT JOIN users u ON u.id = tech_orders.user_id
-            WHERE tech_orders.status = 'in_call_center_supervisor'
-              AND tech_orders.is_active = TRUE
-            ORDER BY tech_orders.created_at ASC
-            OFFSET $1 LIMIT $2
-        """, offset, limit)
-        
-        return dict(row) if row else None
-    finally:
-        await conn.close()
+_counts = TTLCache(maxsize=8, ttl=_COUNTS_TTL)
+_cards = TTLCache(maxsize=512, ttl=_CARDS_TTL)
 
-# ==================== STAFF ORDERS (Operatordan kelgan) ====================
+_QUEUE_WHERE = "{a}.status = 'in_call_center_supervisor' AND {a}.is_active = TRUE"
+_OPERATOR_WHERE = _QUEUE_WHERE + """
+      AND EXISTS (SELECT 1 FROM users op WHERE op.id = {a}.user_id AND op.role = 'callcenter_operator')"""
 
-async def ccs_count_staff_orders() -> int:
-    """Operatordan kelgan staff arizalar soni"""
-    conn = await _conn()
-    try:
-        count = await conn.fetchval("""
-            SELECT COUNT(*)
-            FROM staff_orders
-            WHERE status = 'in_call_center_supervisor'
-              AND is_active = TRUE
-        """)
-        return int(count or 0)
-    finally:
-        await conn.close()
+_STAFF_JOINS = """
+            LEFT JOIN users creator ON creator.id = t.user_id
+            LEFT JOIN users client_user ON client_user.id::text = t.abonent_id
+            LEFT JOIN tarif tr ON tr.id = t.tarif_id"""
 
-async def ccs_fetch_staff_orders(offset: int = 0, limit: int = 1) -> Optional[Dict[str, Any]]:
-    """Operatordan kelgan staff arizalarni olish"""
-    conn = await _conn()
-    try:
-        row = await conn.fetchrow("""
-            SELECT 
-                so.id,
-                so.application_number,
-                so.user_id,
-                so.phone,
-                so.region,
-                so.abonent_id,
-                so.address,
-                so.tarif_id,
-                so.description,
-                so.type_of_zayavka,
-                so.status,
-                so.created_at,
-                so.updated_at,
-                
+_STAFF_PEOPLE = """
                 -- Client ma'lumotlari
                 COALESCE(client_user.full_name, 'Mijoz') as client_name,
-                COALESCE(client_user.phone, so.phone) as client_phone,
+                COALESCE(client_user.phone, t.phone) as client_phone,
                 client_user.telegram_id as client_telegram_id,
-                
+
                 -- Yaratuvchi operator ma'lumotlari
                 creator.full_name as operator_name,
                 creator.phone as operator_phone,
                 creator.role as operator_role,
-                
+
                 -- Tariff yoki muammo
-                CASE 
-                    WHEN so.type_of_zayavka = 'connection' THEN t.name
-                    WHEN so.type_of_zayavka = 'technician' THEN so.description
+                CASE
+                    WHEN t.type_of_zayavka = 'connection' THEN tr.name
+                    WHEN t.type_of_zayavka = 'technician' THEN t.description
                     ELSE NULL
-                END as tariff_or_problem
-                
-            FROM staff_orders so
-            LEFT JOIN users creator ON creator.id = so.user_id
-            LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
-            LEFT JOIN tarif t ON t.id = so.tarif_id
-            WHERE so.status = 'in_call_center_supervisor'
-              AND so.is_active = TRUE
-            ORDER BY so.created_at ASC
-            OFFSET $1 LIMIT $2
-        """, offset, limit)
-        
-        return dict(row) if row else None
-    finally:
-        await conn.close()
+                END as tariff_or_problem"""
 
-# ==================== OPERATOR ORDERS (Call Center operatordan kelgan) ====================
+_QUEUES: Dict[str, Dict[str, str]] = {
+    # Controllerdan kelgan texnik arizalar
+    "technician": {
+        "table": "technician_orders",
+        "where": _QUEUE_WHERE,
+        "columns": """
+                t.id, t.application_number, t.user_id, t.region, t.abonent_id,
+                t.address, t.media, t.description, t.description_operator,
+                t.status, t.created_at, t.updated_at,
 
-async def ccs_count_operator_orders() -> int:
-    """Call Center operatordan kelgan arizalar soni"""
+                -- Client ma'lumotlari
+                u.full_name as client_name,
+                u.phone as client_phone,
+                u.telegram_id as client_telegram_id,
+
+                -- Media type
+                CASE
+                    WHEN t.media IS NOT NULL THEN 'photo'
+                    ELSE NULL
+                END as media_type""",
+        "joins": """
+            LEFT JOIN users u ON u.id = t.user_id""",
+    },
+    # Operatordan kelgan staff arizalar
+    "staff": {
+        "table": "staff_orders",
+        "where": _QUEUE_WHERE,
+        "columns": """
+                t.id, t.application_number, t.user_id, t.phone, t.region,
+                t.abonent_id, t.address, t.tarif_id, t.description,
+                t.type_of_zayavka, t.status, t.created_at, t.updated_at,""" + _STAFF_PEOPLE,
+        "joins": _STAFF_JOINS,
+    },
+    # Call Center operatordan kelgan arizalar
+    "operator": {
+        "table": "staff_orders",
+        "where": _OPERATOR_WHERE,
+        "columns": """
+                t.id, t.application_number, t.user_id, t.region, t.abonent_id,
+                t.address, t.description, t.business_type, t.type_of_zayavka,
+                t.status, t.created_at, t.updated_at,""" + _STAFF_PEOPLE,
+        "joins": _STAFF_JOINS,
+    },
+}
+
+
+def _window_sql(q: Dict[str, str]) -> str:
+    # LEAD/LAG oyna LIMIT'dan oldin hisoblanadi - oxirgi prefetch kartaning
+    # next_id'si ham to'g'ri. Birinchi qatorning oldingisi alohida subquery
+    # (COALESCE faqat LAG NULL bo'lganda uni bajaradi).
+    return f"""
+        SELECT {q['columns']},
+                LEAD(t.id) OVER w AS next_id,
+                COALESCE(LAG(t.id) OVER w, (
+                    SELECT p.id FROM {q['table']} p
+                    WHERE {q['where'].format(a='p')}
+                      AND (p.created_at, p.id) < (t.created_at, t.id)
+                    ORDER BY p.created_at DESC, p.id DESC
+                    LIMIT 1
+                )) AS prev_id
+            FROM {q['table']} t{q['joins']}
+            WHERE {q['where'].format(a='t')}
+              AND ($1::bigint IS NULL OR (t.created_at, t.id) >= (
+                  SELECT a.created_at, a.id FROM {q['table']} a WHERE a.id = $1
+              ))
+            WINDOW w AS (ORDER BY t.created_at, t.id)
+            ORDER BY t.created_at, t.id
+            LIMIT $2
+    """
+
+
+def _last_sql(q: Dict[str, str]) -> str:
+    return f"""
+        SELECT t.id FROM {q['table']} t
+        WHERE {q['where'].format(a='t')}
+        ORDER BY t.created_at DESC, t.id DESC
+        LIMIT 1
+    """
+
+
+def _count_sql(q: Dict[str, str]) -> str:
+    return f"SELECT COUNT(*) FROM {q['table']} t WHERE {q['where'].format(a='t')}"
+
+
+_WINDOW_SQL = {kind: _window_sql(q) for kind, q in _QUEUES.items()}
+_LAST_SQL = {kind: _last_sql(q) for kind, q in _QUEUES.items()}
+_COUNT_SQL = {kind: _count_sql(q) for kind, q in _QUEUES.items()}
+
+
+def ccs_invalidate_inbox_cache() -> None:
+    """Sonlar va oldindan olingan kartalar keshini tozalash (status o'zgarganda)."""
+    _counts.clear()
+    _cards.clear()
+    invalidate_order_counters()
+
+
+async def _ccs_count(kind: str) -> int:
+    cached = _counts.get(kind, MISSING)
+    if cached is not MISSING:
+        return cached
     conn = await _conn()
     try:
-        count = await conn.fetchval("""
-            SELECT COUNT(*)
-            FROM staff_orders
-            WHERE status = 'in_call_center_supervisor'
-              AND is_active = TRUE
-              AND user_id IN (
-                  SELECT id FROM users WHERE role = 'callcenter_operator'
-              )
-        """)
-        return int(count or 0)
+        count = int(await conn.fetchval(_COUNT_SQL[kind]) or 0)
     finally:
         await conn.close()
+    _counts.set(kind, count)
+    return count
+
+
+async def ccs_fetch_card(kind: str, order_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    ``kind`` ('technician' | 'staff' | 'operator') navbatidan bitta karta.
+
+    order_id=None - navbat boshi. Aks holda shu ariza (yoki u navbatdan
+    chiqqan bo'lsa - undan keyingisi, u ham bo'lmasa - oxirgisi).
+    Kartada qo'shimcha ``prev_id`` / ``next_id`` bor (yo'q bo'lsa None).
+    """
+    if order_id is not None:
+        cached = _cards.get((kind, order_id))
+        if cached is not None:
+            return dict(cached)
 
-async def ccs_fetch_operator_orders(offset: int = 0, limit: int = 1) -> Optional[Dict[str, Any]]:
-    """Call Center operatordan kelgan arizalarni olish"""
     conn = await _conn()
     try:
-        row = await conn.fetchrow("""
-            SELECT 
-                so.id,
-                so.application_number,
-                so.user_id,
-                so.region,
-                so.abonent_id,
-                so.address,
-                so.description,
-                so.business_type,
-                so.type_of_zayavka,
-                so.status,
-                so.created_at,
-                so.updated_at,
-                
-                -- Client ma'lumotlari
-                COALESCE(client_user.full_name, 'Mijoz') as client_name,
-                COALESCE(client_user.phone, so.phone) as client_phone,
-                client_user.telegram_id as client_telegram_id,
-                
-                -- Yaratuvchi operator ma'lumotlari
-                creator.full_name as operator_name,
-                creator.phone as operator_phone,
-                creator.role as operator_role,
-                
-                -- Tariff yoki muammo
-                CASE 
-                    WHEN so.type_of_zayavka = 'connection' THEN t.name
-                    WHEN so.type_of_zayavka = 'technician' THEN so.description
-                    ELSE NULL
-                END as tariff_or_problem
-                
-            FROM staff_orders so
-            LEFT JOIN users creator ON creator.id = so.user_id
-            LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
-            LEFT JOIN tarif t ON t.id = so.tarif_id
-            WHERE so.status = 'in_call_center_supervisor'
-              AND so.is_active = TRUE
-              AND creator.role = 'callcenter_operator'
-            ORDER BY so.created_at ASC
-            OFFSET $1 LIMIT $2
-        """, offset, limit)
-        
-        return dict(row) if row else None
+        rows = await conn.fetch(_WINDOW_SQL[kind], order_id, CCS_PREFETCH + 1)
+        if not rows and order_id is not None:
+            last_id = await conn.fetchval(_LAST_SQL[kind])
+            if last_id is not None:
+                rows = await conn.fetch(_WINDOW_SQL[kind], last_id, CCS_PREFETCH + 1)
     finally:
         await conn.close()
 
+    if not rows:
+        return None
+    cards = [dict(r) for r in rows]
+    for card in cards:
+        _cards.set((kind, card["id"]), card)
+    return dict(cards[0])
+
+# ==================== TECHNICIAN ORDERS (Controllerdan kelgan) ====================
+
+async def ccs_count_technician_orders() -> int:
+    """Controllerdan kelgan texnik arizalar soni"""
+    return await _ccs_count("technician")
+
+async def ccs_fetch_technician_card(order_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Controllerdan kelgan texnik ariza kartasi (kursor bo'yicha)"""
+    return await ccs_fetch_card("technician", order_id)
+
+# ==================== STAFF ORDERS (Operatordan kelgan) ====================
+
+async def ccs_count_staff_orders() -> int:
+    """Operatordan kelgan staff arizalar soni"""
+    return await _ccs_count("staff")
+
+async def ccs_fetch_staff_card(order_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Operatordan kelgan staff ariza kartasi (kursor bo'yicha)"""
+    return await ccs_fetch_card("staff", order_id)
+
+# ==================== OPERATOR ORDERS (Call Center operatordan kelgan) ====================
+
+async def ccs_count_operator_orders() -> int:
+    """Call Center operatordan kelgan arizalar soni"""
+    return await _ccs_count("operator")
+
+async def ccs_fetch_operator_card(order_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Call Center operatordan kelgan ariza kartasi (kursor bo'yicha)"""
+    return await ccs_fetch_card("operator", order_id)
+
 # ==================== SEND TO CONTROLLER FUNCTIONS ====================
 
 async def ccs_send_technician_to_controller(order_id: int, supervisor_telegram_id: int) -> bool:
@@ -219,23 +242,22 @@ async def ccs_send_technician_to_controller(order_id: int, supervisor_telegram_i
             supervisor_id = supervisor['id']
             
             # Update technician order status
-            result = await conn.execute("""
+            order = await conn.fetchrow("""
                 UPDATE technician_orders
                 SET status = 'in_controller',
                     updated_at = NOW()
                 WHERE id = $1 AND status = 'in_call_center_supervisor'
+                RETURNING region
             """, order_id)
             
-            if result == "UPDATE 0":
+            if not order:
                 return False
             
-            # Get controller ID
-            controller = await conn.fetchrow("SELECT id FROM users WHERE role = 'controller' LIMIT 1")
-            if not controller:
+            # Controller tanlash (yuklama / region bo'yicha)
+            controller_id = await pick_recipient_id("controller", region=order["region"], conn=conn)
+            if controller_id is None:
                 return False
             
-            controller_id = controller['id']
-            
             # Create connection record
             await conn.execute("""
                 INSERT INTO connections(
@@ -246,6 +268,7 @@ async def ccs_send_technician_to_controller(order_id: int, supervisor_telegram_i
                 VALUES ($1, $2, $3, 'in_call_center_supervisor', 'in_controller', NOW(), NOW())
             """, order_id, supervisor_id, controller_id)
             
+            ccs_invalidate_inbox_cache()
             return True
     finally:
         await conn.close()
@@ -263,23 +286,22 @@ async def ccs_send_staff_to_controller(order_id: int, supervisor_telegram_id: in
             supervisor_id = supervisor['id']
             
             # Update staff order status
-            result = await conn.execute("""
+            order = await conn.fetchrow("""
                 UPDATE staff_orders
                 SET status = 'in_controller',
                     updated_at = NOW()
                 WHERE id = $1 AND status = 'in_call_center_supervisor'
+                RETURNING region
             """, order_id)
             
-            if result == "UPDATE 0":
+            if not order:
                 return False
             
-            # Get controller ID
-            controller = await conn.fetchrow("SELECT id FROM users WHERE role = 'controller' LIMIT 1")
-            if not controller:
+            # Controller tanlash (yuklama / region bo'yicha)
+            controller_id = await pick_recipient_id("controller", region=order["region"], conn=conn)
+            if controller_id is None:
                 return False
             
-            controller_id = controller['id']
-            
             # Create connection record
             await conn.execute("""
                 INSERT INTO connections(
@@ -290,6 +312,7 @@ async def ccs_send_staff_to_controller(order_id: int, supervisor_telegram_id: in
                 VALUES ($1, $2, $3, 'in_call_center_supervisor', 'in_controller', NOW(), NOW())
             """, order_id, supervisor_id, controller_id)
             
+            ccs_invalidate_inbox_cache()
             return True
     finally:
         await conn.close()
@@ -309,23 +332,22 @@ async def ccs_send_technician_to_operator(order_id: int, supervisor_telegram_id:
             supervisor_id = supervisor['id']
             
             # Update technician order status
-            result = await conn.execute("""
+            order = await conn.fetchrow("""
                 UPDATE technician_orders
                 SET status = 'in_call_center_operator',
                     updated_at = NOW()
                 WHERE id = $1 AND status = 'in_call_center_supervisor'
+                RETURNING region
             """, order_id)
             
-            if result == "UPDATE 0":
+            if not order:
                 return False
             
-            # Get any operator ID
-            operator = await conn.fetchrow("SELECT id FROM users WHERE role = 'callcenter_operator' LIMIT 1")
-            if not operator:
+            # Operator tanlash (yuklama / region bo'yicha)
+            operator_id = await pick_recipient_id("callcenter_operator", region=order["region"], conn=conn)
+            if operator_id is None:
                 return False
             
-            operator_id = operator['id']
-            
             # Create connection record
             await conn.execute("""
                 INSERT INTO connections(
@@ -336,6 +358,7 @@ async def ccs_send_technician_to_operator(order_id: int, supervisor_telegram_id:
                 VALUES ($1, $2, $3, 'in_call_center_supervisor', 'in_call_center_operator', NOW(), NOW())
             """, order_id, supervisor_id, operator_id)
             
+            ccs_invalidate_inbox_cache()
             return True
     finally:
         await conn.close()
@@ -353,23 +376,22 @@ async def ccs_send_staff_to_operator(order_id: int, supervisor_telegram_id: int)
             supervisor_id = supervisor['id']
             
             # Update staff order status
-            result = await conn.execute("""
+            order = await conn.fetchrow("""
                 UPDATE staff_orders
                 SET status = 'in_call_center_operator',
                     updated_at = NOW()
                 WHERE id = $1 AND status = 'in_call_center_supervisor'
+                RETURNING region
             """, order_id)
             
-            if result == "UPDATE 0":
+            if not order:
                 return False
             
-            # Get any operator ID
-            operator = await conn.fetchrow("SELECT id FROM users WHERE role = 'callcenter_operator' LIMIT 1")
-            if not operator:
+            # Operator tanlash (yuklama / region bo'yicha)
+            operator_id = await pick_recipient_id("callcenter_operator", region=order["region"], conn=conn)
+            if operator_id is None:
                 return False
             
-            operator_id = operator['id']
-            
             # Create connection record
             await conn.execute("""
                 INSERT INTO connections(
@@ -380,6 +402,7 @@ async def ccs_send_staff_to_operator(order_id: int, supervisor_telegram_id: int)
                 VALUES ($1, $2, $3, 'in_call_center_supervisor', 'in_call_center_operator', NOW(), NOW())
             """, order_id, supervisor_id, operator_id)
             
+            ccs_invalidate_inbox_cache()
             return True
     finally:
         await conn.close()
@@ -419,6 +442,7 @@ async def ccs_complete_technician_order(order_id: int, supervisor_telegram_id: i
                 VALUES ($1, $2, $3, 'in_call_center_supervisor', 'completed', NOW(), NOW())
             """, order_id, supervisor_id, supervisor_id)
             
+            ccs_invalidate_inbox_cache()
             return True
     finally:
         await conn.close()
@@ -456,6 +480,7 @@ async def ccs_complete_staff_order(order_id: int, supervisor_telegram_id: int) -
                 VALUES ($1, $2, $3, 'in_call_center_supervisor', 'completed', NOW(), NOW())
             """, order_id, supervisor_id, supervisor_id)
             
+            ccs_invalidate_inbox_cache()
             return True
     finally:
         await conn.close()
@@ -474,7 +499,10 @@ async def ccs_cancel_technician_order(order_id: int) -> bool:
             WHERE id = $1 AND status = 'in_call_center_supervisor'
         """, order_id)
         
-        return result == "UPDATE 1"
+        if result == "UPDATE 1":
+            ccs_invalidate_inbox_cache()
+            return True
+        return False
     finally:
         await conn.close()
 
@@ -490,6 +518,9 @@ async def ccs_cancel_staff_order(order_id: int) -> bool:
             WHERE id = $1 AND status = 'in_call_center_supervisor'
         """, order_id)
         
-        return result == "UPDATE 1"
+        if result == "UPDATE 1":
+            ccs_invalidate_inbox_cache()
+            return True
+        return False
     finally:
         await conn.close()
\ No newline at end of file
@@ -1,7 +1,7 @@
 # database/call_center_supervisor/statistics.py
-import asyncpg
-from config import settings
 from typing import Dict, Any, List
+from database.connections import get_connection
+from database.basic.order_counters import get_order_counters
 
 async def get_active_connection_tasks_count() -> int:
     """
@@ -9,25 +9,15 @@ async def get_active_connection_tasks_count() -> int:
       staff_orders jadvalidan is_active = TRUE
       va status 'completed' EMAS
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders
-             WHERE is_active = TRUE
-               AND status <> 'completed'
-            """
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", exclude=("completed",))
 
 async def get_callcenter_operator_count() -> int:
     """
     Umumiy xodimlar soni:
       users jadvalidan role = 'callcenter_operator'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -44,41 +34,23 @@ async def get_canceled_connection_tasks_count() -> int:
     Bekor qilingan vazifalar soni:
       staff_orders jadvalidan is_active = False
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders
-             WHERE is_active = FALSE
-            """
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", active=False)
 
 async def get_completed_connection_tasks_count() -> int:
     """
     Yakunlangan vazifalar soni:
       staff_orders jadvalidan status = 'completed'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders
-             WHERE status = 'completed'
-            """
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", statuses=("completed",), active=None)
 
 async def get_operator_orders_stat() -> Dict[str, Any]:
     """
     Operatorlar statistikasi:
       Har bir operator uchun arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -113,7 +85,7 @@ async def get_daily_statistics(days: int = 7) -> List[Dict[str, Any]]:
     Kunlik statistikalar:
       Oxirgi N kun uchun kunlik arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -139,7 +111,7 @@ async def get_monthly_statistics(months: int = 12) -> List[Dict[str, Any]]:
     Oylik statistikalar:
       Oxirgi N oy uchun oylik arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -165,43 +137,13 @@ async def get_status_statistics() -> Dict[str, int]:
     Status bo'yicha statistikalar:
       Har bir status uchun arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                status,
-                COUNT(*) as count
-            FROM staff_orders
-            WHERE is_active = TRUE
-            GROUP BY status
-            ORDER BY count DESC
-            """
-        )
-        
-        return {row['status']: row['count'] for row in rows}
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.group_by("status", "staff")
 
 async def get_type_statistics() -> Dict[str, int]:
     """
     Tur bo'yicha statistikalar:
       Har bir ariza turi uchun arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                type_of_zayavka,
-                COUNT(*) as count
-            FROM staff_orders
-            WHERE is_active = TRUE
-            GROUP BY type_of_zayavka
-            ORDER BY count DESC
-            """
-        )
-        
-        return {row['type_of_zayavka']: row['count'] for row in rows}
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.group_by("kind", "staff")
@@ -1,11 +1,10 @@
 # database/client/material_info.py
-import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
+from database.connections import get_connection
 
 async def _conn():
     """Database connection helper"""
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 async def get_user_orders_with_materials(telegram_id: int, offset: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
     """
@@ -1,9 +1,9 @@
 import asyncpg
-from config import settings
 from typing import Optional
+from database.connections import get_connection
 
 async def find_user_by_telegram_id(telegram_id: int) -> Optional[asyncpg.Record]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.fetchrow(
             """
@@ -51,7 +51,7 @@ def get_region_display_name(region_code):
 
 async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
     """Return user's phone by telegram_id or None."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             "SELECT phone FROM users WHERE telegram_id = $1",
@@ -62,15 +62,8 @@ async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
 
 async def update_user_phone_by_telegram_id(telegram_id: int, phone: str) -> bool:
     """Update user's phone by telegram_id; return True if updated."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        result = await conn.execute(
-            "UPDATE users SET phone = $1 WHERE telegram_id = $2",
-            phone, telegram_id
-        )
-        return result != 'UPDATE 0'
-    finally:
-        await conn.close()
+    from database.basic.user import update_user_phone_by_telegram_id as _update_phone
+    return await _update_phone(telegram_id, phone)
 
 # -----------------------------
 # Order history helpers
@@ -78,7 +71,7 @@ async def update_user_phone_by_telegram_id(telegram_id: int, phone: str) -> bool
 
 async def get_user_orders_count(telegram_id: int) -> int:
     """Get total count of user orders (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             "SELECT id FROM users WHERE telegram_id = $1",
@@ -105,7 +98,7 @@ async def get_user_orders_count(telegram_id: int) -> int:
 
 async def get_user_orders_paginated(telegram_id: int, offset: int = 0, limit: int = 1) -> list:
     """Get user orders with pagination (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             "SELECT id FROM users WHERE telegram_id = $1",
@@ -171,7 +164,7 @@ async def get_user_orders_paginated(telegram_id: int, offset: int = 0, limit: in
 
 async def get_smart_service_orders_by_user(user_id: int, limit: int = 10, offset: int = 0):
     """Get smart service orders for a specific user."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         orders = await conn.fetch(
             """
@@ -205,7 +198,7 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True, aks holda False
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET full_name = $1 WHERE telegram_id = $2',
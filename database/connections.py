@@ -1,13 +1,193 @@
 # database/connections.py
 # Database connection utilities
+#
+# Butun jarayon uchun yagona asyncpg pool. Pool loader.create_bot_and_dp()
+# ichida yaratiladi va bot to'xtaganda close_pool() bilan yopiladi.
+# Barcha database modullari ulanishni get_connection() orqali oladi.
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import asyncpg
 
 from config import settings
+from utils.db_budget import record_connection, record_query
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+# Pool metrikalari (acquire kutish vaqti va timeoutlar)
+_metrics: Dict[str, float] = {
+    "acquires": 0,
+    "acquire_timeouts": 0,
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+}
+
+
+def _timed(name: str):
+    """So'rov metodini o'rash: vaqt joriy update budget'iga yoziladi (utils/db_budget)."""
+
+    async def method(self, query, *args, **kwargs):
+        conn = self._conn
+        if conn is None:
+            raise asyncpg.InterfaceError("connection has been released back to the pool")
+        started = time.perf_counter()
+        try:
+            return await getattr(conn, name)(query, *args, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+    method.__name__ = name
+    return method
+
 
 def get_connection_url() -> str:
     """
     Get the database connection URL from settings.
-    
+
     Returns:
         str: The database connection URL
     """
     return settings.DB_URL
+
+
+async def init_pool() -> asyncpg.Pool:
+    """Jarayon uchun yagona pool'ni yaratadi (allaqachon bo'lsa o'shani qaytaradi)."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await asyncpg.create_pool(
+                dsn=get_connection_url(),
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            )
+            logger.info(
+                "DB pool yaratildi (min=%s, max=%s)",
+                settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE,
+            )
+    return _pool
+
+
+async def close_pool() -> None:
+    """Pool'ni yopadi (bot to'xtaganda chaqiriladi)."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+        logger.info("DB pool yopildi")
+
+
+class PooledConnection:
+    """Pool'dan olingan ulanish.
+
+    asyncpg.Connection kabi ishlatiladi; close() ulanishni yopmaydi,
+    balki pool'ga qaytaradi. Shu sababli eski ``try/finally: await conn.close()``
+    uslubidagi kod o'zgarishsiz ishlaydi. execute/fetch* chaqiruvlari
+    joriy update'ning DB budget'iga yoziladi.
+    """
+
+    __slots__ = ("_pool", "_conn")
+
+    execute = _timed("execute")
+    executemany = _timed("executemany")
+    fetch = _timed("fetch")
+    fetchrow = _timed("fetchrow")
+    fetchval = _timed("fetchval")
+
+    def __init__(self, pool: asyncpg.Pool, conn: asyncpg.Connection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name: str) -> Any:
+        conn = self._conn
+        if conn is None:
+            raise asyncpg.InterfaceError("connection has been released back to the pool")
+        return getattr(conn, name)
+
+    def is_closed(self) -> bool:
+        return self._conn is None or self._conn.is_closed()
+
+    async def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._pool.release(conn)
+
+    async def __aenter__(self) -> "PooledConnection":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+async def get_connection() -> PooledConnection:
+    """Pool'dan ulanish oladi. Caller ``await conn.close()`` bilan qaytarishi shart."""
+    pool = _pool or await init_pool()
+    started = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _metrics["acquire_timeouts"] += 1
+        logger.warning(
+            "DB pool acquire timeout (%.1fs), in_use=%s",
+            settings.DB_POOL_ACQUIRE_TIMEOUT, pool.get_size() - pool.get_idle_size(),
+        )
+        raise
+    waited = time.perf_counter() - started
+    _metrics["acquires"] += 1
+    _metrics["wait_time_total"] += waited
+    if waited > _metrics["wait_time_max"]:
+        _metrics["wait_time_max"] = waited
+    record_connection(waited)
+    return PooledConnection(pool, conn)
+
+
+@asynccontextmanager
+async def acquire():
+    """``async with acquire() as conn:`` uslubida ishlatish uchun."""
+    conn = await get_connection()
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+async def iter_rows(query: str, *args: Any, prefetch: int = 500) -> AsyncIterator[Dict[str, Any]]:
+    """Server-side cursor orqali qatorlarni birma-bir qaytaradi (dict ko'rinishida).
+
+    Natija to'liq xotiraga yuklanmaydi: har safar ``prefetch`` ta qator
+    olinadi. Iteratsiya davomida ulanish band bo'ladi.
+    """
+    conn = await get_connection()
+    try:
+        async with conn.transaction(readonly=True):
+            async for record in conn.cursor(query, *args, prefetch=prefetch):
+                yield dict(record)
+    finally:
+        await conn.close()
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Pool holati: band/bo'sh ulanishlar, o'rtacha/maksimal kutish vaqti, timeoutlar."""
+    pool = _pool
+    size = pool.get_size() if pool is not None else 0
+    idle = pool.get_idle_size() if pool is not None else 0
+    acquires = int(_metrics["acquires"])
+    return {
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+        "max_size": pool.get_max_size() if pool is not None else settings.DB_POOL_MAX_SIZE,
+        "acquires": acquires,
+        "acquire_timeouts": int(_metrics["acquire_timeouts"]),
+        "wait_time_avg_ms": (_metrics["wait_time_total"] / acquires * 1000) if acquires else 0.0,
+        "wait_time_max_ms": _metrics["wait_time_max"] * 1000,
+    }
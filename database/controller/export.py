@@ -1,9 +1,8 @@
 # database/controller/export.py
 
 from typing import List, Dict, Any
-import asyncpg
 import logging
-from config import settings
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +15,7 @@ async def get_controller_orders_for_export() -> List[Dict[str, Any]]:
     Controller orders ro'yxatini export uchun olish.
     Faqat texnik arizalar: technician_orders va staff_orders (type_of_zayavka = 'technician').
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Technician orders (mijozlar yaratgan texnik arizalar)
         tech_rows = await conn.fetch(
@@ -104,7 +103,7 @@ async def get_controller_statistics_for_export() -> Dict[str, Any]:
     """
     Controller uchun statistika export.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # 1. Asosiy statistika
         stats = {}
@@ -224,7 +223,7 @@ async def get_controller_employees_for_export() -> List[Dict[str, Any]]:
     """
     Controller uchun xodimlar ro'yxatini export uchun olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # First get all controller and technician users
         users = await conn.fetch(
@@ -1,9 +1,11 @@
 # database/controller/queries.py
 
 from typing import List, Dict, Any, Optional
-import asyncpg
 import logging
-from config import settings
+import asyncpg
+from database.connections import get_connection
+from database.basic.staff_activity import fetch_staff_activity_stats
+from database.basic.order_counters import invalidates_order_counters
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +34,7 @@ async def fetch_controller_inbox_staff(limit: int = 50, offset: int = 0) -> List
     Controller inbox - staff orders ro'yxatini olish.
     Faqat 'in_controller' statusdagi staff orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -104,7 +106,7 @@ async def count_controller_inbox_staff() -> int:
     """
     Controller inbox - staff orders sonini olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
@@ -133,6 +135,7 @@ async def count_controller_inbox_staff() -> int:
 #  Controller -> Technician assignment
 # =========================================================
 
+@invalidates_order_counters
 async def assign_to_technician_for_staff(request_id: int | str, tech_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Controller -> Technician (staff_orders uchun):
@@ -151,7 +154,7 @@ async def assign_to_technician_for_staff(request_id: int | str, tech_id: int, ac
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Technician mavjudmi? + uning ma'lumotlarini olamiz
@@ -261,93 +264,127 @@ async def assign_to_technician_for_staff(request_id: int | str, tech_id: int, ac
     finally:
         await conn.close()
 
+# 043 migratsiyasi qo'llanmagan bazada yuklama connections tarixidan hisoblanadi
+_technician_load_table = {"available": True}
+
 async def get_technicians_with_load_via_history() -> List[Dict[str, Any]]:
     """
     Technicianlarni hozirgi yuklamasi (barcha turdagi arizalar soni) bilan olish.
     Counts ALL order types: connection_orders, technician_orders, and staff_orders.
+
+    Yuklama technician_load jadvalidan o'qiladi (043_technician_load.sql,
+    triggerlar bilan yangilanadi). Migratsiya qo'llanmagan bazada eski
+    connections tarixi bo'yicha hisoblashga qaytadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        rows = await conn.fetch(
-            """
-            WITH connection_loads AS (
-                -- Connection orders assigned to technician
-                SELECT 
-                    c.recipient_id AS technician_id,
-                    COUNT(*) AS cnt
-                FROM connections c
-                JOIN connection_orders co ON co.id = c.connection_id
-                WHERE c.recipient_id IS NOT NULL
-                  AND co.status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
-                  AND co.is_active = TRUE
-                  AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
-                GROUP BY c.recipient_id
-            ),
-            technician_loads AS (
-                -- Technician orders assigned to technician
-                SELECT 
-                    c.recipient_id AS technician_id,
-                    COUNT(*) AS cnt
-                FROM connections c
-                JOIN technician_orders to_orders ON to_orders.id = c.technician_id
-                WHERE c.recipient_id IS NOT NULL
-                  AND to_orders.status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
-                  AND COALESCE(to_orders.is_active, TRUE) = TRUE
-                  AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
-                GROUP BY c.recipient_id
-            ),
-            staff_loads AS (
-                -- Staff orders assigned to technician
-                SELECT 
-                    c.recipient_id AS technician_id,
-                    COUNT(*) AS cnt
-                FROM connections c
-                JOIN staff_orders so ON so.id = c.staff_id
-                WHERE c.recipient_id IS NOT NULL
-                  AND so.status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
-                  AND COALESCE(so.is_active, TRUE) = TRUE
-                  AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
-                GROUP BY c.recipient_id
-            ),
-            total_loads AS (
-                -- Combine all loads
+        if not _technician_load_table["available"]:
+            rows = await _fetch_technicians_load_from_history(conn)
+            return [dict(r) for r in rows]
+        try:
+            rows = await conn.fetch(
+                """
                 SELECT 
-                    technician_id,
-                    SUM(cnt) AS total_count
-                FROM (
-                    SELECT technician_id, cnt FROM connection_loads
-                    UNION ALL
-                    SELECT technician_id, cnt FROM technician_loads
-                    UNION ALL
-                    SELECT technician_id, cnt FROM staff_loads
-                ) combined
-                GROUP BY technician_id
+                    u.id,
+                    u.full_name,
+                    u.username,
+                    u.phone,
+                    u.telegram_id,
+                    COALESCE(tl.load_count, 0) AS load_count
+                FROM users u
+                LEFT JOIN technician_load tl ON tl.technician_id = u.id
+                WHERE u.role = 'technician'
+                  AND COALESCE(u.is_blocked, FALSE) = FALSE
+                ORDER BY u.full_name NULLS LAST, u.id
+                """
             )
-            SELECT 
-                u.id,
-                u.full_name,
-                u.username,
-                u.phone,
-                u.telegram_id,
-                COALESCE(tl.total_count, 0) AS load_count
-            FROM users u
-            LEFT JOIN total_loads tl ON tl.technician_id = u.id
-            WHERE u.role = 'technician'
-              AND COALESCE(u.is_blocked, FALSE) = FALSE
-            ORDER BY u.full_name NULLS LAST, u.id
-            """
-        )
+        except asyncpg.UndefinedTableError:
+            logger.warning("technician_load table missing (migration 043), counting load from connections")
+            _technician_load_table["available"] = False
+            rows = await _fetch_technicians_load_from_history(conn)
         return [dict(r) for r in rows]
     finally:
         await conn.close()
 
+async def _fetch_technicians_load_from_history(conn) -> List[Any]:
+    """technician_load jadvali bo'lmaganda: yuklamani connections tarixidan hisoblash."""
+    return await conn.fetch(
+        """
+        WITH connection_loads AS (
+            -- Connection orders assigned to technician
+            SELECT 
+                c.recipient_id AS technician_id,
+                COUNT(*) AS cnt
+            FROM connections c
+            JOIN connection_orders co ON co.id = c.connection_id
+            WHERE c.recipient_id IS NOT NULL
+              AND co.status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+              AND co.is_active = TRUE
+              AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+            GROUP BY c.recipient_id
+        ),
+        technician_loads AS (
+            -- Technician orders assigned to technician
+            SELECT 
+                c.recipient_id AS technician_id,
+                COUNT(*) AS cnt
+            FROM connections c
+            JOIN technician_orders to_orders ON to_orders.id = c.technician_id
+            WHERE c.recipient_id IS NOT NULL
+              AND to_orders.status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+              AND COALESCE(to_orders.is_active, TRUE) = TRUE
+              AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+            GROUP BY c.recipient_id
+        ),
+        staff_loads AS (
+            -- Staff orders assigned to technician
+            SELECT 
+                c.recipient_id AS technician_id,
+                COUNT(*) AS cnt
+            FROM connections c
+            JOIN staff_orders so ON so.id = c.staff_id
+            WHERE c.recipient_id IS NOT NULL
+              AND so.status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+              AND COALESCE(so.is_active, TRUE) = TRUE
+              AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+            GROUP BY c.recipient_id
+        ),
+        total_loads AS (
+            -- Combine all loads
+            SELECT 
+                technician_id,
+                SUM(cnt) AS total_count
+            FROM (
+                SELECT technician_id, cnt FROM connection_loads
+                UNION ALL
+                SELECT technician_id, cnt FROM technician_loads
+                UNION ALL
+                SELECT technician_id, cnt FROM staff_loads
+            ) combined
+            GROUP BY technician_id
+        )
+        SELECT 
+            u.id,
+            u.full_name,
+            u.username,
+            u.phone,
+            u.telegram_id,
+            COALESCE(tl.total_count, 0) AS load_count
+        FROM users u
+        LEFT JOIN total_loads tl ON tl.technician_id = u.id
+        WHERE u.role = 'technician'
+          AND COALESCE(u.is_blocked, FALSE) = FALSE
+        ORDER BY u.full_name NULLS LAST, u.id
+        """
+    )
+
 # =========================================================
 #  Controller Orders ro'yxatlari
 # =========================================================
 
 async def list_controller_orders_by_status(status: str, limit: int = 50) -> List[Dict[str, Any]]:
     """Controller arizalarini status bo'yicha olish."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -380,7 +417,7 @@ async def fetch_controller_inbox_connection(limit: int = 50, offset: int = 0) ->
     Faqat 'in_controller' statusdagi connection orders.
     jm_notes ni ham olamiz.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -423,7 +460,7 @@ async def fetch_controller_inbox_tech(limit: int = 50, offset: int = 0) -> List[
     1. technician_orders.media ustunidagi eski usul
     2. media_files jadvalidagi yangi usul
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -489,12 +526,13 @@ async def fetch_controller_inbox_tech(limit: int = 50, offset: int = 0) -> List[
 #  Assignment Functions
 # =========================================================
 
+@invalidates_order_counters
 async def assign_to_technician_connection(request_id: int, tech_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Connection order ni texnikka yuborish.
     Status: in_controller -> in_technician
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update connection_orders
         await conn.execute(
@@ -592,12 +630,13 @@ async def assign_to_technician_connection(request_id: int, tech_id: int, actor_i
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_technician_tech(request_id: int, tech_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Tech service order ni texnikka yuborish.
     Status: in_controller -> in_technician
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update technician_orders
         await conn.execute(
@@ -695,12 +734,13 @@ async def assign_to_technician_tech(request_id: int, tech_id: int, actor_id: int
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_technician_staff(request_id: int, tech_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Staff order ni texnikka yuborish (xodim yaratgan ariza).
     Status: in_controller -> in_technician
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update staff_orders
         await conn.execute(
@@ -798,12 +838,13 @@ async def assign_to_technician_staff(request_id: int, tech_id: int, actor_id: in
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_ccs_connection(request_id: int, ccs_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Connection order ni CCS Supervisorga yuborish.
     Status: in_controller -> in_call_center_supervisor
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update connection_orders
         await conn.execute(
@@ -871,12 +912,13 @@ async def assign_to_ccs_connection(request_id: int, ccs_id: int, actor_id: int)
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_ccs_tech(request_id: int, ccs_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Tech service order ni CCS Supervisorga yuborish.
     Status: in_controller -> in_call_center_supervisor
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update technician_orders
         await conn.execute(
@@ -944,12 +986,13 @@ async def assign_to_ccs_tech(request_id: int, ccs_id: int, actor_id: int) -> Dic
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_ccs_staff(request_id: int, ccs_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Staff order ni CCS Supervisorga yuborish.
     Status: in_controller -> in_call_center_supervisor
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update staff_orders
         await conn.execute(
@@ -1030,257 +1073,11 @@ async def fetch_controller_staff_activity_with_time_filter(time_filter: str = "t
     Controller uchun xodimlar faoliyati - vaqt filtri bilan.
     time_filter: 'today', '3days', '7days', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Vaqt filtri uchun WHERE sharti
-        if time_filter == "total":
-            # Barcha vaqt uchun hech qanday shart qo'shmaslik
-            staff_time_condition = "TRUE"
-            conn_time_condition = "TRUE"
-            tech_time_condition = "TRUE"
-        else:
-            if time_filter == "today":
-                time_condition = "created_at >= CURRENT_DATE"
-            elif time_filter == "7days":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '7 days'"
-            elif time_filter == "month":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '30 days'"
-            else:
-                time_condition = "TRUE"
-            staff_time_condition = f"so.{time_condition}"
-            conn_time_condition = f"co.{time_condition}"
-            tech_time_condition = f"tech_orders.{time_condition}"
-        
-        # SQL query'ni alohida qilib yozamiz
-        if time_filter == "total":
-            query = """
-            WITH controller_connection_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Orders they created (as user_id) - Connection orders
-                    COUNT(CASE WHEN co.user_id = u.id THEN co.id END) as created_conn_orders,
-                    COUNT(CASE WHEN co.user_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as created_conn_active,
-                    -- Orders assigned to them through workflow (as recipient) - Connection orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') THEN co.id END) as assigned_conn_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as assigned_conn_active
-                FROM users u
-                LEFT JOIN connection_orders co ON COALESCE(co.is_active, TRUE) = TRUE
-                LEFT JOIN connections c ON c.connection_id = co.id
-                WHERE u.role IN ('controller')
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            ),
-            controller_technician_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Technician orders
-                    COUNT(CASE WHEN tech_orders.user_id = u.id THEN tech_orders.id END) as created_tech_orders,
-                    COUNT(CASE WHEN tech_orders.user_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as created_tech_active,
-                    -- Orders assigned to them through workflow (as recipient) - Technician orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') THEN tech_orders.id END) as assigned_tech_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as assigned_tech_active
-                FROM users u
-                LEFT JOIN technician_orders tech_orders ON COALESCE(tech_orders.is_active, TRUE) = TRUE
-                LEFT JOIN connections c ON c.technician_id = tech_orders.id
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_staff_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Staff orders
-                    COUNT(CASE WHEN so.user_id = u.id THEN so.id END) as created_staff_orders,
-                    COUNT(CASE WHEN so.user_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as created_staff_active,
-                    -- Orders assigned to them through workflow (as recipient) - Staff orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') THEN so.id END) as assigned_staff_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as assigned_staff_active
-                FROM users u
-                LEFT JOIN staff_orders so ON COALESCE(so.is_active, TRUE) = TRUE
-                LEFT JOIN connections c ON c.staff_id = so.id
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_sent_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they sent (as sender_id) - Through connections table
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.connection_id IS NOT NULL THEN c.id END) as sent_conn_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.connection_id IS NOT NULL AND co.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_conn_active,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.technician_id IS NOT NULL THEN c.id END) as sent_tech_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.technician_id IS NOT NULL AND tech_orders.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_tech_active,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.staff_id IS NOT NULL THEN c.id END) as sent_staff_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.staff_id IS NOT NULL AND so.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_staff_active
-                FROM users u
-                LEFT JOIN connections c ON c.sender_id = u.id
-                LEFT JOIN connection_orders co ON co.id = c.connection_id
-                LEFT JOIN technician_orders tech_orders ON tech_orders.id = c.technician_id
-                LEFT JOIN staff_orders so ON so.id = c.staff_id
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            )
-            SELECT
-                ccs.id,
-                ccs.full_name,
-                ccs.phone,
-                ccs.role,
-                ccs.created_at,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(ccs.assigned_conn_orders, 0) + 
-                 COALESCE(cts.created_tech_orders, 0) + COALESCE(cts.assigned_tech_orders, 0) +
-                 COALESCE(csos.created_staff_orders, 0) + COALESCE(csos.assigned_staff_orders, 0) +
-                 COALESCE(csent.sent_conn_orders, 0) + COALESCE(csent.sent_tech_orders, 0) + COALESCE(csent.sent_staff_orders, 0)) as total_orders,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(ccs.assigned_conn_orders, 0) + 
-                 COALESCE(csent.sent_conn_orders, 0)) as conn_count,
-                (COALESCE(cts.created_tech_orders, 0) + COALESCE(cts.assigned_tech_orders, 0) + 
-                 COALESCE(csent.sent_tech_orders, 0)) as tech_count,
-                (COALESCE(ccs.created_conn_active, 0) + COALESCE(ccs.assigned_conn_active, 0) + 
-                 COALESCE(cts.created_tech_active, 0) + COALESCE(cts.assigned_tech_active, 0) +
-                 COALESCE(csos.created_staff_active, 0) + COALESCE(csos.assigned_staff_active, 0) +
-                 COALESCE(csent.sent_conn_active, 0) + COALESCE(csent.sent_tech_active, 0) + COALESCE(csent.sent_staff_active, 0)) as active_count,
-                -- New detailed counts
-                COALESCE(ccs.assigned_conn_orders, 0) as assigned_conn_count,
-                COALESCE(ccs.created_conn_orders, 0) as created_conn_count,
-                COALESCE(cts.created_tech_orders, 0) as created_tech_count,
-                COALESCE(cts.assigned_tech_orders, 0) as assigned_tech_count,
-                -- Staff orders they created and assigned
-                COALESCE(csos.created_staff_orders, 0) as created_staff_count,
-                COALESCE(csos.assigned_staff_orders, 0) as assigned_staff_count,
-                -- Orders they sent
-                COALESCE(csent.sent_conn_orders, 0) as sent_conn_count,
-                COALESCE(csent.sent_tech_orders, 0) as sent_tech_count,
-                COALESCE(csent.sent_staff_orders, 0) as sent_staff_count
-            FROM controller_connection_stats ccs
-            LEFT JOIN controller_technician_stats cts ON cts.id = ccs.id
-            LEFT JOIN controller_staff_orders_stats csos ON csos.id = ccs.id
-            LEFT JOIN controller_sent_orders_stats csent ON csent.id = ccs.id
-            ORDER BY total_orders DESC, ccs.full_name
-            """
-        else:
-            # Vaqt filtri bilan query
-            if time_filter == "today":
-                time_condition = "created_at >= CURRENT_DATE"
-            elif time_filter == "7days":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '7 days'"
-            elif time_filter == "month":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '30 days'"
-            else:
-                time_condition = "TRUE"
-            
-            query = f"""
-            WITH controller_connection_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Orders they created (as user_id) - Connection orders
-                    COUNT(CASE WHEN co.user_id = u.id THEN co.id END) as created_conn_orders,
-                    COUNT(CASE WHEN co.user_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as created_conn_active,
-                    -- Orders assigned to them through workflow (as recipient) - Connection orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') THEN co.id END) as assigned_conn_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as assigned_conn_active
-                FROM users u
-                LEFT JOIN connection_orders co ON COALESCE(co.is_active, TRUE) = TRUE
-                    AND co.{time_condition}
-                LEFT JOIN connections c ON c.connection_id = co.id
-                WHERE u.role IN ('controller')
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            ),
-            controller_technician_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Technician orders
-                    COUNT(CASE WHEN tech_orders.user_id = u.id THEN tech_orders.id END) as created_tech_orders,
-                    COUNT(CASE WHEN tech_orders.user_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as created_tech_active,
-                    -- Orders assigned to them through workflow (as recipient) - Technician orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') THEN tech_orders.id END) as assigned_tech_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as assigned_tech_active
-                FROM users u
-                LEFT JOIN technician_orders tech_orders ON COALESCE(tech_orders.is_active, TRUE) = TRUE
-                    AND tech_orders.{time_condition}
-                LEFT JOIN connections c ON c.technician_id = tech_orders.id
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_staff_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Staff orders
-                    COUNT(CASE WHEN so.user_id = u.id THEN so.id END) as created_staff_orders,
-                    COUNT(CASE WHEN so.user_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as created_staff_active,
-                    -- Orders assigned to them through workflow (as recipient) - Staff orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') THEN so.id END) as assigned_staff_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_controller') AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as assigned_staff_active
-                FROM users u
-                LEFT JOIN staff_orders so ON COALESCE(so.is_active, TRUE) = TRUE
-                    AND so.{time_condition}
-                LEFT JOIN connections c ON c.staff_id = so.id
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_sent_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they sent (as sender_id) - Through connections table
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.connection_id IS NOT NULL THEN c.id END) as sent_conn_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.connection_id IS NOT NULL AND co.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_conn_active,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.technician_id IS NOT NULL THEN c.id END) as sent_tech_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.technician_id IS NOT NULL AND tech_orders.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_tech_active,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.staff_id IS NOT NULL THEN c.id END) as sent_staff_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.staff_id IS NOT NULL AND so.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_staff_active
-                FROM users u
-                LEFT JOIN connections c ON c.sender_id = u.id
-                    AND c.{time_condition}
-                LEFT JOIN connection_orders co ON co.id = c.connection_id
-                LEFT JOIN technician_orders tech_orders ON tech_orders.id = c.technician_id
-                LEFT JOIN staff_orders so ON so.id = c.staff_id
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            )
-            SELECT
-                ccs.id,
-                ccs.full_name,
-                ccs.phone,
-                ccs.role,
-                ccs.created_at,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(ccs.assigned_conn_orders, 0) + 
-                 COALESCE(cts.created_tech_orders, 0) + COALESCE(cts.assigned_tech_orders, 0) +
-                 COALESCE(csos.created_staff_orders, 0) + COALESCE(csos.assigned_staff_orders, 0) +
-                 COALESCE(csent.sent_conn_orders, 0) + COALESCE(csent.sent_tech_orders, 0) + COALESCE(csent.sent_staff_orders, 0)) as total_orders,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(ccs.assigned_conn_orders, 0) + 
-                 COALESCE(csent.sent_conn_orders, 0)) as conn_count,
-                (COALESCE(cts.created_tech_orders, 0) + COALESCE(cts.assigned_tech_orders, 0) + 
-                 COALESCE(csent.sent_tech_orders, 0)) as tech_count,
-                (COALESCE(ccs.created_conn_active, 0) + COALESCE(ccs.assigned_conn_active, 0) + 
-                 COALESCE(cts.created_tech_active, 0) + COALESCE(cts.assigned_tech_active, 0) +
-                 COALESCE(csos.created_staff_active, 0) + COALESCE(csos.assigned_staff_active, 0) +
-                 COALESCE(csent.sent_conn_active, 0) + COALESCE(csent.sent_tech_active, 0) + COALESCE(csent.sent_staff_active, 0)) as active_count,
-                -- New detailed counts
-                COALESCE(ccs.assigned_conn_orders, 0) as assigned_conn_count,
-                COALESCE(ccs.created_conn_orders, 0) as created_conn_count,
-                COALESCE(cts.created_tech_orders, 0) as created_tech_count,
-                COALESCE(cts.assigned_tech_orders, 0) as assigned_tech_count,
-                -- Staff orders they created and assigned
-                COALESCE(csos.created_staff_orders, 0) as created_staff_count,
-                COALESCE(csos.assigned_staff_orders, 0) as assigned_staff_count,
-                -- Orders they sent
-                COALESCE(csent.sent_conn_orders, 0) as sent_conn_count,
-                COALESCE(csent.sent_tech_orders, 0) as sent_tech_count,
-                COALESCE(csent.sent_staff_orders, 0) as sent_staff_count
-            FROM controller_connection_stats ccs
-            LEFT JOIN controller_technician_stats cts ON cts.id = ccs.id
-            LEFT JOIN controller_staff_orders_stats csos ON csos.id = ccs.id
-            LEFT JOIN controller_sent_orders_stats csent ON csent.id = ccs.id
-            ORDER BY total_orders DESC, ccs.full_name
-            """
-        
-        rows = await conn.fetch(query)
-        return [dict(r) for r in rows]
-    finally:
-        await conn.close()
+    return await fetch_staff_activity_stats(
+        roles=("controller",),
+        time_filter=time_filter,
+        assigned_statuses=("in_controller",),
+    )
 
 # =========================================================
 #  Load calculation functions
@@ -1291,7 +1088,7 @@ async def get_ccs_supervisors_with_load() -> List[Dict[str, Any]]:
     CCS Supervisorlar ro'yxatini yuklama bilan olish.
     Yangi.sql ma'lumotlari bilan moslashtirilgan.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -1328,7 +1125,7 @@ async def list_controller_orders_by_status(status: str, limit: int = 50) -> List
     """
     Controller orders ro'yxatini status bo'yicha olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -1385,7 +1182,7 @@ async def get_controller_statistics() -> Dict[str, Any]:
     """
     Controller uchun statistika olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
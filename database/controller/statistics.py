@@ -1,9 +1,9 @@
 # database/controller/statistics.py
 
 from typing import Dict, Any, List
-import asyncpg
 import logging
-from config import settings
+from database.connections import get_connection
+from database.basic.order_counters import get_order_counters
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ async def get_controller_statistics() -> Dict[str, Any]:
     """
     Controller uchun umumiy statistika olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
@@ -51,7 +51,7 @@ async def get_controller_daily_statistics(days: int = 7) -> List[Dict[str, Any]]
     """
     Controller uchun kunlik statistika olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -90,7 +90,7 @@ async def get_controller_technician_performance() -> List[Dict[str, Any]]:
     """
     Controller uchun technician performance statistika.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -131,7 +131,7 @@ async def get_controller_order_types_statistics() -> Dict[str, Any]:
     """
     Controller uchun order types bo'yicha statistika.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
@@ -165,43 +165,33 @@ async def get_controller_order_types_statistics() -> Dict[str, Any]:
 #  Individual Count Functions for Controller Orders Handler
 # =========================================================
 
+# Controller bosqichidagi texnik ariza statuslari (birinchisi - yangi kelgan)
+_CTRL_TECH_STATUSES = (
+    'in_controller', 'between_controller_technician', 'in_technician',
+    'in_technician_work', 'in_repairs', 'in_warehouse',
+)
+
 async def ctrl_total_tech_orders_count() -> int:
     """
     Controller uchun jami aktiv buyurtmalar soni.
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM technician_orders WHERE COALESCE(is_active, TRUE) = TRUE AND status IN ('in_controller','between_controller_technician','in_technician','in_technician_work','in_repairs','in_warehouse','completed')) +
-                (SELECT COUNT(*) FROM staff_orders WHERE type_of_zayavka = 'technician' AND COALESCE(is_active, TRUE) = TRUE AND status IN ('in_controller','between_controller_technician','in_technician','in_technician_work','in_repairs','in_warehouse','completed')) +
-                (SELECT COUNT(*) FROM connection_orders WHERE COALESCE(is_active, TRUE) = TRUE AND status IN ('in_controller','between_controller_technician','in_technician','completed'))
-            """
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    tech_statuses = _CTRL_TECH_STATUSES + ("completed",)
+    return (c.count("technician", statuses=tech_statuses)
+            + c.count("staff", kind="technician", statuses=tech_statuses)
+            + c.count("connection", statuses=("in_controller", "between_controller_technician",
+                                              "in_technician", "completed")))
 
 async def ctrl_new_in_controller_count() -> int:
     """
     Controller uchun yangi kelgan buyurtmalar soni.
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM technician_orders WHERE status = 'in_controller' AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM staff_orders WHERE status = 'in_controller' AND type_of_zayavka = 'technician' AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM connection_orders WHERE status = 'in_controller' AND COALESCE(is_active, TRUE) = TRUE)
-            """
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return (c.count("technician", statuses=("in_controller",))
+            + c.count("staff", kind="technician", statuses=("in_controller",))
+            + c.count("connection", statuses=("in_controller",)))
 
 async def ctrl_in_progress_count() -> int:
     """
@@ -209,19 +199,11 @@ async def ctrl_in_progress_count() -> int:
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     Excludes completed and cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM technician_orders WHERE status IN ('between_controller_technician', 'in_technician', 'in_technician_work', 'in_repairs', 'in_warehouse') AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM staff_orders WHERE status IN ('between_controller_technician', 'in_technician', 'in_technician_work', 'in_repairs', 'in_warehouse') AND type_of_zayavka = 'technician' AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM connection_orders WHERE status IN ('between_controller_technician','in_technician') AND COALESCE(is_active, TRUE) = TRUE)
-            """
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    work_statuses = _CTRL_TECH_STATUSES[1:]
+    return (c.count("technician", statuses=work_statuses)
+            + c.count("staff", kind="technician", statuses=work_statuses)
+            + c.count("connection", statuses=("between_controller_technician", "in_technician")))
 
 async def ctrl_completed_today_count() -> int:
     """
@@ -229,19 +211,10 @@ async def ctrl_completed_today_count() -> int:
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     Only orders completed today, excludes cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM technician_orders WHERE status = 'completed' AND DATE(updated_at) = CURRENT_DATE AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM staff_orders WHERE status = 'completed' AND DATE(updated_at) = CURRENT_DATE AND type_of_zayavka = 'technician' AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM connection_orders WHERE status = 'completed' AND DATE(updated_at) = CURRENT_DATE AND COALESCE(is_active, TRUE) = TRUE)
-            """
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return (c.count("technician", statuses=("completed",), updated_today=True)
+            + c.count("staff", kind="technician", statuses=("completed",), updated_today=True)
+            + c.count("connection", statuses=("completed",), updated_today=True))
 
 async def ctrl_cancelled_count() -> int:
     """
@@ -260,7 +233,7 @@ async def ctrl_get_new_orders(limit: int = 20) -> List[Dict[str, Any]]:
     Controller uchun yangi kelgan buyurtmalar ro'yxati.
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -361,7 +334,7 @@ async def ctrl_get_in_progress_orders(limit: int = 20) -> List[Dict[str, Any]]:
     Both technician_orders (client-created) and staff_orders with type_of_zayavka='technician' (staff-created).
     Excludes completed and cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -438,7 +411,7 @@ async def ctrl_get_completed_today_orders(limit: int = 20) -> List[Dict[str, Any
     Both technician_orders (client-created) and staff_orders with type_of_zayavka='technician' (staff-created).
     Only orders completed today, excludes cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -523,7 +496,7 @@ async def ctrl_get_order_media(order_id: int, order_type: str) -> List[Dict[str,
     """
     Ariza uchun media fayllarni olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if order_type == 'technician':
             # Technician orders uchun media ustunidan olamiz
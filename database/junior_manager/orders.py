@@ -1,15 +1,18 @@
 # database/junior_manager/orders.py
 # Junior Manager roli uchun orders bilan bog'liq queries
 
-import asyncpg
 import re
 from typing import List, Dict, Any, Optional
-from config import settings
 
 # Umumiy funksiyalarni import qilamiz
 from database.basic.user import ensure_user
 from database.basic.tariff import get_or_create_tarif_by_code
-from database.basic.phone import normalize_phone
+from database.basic.phone import find_user_by_phone
+from database.basic.search import search_users
+from database.basic.assignment import pick_recipient_id
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number
+from database.basic.order_counters import invalidates_order_counters
 
 # =========================================================
 #  Junior Manager uchun user yaratish
@@ -39,15 +42,11 @@ async def staff_orders_create(
     Default status: 'in_manager'.
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Application number generatsiya qilamiz - har bir business_type uchun alohida ketma-ketlikda
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-CONN-{business_type}-%"
-            )
-            application_number = f"STAFF-CONN-{business_type}-{next_number:04d}"
+            application_number = await allocate_application_number(conn, f"STAFF-CONN-{business_type}")
             
             row = await conn.fetchrow(
                 """
@@ -99,14 +98,10 @@ async def staff_orders_technician_create(
     Default status: 'in_manager'.
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-TECH-{business_type}-%"
-            )
-            application_number = f"STAFF-TECH-{business_type}-{next_number:04d}"
+            application_number = await allocate_application_number(conn, f"STAFF-TECH-{business_type}")
             
             row = await conn.fetchrow(
                 """
@@ -153,7 +148,7 @@ async def update_jm_notes(order_id: int, notes: str, order_type: str = "connecti
     Update jm_notes field for an order.
     order_type: "connection" or "staff"
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if order_type == "connection":
             await conn.execute(
@@ -180,7 +175,7 @@ async def list_new_for_jm(jm_id: int, limit: int = 50) -> List[Dict[str, Any]]:
     """
     Junior Manager uchun yangi arizalar ro'yxati.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -219,7 +214,7 @@ async def list_inprogress_for_jm(jm_id: int, limit: int = 50) -> List[Dict[str,
     """
     Junior Manager uchun jarayondagi arizalar ro'yxati (connection + staff orders, completed bo'lmaganlar).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -290,7 +285,7 @@ async def list_assigned_for_jm(jm_id: int, limit: int = 50) -> List[Dict[str, An
     """
     Junior Manager uchun biriktirilgan arizalar ro'yxati (faqat o'ziga biriktirilganlar).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -372,7 +367,7 @@ async def list_completed_for_jm(jm_id: int, limit: int = 50) -> List[Dict[str, A
     """
     Junior Manager uchun tugallangan arizalar ro'yxati (connection + staff orders).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -447,7 +442,7 @@ async def count_active_jm_orders() -> int:
     """
     Junior Manager inboxdagi aktiv arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -464,7 +459,7 @@ async def fetch_jm_order_by_offset(offset: int) -> Optional[Dict[str, Any]]:
     """
     Junior Manager inboxdan offset bo'yicha bitta arizani olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -498,11 +493,12 @@ async def fetch_jm_order_by_offset(offset: int) -> Optional[Dict[str, Any]]:
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def send_to_controller(order_id: int, jm_id: int) -> bool:
     """
     Junior Manager -> Controller: order yuborish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Staff order statusini yangilash
@@ -516,13 +512,17 @@ async def send_to_controller(order_id: int, jm_id: int) -> bool:
                 order_id
             )
             
+            controller_id = await pick_recipient_id("controller", conn=conn)
+            if controller_id is None:
+                raise ValueError("Controller topilmadi")
+            
             # Connection yozuvini yaratish
             await conn.execute(
                 """
                 INSERT INTO connections (sender_id, recipient_id, connection_id, created_at, updated_at)
                 VALUES ($1, $2, $3, NOW(), NOW())
                 """,
-                jm_id, 0, order_id  # recipient_id = 0 (controller)
+                jm_id, controller_id, order_id
             )
             
             return True
@@ -537,57 +537,21 @@ async def send_to_controller(order_id: int, jm_id: int) -> bool:
 
 async def search_client_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     """
-    Telefon raqam bo'yicha mijozni qidirish.
+    Telefon raqam bo'yicha mijozni qidirish (users.phone_normalized indeksi orqali).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Telefon raqamni normalize qilamiz
-        normalized_phone = normalize_phone(phone)
-        
-        row = await conn.fetchrow(
-            """
-            SELECT 
-                id, telegram_id, full_name, phone, username, 
-                region, address, abonent_id, created_at
-            FROM users 
-            WHERE phone = $1 
-            LIMIT 1
-            """,
-            normalized_phone
-        )
-        
-        return dict(row) if row else None
-    finally:
-        await conn.close()
+    return await find_user_by_phone(phone)
 
 async def search_client_by_name(name: str) -> List[Dict[str, Any]]:
     """
-    Ism bo'yicha mijozlarni qidirish.
+    Ism bo'yicha mijozlarni qidirish (pg_trgm, mos kelish darajasi bo'yicha).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                id, telegram_id, full_name, phone, username, 
-                region, address, abonent_id, created_at
-            FROM users 
-            WHERE LOWER(full_name) LIKE LOWER($1)
-            ORDER BY full_name
-            LIMIT 10
-            """,
-            f"%{name}%"
-        )
-        
-        return [dict(r) for r in rows]
-    finally:
-        await conn.close()
+    return await search_users(name, limit=10)
 
 async def get_client_order_history(user_id: int) -> List[Dict[str, Any]]:
     """
     Mijozning oldingi arizalarini olish (barcha turdagi arizalar).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -677,7 +641,7 @@ async def get_client_order_count(user_id: int) -> Dict[str, int]:
     """
     Mijozning arizalar sonini olish (barcha turdagi arizalar).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
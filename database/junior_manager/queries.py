@@ -1,8 +1,9 @@
 
 
-import asyncpg
 from typing import Any, Dict, List, Optional
-from config import settings
+from database.connections import get_connection
+from database.basic.assignment import pick_recipient
+from database.basic.order_counters import invalidates_order_counters
 
 # =========================================================
 #  User ma'lumotlari bilan ishlash
@@ -13,7 +14,7 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     Telegram ID orqali user ma'lumotlarini olish.
     Junior Manager uchun umumiy funksiya.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -39,7 +40,7 @@ async def get_connections_by_recipient(recipient_id: int, limit: int = 20) -> Li
     Faqat hali controller'ga yuborilmagan arizalar ko'rsatiladi.
     Connection_orders va staff_orders bilan join qilib to'liq ma'lumot olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -125,7 +126,7 @@ async def get_connection_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
     """
     Connection order ma'lumotlarini ID bo'yicha olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -156,7 +157,7 @@ async def get_staff_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
     """
     Staff order ma'lumotlarini ID bo'yicha olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -188,6 +189,7 @@ async def get_staff_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def move_order_to_controller(order_id: int, jm_id: int) -> Dict[str, Any]:
     """
     Junior Manager -> Controller: order statusini yangilash.
@@ -196,22 +198,12 @@ async def move_order_to_controller(order_id: int, jm_id: int) -> Dict[str, Any]:
     Returns:
         Dict with controller info for notification
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
-            # Controller ma'lumotlarini olamiz
-            controller_info = await conn.fetchrow(
-                "SELECT id, telegram_id, language FROM users WHERE role = 'controller' ORDER BY id ASC LIMIT 1"
-            )
-            if not controller_info:
-                raise ValueError("Controller topilmadi")
-            
-            controller_id = controller_info["id"]
-            controller_lang = controller_info["language"] or "uz"
-            
             # Check if it's a connection order
             connection_order = await conn.fetchrow(
-                "SELECT id, application_number, user_id, status FROM connection_orders WHERE id = $1 FOR UPDATE", order_id
+                "SELECT id, application_number, user_id, status, region FROM connection_orders WHERE id = $1 FOR UPDATE", order_id
             )
             
             app_number = None
@@ -232,10 +224,11 @@ async def move_order_to_controller(order_id: int, jm_id: int) -> Dict[str, Any]:
                 app_number = connection_order["application_number"]
                 order_type = "connection"
                 creator_id = connection_order["user_id"]
+                region = connection_order["region"]
             else:
                 # Check if it's a staff order
                 staff_order = await conn.fetchrow(
-                    "SELECT id, application_number, user_id, status, type_of_zayavka FROM staff_orders WHERE id = $1 FOR UPDATE", order_id
+                    "SELECT id, application_number, user_id, status, type_of_zayavka, region FROM staff_orders WHERE id = $1 FOR UPDATE", order_id
                 )
                 
                 if staff_order:
@@ -252,9 +245,18 @@ async def move_order_to_controller(order_id: int, jm_id: int) -> Dict[str, Any]:
                     app_number = staff_order["application_number"]
                     order_type = "staff"
                     creator_id = staff_order["user_id"]
+                    region = staff_order["region"]
                 else:
                     raise ValueError("Order topilmadi")
             
+            # Controller tanlash (yuklama / region bo'yicha)
+            controller_info = await pick_recipient("controller", region=region, conn=conn)
+            if not controller_info:
+                raise ValueError("Controller topilmadi")
+            
+            controller_id = controller_info["id"]
+            controller_lang = controller_info["language"] or "uz"
+            
             # Connection yozuvini yaratish
             await conn.execute(
                 """
@@ -317,7 +319,7 @@ async def set_jm_notes(order_id: int, notes: str) -> bool:
     Junior Manager notes qo'shish.
     Both connection_orders and staff_orders ni qo'llab-quvvatlaydi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Check if it's a connection order
         connection_order = await conn.fetchrow(
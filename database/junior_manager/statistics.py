@@ -1,15 +1,14 @@
 # database/junior_manager/statistics.py
 # Junior Manager roli uchun statistika queries
 
-import asyncpg
 from typing import Dict, Any
-from config import settings
+from database.connections import get_connection
 
 async def get_jm_stats_for_telegram(telegram_id: int) -> Dict[str, Any]:
     """
     Junior Manager uchun statistika ma'lumotlari.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Junior Manager ID va ismini olish
         user_row = await conn.fetchrow(
@@ -85,7 +84,7 @@ async def get_jm_performance_stats(telegram_id: int, days: int = 30) -> Dict[str
     """
     Junior Manager ishlash ko'rsatkichlari.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Junior Manager ID ni olish
         user_row = await conn.fetchrow(
@@ -1,11 +1,10 @@
 # database/manager/export.py
 # Manager roli uchun export queries
 
-import asyncpg
-from config import settings
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +14,7 @@ logger = logging.getLogger(__name__)
 
 async def get_manager_connection_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch all connection orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -48,7 +47,7 @@ async def get_manager_connection_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_statistics_for_export() -> Dict[str, Any]:
     """Fetch detailed statistics for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # 1. Asosiy statistika
         stats = {}
@@ -204,7 +203,7 @@ async def get_manager_statistics_for_export() -> Dict[str, Any]:
 
 async def get_manager_employees_for_export() -> List[Dict[str, Any]]:
     """Fetch employees list for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -233,7 +232,7 @@ async def get_manager_employees_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_staff_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch staff orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -272,7 +271,7 @@ async def get_manager_staff_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_smart_service_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch smart service orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -308,7 +307,7 @@ async def get_manager_smart_service_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_technician_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch technician orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
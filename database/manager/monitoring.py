@@ -1,10 +1,8 @@
 # database/manager/monitoring.py
 # Manager roli uchun realtime monitoring queries
 
-from typing import List, Dict, Any, Optional
-import asyncpg
-from asyncpg.exceptions import UndefinedColumnError
-from config import settings
+from typing import List, Dict, Any
+from database.connections import get_connection
 
 # =========================================================
 #  OVERVIEW COUNTS (faqat connection_orders)
@@ -27,7 +25,7 @@ async def get_realtime_counts() -> Dict[str, int]:
       ) AS urgent_total
     FROM connection_orders;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(sql)
         active = int(row["active_total"] or 0)
@@ -72,7 +70,7 @@ async def _list_detailed(limit: int, urgent_only: bool) -> List[Dict[str, Any]]:
     ORDER BY co.created_at {order_dir}, co.id {order_dir}
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -117,7 +115,7 @@ async def get_workflow_history(order_id: int) -> Dict[str, Any]:
     - Tugallanmagan bosqichda end_at = NULL, duration_str = "—" (handler UZ/RU matnini o'zi qo'yadi).
     Barcha order turlarini qo'llab-quvvatlaydi: connection_orders, technician_orders, staff_orders, smart_service_orders
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Barcha order turlarini tekshirib, mos connection recordlarni olamiz
         sql_all_connections = """
@@ -275,7 +273,7 @@ async def get_smart_service_realtime_counts() -> Dict[str, int]:
       ) AS urgent_total
     FROM smart_service_orders;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(sql)
         active = int(row["active_total"] or 0)
@@ -309,7 +307,7 @@ async def list_smart_service_active_detailed(limit: int = 50) -> List[Dict[str,
     ORDER BY sso.created_at DESC
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -335,7 +333,7 @@ async def get_staff_orders_realtime_counts() -> Dict[str, int]:
       ) AS urgent_total
     FROM staff_orders;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(sql)
         active = int(row["active_total"] or 0)
@@ -371,7 +369,7 @@ async def list_staff_orders_active_detailed(limit: int = 50) -> List[Dict[str, A
     ORDER BY so.created_at DESC
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -397,7 +395,7 @@ async def get_technician_orders_realtime_counts() -> Dict[str, int]:
       ) AS urgent_total
     FROM technician_orders;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(sql)
         active = int(row["active_total"] or 0)
@@ -433,7 +431,7 @@ async def list_technician_orders_active_detailed(limit: int = 50) -> List[Dict[s
     ORDER BY tech_orders.created_at DESC
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -448,7 +446,7 @@ async def get_overall_dashboard_stats() -> Dict[str, Any]:
     """
     Umumiy dashboard statistikasi - barcha order turlari uchun.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Connection orders
         connection_stats = await conn.fetchrow("""
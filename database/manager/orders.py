@@ -1,11 +1,13 @@
-import asyncpg
 import re
 from typing import List, Dict, Any, Optional
-from config import settings
 
 from database.basic.user import ensure_user
 from database.basic.tariff import get_or_create_tarif_by_code
 from database.basic.phone import normalize_phone
+from database.connections import get_connection
+from database.basic.order_counters import get_order_counters, invalidates_order_counters
+from database.basic.staff_activity import fetch_staff_activity_stats
+from database.basic.application_number import allocate_application_number
 
 async def ensure_user_manager(telegram_id: int, full_name: str, username: str) -> Dict[str, Any]:
     """
@@ -13,6 +15,7 @@ async def ensure_user_manager(telegram_id: int, full_name: str, username: str) -
     """
     return await ensure_user(telegram_id, full_name, username, 'manager')
 
+@invalidates_order_counters
 async def staff_orders_create(
     user_id: int,
     phone: Optional[str],
@@ -27,14 +30,10 @@ async def staff_orders_create(
     Default status: 'in_manager'.
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-CONN-{business_type}-%"
-            )
-            application_number = f"STAFF-CONN-{business_type}-{next_number:04d}"
+            application_number = await allocate_application_number(conn, f"STAFF-CONN-{business_type}")
             
             row = await conn.fetchrow(
                 """
@@ -71,6 +70,7 @@ async def staff_orders_create(
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def staff_orders_technician_create(
     user_id: int,
     phone: Optional[str],
@@ -85,15 +85,11 @@ async def staff_orders_technician_create(
     Default status: 'in_controller'.
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Application number generatsiya qilamiz - TECH uchun alohida ketma-ketlikda
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-TECH-{business_type}-%"
-            )
-            application_number = f"STAFF-TECH-{business_type}-{next_number:04d}"
+            application_number = await allocate_application_number(conn, f"STAFF-TECH-{business_type}")
             
             row = await conn.fetchrow(
                 """
@@ -139,7 +135,7 @@ async def fetch_manager_orders(user_id: int, limit: int = 50, offset: int = 0) -
     """
     Manager yaratgan arizalarni olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -174,7 +170,7 @@ async def count_manager_orders(user_id: int) -> int:
     """
     Manager yaratgan arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -194,125 +190,46 @@ async def count_manager_orders(user_id: int) -> int:
 
 async def get_all_total_connection_orders_count() -> int:
     """Barcha faol ulanish arizalarining umumiy sonini qaytaradi (mijozlar va xodimlar ochgan)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        total_count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE)
-                +
-                (SELECT COUNT(*) FROM staff_orders WHERE is_active = TRUE AND type_of_zayavka = 'connection')
-            """
-        )
-        return total_count if total_count is not None else 0
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("connection") + c.count("staff", kind="connection")
 
 async def get_total_orders_count(user_id: int) -> int:
     """Manager yaratgan jami arizalar soni."""
-    return await count_manager_orders(user_id)
+    c = await get_order_counters()
+    return c.count("staff", user_id=user_id)
 
 async def get_in_progress_count(user_id: int) -> int:
     """Manager yaratgan ish jarayonidagi arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders so
-             WHERE so.user_id = $1
-               AND COALESCE(so.is_active, TRUE) = TRUE
-               AND so.status IN ('in_junior_manager', 'in_controller', 'in_technician')
-            """,
-            user_id
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", user_id=user_id,
+                   statuses=("in_junior_manager", "in_controller", "in_technician"))
 
 async def get_completed_today_count(user_id: int) -> int:
     """Manager yaratgan bugun yakunlangan arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders so
-             WHERE so.user_id = $1
-               AND COALESCE(so.is_active, TRUE) = TRUE
-               AND so.status = 'completed'
-               AND DATE(so.updated_at) = CURRENT_DATE
-            """,
-            user_id
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", user_id=user_id, statuses=("completed",), updated_today=True)
 
 async def get_cancelled_count(user_id: int) -> int:
     """Manager yaratgan bekor qilingan arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders so
-             WHERE so.user_id = $1
-               AND COALESCE(so.is_active, TRUE) = TRUE
-               AND so.status = 'cancelled'
-            """,
-            user_id
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", user_id=user_id, statuses=("cancelled",))
 
 async def get_all_cancelled_count() -> int:
     """Barcha bekor qilingan ulanish arizalari soni (client va xodim yaratgani)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        total_count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'cancelled')
-                +
-                (SELECT COUNT(*) FROM staff_orders WHERE is_active = TRUE AND status = 'cancelled' AND type_of_zayavka = 'connection')
-            """
-        )
-        return total_count if total_count is not None else 0
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return (c.count("connection", statuses=("cancelled",))
+            + c.count("staff", kind="connection", statuses=("cancelled",)))
 
 async def get_all_new_orders_count() -> int:
     """Barcha manager'ga kelgan yangi arizalar soni (mijozlar va xodimlar ochgani)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        total_count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'in_manager')
-                +
-                (SELECT COUNT(*) FROM staff_orders WHERE is_active = TRUE AND status = 'in_manager' AND type_of_zayavka = 'connection')
-            """
-        )
-        return total_count if total_count is not None else 0
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return (c.count("connection", statuses=("in_manager",))
+            + c.count("staff", kind="connection", statuses=("in_manager",)))
 
 async def get_new_orders_today_count(user_id: int) -> int:
     """Manager yaratgan bugungi yangi arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        return await conn.fetchval(
-            """
-            SELECT COUNT(*)
-              FROM staff_orders so
-             WHERE so.user_id = $1
-               AND COALESCE(so.is_active, TRUE) = TRUE
-               AND so.status = 'in_manager'
-               AND DATE(so.created_at) = CURRENT_DATE
-            """,
-            user_id
-        )
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("staff", user_id=user_id, statuses=("in_manager",), created_today=True)
 
 # =========================================================
 #  Manager Orders ro'yxatlari
@@ -320,7 +237,7 @@ async def get_new_orders_today_count(user_id: int) -> int:
 
 async def list_new_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Barcha yangi ulanish arizalari (client va xodim yaratgani)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Client arizalari va staff arizalarini birlashtiramiz
         rows = await conn.fetch(
@@ -378,7 +295,7 @@ async def list_new_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]
 
 async def list_all_in_progress_orders(limit: int = 50) -> List[Dict[str, Any]]:
     """Barcha jarayondagi ulanish arizalari - mijozlar va xodimlar ochgani."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -432,23 +349,13 @@ async def list_all_in_progress_orders(limit: int = 50) -> List[Dict[str, Any]]:
 
 async def get_all_in_progress_count() -> int:
     """Barcha jarayondagi ulanish arizalari soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            """
-            SELECT 
-                (SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status NOT IN ('cancelled', 'completed'))
-                +
-                (SELECT COUNT(*) FROM staff_orders WHERE is_active = TRUE AND status NOT IN ('cancelled', 'completed') AND type_of_zayavka = 'connection')
-            """
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return (c.count("connection", exclude=("cancelled", "completed"))
+            + c.count("staff", kind="connection", exclude=("cancelled", "completed")))
 
 async def list_completed_today_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Manager yaratgan bugun yakunlangan arizalar."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -481,7 +388,7 @@ async def list_completed_today_orders(user_id: int, limit: int = 10) -> List[Dic
 
 async def list_cancelled_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Manager yaratgan bekor qilingan arizalar."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -513,7 +420,7 @@ async def list_cancelled_orders(user_id: int, limit: int = 10) -> List[Dict[str,
 
 async def list_my_created_orders_by_type(user_id: int, order_type: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Manager yaratgan arizalar turi bo'yicha."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -549,60 +456,35 @@ async def list_my_created_orders_by_type(user_id: int, order_type: str, limit: i
 
 async def get_connection_orders_count() -> int:
     """Barcha connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval("SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE")
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("connection")
 
 async def get_connection_orders_in_progress_count() -> int:
     """Jarayondagi connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status IN ('in_junior_manager', 'in_controller', 'in_technician', 'in_warehouse', 'in_repairs', 'in_technician_work')"
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("connection", statuses=(
+        "in_junior_manager", "in_controller", "in_technician",
+        "in_warehouse", "in_repairs", "in_technician_work",
+    ))
 
 async def get_connection_orders_completed_today_count() -> int:
     """Bugun bajarilgan connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'completed' AND DATE(updated_at) = CURRENT_DATE"
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("connection", statuses=("completed",), updated_today=True)
 
 async def get_connection_orders_cancelled_count() -> int:
     """Bekor qilingan connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE is_active = FALSE"
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("connection", active=False)
 
 async def get_connection_orders_new_today_count() -> int:
     """Bugun yaratilgan connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'in_manager' AND DATE(created_at) = CURRENT_DATE"
-        )
-        return int(count or 0)
-    finally:
-        await conn.close()
+    c = await get_order_counters()
+    return c.count("connection", statuses=("in_manager",), created_today=True)
 
 async def list_connection_orders_new(limit: int = 10) -> List[Dict[str, Any]]:
     """Yangi connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -632,7 +514,7 @@ async def list_connection_orders_new(limit: int = 10) -> List[Dict[str, Any]]:
 
 async def list_connection_orders_in_progress(limit: int = 10) -> List[Dict[str, Any]]:
     """Jarayondagi connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -662,7 +544,7 @@ async def list_connection_orders_in_progress(limit: int = 10) -> List[Dict[str,
 
 async def list_connection_orders_completed_today(limit: int = 10) -> List[Dict[str, Any]]:
     """Bugun bajarilgan connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -693,7 +575,7 @@ async def list_connection_orders_completed_today(limit: int = 10) -> List[Dict[s
 
 async def list_connection_orders_cancelled(limit: int = 10) -> List[Dict[str, Any]]:
     """Bekor qilingan connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -729,123 +611,9 @@ async def fetch_staff_activity_with_time_filter(time_filter: str = "total") -> L
     Xodimlar faoliyati - vaqt filtri bilan.
     time_filter: 'today', '3days', '7days', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Vaqt filtri uchun WHERE sharti
-        if time_filter == "total":
-            # Barcha vaqt uchun hech qanday shart qo'shmaslik
-            staff_time_condition = "TRUE"
-            conn_time_condition = "TRUE"
-            tech_time_condition = "TRUE"
-        else:
-            time_conditions = {
-                "today": "created_at >= CURRENT_DATE",
-                "3days": "created_at >= CURRENT_DATE - INTERVAL '3 days'",
-                "7days": "created_at >= CURRENT_DATE - INTERVAL '7 days'",
-                "month": "created_at >= CURRENT_DATE - INTERVAL '30 days'"
-            }
-            time_condition = time_conditions.get(time_filter, "TRUE")
-            staff_time_condition = f"so.{time_condition}"
-            conn_time_condition = f"co.{time_condition}"
-            tech_time_condition = f"tech_orders.{time_condition}"
-        
-        rows = await conn.fetch(
-            f"""
-            WITH manager_connection_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Orders they created (as user_id) - Connection orders
-                    COUNT(CASE WHEN co.user_id = u.id THEN co.id END) as created_conn_orders,
-                    COUNT(CASE WHEN co.user_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as created_conn_active,
-                    -- Orders assigned to them through workflow (as recipient) - Connection orders
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_manager', 'in_junior_manager') THEN co.id END) as assigned_conn_orders,
-                    COUNT(CASE WHEN c.recipient_id = u.id AND c.recipient_status IN ('in_manager', 'in_junior_manager') AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as assigned_conn_active
-                FROM users u
-                LEFT JOIN connection_orders co ON COALESCE(co.is_active, TRUE) = TRUE
-                    AND {conn_time_condition}
-                LEFT JOIN connections c ON c.connection_id = co.id
-                WHERE u.role IN ('junior_manager', 'manager')
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            ),
-            manager_technician_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Technician orders (only for managers)
-                    COUNT(CASE WHEN tech_orders.user_id = u.id THEN tech_orders.id END) as created_tech_orders,
-                    COUNT(CASE WHEN tech_orders.user_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as created_tech_active
-                FROM users u
-                LEFT JOIN technician_orders tech_orders ON COALESCE(tech_orders.is_active, TRUE) = TRUE
-                    AND {tech_time_condition}
-                WHERE u.role = 'manager'  -- Only managers create technician orders
-                GROUP BY u.id
-            ),
-            manager_staff_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Staff orders
-                    COUNT(CASE WHEN so.user_id = u.id THEN so.id END) as created_staff_orders,
-                    COUNT(CASE WHEN so.user_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as created_staff_active
-                FROM users u
-                LEFT JOIN staff_orders so ON COALESCE(so.is_active, TRUE) = TRUE
-                    AND {staff_time_condition}
-                WHERE u.role IN ('junior_manager', 'manager')
-                GROUP BY u.id
-            ),
-            manager_sent_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they sent (as sender_id) - Through connections table
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.connection_id IS NOT NULL THEN c.id END) as sent_conn_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.connection_id IS NOT NULL AND co.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_conn_active,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.technician_id IS NOT NULL THEN c.id END) as sent_tech_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.technician_id IS NOT NULL AND tech_orders.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_tech_active,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.staff_id IS NOT NULL THEN c.id END) as sent_staff_orders,
-                    COUNT(CASE WHEN c.sender_id = u.id AND c.staff_id IS NOT NULL AND so.status NOT IN ('cancelled', 'completed') THEN c.id END) as sent_staff_active
-                FROM users u
-                LEFT JOIN connections c ON c.sender_id = u.id
-                    AND {staff_time_condition.replace('so.', 'c.')}
-                LEFT JOIN connection_orders co ON co.id = c.connection_id
-                LEFT JOIN technician_orders tech_orders ON tech_orders.id = c.technician_id
-                LEFT JOIN staff_orders so ON so.id = c.staff_id
-                WHERE u.role IN ('junior_manager', 'manager')
-                GROUP BY u.id
-            )
-            SELECT
-                mcs.id,
-                mcs.full_name,
-                mcs.phone,
-                mcs.role,
-                mcs.created_at,
-                (COALESCE(mcs.created_conn_orders, 0) + COALESCE(mcs.assigned_conn_orders, 0) + 
-                 COALESCE(mts.created_tech_orders, 0) + COALESCE(msos.created_staff_orders, 0) +
-                 COALESCE(msent.sent_conn_orders, 0) + COALESCE(msent.sent_tech_orders, 0) + COALESCE(msent.sent_staff_orders, 0)) as total_orders,
-                (COALESCE(mcs.created_conn_orders, 0) + COALESCE(mcs.assigned_conn_orders, 0) + 
-                 COALESCE(msent.sent_conn_orders, 0)) as conn_count,
-                (COALESCE(mts.created_tech_orders, 0) + COALESCE(msent.sent_tech_orders, 0)) as tech_count,
-                (COALESCE(mcs.created_conn_active, 0) + COALESCE(mcs.assigned_conn_active, 0) + 
-                 COALESCE(mts.created_tech_active, 0) + COALESCE(msos.created_staff_active, 0) +
-                 COALESCE(msent.sent_conn_active, 0) + COALESCE(msent.sent_tech_active, 0) + COALESCE(msent.sent_staff_active, 0)) as active_count,
-                -- New detailed counts
-                COALESCE(mcs.assigned_conn_orders, 0) as assigned_conn_count,
-                COALESCE(mcs.created_conn_orders, 0) as created_conn_count,
-                COALESCE(mts.created_tech_orders, 0) as created_tech_count,
-                -- Staff orders they created
-                COALESCE(msos.created_staff_orders, 0) as created_staff_count,
-                -- Orders they sent
-                COALESCE(msent.sent_conn_orders, 0) as sent_conn_count,
-                COALESCE(msent.sent_tech_orders, 0) as sent_tech_count,
-                COALESCE(msent.sent_staff_orders, 0) as sent_staff_count
-            FROM manager_connection_stats mcs
-            LEFT JOIN manager_technician_stats mts ON mts.id = mcs.id
-            LEFT JOIN manager_staff_orders_stats msos ON msos.id = mcs.id
-            LEFT JOIN manager_sent_orders_stats msent ON msent.id = mcs.id
-            ORDER BY total_orders DESC, mcs.full_name
-            """
-        )
-        return [dict(r) for r in rows]
-    finally:
-        await conn.close()
\ No newline at end of file
+    return await fetch_staff_activity_stats(
+        roles=("junior_manager", "manager"),
+        time_filter=time_filter,
+        assigned_statuses=("in_manager", "in_junior_manager"),
+        assigned_kinds=("conn",),
+    )
@@ -1,12 +1,12 @@
 # database/manager/queries.py
 # Manager roli uchun asosiy queries (inbox)
 
-import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
 
 # Umumiy user funksiyalarini import qilamiz
 from database.basic.user import get_user_by_telegram_id, get_users_by_role
+from database.connections import get_connection
+from database.basic.order_counters import invalidates_order_counters
 
 # =========================================================
 #  Manager Inbox bilan ishlash
@@ -17,7 +17,7 @@ async def fetch_manager_inbox(limit: int = 50, offset: int = 0) -> List[Dict[str
     Manager ko'rishi uchun inbox arizalari.
     Statusi 'in_manager' bo'lgan arizalar.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -50,7 +50,7 @@ async def count_manager_inbox() -> int:
     """
     Manager inboxdagi arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -63,6 +63,7 @@ async def count_manager_inbox() -> int:
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_junior_manager(request_id: int | str, jm_id: int, actor_id: int, bot=None) -> Dict[str, Any]:
     """
     Manager -> Junior Manager:
@@ -81,7 +82,7 @@ async def assign_to_junior_manager(request_id: int | str, jm_id: int, actor_id:
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # JM mavjudmi? + uning ma'lumotlarini olamiz
@@ -195,7 +196,7 @@ async def get_juniors_with_load_via_history() -> List[Dict[str, Any]]:
     """
     Junior managerlarni hozirgi yuklamasi (ochiq arizalar soni) bilan olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -247,7 +248,7 @@ async def fetch_manager_inbox_staff(limit: int = 50, offset: int = 0) -> List[Di
     Manager ko'rishi uchun staff_orders inbox arizalari.
     Statusi 'in_manager' bo'lgan staff_orders arizalar.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -289,7 +290,7 @@ async def count_manager_inbox_staff() -> int:
     """
     Manager inboxdagi staff_orders arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -302,6 +303,7 @@ async def count_manager_inbox_staff() -> int:
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_junior_manager_for_staff(request_id: int | str, jm_id: int, actor_id: int) -> None:
     """
     Manager -> Junior Manager: Staff Orders uchun
@@ -316,7 +318,7 @@ async def assign_to_junior_manager_for_staff(request_id: int | str, jm_id: int,
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # JM mavjudmi?
@@ -386,6 +388,7 @@ async def assign_to_junior_manager_for_staff(request_id: int | str, jm_id: int,
     finally:
         await conn.close()
 
+@invalidates_order_counters
 async def assign_to_controller_for_staff(request_id: int | str, controller_id: int, actor_id: int) -> Dict[str, Any]:
     """
     Manager -> Controller (staff_orders uchun):
@@ -404,7 +407,7 @@ async def assign_to_controller_for_staff(request_id: int | str, controller_id: i
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Controller mavjudmi? + uning ma'lumotlarini olamiz
@@ -518,7 +521,7 @@ async def get_controllers_with_load_via_history() -> List[Dict[str, Any]]:
     """
     Controllerlarni hozirgi yuklamasi (ochiq staff arizalar soni) bilan olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
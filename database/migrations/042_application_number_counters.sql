@@ -0,0 +1,49 @@
+-- Migration 042: Application number counters
+-- CONN-B2C-0001 / TECH-B2B-0001 / STAFF-CONN-B2C-0001 / SMA-0001 raqamlari endi
+-- MAX(CAST(SUBSTRING(...))) skanisiz, har bir prefiks uchun bitta hisoblagich
+-- qatoridan olinadi. UPSERT qatorni qulflaydi, shuning uchun parallel
+-- insertlar bir xil raqam ololmaydi.
+
+CREATE TABLE IF NOT EXISTS application_number_counters (
+    prefix      TEXT PRIMARY KEY,          -- masalan: 'CONN-B2C', 'STAFF-TECH-B2B', 'SMA'
+    last_value  BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION next_application_number(p_prefix TEXT)
+RETURNS BIGINT AS $$
+    INSERT INTO application_number_counters AS c (prefix, last_value)
+    VALUES (p_prefix, 1)
+    ON CONFLICT (prefix) DO UPDATE
+        SET last_value = c.last_value + 1,
+            updated_at = NOW()
+    RETURNING c.last_value;
+$$ LANGUAGE sql;
+
+-- Mavjud ma'lumotlardan hisoblagichlarni to'ldirish (bir martalik skan)
+INSERT INTO application_number_counters (prefix, last_value)
+SELECT prefix, MAX(num)
+FROM (
+    SELECT regexp_replace(application_number, '-[0-9]+$', '') AS prefix,
+           CAST(SUBSTRING(application_number FROM '([0-9]+)$') AS BIGINT) AS num
+    FROM connection_orders WHERE application_number ~ '^CONN-B2[BC]-[0-9]+$'
+    UNION ALL
+    SELECT regexp_replace(application_number, '-[0-9]+$', ''),
+           CAST(SUBSTRING(application_number FROM '([0-9]+)$') AS BIGINT)
+    FROM technician_orders WHERE application_number ~ '^TECH-B2[BC]-[0-9]+$'
+    UNION ALL
+    SELECT regexp_replace(application_number, '-[0-9]+$', ''),
+           CAST(SUBSTRING(application_number FROM '([0-9]+)$') AS BIGINT)
+    FROM staff_orders WHERE application_number ~ '^STAFF-(CONN|TECH)-B2[BC]-[0-9]+$'
+    UNION ALL
+    SELECT regexp_replace(application_number, '-[0-9]+$', ''),
+           CAST(SUBSTRING(application_number FROM '([0-9]+)$') AS BIGINT)
+    FROM smart_service_orders WHERE application_number ~ '^SMA-[0-9]+$'
+) AS existing
+GROUP BY prefix
+ON CONFLICT (prefix) DO UPDATE
+    SET last_value = GREATEST(application_number_counters.last_value, EXCLUDED.last_value),
+        updated_at = NOW();
+
+COMMENT ON TABLE application_number_counters IS 'Per-prefix counters for application_number allocation';
+COMMENT ON FUNCTION next_application_number(TEXT) IS 'Atomically allocates the next number for an application_number prefix';
@@ -0,0 +1,127 @@
+-- Migration 043: technician_load summary table
+-- Controller "texnikka biriktirish" oynasi har safar connections x 3 order
+-- jadvali bo'yicha yuklamani qayta hisoblardi. Endi yuklama technician_load
+-- jadvalida saqlanadi va triggerlar orqali faqat o'zgargan texnik uchun
+-- yangilanadi; o'qish - bitta PK lookup.
+
+CREATE TABLE IF NOT EXISTS technician_load (
+    technician_id  BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    load_count     INTEGER NOT NULL DEFAULT 0,
+    updated_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Trigger va qayta hisoblash uchun indekslar
+CREATE INDEX IF NOT EXISTS idx_connections_connection_id ON connections(connection_id);
+CREATE INDEX IF NOT EXISTS idx_connections_technician_id ON connections(technician_id);
+CREATE INDEX IF NOT EXISTS idx_connections_staff_id ON connections(staff_id);
+CREATE INDEX IF NOT EXISTS idx_connections_recipient_tech_active
+    ON connections(recipient_id)
+    WHERE recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work');
+
+-- Bitta texnik yuklamasini qayta hisoblash (faqat uning faol qatorlari bo'yicha)
+CREATE OR REPLACE FUNCTION refresh_technician_load(p_technician_id BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_technician_id IS NULL
+       OR NOT EXISTS (SELECT 1 FROM users WHERE id = p_technician_id AND role = 'technician') THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO technician_load (technician_id, load_count, updated_at)
+    SELECT p_technician_id, COUNT(*), NOW()
+    FROM connections c
+    LEFT JOIN connection_orders co ON co.id = c.connection_id
+    LEFT JOIN technician_orders tor ON tor.id = c.technician_id
+    LEFT JOIN staff_orders so ON so.id = c.staff_id
+    WHERE c.recipient_id = p_technician_id
+      AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+      AND (
+            (co.id IS NOT NULL AND co.is_active = TRUE
+             AND co.status::text IN ('between_controller_technician', 'in_technician', 'in_technician_work'))
+         OR (tor.id IS NOT NULL AND COALESCE(tor.is_active, TRUE) = TRUE
+             AND tor.status::text IN ('between_controller_technician', 'in_technician', 'in_technician_work'))
+         OR (so.id IS NOT NULL AND COALESCE(so.is_active, TRUE) = TRUE
+             AND so.status::text IN ('between_controller_technician', 'in_technician', 'in_technician_work'))
+      )
+    ON CONFLICT (technician_id) DO UPDATE
+        SET load_count = EXCLUDED.load_count,
+            updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- connections o'zgarganda: eski va yangi recipient uchun
+CREATE OR REPLACE FUNCTION trg_connections_technician_load()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM refresh_technician_load(OLD.recipient_id);
+        RETURN NULL;
+    END IF;
+    PERFORM refresh_technician_load(NEW.recipient_id);
+    IF TG_OP = 'UPDATE' AND OLD.recipient_id IS DISTINCT FROM NEW.recipient_id THEN
+        PERFORM refresh_technician_load(OLD.recipient_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_technician_load ON connections;
+CREATE TRIGGER trg_connections_technician_load
+AFTER INSERT OR DELETE OR UPDATE OF recipient_id, recipient_status, connection_id, technician_id, staff_id
+ON connections
+FOR EACH ROW EXECUTE FUNCTION trg_connections_technician_load();
+
+-- Order statusi / is_active o'zgarganda: shu arizaga biriktirilgan texniklar uchun
+CREATE OR REPLACE FUNCTION trg_orders_technician_load()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN EXECUTE format(
+        'SELECT DISTINCT recipient_id FROM connections WHERE %I = $1 AND recipient_id IS NOT NULL',
+        TG_ARGV[0]
+    ) USING NEW.id
+    LOOP
+        PERFORM refresh_technician_load(r.recipient_id);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_technician_load ON connection_orders;
+CREATE TRIGGER trg_connection_orders_technician_load
+AFTER UPDATE OF status, is_active ON connection_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION trg_orders_technician_load('connection_id');
+
+DROP TRIGGER IF EXISTS trg_technician_orders_technician_load ON technician_orders;
+CREATE TRIGGER trg_technician_orders_technician_load
+AFTER UPDATE OF status, is_active ON technician_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION trg_orders_technician_load('technician_id');
+
+DROP TRIGGER IF EXISTS trg_staff_orders_technician_load ON staff_orders;
+CREATE TRIGGER trg_staff_orders_technician_load
+AFTER UPDATE OF status, is_active ON staff_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION trg_orders_technician_load('staff_id');
+
+-- Rol o'zgarganda (masalan, foydalanuvchi texnikka aylantirilganda) yuklamani hisoblash
+CREATE OR REPLACE FUNCTION trg_users_technician_load()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_technician_load(NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_technician_load ON users;
+CREATE TRIGGER trg_users_technician_load
+AFTER UPDATE OF role ON users
+FOR EACH ROW WHEN (OLD.role IS DISTINCT FROM NEW.role AND NEW.role = 'technician')
+EXECUTE FUNCTION trg_users_technician_load();
+
+-- Boshlang'ich to'ldirish: barcha texniklar uchun
+SELECT refresh_technician_load(id) FROM users WHERE role = 'technician';
+
+COMMENT ON TABLE technician_load IS 'Per-technician active order count, maintained by triggers on connections and order tables';
@@ -0,0 +1,18 @@
+-- Migration 044: FSM storage
+-- aiogram FSM holati va ma'lumotlari (MemoryStorage o'rniga). Bot qayta
+-- ishga tushganda holat yo'qolmaydi va bir nechta worker bitta bazadan
+-- foydalana oladi. expires_at o'tgan yozuvlar o'qilmaydi va vaqti-vaqti
+-- bilan o'chiriladi (database/basic/fsm_storage.py).
+
+CREATE TABLE IF NOT EXISTS fsm_storage (
+    key         TEXT PRIMARY KEY,          -- bot:chat:user:thread:business:destiny
+    state       TEXT,
+    data        JSONB NOT NULL DEFAULT '{}'::jsonb,
+    expires_at  TIMESTAMPTZ,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsm_storage_expires_at
+    ON fsm_storage(expires_at) WHERE expires_at IS NOT NULL;
+
+COMMENT ON TABLE fsm_storage IS 'aiogram FSM state/data per storage key, with optional TTL';
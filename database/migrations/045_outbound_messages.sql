@@ -0,0 +1,44 @@
+-- Migration 045: Outbound message queue
+-- Handler'lar Telegram'ga yuboriladigan xabarlarni (guruh xabarlari,
+-- rollar orasidagi bildirishnomalar, AKT hujjatlari) shu jadvalga yozadi
+-- va darhol javob qaytaradi. Fon dispatcher'i (utils/outbound_queue.py)
+-- ularni chat va global tezlik limitlariga rioya qilgan holda yuboradi.
+--
+-- status: pending -> sending -> sent | failed
+-- dedup_key: bir xil kalitli kutilayotgan xabar bo'lsa yangi qator
+-- qo'shilmaydi, mavjudining payload'i yangilanadi (coalescing).
+
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id            BIGSERIAL PRIMARY KEY,
+    chat_id       BIGINT NOT NULL,
+    method        TEXT NOT NULL,              -- message | photo | video | location | document
+    payload       JSONB NOT NULL DEFAULT '{}'::jsonb,
+    dedup_key     TEXT,
+    on_sent       TEXT,                       -- yuborilgandan keyin chaqiriladigan hook nomi
+    on_failed     TEXT,                       -- butunlay muvaffaqiyatsiz bo'lganda hook nomi
+    meta          JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status        TEXT NOT NULL DEFAULT 'pending'
+                  CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at    TIMESTAMPTZ,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at   TIMESTAMPTZ,                -- sent yoki failed bo'lgan vaqt
+    last_error    TEXT
+);
+
+-- Dispatcher navbati: faqat kutilayotgan qatorlar
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_pending
+    ON outbound_messages(available_at, id) WHERE status = 'pending';
+
+-- Osilib qolgan 'sending' qatorlarini qaytarish uchun
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_sending
+    ON outbound_messages(claimed_at) WHERE status = 'sending';
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_outbound_messages_dedup_pending
+    ON outbound_messages(dedup_key) WHERE status = 'pending' AND dedup_key IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_finished_at
+    ON outbound_messages(finished_at) WHERE status IN ('sent', 'failed');
+
+COMMENT ON TABLE outbound_messages IS 'Persisted Telegram outbound queue drained by a rate-limited dispatcher';
@@ -0,0 +1,40 @@
+-- Migration 046: Media ingestion queue
+-- Ariza ilovalari (foto / video) endi ariza yaratish handler'ida emas, fon
+-- worker'ida (utils/media_ingest.py) yuklab olinadi. Handler faqat
+-- media_ingest_jobs ga Telegram file_id yozadi.
+--
+-- media_files.content_hash - fayl tarkibining sha256 xeshi: bir xil rasm
+-- qayta yuborilsa diskka ikkinchi marta yozilmaydi, mavjud fayl yo'li
+-- ishlatiladi.
+
+CREATE TABLE IF NOT EXISTS media_ingest_jobs (
+    id             BIGSERIAL PRIMARY KEY,
+    file_id        TEXT NOT NULL,
+    media_type     TEXT NOT NULL,             -- photo | video
+    category       TEXT NOT NULL DEFAULT 'service_attachment',
+    related_table  TEXT NOT NULL,
+    related_id     BIGINT NOT NULL,
+    uploaded_by    BIGINT,
+    status         TEXT NOT NULL DEFAULT 'pending'
+                   CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    available_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at     TIMESTAMPTZ,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at    TIMESTAMPTZ,
+    last_error     TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_ingest_jobs_pending
+    ON media_ingest_jobs(available_at, id) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_media_ingest_jobs_running
+    ON media_ingest_jobs(claimed_at) WHERE status = 'running';
+
+ALTER TABLE media_files ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_media_files_content_hash
+    ON media_files(content_hash) WHERE content_hash IS NOT NULL;
+
+COMMENT ON TABLE media_ingest_jobs IS 'Pending Telegram attachment downloads processed by the media ingest worker';
+COMMENT ON COLUMN media_files.content_hash IS 'sha256 of the stored file, used to deduplicate repeated uploads';
@@ -0,0 +1,52 @@
+-- Migration 047: users.phone_normalized
+-- Telefon bo'yicha qidiruv regexp_replace(phone, ...) = ... ko'rinishida
+-- edi va har safar users jadvalini to'liq o'qirdi. Endi faqat raqamlardan
+-- iborat normal shakl generated column sifatida saqlanadi (9 xonali
+-- mahalliy raqamga 998 qo'shiladi) va indeks orqali qidiriladi
+-- (database/basic/phone.py: find_user_by_phone).
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS phone_normalized TEXT
+    GENERATED ALWAYS AS (
+        CASE
+            WHEN length(regexp_replace(phone, '[^0-9]', '', 'g')) = 9
+                THEN '998' || regexp_replace(phone, '[^0-9]', '', 'g')
+            ELSE NULLIF(regexp_replace(phone, '[^0-9]', '', 'g'), '')
+        END
+    ) STORED;
+
+-- Bitta raqam - bitta foydalanuvchi. Eski bazada takroriy raqamlar bo'lsa
+-- unique indeks yaratib bo'lmaydi: oddiy indeks qo'yiladi va takrorlar
+-- ro'yxati NOTICE sifatida chiqariladi (qo'lda tozalangandan keyin
+-- migratsiyani qayta ishga tushirish kifoya).
+DO $$
+DECLARE
+    dup RECORD;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE tablename = 'users' AND indexname = 'uq_users_phone_normalized'
+    ) THEN
+        RETURN;
+    END IF;
+
+    BEGIN
+        CREATE UNIQUE INDEX uq_users_phone_normalized
+            ON users(phone_normalized) WHERE phone_normalized IS NOT NULL;
+        DROP INDEX IF EXISTS idx_users_phone_normalized;
+    EXCEPTION WHEN unique_violation THEN
+        FOR dup IN
+            SELECT phone_normalized, array_agg(id ORDER BY id) AS ids
+            FROM users
+            WHERE phone_normalized IS NOT NULL
+            GROUP BY phone_normalized
+            HAVING COUNT(*) > 1
+        LOOP
+            RAISE NOTICE 'duplicate phone %: users %', dup.phone_normalized, dup.ids;
+        END LOOP;
+        CREATE INDEX IF NOT EXISTS idx_users_phone_normalized
+            ON users(phone_normalized) WHERE phone_normalized IS NOT NULL;
+    END;
+END $$;
+
+COMMENT ON COLUMN users.phone_normalized IS 'Digits-only phone (998XXXXXXXXX) used for indexed phone lookup';
@@ -0,0 +1,38 @@
+-- Migration 048: pg_trgm search indexes
+-- Ism / manzil / material nomi bo'yicha qidiruvlar ILIKE '%...%' edi va
+-- hech qanday indeksdan foydalana olmasdi. GIN (gin_trgm_ops) indekslari
+-- ILIKE '%...%' va word_similarity (<%) operatorlarini qo'llab-quvvatlaydi,
+-- shuning uchun qidiruv vaqti jadval hajmiga deyarli bog'liq bo'lmaydi
+-- (database/basic/search.py).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Mijozlar / foydalanuvchilar
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm
+    ON users USING gin (full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_phone_trgm
+    ON users USING gin (phone gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_abonent_id_trgm
+    ON users USING gin (abonent_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+    ON users USING gin (username gin_trgm_ops);
+
+-- Arizalar
+CREATE INDEX IF NOT EXISTS idx_connection_orders_app_number_trgm
+    ON connection_orders USING gin (application_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_connection_orders_address_trgm
+    ON connection_orders USING gin (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_technician_orders_app_number_trgm
+    ON technician_orders USING gin (application_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_technician_orders_address_trgm
+    ON technician_orders USING gin (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_orders_app_number_trgm
+    ON staff_orders USING gin (application_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_orders_address_trgm
+    ON staff_orders USING gin (address gin_trgm_ops);
+
+-- Materiallar
+CREATE INDEX IF NOT EXISTS idx_materials_name_trgm
+    ON materials USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_materials_serial_number_trgm
+    ON materials USING gin (serial_number gin_trgm_ops);
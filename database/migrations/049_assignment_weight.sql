@@ -0,0 +1,24 @@
+-- Migration 049: users.assignment_weight
+-- Avtomatik biriktirishda (database/basic/assignment.py) xodim vazni:
+-- weighted round-robin'da ulush, least-loaded'da sig'im (yuklama / vazn).
+-- 0 - avtomatik biriktirishdan chiqarilgan (ta'til, sinov va h.k.),
+-- qo'lda tanlash bunga bog'liq emas.
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS assignment_weight SMALLINT NOT NULL DEFAULT 1;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'chk_users_assignment_weight'
+    ) THEN
+        ALTER TABLE users
+            ADD CONSTRAINT chk_users_assignment_weight CHECK (assignment_weight >= 0);
+    END IF;
+END $$;
+
+-- Yuklama hisoblash: recipient bo'yicha faol hand-off qatorlari
+CREATE INDEX IF NOT EXISTS idx_connections_recipient_status
+    ON connections(recipient_id, recipient_status);
+
+COMMENT ON COLUMN users.assignment_weight IS 'Auto-assignment weight (0 = excluded from automatic hand-offs)';
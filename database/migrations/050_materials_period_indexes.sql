@@ -0,0 +1,7 @@
+-- Migration 050: materials davr indekslari
+-- Ombor statistikasi (database/warehouse/analytics.py) kun / oraliq
+-- bo'yicha "created_at >= $1 AND created_at < $2" shartlaridan foydalanadi;
+-- DATE(created_at) = $1 o'rniga shu indekslar ishlaydi.
+
+CREATE INDEX IF NOT EXISTS idx_materials_created_at ON materials(created_at);
+CREATE INDEX IF NOT EXISTS idx_materials_updated_at ON materials(updated_at);
@@ -0,0 +1,29 @@
+-- Migration 051: material_requests (user_id, application_number, material_id) unique
+-- Material tanlash (database/technician/materials.py::upsert_material_cart)
+-- INSERT ... ON CONFLICT (user_id, application_number, material_id) DO UPDATE
+-- bilan ishlaydi. Avval takroriy qatorlar birlashtiriladi: miqdorlar eng
+-- kichik ID'li qatorga qo'shiladi (tanlov doim qo'shish bilan yozilgan).
+
+WITH dup AS (
+    SELECT user_id, application_number, material_id,
+           MIN(id) AS keep_id, SUM(quantity) AS qty
+    FROM material_requests
+    WHERE application_number IS NOT NULL
+    GROUP BY user_id, application_number, material_id
+    HAVING COUNT(*) > 1
+)
+UPDATE material_requests mr
+   SET quantity = dup.qty,
+       total_price = dup.qty * COALESCE(mr.price, 0)
+  FROM dup
+ WHERE mr.id = dup.keep_id;
+
+DELETE FROM material_requests a
+USING material_requests b
+WHERE a.user_id = b.user_id
+  AND a.application_number = b.application_number
+  AND a.material_id = b.material_id
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_material_requests_user_appnum_material
+    ON material_requests(user_id, application_number, material_id);
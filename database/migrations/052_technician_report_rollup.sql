@@ -0,0 +1,240 @@
+-- Migration 052: texnik hisoboti uchun kunlik rollup
+-- "Hisobotlarim" har safar texnikning butun connections tarixi bo'yicha
+-- DISTINCT ON (order_id) ni 3 marta (connection / technician / staff)
+-- hisoblardi. Endi:
+--   technician_order_state  - (texnik, tur, ariza) bo'yicha oxirgi holat:
+--                             oxirgi qatnashgan kun va texnik statusi
+--   technician_daily_rollup - (texnik, kun, tur, status) bo'yicha arizalar soni
+-- Ikkalasi ham triggerlar orqali faqat o'zgargan ariza uchun yangilanadi;
+-- hisobot davr kunlari bo'yicha rollup qatorlarini qo'shadi xolos.
+--
+-- Qoidalar database/technician/report.py dagi eski so'rov bilan bir xil:
+-- ariza oxirgi qatnashgan kuni hisoblanadi; ariza statusi completed /
+-- cancelled bo'lsa o'sha, aks holda texnik tomonidagi status olinadi.
+-- Kun - Asia/Tashkent vaqti bo'yicha.
+
+CREATE TABLE IF NOT EXISTS technician_order_state (
+    technician_id  BIGINT      NOT NULL,
+    kind           TEXT        NOT NULL,   -- connection | technician | staff
+    order_id       BIGINT      NOT NULL,
+    last_day       DATE        NOT NULL,
+    last_ts        TIMESTAMPTZ NOT NULL,
+    tech_status    TEXT        NOT NULL,
+    order_final    TEXT,                   -- ariza statusi (faqat completed / cancelled)
+    PRIMARY KEY (technician_id, kind, order_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_technician_order_state_order
+    ON technician_order_state(kind, order_id);
+
+CREATE TABLE IF NOT EXISTS technician_daily_rollup (
+    technician_id  BIGINT  NOT NULL,
+    day            DATE    NOT NULL,
+    kind           TEXT    NOT NULL,
+    status         TEXT    NOT NULL,
+    orders         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (technician_id, day, kind, status)
+);
+
+-- Bir tomondagi status -> texnik statusi (qiziq bo'lmasa NULL)
+CREATE OR REPLACE FUNCTION tech_rollup_side_status(p_status TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_status IN ('between_controller_technician', 'in_between_controller_technician')
+            THEN 'between_controller_technician'
+        WHEN p_status IN ('in_technician', 'in_technician_work', 'in_warehouse', 'completed')
+            THEN p_status
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Ikkala tomonda ham shu foydalanuvchi: ustuvorlik bo'yicha
+CREATE OR REPLACE FUNCTION tech_rollup_both_status(p_sender TEXT, p_recipient TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_sender = 'completed' OR p_recipient = 'completed' THEN 'completed'
+        WHEN p_sender = 'in_warehouse' OR p_recipient = 'in_warehouse' THEN 'in_warehouse'
+        WHEN p_sender = 'in_technician_work' OR p_recipient = 'in_technician_work' THEN 'in_technician_work'
+        WHEN p_sender = 'in_technician' OR p_recipient = 'in_technician' THEN 'in_technician'
+        WHEN p_sender IN ('between_controller_technician', 'in_between_controller_technician')
+          OR p_recipient IN ('between_controller_technician', 'in_between_controller_technician')
+            THEN 'between_controller_technician'
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION tech_rollup_bump(p_tech BIGINT, p_day DATE, p_kind TEXT, p_status TEXT, p_delta INTEGER)
+RETURNS VOID AS $$
+    INSERT INTO technician_daily_rollup (technician_id, day, kind, status, orders)
+    VALUES (p_tech, p_day, p_kind, p_status, p_delta)
+    ON CONFLICT (technician_id, day, kind, status)
+    DO UPDATE SET orders = technician_daily_rollup.orders + EXCLUDED.orders;
+$$ LANGUAGE sql;
+
+-- Bitta connections qatori bir foydalanuvchi uchun: holatni ko'chirish
+CREATE OR REPLACE FUNCTION tech_rollup_apply(
+    p_tech BIGINT, p_kind TEXT, p_order BIGINT, p_ts TIMESTAMPTZ,
+    p_status TEXT, p_order_status TEXT
+)
+RETURNS VOID AS $$
+DECLARE
+    v_day   DATE := (p_ts AT TIME ZONE 'Asia/Tashkent')::date;
+    v_final TEXT := CASE WHEN p_order_status IN ('completed', 'cancelled') THEN p_order_status END;
+    old     technician_order_state%ROWTYPE;
+BEGIN
+    IF p_tech IS NULL OR p_order IS NULL OR p_status IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO technician_order_state
+        (technician_id, kind, order_id, last_day, last_ts, tech_status, order_final)
+    VALUES (p_tech, p_kind, p_order, v_day, p_ts, p_status, v_final)
+    ON CONFLICT (technician_id, kind, order_id) DO NOTHING;
+    IF FOUND THEN
+        PERFORM tech_rollup_bump(p_tech, v_day, p_kind, COALESCE(v_final, p_status), 1);
+        RETURN;
+    END IF;
+
+    SELECT * INTO old FROM technician_order_state
+     WHERE technician_id = p_tech AND kind = p_kind AND order_id = p_order
+     FOR UPDATE;
+    IF old.last_ts > p_ts THEN
+        RETURN;  -- eskiroq yozuv oxirgi holatni o'zgartirmaydi
+    END IF;
+
+    PERFORM tech_rollup_bump(p_tech, old.last_day, p_kind, COALESCE(old.order_final, old.tech_status), -1);
+    UPDATE technician_order_state
+       SET last_day = v_day, last_ts = p_ts, tech_status = p_status, order_final = v_final
+     WHERE technician_id = p_tech AND kind = p_kind AND order_id = p_order;
+    PERFORM tech_rollup_bump(p_tech, v_day, p_kind, COALESCE(v_final, p_status), 1);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Yangi connections qatori: sender va recipient uchun
+CREATE OR REPLACE FUNCTION trg_connections_tech_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ts  TIMESTAMPTZ := COALESCE(NEW.updated_at, NEW.created_at, NOW());
+    k     RECORD;
+    v_order_status TEXT;
+BEGIN
+    FOR k IN
+        SELECT * FROM (VALUES ('connection', NEW.connection_id),
+                              ('technician', NEW.technician_id),
+                              ('staff', NEW.staff_id)) AS t(kind, order_id)
+        WHERE t.order_id IS NOT NULL
+    LOOP
+        IF k.kind = 'connection' THEN
+            SELECT status::text INTO v_order_status FROM connection_orders WHERE id = k.order_id;
+        ELSIF k.kind = 'technician' THEN
+            SELECT status::text INTO v_order_status FROM technician_orders WHERE id = k.order_id;
+        ELSE
+            SELECT status::text INTO v_order_status FROM staff_orders WHERE id = k.order_id;
+        END IF;
+
+        IF NEW.sender_id IS NOT DISTINCT FROM NEW.recipient_id THEN
+            PERFORM tech_rollup_apply(NEW.sender_id, k.kind, k.order_id, v_ts,
+                tech_rollup_both_status(NEW.sender_status::text, NEW.recipient_status::text), v_order_status);
+        ELSE
+            PERFORM tech_rollup_apply(NEW.sender_id, k.kind, k.order_id, v_ts,
+                tech_rollup_side_status(NEW.sender_status::text), v_order_status);
+            PERFORM tech_rollup_apply(NEW.recipient_id, k.kind, k.order_id, v_ts,
+                tech_rollup_side_status(NEW.recipient_status::text), v_order_status);
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_tech_rollup ON connections;
+CREATE TRIGGER trg_connections_tech_rollup
+AFTER INSERT ON connections
+FOR EACH ROW EXECUTE FUNCTION trg_connections_tech_rollup();
+
+-- Ariza statusi completed / cancelled ga o'tganda (yoki qaytganda):
+-- shu arizadagi barcha texniklar qatori boshqa status ustuniga ko'chadi
+CREATE OR REPLACE FUNCTION trg_orders_tech_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_kind  TEXT := TG_ARGV[0];
+    v_final TEXT := CASE WHEN NEW.status::text IN ('completed', 'cancelled') THEN NEW.status::text END;
+    s       RECORD;
+BEGIN
+    FOR s IN
+        SELECT * FROM technician_order_state
+         WHERE kind = v_kind AND order_id = NEW.id
+           AND order_final IS DISTINCT FROM v_final
+         FOR UPDATE
+    LOOP
+        PERFORM tech_rollup_bump(s.technician_id, s.last_day, v_kind, COALESCE(s.order_final, s.tech_status), -1);
+        PERFORM tech_rollup_bump(s.technician_id, s.last_day, v_kind, COALESCE(v_final, s.tech_status), 1);
+        UPDATE technician_order_state
+           SET order_final = v_final
+         WHERE technician_id = s.technician_id AND kind = v_kind AND order_id = NEW.id;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_tech_rollup ON connection_orders;
+CREATE TRIGGER trg_connection_orders_tech_rollup
+AFTER UPDATE OF status ON connection_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION trg_orders_tech_rollup('connection');
+
+DROP TRIGGER IF EXISTS trg_technician_orders_tech_rollup ON technician_orders;
+CREATE TRIGGER trg_technician_orders_tech_rollup
+AFTER UPDATE OF status ON technician_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION trg_orders_tech_rollup('technician');
+
+DROP TRIGGER IF EXISTS trg_staff_orders_tech_rollup ON staff_orders;
+CREATE TRIGGER trg_staff_orders_tech_rollup
+AFTER UPDATE OF status ON staff_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION trg_orders_tech_rollup('staff');
+
+-- Boshlang'ich to'ldirish: mavjud connections tarixidan
+INSERT INTO technician_order_state
+    (technician_id, kind, order_id, last_day, last_ts, tech_status, order_final)
+SELECT DISTINCT ON (inv.user_id, inv.kind, inv.order_id)
+       inv.user_id, inv.kind, inv.order_id,
+       (inv.ts AT TIME ZONE 'Asia/Tashkent')::date, inv.ts, inv.st,
+       CASE WHEN o.status IN ('completed', 'cancelled') THEN o.status END
+FROM (
+    SELECT c.id, COALESCE(c.updated_at, c.created_at) AS ts, k.kind, k.order_id, u.user_id, u.st
+    FROM connections c
+    CROSS JOIN LATERAL (VALUES ('connection', c.connection_id),
+                               ('technician', c.technician_id),
+                               ('staff', c.staff_id)) AS k(kind, order_id)
+    CROSS JOIN LATERAL (
+        SELECT c.sender_id, tech_rollup_both_status(c.sender_status::text, c.recipient_status::text)
+         WHERE c.sender_id IS NOT DISTINCT FROM c.recipient_id
+        UNION ALL
+        SELECT c.sender_id, tech_rollup_side_status(c.sender_status::text)
+         WHERE c.sender_id IS DISTINCT FROM c.recipient_id
+        UNION ALL
+        SELECT c.recipient_id, tech_rollup_side_status(c.recipient_status::text)
+         WHERE c.sender_id IS DISTINCT FROM c.recipient_id
+    ) AS u(user_id, st)
+    WHERE k.order_id IS NOT NULL AND u.user_id IS NOT NULL AND u.st IS NOT NULL
+) inv
+LEFT JOIN (
+    SELECT 'connection' AS kind, id, status::text AS status FROM connection_orders
+    UNION ALL
+    SELECT 'technician', id, status::text FROM technician_orders
+    UNION ALL
+    SELECT 'staff', id, status::text FROM staff_orders
+) o ON o.kind = inv.kind AND o.id = inv.order_id
+ORDER BY inv.user_id, inv.kind, inv.order_id, inv.ts DESC, inv.id DESC
+ON CONFLICT (technician_id, kind, order_id) DO NOTHING;
+
+-- Rollup holat jadvalidan to'liq qayta quriladi (migratsiya takrorlansa ham to'g'ri)
+DELETE FROM technician_daily_rollup;
+INSERT INTO technician_daily_rollup (technician_id, day, kind, status, orders)
+SELECT technician_id, last_day, kind, COALESCE(order_final, tech_status), COUNT(*)
+FROM technician_order_state
+GROUP BY technician_id, last_day, kind, COALESCE(order_final, tech_status);
+
+COMMENT ON TABLE technician_daily_rollup IS 'Per-technician, per-day, per-order-kind status counts for the technician report; maintained by triggers';
+COMMENT ON TABLE technician_order_state IS 'Latest technician involvement per order, source of technician_daily_rollup';
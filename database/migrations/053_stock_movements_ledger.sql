@@ -0,0 +1,52 @@
+-- Migration 053: stock_movements - material harakatlari jurnali
+-- Ombor <-> texnik <-> ariza o'rtasidagi har bir o'tkazma bitta qator
+-- (append-only). Qoldiqlar avvalgidek materials.quantity (ombor) va
+-- material_and_technician.quantity (texnik) da saqlanadi; ular
+-- database/basic/stock_ledger.py da jurnal yozuvi bilan bitta statement'da,
+-- shartli (quantity >= miqdor) kamaytirish orqali o'zgartiriladi.
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id                  BIGSERIAL PRIMARY KEY,
+    material_id         INTEGER     NOT NULL REFERENCES materials(id),
+    quantity            INTEGER     NOT NULL CHECK (quantity > 0),
+    from_type           TEXT        NOT NULL CHECK (from_type IN ('warehouse', 'technician', 'order')),
+    from_id             BIGINT,                 -- texnik: users.id
+    to_type             TEXT        NOT NULL CHECK (to_type IN ('warehouse', 'technician', 'order')),
+    to_id               BIGINT,
+    application_number  TEXT,
+    actor_id            BIGINT,
+    reason              TEXT,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_material ON stock_movements(material_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_from ON stock_movements(from_type, from_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_to ON stock_movements(to_type, to_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_application ON stock_movements(application_number)
+    WHERE application_number IS NOT NULL;
+
+-- Jurnal faqat qo'shiladi: tuzatish - teskari harakat yozuvi bilan
+CREATE OR REPLACE FUNCTION trg_stock_movements_append_only()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'stock_movements is append-only';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_movements_append_only ON stock_movements;
+CREATE TRIGGER trg_stock_movements_append_only
+BEFORE UPDATE OR DELETE ON stock_movements
+FOR EACH ROW EXECUTE FUNCTION trg_stock_movements_append_only();
+
+-- Egasi bo'yicha joriy qoldiqlar (ombor + texniklar)
+CREATE OR REPLACE VIEW stock_holder_balances AS
+SELECT 'warehouse'::text AS holder_type, NULL::bigint AS holder_id,
+       m.id AS material_id, m.name, m.price, m.serial_number, m.quantity
+FROM materials m
+UNION ALL
+SELECT 'technician'::text, t.user_id::bigint,
+       t.material_id, m.name, m.price, m.serial_number, t.quantity
+FROM material_and_technician t
+JOIN materials m ON m.id = t.material_id;
+
+COMMENT ON TABLE stock_movements IS 'Append-only material movement ledger (warehouse / technician / order)';
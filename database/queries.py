@@ -1,6 +1,10 @@
 import asyncpg
 from config import settings
 from typing import Optional
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number
+from database.basic.user import invalidate_user_cache
+from database.basic.language import get_user_language as _cached_get_user_language
 
 async def get_or_create_user(telegram_id: int, username: Optional[str], full_name: Optional[str] = None) -> str:
     """telegram_id bo'yicha userni tekshiradi, bo'lmasa ketma-ket ID bilan 'client' rolida yaratadi.
@@ -16,8 +20,7 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
     # Bot o'zini bazaga saqlamasligi uchun tekshirish
     if telegram_id == settings.BOT_ID:
         return "client"  # Bot uchun default role qaytaradi, lekin bazaga saqlamaydi
-    
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             'SELECT role, full_name FROM users WHERE telegram_id = $1',
@@ -56,13 +59,14 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
                 """,
                 telegram_id, username, full_name
             )
+            invalidate_user_cache(telegram_id)
             return "client"
     finally:
         await conn.close()
 
 async def reset_user_sequence() -> None:
     """User ID sequence ni hozirgi ma'lumotlarga moslashtiradi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         await conn.execute("SELECT reset_user_sequential_sequence()")
     finally:
@@ -70,7 +74,7 @@ async def reset_user_sequence() -> None:
 
 async def get_next_user_id() -> int:
     """Keyingi ketma-ket user ID ni qaytaradi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.fetchval("SELECT get_next_sequential_user_id()")
         return result
@@ -79,7 +83,7 @@ async def get_next_user_id() -> int:
 
 async def find_user_by_telegram_id(telegram_id: int) -> Optional[asyncpg.Record]:
     """Finds a user by their Telegram ID."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             'SELECT * FROM users WHERE telegram_id = $1',
@@ -89,61 +93,28 @@ async def find_user_by_telegram_id(telegram_id: int) -> Optional[asyncpg.Record]
     finally:
         await conn.close()
 
-async def find_user_by_phone(phone: str) -> Optional[asyncpg.Record]:
-    """Finds a user by their phone number with flexible format matching.
+async def find_user_by_phone(phone: str) -> Optional[dict]:
+    """Finds a user by phone number (+998XXXXXXXXX, 998XXXXXXXXX, spaces etc.).
     
-    Supports both formats: +998XXXXXXXXX and 998XXXXXXXXX
-    Also handles spaces and other non-digit characters.
+    Uses the shared indexed lookup on users.phone_normalized.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Normalize input phone by removing all non-digits
-        normalized_input = ''.join(filter(str.isdigit, phone))
-        
-        # Try multiple search strategies
-        user = await conn.fetchrow(
-            """
-            SELECT * FROM users 
-            WHERE 
-                -- Exact match
-                phone = $1 OR
-                -- Match with + prefix
-                phone = $2 OR
-                -- Match without + prefix  
-                phone = $3 OR
-                -- Normalize both sides (remove all non-digits)
-                regexp_replace(phone, '[^0-9]', '', 'g') = $4
-            LIMIT 1
-            """,
-            phone,  # Original input
-            '+' + phone.lstrip('+'),  # Add + if not present
-            phone.lstrip('+'),  # Remove + if present
-            normalized_input  # Only digits
-        )
-        return user
-    finally:
-        await conn.close()
+    from database.basic.phone import find_user_by_phone as _find_user_by_phone
+    return await _find_user_by_phone(phone)
 
 async def update_user_phone(telegram_id: int, phone: str) -> bool:
     """Updates the phone number of a user by their Telegram ID."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        result = await conn.execute(
-            'UPDATE users SET phone = $1 WHERE telegram_id = $2',
-            phone, telegram_id
-        )
-        return result != 'UPDATE 0'
-    finally:
-        await conn.close()
+    from database.basic.user import update_user_phone_by_telegram_id
+    return await update_user_phone_by_telegram_id(telegram_id, phone)
 
 async def update_user_role(telegram_id: int, new_role: str) -> bool:
     """Updates the role of a user by their Telegram ID."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET role = $1 WHERE telegram_id = $2',
             new_role, telegram_id
         )
+        invalidate_user_cache(telegram_id)
         return result != 'UPDATE 0'
     finally:
         await conn.close()
@@ -158,7 +129,7 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True, aks holda False
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET full_name = $1 WHERE telegram_id = $2',
@@ -170,15 +141,7 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
 
 async def get_user_language(telegram_id: int) -> str:
     """Get user's language by telegram_id; return 'uz' as default."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        language = await conn.fetchval(
-            "SELECT language FROM users WHERE telegram_id = $1",
-            telegram_id
-        )
-        return language if language else 'uz'
-    finally:
-        await conn.close()
+    return (await _cached_get_user_language(telegram_id)) or 'uz'
 
 # SmartService Manager Queries
 async def get_smart_service_orders_for_manager(limit: int = 10, offset: int = 0) -> list:
@@ -191,7 +154,7 @@ async def get_smart_service_orders_for_manager(limit: int = 10, offset: int = 0)
     Returns:
         list: SmartService arizalari ro'yxati
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         orders = await conn.fetch(
             """
@@ -218,7 +181,7 @@ async def get_smart_service_order_by_id(order_id: int) -> Optional[dict]:
     Returns:
         dict: Ariza ma'lumotlari yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         order = await conn.fetchrow(
             """
@@ -241,7 +204,7 @@ async def get_smart_service_orders_count() -> int:
     Returns:
         int: Jami arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval("SELECT COUNT(*) FROM smart_service_orders")
         return count or 0
@@ -260,25 +223,10 @@ async def create_smart_service_order(user_id: int, category: str, service_type:
     Returns:
         int: Yaratilgan ariza IDsi
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Generate application number for smart service
-        # Get next number for smart service orders
-        next_num = await conn.fetchval(
-            """
-            SELECT COALESCE(MAX(
-                CASE 
-                    WHEN application_number ~ '^SMA-[0-9]+$' THEN 
-                        CAST(SUBSTRING(application_number FROM 'SMA-([0-9]+)$') AS INTEGER)
-                    ELSE 0
-                END
-            ), 0) + 1
-            FROM smart_service_orders 
-            WHERE application_number IS NOT NULL
-            """
-        )
-        
-        application_number = f"SMA-{next_num:04d}"
+        application_number = await allocate_application_number(conn, "SMA")
         
         order_id = await conn.fetchval(
             """
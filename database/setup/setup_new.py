@@ -486,6 +486,23 @@ DROP TRIGGER IF EXISTS trg_media_files_updated_at ON public.media_files;
 CREATE TRIGGER trg_media_files_updated_at BEFORE UPDATE ON public.media_files
 FOR EACH ROW EXECUTE FUNCTION public.update_updated_at_column();
 
+-- APPLICATION_NUMBER_COUNTERS (per-prefix application_number allocator)
+CREATE TABLE IF NOT EXISTS public.application_number_counters (
+  prefix      TEXT PRIMARY KEY,
+  last_value  BIGINT NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION public.next_application_number(p_prefix TEXT)
+RETURNS BIGINT AS $$
+    INSERT INTO public.application_number_counters AS c (prefix, last_value)
+    VALUES (p_prefix, 1)
+    ON CONFLICT (prefix) DO UPDATE
+        SET last_value = c.last_value + 1,
+            updated_at = NOW()
+    RETURNING c.last_value;
+$$ LANGUAGE sql;
+
 -- ===== SEQUENTIAL USER ID FUNCTIONS =====
 
 -- Create a custom sequence for sequential user IDs
@@ -586,6 +603,698 @@ COMMENT ON SEQUENCE user_sequential_id_seq IS 'Sequential ID generator for users
 COMMENT ON FUNCTION get_next_sequential_user_id() IS 'Returns next available sequential user ID';
 COMMENT ON FUNCTION create_user_sequential(BIGINT, TEXT, TEXT, TEXT, user_role) IS 'Creates user with sequential ID';
 COMMENT ON FUNCTION reset_user_sequential_sequence() IS 'Resets sequence to match existing data';
+
+-- ===== TECHNICIAN LOAD (043_technician_load.sql) =====
+-- Texnik yuklamasi triggerlar bilan yangilanadi (controller biriktirish oynasi uchun)
+CREATE TABLE IF NOT EXISTS technician_load (
+    technician_id  BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    load_count     INTEGER NOT NULL DEFAULT 0,
+    updated_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Trigger va qayta hisoblash uchun indekslar
+CREATE INDEX IF NOT EXISTS idx_connections_connection_id ON connections(connection_id);
+CREATE INDEX IF NOT EXISTS idx_connections_technician_id ON connections(technician_id);
+CREATE INDEX IF NOT EXISTS idx_connections_staff_id ON connections(staff_id);
+CREATE INDEX IF NOT EXISTS idx_connections_recipient_tech_active
+    ON connections(recipient_id)
+    WHERE recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work');
+
+-- Bitta texnik yuklamasini qayta hisoblash (faqat uning faol qatorlari bo'yicha)
+CREATE OR REPLACE FUNCTION refresh_technician_load(p_technician_id BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_technician_id IS NULL
+       OR NOT EXISTS (SELECT 1 FROM users WHERE id = p_technician_id AND role = 'technician') THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO technician_load (technician_id, load_count, updated_at)
+    SELECT p_technician_id, COUNT(*), NOW()
+    FROM connections c
+    LEFT JOIN connection_orders co ON co.id = c.connection_id
+    LEFT JOIN technician_orders tor ON tor.id = c.technician_id
+    LEFT JOIN staff_orders so ON so.id = c.staff_id
+    WHERE c.recipient_id = p_technician_id
+      AND c.recipient_status IN ('between_controller_technician', 'in_technician', 'in_technician_work')
+      AND (
+            (co.id IS NOT NULL AND co.is_active = TRUE
+             AND co.status::text IN ('between_controller_technician', 'in_technician', 'in_technician_work'))
+         OR (tor.id IS NOT NULL AND COALESCE(tor.is_active, TRUE) = TRUE
+             AND tor.status::text IN ('between_controller_technician', 'in_technician', 'in_technician_work'))
+         OR (so.id IS NOT NULL AND COALESCE(so.is_active, TRUE) = TRUE
+             AND so.status::text IN ('between_controller_technician', 'in_technician', 'in_technician_work'))
+      )
+    ON CONFLICT (technician_id) DO UPDATE
+        SET load_count = EXCLUDED.load_count,
+            updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- connections o'zgarganda: eski va yangi recipient uchun
+CREATE OR REPLACE FUNCTION trg_connections_technician_load()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM refresh_technician_load(OLD.recipient_id);
+        RETURN NULL;
+    END IF;
+    PERFORM refresh_technician_load(NEW.recipient_id);
+    IF TG_OP = 'UPDATE' AND OLD.recipient_id IS DISTINCT FROM NEW.recipient_id THEN
+        PERFORM refresh_technician_load(OLD.recipient_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_technician_load ON connections;
+CREATE TRIGGER trg_connections_technician_load
+AFTER INSERT OR DELETE OR UPDATE OF recipient_id, recipient_status, connection_id, technician_id, staff_id
+ON connections
+FOR EACH ROW EXECUTE FUNCTION trg_connections_technician_load();
+
+-- Order statusi / is_active o'zgarganda: shu arizaga biriktirilgan texniklar uchun
+CREATE OR REPLACE FUNCTION trg_orders_technician_load()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN EXECUTE format(
+        'SELECT DISTINCT recipient_id FROM connections WHERE %I = $1 AND recipient_id IS NOT NULL',
+        TG_ARGV[0]
+    ) USING NEW.id
+    LOOP
+        PERFORM refresh_technician_load(r.recipient_id);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_technician_load ON connection_orders;
+CREATE TRIGGER trg_connection_orders_technician_load
+AFTER UPDATE OF status, is_active ON connection_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION trg_orders_technician_load('connection_id');
+
+DROP TRIGGER IF EXISTS trg_technician_orders_technician_load ON technician_orders;
+CREATE TRIGGER trg_technician_orders_technician_load
+AFTER UPDATE OF status, is_active ON technician_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION trg_orders_technician_load('technician_id');
+
+DROP TRIGGER IF EXISTS trg_staff_orders_technician_load ON staff_orders;
+CREATE TRIGGER trg_staff_orders_technician_load
+AFTER UPDATE OF status, is_active ON staff_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.is_active IS DISTINCT FROM NEW.is_active)
+EXECUTE FUNCTION trg_orders_technician_load('staff_id');
+
+-- Rol o'zgarganda (masalan, foydalanuvchi texnikka aylantirilganda) yuklamani hisoblash
+CREATE OR REPLACE FUNCTION trg_users_technician_load()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_technician_load(NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_technician_load ON users;
+CREATE TRIGGER trg_users_technician_load
+AFTER UPDATE OF role ON users
+FOR EACH ROW WHEN (OLD.role IS DISTINCT FROM NEW.role AND NEW.role = 'technician')
+EXECUTE FUNCTION trg_users_technician_load();
+
+-- Boshlang'ich to'ldirish: barcha texniklar uchun
+SELECT refresh_technician_load(id) FROM users WHERE role = 'technician';
+
+COMMENT ON TABLE technician_load IS 'Per-technician active order count, maintained by triggers on connections and order tables';
+
+-- ===== Keyingi bo'limlar talab qiladi (009, 031 migratsiyalari) =====
+-- material_and_technician (user_id, material_id) - ON CONFLICT upsert'lar uchun
+DO $$ BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ux_mat_tech_user_material') THEN
+    ALTER TABLE public.material_and_technician
+      ADD CONSTRAINT ux_mat_tech_user_material UNIQUE (user_id, material_id);
+  END IF;
+END $$;
+
+-- material_requests.application_number (051 indeksi va savat upsert'i uchun)
+ALTER TABLE public.material_requests ADD COLUMN IF NOT EXISTS application_number VARCHAR(50);
+CREATE INDEX IF NOT EXISTS idx_material_requests_application_number
+    ON public.material_requests(application_number);
+
+-- ===== FSM storage (044_fsm_storage.sql) =====
+-- aiogram FSM holati va ma'lumotlari (MemoryStorage o'rniga). Bot qayta
+-- ishga tushganda holat yo'qolmaydi va bir nechta worker bitta bazadan
+-- foydalana oladi. expires_at o'tgan yozuvlar o'qilmaydi va vaqti-vaqti
+-- bilan o'chiriladi (database/basic/fsm_storage.py).
+
+CREATE TABLE IF NOT EXISTS fsm_storage (
+    key         TEXT PRIMARY KEY,          -- bot:chat:user:thread:business:destiny
+    state       TEXT,
+    data        JSONB NOT NULL DEFAULT '{}'::jsonb,
+    expires_at  TIMESTAMPTZ,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsm_storage_expires_at
+    ON fsm_storage(expires_at) WHERE expires_at IS NOT NULL;
+
+COMMENT ON TABLE fsm_storage IS 'aiogram FSM state/data per storage key, with optional TTL';
+
+-- ===== Outbound message queue (045_outbound_messages.sql) =====
+-- Handler'lar Telegram'ga yuboriladigan xabarlarni (guruh xabarlari,
+-- rollar orasidagi bildirishnomalar, AKT hujjatlari) shu jadvalga yozadi
+-- va darhol javob qaytaradi. Fon dispatcher'i (utils/outbound_queue.py)
+-- ularni chat va global tezlik limitlariga rioya qilgan holda yuboradi.
+--
+-- status: pending -> sending -> sent | failed
+-- dedup_key: bir xil kalitli kutilayotgan xabar bo'lsa yangi qator
+-- qo'shilmaydi, mavjudining payload'i yangilanadi (coalescing).
+
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id            BIGSERIAL PRIMARY KEY,
+    chat_id       BIGINT NOT NULL,
+    method        TEXT NOT NULL,              -- message | photo | video | location | document
+    payload       JSONB NOT NULL DEFAULT '{}'::jsonb,
+    dedup_key     TEXT,
+    on_sent       TEXT,                       -- yuborilgandan keyin chaqiriladigan hook nomi
+    on_failed     TEXT,                       -- butunlay muvaffaqiyatsiz bo'lganda hook nomi
+    meta          JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status        TEXT NOT NULL DEFAULT 'pending'
+                  CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at    TIMESTAMPTZ,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at   TIMESTAMPTZ,                -- sent yoki failed bo'lgan vaqt
+    last_error    TEXT
+);
+
+-- Dispatcher navbati: faqat kutilayotgan qatorlar
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_pending
+    ON outbound_messages(available_at, id) WHERE status = 'pending';
+
+-- Osilib qolgan 'sending' qatorlarini qaytarish uchun
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_sending
+    ON outbound_messages(claimed_at) WHERE status = 'sending';
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_outbound_messages_dedup_pending
+    ON outbound_messages(dedup_key) WHERE status = 'pending' AND dedup_key IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_finished_at
+    ON outbound_messages(finished_at) WHERE status IN ('sent', 'failed');
+
+COMMENT ON TABLE outbound_messages IS 'Persisted Telegram outbound queue drained by a rate-limited dispatcher';
+
+-- ===== Media ingestion queue (046_media_ingest_jobs.sql) =====
+-- Ariza ilovalari (foto / video) endi ariza yaratish handler'ida emas, fon
+-- worker'ida (utils/media_ingest.py) yuklab olinadi. Handler faqat
+-- media_ingest_jobs ga Telegram file_id yozadi.
+--
+-- media_files.content_hash - fayl tarkibining sha256 xeshi: bir xil rasm
+-- qayta yuborilsa diskka ikkinchi marta yozilmaydi, mavjud fayl yo'li
+-- ishlatiladi.
+
+CREATE TABLE IF NOT EXISTS media_ingest_jobs (
+    id             BIGSERIAL PRIMARY KEY,
+    file_id        TEXT NOT NULL,
+    media_type     TEXT NOT NULL,             -- photo | video
+    category       TEXT NOT NULL DEFAULT 'service_attachment',
+    related_table  TEXT NOT NULL,
+    related_id     BIGINT NOT NULL,
+    uploaded_by    BIGINT,
+    status         TEXT NOT NULL DEFAULT 'pending'
+                   CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    available_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at     TIMESTAMPTZ,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at    TIMESTAMPTZ,
+    last_error     TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_ingest_jobs_pending
+    ON media_ingest_jobs(available_at, id) WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_media_ingest_jobs_running
+    ON media_ingest_jobs(claimed_at) WHERE status = 'running';
+
+ALTER TABLE media_files ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_media_files_content_hash
+    ON media_files(content_hash) WHERE content_hash IS NOT NULL;
+
+COMMENT ON TABLE media_ingest_jobs IS 'Pending Telegram attachment downloads processed by the media ingest worker';
+COMMENT ON COLUMN media_files.content_hash IS 'sha256 of the stored file, used to deduplicate repeated uploads';
+
+-- ===== users.phone_normalized (047_users_phone_normalized.sql) =====
+-- Telefon bo'yicha qidiruv regexp_replace(phone, ...) = ... ko'rinishida
+-- edi va har safar users jadvalini to'liq o'qirdi. Endi faqat raqamlardan
+-- iborat normal shakl generated column sifatida saqlanadi (9 xonali
+-- mahalliy raqamga 998 qo'shiladi) va indeks orqali qidiriladi
+-- (database/basic/phone.py: find_user_by_phone).
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS phone_normalized TEXT
+    GENERATED ALWAYS AS (
+        CASE
+            WHEN length(regexp_replace(phone, '[^0-9]', '', 'g')) = 9
+                THEN '998' || regexp_replace(phone, '[^0-9]', '', 'g')
+            ELSE NULLIF(regexp_replace(phone, '[^0-9]', '', 'g'), '')
+        END
+    ) STORED;
+
+-- Bitta raqam - bitta foydalanuvchi. Eski bazada takroriy raqamlar bo'lsa
+-- unique indeks yaratib bo'lmaydi: oddiy indeks qo'yiladi va takrorlar
+-- ro'yxati NOTICE sifatida chiqariladi (qo'lda tozalangandan keyin
+-- migratsiyani qayta ishga tushirish kifoya).
+DO $$
+DECLARE
+    dup RECORD;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE tablename = 'users' AND indexname = 'uq_users_phone_normalized'
+    ) THEN
+        RETURN;
+    END IF;
+
+    BEGIN
+        CREATE UNIQUE INDEX uq_users_phone_normalized
+            ON users(phone_normalized) WHERE phone_normalized IS NOT NULL;
+        DROP INDEX IF EXISTS idx_users_phone_normalized;
+    EXCEPTION WHEN unique_violation THEN
+        FOR dup IN
+            SELECT phone_normalized, array_agg(id ORDER BY id) AS ids
+            FROM users
+            WHERE phone_normalized IS NOT NULL
+            GROUP BY phone_normalized
+            HAVING COUNT(*) > 1
+        LOOP
+            RAISE NOTICE 'duplicate phone %: users %', dup.phone_normalized, dup.ids;
+        END LOOP;
+        CREATE INDEX IF NOT EXISTS idx_users_phone_normalized
+            ON users(phone_normalized) WHERE phone_normalized IS NOT NULL;
+    END;
+END $$;
+
+COMMENT ON COLUMN users.phone_normalized IS 'Digits-only phone (998XXXXXXXXX) used for indexed phone lookup';
+
+-- ===== pg_trgm search indexes (048_trigram_search.sql) =====
+-- Ism / manzil / material nomi bo'yicha qidiruvlar ILIKE '%...%' edi va
+-- hech qanday indeksdan foydalana olmasdi. GIN (gin_trgm_ops) indekslari
+-- ILIKE '%...%' va word_similarity (<%) operatorlarini qo'llab-quvvatlaydi,
+-- shuning uchun qidiruv vaqti jadval hajmiga deyarli bog'liq bo'lmaydi
+-- (database/basic/search.py).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Mijozlar / foydalanuvchilar
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm
+    ON users USING gin (full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_phone_trgm
+    ON users USING gin (phone gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_abonent_id_trgm
+    ON users USING gin (abonent_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+    ON users USING gin (username gin_trgm_ops);
+
+-- Arizalar
+CREATE INDEX IF NOT EXISTS idx_connection_orders_app_number_trgm
+    ON connection_orders USING gin (application_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_connection_orders_address_trgm
+    ON connection_orders USING gin (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_technician_orders_app_number_trgm
+    ON technician_orders USING gin (application_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_technician_orders_address_trgm
+    ON technician_orders USING gin (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_orders_app_number_trgm
+    ON staff_orders USING gin (application_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_staff_orders_address_trgm
+    ON staff_orders USING gin (address gin_trgm_ops);
+
+-- Materiallar
+CREATE INDEX IF NOT EXISTS idx_materials_name_trgm
+    ON materials USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_materials_serial_number_trgm
+    ON materials USING gin (serial_number gin_trgm_ops);
+
+-- ===== users.assignment_weight (049_assignment_weight.sql) =====
+-- Avtomatik biriktirishda (database/basic/assignment.py) xodim vazni:
+-- weighted round-robin'da ulush, least-loaded'da sig'im (yuklama / vazn).
+-- 0 - avtomatik biriktirishdan chiqarilgan (ta'til, sinov va h.k.),
+-- qo'lda tanlash bunga bog'liq emas.
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS assignment_weight SMALLINT NOT NULL DEFAULT 1;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'chk_users_assignment_weight'
+    ) THEN
+        ALTER TABLE users
+            ADD CONSTRAINT chk_users_assignment_weight CHECK (assignment_weight >= 0);
+    END IF;
+END $$;
+
+-- Yuklama hisoblash: recipient bo'yicha faol hand-off qatorlari
+CREATE INDEX IF NOT EXISTS idx_connections_recipient_status
+    ON connections(recipient_id, recipient_status);
+
+COMMENT ON COLUMN users.assignment_weight IS 'Auto-assignment weight (0 = excluded from automatic hand-offs)';
+
+-- ===== materials davr indekslari (050_materials_period_indexes.sql) =====
+-- Ombor statistikasi (database/warehouse/analytics.py) kun / oraliq
+-- bo'yicha "created_at >= $1 AND created_at < $2" shartlaridan foydalanadi;
+-- DATE(created_at) = $1 o'rniga shu indekslar ishlaydi.
+
+CREATE INDEX IF NOT EXISTS idx_materials_created_at ON materials(created_at);
+CREATE INDEX IF NOT EXISTS idx_materials_updated_at ON materials(updated_at);
+
+-- ===== material_requests (user_id, application_number, material_id) unique (051_material_requests_cart_unique.sql) =====
+-- Material tanlash (database/technician/materials.py::upsert_material_cart)
+-- INSERT ... ON CONFLICT (user_id, application_number, material_id) DO UPDATE
+-- bilan ishlaydi. Avval takroriy qatorlar birlashtiriladi: miqdorlar eng
+-- kichik ID'li qatorga qo'shiladi (tanlov doim qo'shish bilan yozilgan).
+
+WITH dup AS (
+    SELECT user_id, application_number, material_id,
+           MIN(id) AS keep_id, SUM(quantity) AS qty
+    FROM material_requests
+    WHERE application_number IS NOT NULL
+    GROUP BY user_id, application_number, material_id
+    HAVING COUNT(*) > 1
+)
+UPDATE material_requests mr
+   SET quantity = dup.qty,
+       total_price = dup.qty * COALESCE(mr.price, 0)
+  FROM dup
+ WHERE mr.id = dup.keep_id;
+
+DELETE FROM material_requests a
+USING material_requests b
+WHERE a.user_id = b.user_id
+  AND a.application_number = b.application_number
+  AND a.material_id = b.material_id
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_material_requests_user_appnum_material
+    ON material_requests(user_id, application_number, material_id);
+
+-- ===== texnik hisoboti uchun kunlik rollup (052_technician_report_rollup.sql) =====
+-- "Hisobotlarim" har safar texnikning butun connections tarixi bo'yicha
+-- DISTINCT ON (order_id) ni 3 marta (connection / technician / staff)
+-- hisoblardi. Endi:
+--   technician_order_state  - (texnik, tur, ariza) bo'yicha oxirgi holat:
+--                             oxirgi qatnashgan kun va texnik statusi
+--   technician_daily_rollup - (texnik, kun, tur, status) bo'yicha arizalar soni
+-- Ikkalasi ham triggerlar orqali faqat o'zgargan ariza uchun yangilanadi;
+-- hisobot davr kunlari bo'yicha rollup qatorlarini qo'shadi xolos.
+--
+-- Qoidalar database/technician/report.py dagi eski so'rov bilan bir xil:
+-- ariza oxirgi qatnashgan kuni hisoblanadi; ariza statusi completed /
+-- cancelled bo'lsa o'sha, aks holda texnik tomonidagi status olinadi.
+-- Kun - Asia/Tashkent vaqti bo'yicha.
+
+CREATE TABLE IF NOT EXISTS technician_order_state (
+    technician_id  BIGINT      NOT NULL,
+    kind           TEXT        NOT NULL,   -- connection | technician | staff
+    order_id       BIGINT      NOT NULL,
+    last_day       DATE        NOT NULL,
+    last_ts        TIMESTAMPTZ NOT NULL,
+    tech_status    TEXT        NOT NULL,
+    order_final    TEXT,                   -- ariza statusi (faqat completed / cancelled)
+    PRIMARY KEY (technician_id, kind, order_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_technician_order_state_order
+    ON technician_order_state(kind, order_id);
+
+CREATE TABLE IF NOT EXISTS technician_daily_rollup (
+    technician_id  BIGINT  NOT NULL,
+    day            DATE    NOT NULL,
+    kind           TEXT    NOT NULL,
+    status         TEXT    NOT NULL,
+    orders         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (technician_id, day, kind, status)
+);
+
+-- Bir tomondagi status -> texnik statusi (qiziq bo'lmasa NULL)
+CREATE OR REPLACE FUNCTION tech_rollup_side_status(p_status TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_status IN ('between_controller_technician', 'in_between_controller_technician')
+            THEN 'between_controller_technician'
+        WHEN p_status IN ('in_technician', 'in_technician_work', 'in_warehouse', 'completed')
+            THEN p_status
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Ikkala tomonda ham shu foydalanuvchi: ustuvorlik bo'yicha
+CREATE OR REPLACE FUNCTION tech_rollup_both_status(p_sender TEXT, p_recipient TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_sender = 'completed' OR p_recipient = 'completed' THEN 'completed'
+        WHEN p_sender = 'in_warehouse' OR p_recipient = 'in_warehouse' THEN 'in_warehouse'
+        WHEN p_sender = 'in_technician_work' OR p_recipient = 'in_technician_work' THEN 'in_technician_work'
+        WHEN p_sender = 'in_technician' OR p_recipient = 'in_technician' THEN 'in_technician'
+        WHEN p_sender IN ('between_controller_technician', 'in_between_controller_technician')
+          OR p_recipient IN ('between_controller_technician', 'in_between_controller_technician')
+            THEN 'between_controller_technician'
+        ELSE NULL
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION tech_rollup_bump(p_tech BIGINT, p_day DATE, p_kind TEXT, p_status TEXT, p_delta INTEGER)
+RETURNS VOID AS $$
+    INSERT INTO technician_daily_rollup (technician_id, day, kind, status, orders)
+    VALUES (p_tech, p_day, p_kind, p_status, p_delta)
+    ON CONFLICT (technician_id, day, kind, status)
+    DO UPDATE SET orders = technician_daily_rollup.orders + EXCLUDED.orders;
+$$ LANGUAGE sql;
+
+-- Bitta connections qatori bir foydalanuvchi uchun: holatni ko'chirish
+CREATE OR REPLACE FUNCTION tech_rollup_apply(
+    p_tech BIGINT, p_kind TEXT, p_order BIGINT, p_ts TIMESTAMPTZ,
+    p_status TEXT, p_order_status TEXT
+)
+RETURNS VOID AS $$
+DECLARE
+    v_day   DATE := (p_ts AT TIME ZONE 'Asia/Tashkent')::date;
+    v_final TEXT := CASE WHEN p_order_status IN ('completed', 'cancelled') THEN p_order_status END;
+    old     technician_order_state%ROWTYPE;
+BEGIN
+    IF p_tech IS NULL OR p_order IS NULL OR p_status IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO technician_order_state
+        (technician_id, kind, order_id, last_day, last_ts, tech_status, order_final)
+    VALUES (p_tech, p_kind, p_order, v_day, p_ts, p_status, v_final)
+    ON CONFLICT (technician_id, kind, order_id) DO NOTHING;
+    IF FOUND THEN
+        PERFORM tech_rollup_bump(p_tech, v_day, p_kind, COALESCE(v_final, p_status), 1);
+        RETURN;
+    END IF;
+
+    SELECT * INTO old FROM technician_order_state
+     WHERE technician_id = p_tech AND kind = p_kind AND order_id = p_order
+     FOR UPDATE;
+    IF old.last_ts > p_ts THEN
+        RETURN;  -- eskiroq yozuv oxirgi holatni o'zgartirmaydi
+    END IF;
+
+    PERFORM tech_rollup_bump(p_tech, old.last_day, p_kind, COALESCE(old.order_final, old.tech_status), -1);
+    UPDATE technician_order_state
+       SET last_day = v_day, last_ts = p_ts, tech_status = p_status, order_final = v_final
+     WHERE technician_id = p_tech AND kind = p_kind AND order_id = p_order;
+    PERFORM tech_rollup_bump(p_tech, v_day, p_kind, COALESCE(v_final, p_status), 1);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Yangi connections qatori: sender va recipient uchun
+CREATE OR REPLACE FUNCTION trg_connections_tech_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ts  TIMESTAMPTZ := COALESCE(NEW.updated_at, NEW.created_at, NOW());
+    k     RECORD;
+    v_order_status TEXT;
+BEGIN
+    FOR k IN
+        SELECT * FROM (VALUES ('connection', NEW.connection_id),
+                              ('technician', NEW.technician_id),
+                              ('staff', NEW.staff_id)) AS t(kind, order_id)
+        WHERE t.order_id IS NOT NULL
+    LOOP
+        IF k.kind = 'connection' THEN
+            SELECT status::text INTO v_order_status FROM connection_orders WHERE id = k.order_id;
+        ELSIF k.kind = 'technician' THEN
+            SELECT status::text INTO v_order_status FROM technician_orders WHERE id = k.order_id;
+        ELSE
+            SELECT status::text INTO v_order_status FROM staff_orders WHERE id = k.order_id;
+        END IF;
+
+        IF NEW.sender_id IS NOT DISTINCT FROM NEW.recipient_id THEN
+            PERFORM tech_rollup_apply(NEW.sender_id, k.kind, k.order_id, v_ts,
+                tech_rollup_both_status(NEW.sender_status::text, NEW.recipient_status::text), v_order_status);
+        ELSE
+            PERFORM tech_rollup_apply(NEW.sender_id, k.kind, k.order_id, v_ts,
+                tech_rollup_side_status(NEW.sender_status::text), v_order_status);
+            PERFORM tech_rollup_apply(NEW.recipient_id, k.kind, k.order_id, v_ts,
+                tech_rollup_side_status(NEW.recipient_status::text), v_order_status);
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_tech_rollup ON connections;
+CREATE TRIGGER trg_connections_tech_rollup
+AFTER INSERT ON connections
+FOR EACH ROW EXECUTE FUNCTION trg_connections_tech_rollup();
+
+-- Ariza statusi completed / cancelled ga o'tganda (yoki qaytganda):
+-- shu arizadagi barcha texniklar qatori boshqa status ustuniga ko'chadi
+CREATE OR REPLACE FUNCTION trg_orders_tech_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_kind  TEXT := TG_ARGV[0];
+    v_final TEXT := CASE WHEN NEW.status::text IN ('completed', 'cancelled') THEN NEW.status::text END;
+    s       RECORD;
+BEGIN
+    FOR s IN
+        SELECT * FROM technician_order_state
+         WHERE kind = v_kind AND order_id = NEW.id
+           AND order_final IS DISTINCT FROM v_final
+         FOR UPDATE
+    LOOP
+        PERFORM tech_rollup_bump(s.technician_id, s.last_day, v_kind, COALESCE(s.order_final, s.tech_status), -1);
+        PERFORM tech_rollup_bump(s.technician_id, s.last_day, v_kind, COALESCE(v_final, s.tech_status), 1);
+        UPDATE technician_order_state
+           SET order_final = v_final
+         WHERE technician_id = s.technician_id AND kind = v_kind AND order_id = NEW.id;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_tech_rollup ON connection_orders;
+CREATE TRIGGER trg_connection_orders_tech_rollup
+AFTER UPDATE OF status ON connection_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION trg_orders_tech_rollup('connection');
+
+DROP TRIGGER IF EXISTS trg_technician_orders_tech_rollup ON technician_orders;
+CREATE TRIGGER trg_technician_orders_tech_rollup
+AFTER UPDATE OF status ON technician_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION trg_orders_tech_rollup('technician');
+
+DROP TRIGGER IF EXISTS trg_staff_orders_tech_rollup ON staff_orders;
+CREATE TRIGGER trg_staff_orders_tech_rollup
+AFTER UPDATE OF status ON staff_orders
+FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION trg_orders_tech_rollup('staff');
+
+-- Boshlang'ich to'ldirish: mavjud connections tarixidan
+INSERT INTO technician_order_state
+    (technician_id, kind, order_id, last_day, last_ts, tech_status, order_final)
+SELECT DISTINCT ON (inv.user_id, inv.kind, inv.order_id)
+       inv.user_id, inv.kind, inv.order_id,
+       (inv.ts AT TIME ZONE 'Asia/Tashkent')::date, inv.ts, inv.st,
+       CASE WHEN o.status IN ('completed', 'cancelled') THEN o.status END
+FROM (
+    SELECT c.id, COALESCE(c.updated_at, c.created_at) AS ts, k.kind, k.order_id, u.user_id, u.st
+    FROM connections c
+    CROSS JOIN LATERAL (VALUES ('connection', c.connection_id),
+                               ('technician', c.technician_id),
+                               ('staff', c.staff_id)) AS k(kind, order_id)
+    CROSS JOIN LATERAL (
+        SELECT c.sender_id, tech_rollup_both_status(c.sender_status::text, c.recipient_status::text)
+         WHERE c.sender_id IS NOT DISTINCT FROM c.recipient_id
+        UNION ALL
+        SELECT c.sender_id, tech_rollup_side_status(c.sender_status::text)
+         WHERE c.sender_id IS DISTINCT FROM c.recipient_id
+        UNION ALL
+        SELECT c.recipient_id, tech_rollup_side_status(c.recipient_status::text)
+         WHERE c.sender_id IS DISTINCT FROM c.recipient_id
+    ) AS u(user_id, st)
+    WHERE k.order_id IS NOT NULL AND u.user_id IS NOT NULL AND u.st IS NOT NULL
+) inv
+LEFT JOIN (
+    SELECT 'connection' AS kind, id, status::text AS status FROM connection_orders
+    UNION ALL
+    SELECT 'technician', id, status::text FROM technician_orders
+    UNION ALL
+    SELECT 'staff', id, status::text FROM staff_orders
+) o ON o.kind = inv.kind AND o.id = inv.order_id
+ORDER BY inv.user_id, inv.kind, inv.order_id, inv.ts DESC, inv.id DESC
+ON CONFLICT (technician_id, kind, order_id) DO NOTHING;
+
+-- Rollup holat jadvalidan to'liq qayta quriladi (migratsiya takrorlansa ham to'g'ri)
+DELETE FROM technician_daily_rollup;
+INSERT INTO technician_daily_rollup (technician_id, day, kind, status, orders)
+SELECT technician_id, last_day, kind, COALESCE(order_final, tech_status), COUNT(*)
+FROM technician_order_state
+GROUP BY technician_id, last_day, kind, COALESCE(order_final, tech_status);
+
+COMMENT ON TABLE technician_daily_rollup IS 'Per-technician, per-day, per-order-kind status counts for the technician report; maintained by triggers';
+COMMENT ON TABLE technician_order_state IS 'Latest technician involvement per order, source of technician_daily_rollup';
+
+-- ===== stock_movements - material harakatlari jurnali (053_stock_movements_ledger.sql) =====
+-- Ombor <-> texnik <-> ariza o'rtasidagi har bir o'tkazma bitta qator
+-- (append-only). Qoldiqlar avvalgidek materials.quantity (ombor) va
+-- material_and_technician.quantity (texnik) da saqlanadi; ular
+-- database/basic/stock_ledger.py da jurnal yozuvi bilan bitta statement'da,
+-- shartli (quantity >= miqdor) kamaytirish orqali o'zgartiriladi.
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id                  BIGSERIAL PRIMARY KEY,
+    material_id         INTEGER     NOT NULL REFERENCES materials(id),
+    quantity            INTEGER     NOT NULL CHECK (quantity > 0),
+    from_type           TEXT        NOT NULL CHECK (from_type IN ('warehouse', 'technician', 'order')),
+    from_id             BIGINT,                 -- texnik: users.id
+    to_type             TEXT        NOT NULL CHECK (to_type IN ('warehouse', 'technician', 'order')),
+    to_id               BIGINT,
+    application_number  TEXT,
+    actor_id            BIGINT,
+    reason              TEXT,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_material ON stock_movements(material_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_from ON stock_movements(from_type, from_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_to ON stock_movements(to_type, to_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_application ON stock_movements(application_number)
+    WHERE application_number IS NOT NULL;
+
+-- Jurnal faqat qo'shiladi: tuzatish - teskari harakat yozuvi bilan
+CREATE OR REPLACE FUNCTION trg_stock_movements_append_only()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'stock_movements is append-only';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_movements_append_only ON stock_movements;
+CREATE TRIGGER trg_stock_movements_append_only
+BEFORE UPDATE OR DELETE ON stock_movements
+FOR EACH ROW EXECUTE FUNCTION trg_stock_movements_append_only();
+
+-- Egasi bo'yicha joriy qoldiqlar (ombor + texniklar)
+CREATE OR REPLACE VIEW stock_holder_balances AS
+SELECT 'warehouse'::text AS holder_type, NULL::bigint AS holder_id,
+       m.id AS material_id, m.name, m.price, m.serial_number, m.quantity
+FROM materials m
+UNION ALL
+SELECT 'technician'::text, t.user_id::bigint,
+       t.material_id, m.name, m.price, m.serial_number, t.quantity
+FROM material_and_technician t
+JOIN materials m ON m.id = t.material_id;
+
+COMMENT ON TABLE stock_movements IS 'Append-only material movement ledger (warehouse / technician / order)';
 """
 
 def run_sql(conn, sql_text):
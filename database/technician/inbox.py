@@ -1,12 +1,12 @@
 # database/technician/inbox.py
-import asyncpg
+import json
 from typing import List, Dict, Any, Optional
-from config import settings
+from database.connections import get_connection
 
 
 # ----------------- YORDAMCHI -----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 def _as_dicts(rows):
     return [dict(r) for r in rows]
@@ -297,3 +297,190 @@ async def fetch_technician_inbox_staff(
         return _as_dicts(rows)
     finally:
         await conn.close()
+
+
+# ======================= INBOX KARTASI (keyset) =======================
+# Inbox tartibi: status (0/1/2), created_at DESC, id DESC. Navigatsiya
+# joriy ariza ID'si (kursor) bo'yicha: bitta so'rov kartani, qo'shni
+# (oldingi/keyingi) ariza ID'larini, pozitsiya/jami sonini va tanlangan
+# materiallarni qaytaradi. ROW_NUMBER() oynasi va OFFSET kerak emas.
+#
+# "i joriy kartadan oldin" sharti (rank ASC, created_at DESC, id DESC):
+#   (i.rank, cur.created_at, cur.id) < (cur.rank, i.created_at, i.id)
+
+_TECH_STATUS_RANK = """
+    CASE {col}
+        WHEN 'between_controller_technician' THEN 0
+        WHEN 'in_technician'                 THEN 1
+        ELSE 2
+    END
+"""
+
+_CARD_SQL_TEMPLATE = """
+WITH inbox AS (
+    SELECT {alias}.id, {rank} AS rank, {alias}.created_at
+    FROM {table} {alias}
+    WHERE {alias}.is_active = TRUE
+      AND {alias}.status IN ({statuses})
+      AND EXISTS (
+          SELECT 1 FROM connections c
+          WHERE c.recipient_id = $1 AND {link}
+      )
+),
+cur AS (
+    SELECT * FROM inbox
+    WHERE $2::bigint IS NULL OR id = $2
+    ORDER BY rank, created_at DESC, id DESC
+    LIMIT 1
+),
+nav AS (
+    SELECT
+        cur.id,
+        (SELECT i.id FROM inbox i
+          WHERE (i.rank, cur.created_at, cur.id) < (cur.rank, i.created_at, i.id)
+          ORDER BY i.rank DESC, i.created_at, i.id
+          LIMIT 1) AS prev_id,
+        (SELECT i.id FROM inbox i
+          WHERE (cur.rank, i.created_at, i.id) < (i.rank, cur.created_at, cur.id)
+          ORDER BY i.rank, i.created_at DESC, i.id DESC
+          LIMIT 1) AS next_id,
+        (SELECT COUNT(*) FROM inbox i
+          WHERE (i.rank, cur.created_at, cur.id) < (cur.rank, i.created_at, i.id)) AS position,
+        (SELECT COUNT(*) FROM inbox) AS total
+    FROM cur
+)
+SELECT
+    {columns},
+    nav.prev_id,
+    nav.next_id,
+    nav.position,
+    nav.total,
+    COALESCE((
+        SELECT json_agg(json_build_object(
+                   'material_id', mr.material_id,
+                   'name', m.name,
+                   'price', COALESCE(m.price, 0),
+                   'qty', mr.quantity,
+                   'source_type', mr.source_type
+               ) ORDER BY m.name)
+        FROM material_requests mr
+        JOIN materials m ON m.id = mr.material_id
+        WHERE mr.user_id = $1
+          AND mr.application_number = {alias}.application_number
+    ), '[]')::text AS materials
+FROM nav
+JOIN {table} {alias} ON {alias}.id = nav.id
+{joins}
+"""
+
+_CARD_SQL = {
+    "connection": _CARD_SQL_TEMPLATE.format(
+        table="connection_orders", alias="co",
+        rank=_TECH_STATUS_RANK.format(col="co.status"),
+        statuses="""'between_controller_technician'::connection_order_status,
+                          'in_technician'::connection_order_status,
+                          'in_technician_work'::connection_order_status""",
+        link="c.connection_id = co.id",
+        columns="""co.id,
+    co.application_number,
+    co.address,
+    co.region,
+    co.status,
+    co.created_at,
+    co.jm_notes,
+    COALESCE(u.full_name, 'Mijoz') AS client_name,
+    COALESCE(u.phone, '-') AS client_phone,
+    t.name AS tariff""",
+        joins="""LEFT JOIN users u ON u.id = co.user_id
+LEFT JOIN tarif t ON t.id = co.tarif_id""",
+    ),
+    "technician": _CARD_SQL_TEMPLATE.format(
+        table="technician_orders", alias="to2",
+        rank=_TECH_STATUS_RANK.format(col="to2.status"),
+        statuses="'between_controller_technician','in_technician','in_technician_work'",
+        # Eski yozuvlarda technician_orders.id connection_id ichida turgan bo'lishi mumkin
+        link="COALESCE(c.technician_id, c.connection_id) = to2.id",
+        columns="""to2.id,
+    to2.application_number,
+    to2.address,
+    to2.region,
+    to2.status,
+    to2.created_at,
+    to2.description,
+    to2.description_ish AS diagnostics,
+    to2.media AS media_file_id,
+    CASE 
+        WHEN to2.media IS NOT NULL THEN 'photo'
+        ELSE NULL
+    END AS media_type,
+    to2.description_operator,
+    to2.description_ish,
+    COALESCE(client_user.full_name, user_user.full_name, 'Mijoz') AS client_name,
+    COALESCE(client_user.phone, user_user.phone, '-') AS client_phone,
+    NULL        AS tariff""",
+        joins="""LEFT JOIN users client_user ON client_user.id::text = to2.abonent_id
+LEFT JOIN users user_user ON user_user.id = to2.user_id""",
+    ),
+    "staff": _CARD_SQL_TEMPLATE.format(
+        table="staff_orders", alias="so",
+        rank=_TECH_STATUS_RANK.format(col="so.status"),
+        statuses="'between_controller_technician','in_technician','in_technician_work'",
+        link="c.staff_id = so.id",
+        columns="""so.id,
+    so.application_number,
+    so.phone,
+    so.region,
+    so.abonent_id,
+    so.address,
+    so.description,
+    so.diagnostics,
+    so.status,
+    so.created_at,
+    so.type_of_zayavka,
+    so.jm_notes,
+    COALESCE(client_user.full_name, 'Mijoz') AS client_name,
+    COALESCE(client_user.phone, so.phone, '-') AS client_phone,
+    client_user.telegram_id,
+    creator.full_name AS staff_creator_name,
+    creator.phone AS staff_creator_phone,
+    creator.role AS staff_creator_role,
+    CASE 
+        WHEN so.type_of_zayavka = 'connection' THEN t.name
+        WHEN so.type_of_zayavka = 'technician' THEN so.description
+        ELSE NULL
+    END AS tariff_or_problem,
+    NULL AS tariff""",
+        joins="""LEFT JOIN users creator ON creator.id = so.user_id
+LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
+LEFT JOIN tarif t ON t.id = so.tarif_id""",
+    ),
+}
+
+
+async def fetch_technician_inbox_card(
+    mode: str,
+    technician_id: int,
+    order_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Inbox kartasi (keyset): order_id berilsa - o'sha ariza, aks holda birinchisi.
+
+    Karta ro'yxatdagi bilan bir xil maydonlarga ega, qo'shimcha:
+    prev_id / next_id (qo'shni arizalar, bo'lmasa None), position (0 dan),
+    total va materials (tanlangan materiallar ro'yxati).
+    Ariza inboxda bo'lmasa (status o'zgargan) None qaytaradi.
+    """
+    sql = _CARD_SQL.get(mode, _CARD_SQL["connection"])
+    conn = await _conn()
+    try:
+        row = await conn.fetchrow(sql, technician_id, order_id)
+    finally:
+        await conn.close()
+    if row is None:
+        return None
+    card = dict(row)
+    card["materials"] = json.loads(card["materials"] or "[]")
+    card["position"] = int(card["position"] or 0)
+    card["total"] = int(card["total"] or 0)
+    return card
+
@@ -1,14 +1,19 @@
 # database/technician/materials.py
 import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
 import logging
+from database.connections import get_connection
+from database.basic.assignment import pick_recipient_id
+from database.basic.stock_ledger import (
+    issue_to_technician, consume_for_order, return_from_order, InsufficientStock,
+)
+from database.basic.schema import get_schema
 logger = logging.getLogger(__name__)
 
 
 # ----------------- YORDAMCHI -----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 def _as_dicts(rows):
     return [dict(r) for r in rows]
@@ -149,16 +154,10 @@ async def fetch_assigned_qty(user_id: int, material_id: int) -> int:
 
 async def _has_column(conn, table: str, column: str) -> bool:
     """
-    Checks if a column exists in a given table.
+    Checks if a column exists in a given table (sxema reyestridan).
     """
-    sql = """
-        SELECT EXISTS (
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name = $1 AND column_name = $2
-        )
-    """
-    return await conn.fetchval(sql, table, column)
+    schema = await get_schema(conn)
+    return schema.has_column(table, column)
 
 async def _get_application_number_for_material_issued(conn, applications_id: int, request_type: str) -> str:
     """Material_issued uchun application_number ni olish"""
@@ -207,186 +206,174 @@ async def _insert_material_issued(
         material_name, application_number, request_type
     )
 
-async def upsert_material_selection(
+# Savatdagi materiallar: nomi, narxi va texnikdagi qoldig'i (bitta so'rov)
+_CART_MATERIALS_SQL = """
+    SELECT m.id, m.name, COALESCE(m.price, 0) AS price, mt.quantity AS tech_qty
+    FROM materials m
+    LEFT JOIN material_and_technician mt
+           ON mt.user_id = $1 AND mt.material_id = m.id
+    WHERE m.id = ANY($2::int[])
+"""
+
+# Savatni yozish: material_requests upsert + arizaning yangilangan savati -
+# bitta statement (texnik zaxirasi oldinroq stock_ledger orqali kamaytiriladi).
+# CTE'dagi o'zgarishlar asosiy SELECT'ga ko'rinmaydi, shuning uchun savat
+# "eski qatorlar + RETURNING" dan yig'iladi.
+_CART_WRITE_SQL = """
+    WITH cart AS (
+        SELECT * FROM unnest($3::int[], $4::int[], $5::numeric[]) AS c(material_id, qty, price)
+    ),
+    {upsert}
+    SELECT r.material_id, m.name, COALESCE(m.price, 0) AS price,
+           r.quantity AS qty, r.source_type
+    FROM (
+        SELECT material_id, quantity, source_type
+          FROM material_requests
+         WHERE user_id = $1 AND application_number = $2
+           AND material_id <> ALL($3::int[])
+        UNION ALL
+        SELECT material_id, quantity, source_type FROM upserted
+    ) r
+    JOIN materials m ON m.id = r.material_id
+    ORDER BY m.name
+"""
+
+# 051 migratsiyasidagi unique indeks bo'yicha
+_CART_UPSERT = """
+    upserted AS (
+        INSERT INTO material_requests (user_id, material_id, quantity, price, total_price,
+                                       source_type, application_number{ins_cols})
+        SELECT $1, c.material_id, c.qty, c.price, c.qty * c.price, $6, $2{ins_vals}
+          FROM cart c
+        ON CONFLICT (user_id, application_number, material_id) DO UPDATE
+           SET quantity = material_requests.quantity + EXCLUDED.quantity,
+               price = EXCLUDED.price,
+               total_price = (material_requests.quantity + EXCLUDED.quantity) * EXCLUDED.price,
+               source_type = EXCLUDED.source_type{upd_set}
+        RETURNING material_id, quantity, source_type
+    )"""
+
+# Unique indeks hali yo'q bazalar uchun: mavjudini yangilash + yo'g'ini qo'shish
+_CART_UPDATE_INSERT = """
+    updated AS (
+        UPDATE material_requests mr
+           SET quantity = mr.quantity + c.qty,
+               price = c.price,
+               total_price = (mr.quantity + c.qty) * c.price,
+               source_type = $6{upd_set}
+          FROM cart c
+         WHERE mr.user_id = $1 AND mr.application_number = $2 AND mr.material_id = c.material_id
+        RETURNING mr.material_id, mr.quantity, mr.source_type
+    ),
+    inserted AS (
+        INSERT INTO material_requests (user_id, material_id, quantity, price, total_price,
+                                       source_type, application_number{ins_cols})
+        SELECT $1, c.material_id, c.qty, c.price, c.qty * c.price, $6, $2{ins_vals}
+          FROM cart c
+         WHERE NOT EXISTS (
+                SELECT 1 FROM material_requests mr
+                 WHERE mr.user_id = $1 AND mr.application_number = $2 AND mr.material_id = c.material_id
+         )
+        RETURNING material_id, quantity, source_type
+    ),
+    upserted AS (
+        SELECT * FROM updated UNION ALL SELECT * FROM inserted
+    )"""
+
+_cart_conflict_index = {"available": True}
+
+
+def _cart_write_sql(has_updated_at: bool, on_conflict: bool) -> str:
+    parts = {
+        "ins_cols": ", updated_at" if has_updated_at else "",
+        "ins_vals": ", NOW()" if has_updated_at else "",
+        "upd_set": ", updated_at = NOW()" if has_updated_at else "",
+    }
+    upsert = (_CART_UPSERT if on_conflict else _CART_UPDATE_INSERT).format(**parts)
+    return _CART_WRITE_SQL.format(upsert=upsert)
+
+
+async def upsert_material_cart(
     user_id: int,
-    application_id: int,  
-    material_id: int,
-    qty: int,
+    application_id: int,
+    cart: Dict[int, int],
     request_type: str = "connection",
-    source_type: str = "warehouse"
-) -> None:
+    source_type: str = "warehouse",
+) -> List[Dict[str, Any]]:
     """
-    Material tanlash funksiyasi - REFACTORED for application_number schema.
-    
-    source_type='technician_stock': Texnikda mavjud material - darhol kamaytiriladi va material_requests ga yoziladi
-    source_type='warehouse': Ombordan so'ralgan material - material_requests ga yoziladi
-    
-    MUHIM: Barcha material tanlovlari darhol material_requests ga yoziladi!
+    Bir nechta materialni bitta tranzaksiyada tanlash: {material_id: qty}.
+
+    Miqdorlar mavjud tanlovga QO'SHILADI. source_type='technician_stock' bo'lsa
+    materiallar texnik qoldig'idan arizaga sarflanadi (consume_for_order,
+    stock_movements); 'warehouse' - faqat so'rov, ombor tasdiqlaganda beriladi.
+    Qaytaradi: arizaning yangilangan savati
+    (fetch_selected_materials_for_request bilan bir xil ko'rinishda).
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    logger.info(f"upsert_material_selection called: user_id={user_id}, application_id={application_id}, material_id={material_id}, qty={qty}, source_type={source_type}")
-    
-    if qty <= 0:
+    if source_type == "technician":
+        # "🧑‍🔧 O'zimda" tugmasi (tech_source_technician_*) shu nomni yuboradi
+        source_type = "technician_stock"
+    cart = {int(mid): int(qty) for mid, qty in cart.items()}
+    if not cart:
+        raise ValueError("Savat bo'sh")
+    if any(qty <= 0 for qty in cart.values()):
         raise ValueError("Miqdor 0 dan katta bo'lishi kerak")
 
+    material_ids = list(cart)
     conn = await _conn()
     try:
         async with conn.transaction():
-            # Material ma'lumotlarini olish
-            material_info = await conn.fetchrow(
-                "SELECT name, COALESCE(price, 0) as price FROM materials WHERE id=$1",
-                material_id
-            )
-            if not material_info:
-                raise ValueError(f"Material {material_id} topilmadi")
-            
-            price = material_info['price']
-            material_name = material_info['name']
-            total = price * qty
+            rows = await conn.fetch(_CART_MATERIALS_SQL, user_id, material_ids)
+            info = {r["id"]: r for r in rows}
+            for mid in material_ids:
+                if mid not in info:
+                    raise ValueError(f"Material {mid} topilmadi")
+                if source_type == "technician_stock":
+                    current_qty = info[mid]["tech_qty"]
+                    if current_qty is None:
+                        raise ValueError("Texnikda bu material yo'q")
+                    if current_qty < cart[mid]:
+                        raise ValueError(
+                            f"Texnikda yetarli material yo'q. "
+                            f"Mavjud: {current_qty}, Kerak: {cart[mid]}"
+                        )
 
-            # Texnikda mavjud material uchun tekshirish
-            if source_type == 'technician_stock':
-                current_qty = await conn.fetchval(
-                    """
-                    SELECT COALESCE(quantity, 0) 
-                    FROM material_and_technician 
-                    WHERE user_id = $1 AND material_id = $2
-                    """,
-                    user_id, material_id
-                )
-                
-                if current_qty is None:
-                    raise ValueError(f"Texnikda bu material yo'q")
-                
-                if current_qty < qty:
-                    raise ValueError(
-                        f"Texnikda yetarli material yo'q. "
-                        f"Mavjud: {current_qty}, Kerak: {qty}"
-                    )
-
-            # Get application_number from the order tables
             application_number = await _get_application_number_for_material_issued(conn, application_id, request_type)
-            
-            if not application_number:
-                raise ValueError(f"Application number not found for {request_type} order {application_id}")
-            
-            # Barcha material tanlovlari uchun material_requests ga DARHOL yozish
-            logger.info(f"Writing to material_requests: user_id={user_id}, application_id={application_id}, material_id={material_id}, qty={qty}, price={price}, total={total}, source_type={source_type}, application_number={application_number}")
-            
+            if source_type == "technician_stock":
+                try:
+                    await consume_for_order(user_id, cart, application_number, actor_id=user_id, conn=conn)
+                except InsufficientStock:
+                    # Tekshiruvdan keyin qoldiq parallel o'zgargan
+                    raise ValueError("Texnikda yetarli material yo'q")
             has_updated_at = await _has_column(conn, "material_requests", "updated_at")
-            logger.info(f"has_updated_at column: {has_updated_at}")
-
-            # Check if record exists first - using application_number instead of applications_id
-            existing_record = await conn.fetchrow(
-                "SELECT id FROM material_requests WHERE user_id = $1 AND application_number = $2 AND material_id = $3",
-                user_id, application_number, material_id
+            args = (
+                user_id, application_number, material_ids,
+                [cart[mid] for mid in material_ids],
+                [info[mid]["price"] for mid in material_ids],
+                source_type,
             )
-            logger.info(f"Existing record: {existing_record}")
-
-            if existing_record:
-                # Update existing record - QO'SHISH (qty ni qo'shish)
-                logger.info(f"Updating existing record with id: {existing_record['id']} - adding {qty} to existing quantity")
-                
-                # Avval joriy ma'lumotlarni olish
-                current_record = await conn.fetchrow(
-                    "SELECT quantity, price FROM material_requests WHERE id = $1",
-                    existing_record['id']
-                )
-                new_quantity = current_record['quantity'] + qty
-                new_total = new_quantity * price
-                
-                if has_updated_at:
-                    await conn.execute(
-                        """
-                        UPDATE material_requests 
-                        SET quantity = $1, price = $2, total_price = $3, source_type = $4, 
-                            application_number = $5, updated_at = NOW()
-                        WHERE id = $6
-                        """,
-                        new_quantity, price, new_total, source_type, application_number, existing_record['id']
-                    )
-                else:
-                    await conn.execute(
-                        """
-                        UPDATE material_requests 
-                        SET quantity = $1, price = $2, total_price = $3, source_type = $4,
-                            application_number = $5
-                        WHERE id = $6
-                        """,
-                        new_quantity, price, new_total, source_type, application_number, existing_record['id']
-                    )
-                logger.info("Record updated successfully - quantity added")
-            else:
-                # Insert new record
-                logger.info("Inserting new record")
-                if has_updated_at:
-                    await conn.execute(
-                        """
-                        INSERT INTO material_requests (user_id, material_id, quantity, price, total_price, source_type, 
-                            application_number, updated_at)
-                        VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
-                        """,
-                        user_id, material_id, qty, price, total, source_type, application_number
-                    )
-                else:
-                    await conn.execute(
-                        """
-                        INSERT INTO material_requests (user_id, material_id, quantity, price, total_price, source_type,
-                            application_number)
-                        VALUES ($1, $2, $3, $4, $5, $6, $7)
-                        """,
-                        user_id, material_id, qty, price, total, source_type, application_number
-                    )
-                logger.info("Record inserted successfully")
-
-            # Texnikda mavjud materiallar uchun darhol kamaytirish
-            if source_type == 'technician_stock':
-                await conn.execute(
-                    """
-                    UPDATE material_and_technician 
-                    SET quantity = quantity - $1
-                    WHERE user_id = $2 AND material_id = $3
-                    """,
-                    qty, user_id, material_id
-                )
-                logger.info(f"Decreased technician stock: material_id={material_id}, qty={qty}")
-            elif source_type == 'warehouse':
-                # Warehouse materiallari uchun ham texnikda kamaytirish kerak
-                # (agar texnikda bu material bo'lsa)
-                current_qty = await conn.fetchval(
-                    """
-                    SELECT COALESCE(quantity, 0) 
-                    FROM material_and_technician 
-                    WHERE user_id = $1 AND material_id = $2
-                    """,
-                    user_id, material_id
-                )
-                
-                if current_qty and current_qty > 0:
-                    # Texnikda bu material bor, uni kamaytirish
-                    await conn.execute(
-                        """
-                        UPDATE material_and_technician 
-                        SET quantity = quantity - $1
-                        WHERE user_id = $2 AND material_id = $3
-                        """,
-                        qty, user_id, material_id
-                    )
-                    logger.info(f"Decreased technician stock for warehouse material: material_id={material_id}, qty={qty}")
-                else:
-                    logger.info(f"Warehouse material not in technician stock: material_id={material_id}")
 
+            selected = None
+            if _cart_conflict_index["available"]:
+                try:
+                    async with conn.transaction():
+                        selected = await conn.fetch(_cart_write_sql(has_updated_at, True), *args)
+                except asyncpg.InvalidColumnReferenceError:
+                    # 051 migratsiyasi qo'llanmagan - ON CONFLICT uchun unique indeks yo'q
+                    logger.warning("material_requests unique index missing, using update+insert")
+                    _cart_conflict_index["available"] = False
+            if selected is None:
+                selected = await conn.fetch(_cart_write_sql(has_updated_at, False), *args)
+
+        logger.info(
+            f"Material cart saved: user_id={user_id}, application={application_number}, "
+            f"items={len(cart)}, source_type={source_type}"
+        )
+        return [dict(r) for r in selected]
     except asyncpg.UniqueViolationError:
         raise ValueError("Material allaqachon tanlangan. Miqdorni o'zgartirish uchun qayta tanlang.")
-    except ValueError as ve:
-        # Re-raise validation errors as-is
-        raise ve
+    except ValueError:
+        raise
     except Exception as e:
-        # Log error and re-raise with more context
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Material selection upsert failed: {str(e)}")
         raise Exception(f"Material selection upsert failed: {str(e)}")
     finally:
@@ -428,36 +415,40 @@ async def create_material_issued_from_review(
         await conn.close()
 
 
+async def _return_consumed_materials(conn, user_id: int, application_number: str) -> None:
+    """
+    Arizaga sarflangan materiallarni texnikka qaytarish (ariza -> texnik).
+    technician_stock tanlovda, ombordan so'ralgani esa ombor tasdiqlaganda sarflanadi.
+    """
+    rows = await conn.fetch(
+        """
+        SELECT material_id, SUM(quantity)::int AS qty
+        FROM material_requests
+        WHERE user_id = $1 AND application_number = $2
+          AND material_id IS NOT NULL AND quantity > 0
+          AND (source_type = 'technician_stock'
+               OR (source_type = 'warehouse' AND warehouse_approved = TRUE))
+        GROUP BY material_id
+        """,
+        user_id, application_number
+    )
+    if rows:
+        await return_from_order(
+            user_id, [(r["material_id"], r["qty"]) for r in rows], application_number,
+            actor_id=user_id, conn=conn
+        )
+
+
 async def restore_technician_materials_on_cancel(user_id: int, application_number: str) -> None:
     """
     Ariza bekor qilinganda material tanlovlarini o'chirish.
     - Barcha material tanlovlarini o'chiradi (warehouse va technician_stock)
-    - Texnikda mavjud materiallarni qaytaradi
+    - Arizaga sarflangan materiallarni texnikka qaytaradi (stock_movements bilan)
     """
     conn = await _conn()
     try:
         async with conn.transaction():
-            # Avval tanlangan materiallarni olish
-            selected_materials = await conn.fetch(
-                """
-                SELECT material_id, quantity, source_type
-                FROM material_requests 
-                WHERE user_id = $1 AND application_number = $2
-                """,
-                user_id, application_number
-            )
-            
-            # Texnikda mavjud materiallarni qaytarish
-            for material in selected_materials:
-                if material['source_type'] == 'technician_stock':
-                    await conn.execute(
-                        """
-                        UPDATE material_and_technician 
-                        SET quantity = quantity + $1
-                        WHERE user_id = $2 AND material_id = $3
-                        """,
-                        material['quantity'], user_id, material['material_id']
-                    )
+            await _return_consumed_materials(conn, user_id, application_number)
             
             # Barcha material tanlovlarini o'chirish
             await conn.execute(
@@ -499,7 +490,7 @@ async def upsert_material_request_and_decrease_stock(
     add_qty: int,
     request_type: str = "connection"
 ) -> None:
-    await upsert_material_selection(user_id, applications_id, material_id, add_qty, request_type)
+    await upsert_material_cart(user_id, applications_id, {material_id: add_qty}, request_type=request_type)
 
 
 async def fetch_selected_materials_for_request(
@@ -539,63 +530,12 @@ async def return_materials_to_technician_stock(
 ) -> None:
     """
     Ariza bekor qilinganda materiallarni texnik stock'ga qaytarish.
-    Faqat technician_stock source_type uchun qaytariladi.
+    technician_stock - tanlovda sarflangan; warehouse - ombor tasdiqlaganda sarflangan.
     """
     conn = await _conn()
     try:
         async with conn.transaction():
-            # Technician stock materiallarini topish
-            technician_materials = await conn.fetch(
-                """
-                SELECT material_id, quantity
-                FROM material_requests 
-                WHERE user_id = $1 AND application_number = $2 AND source_type = 'technician_stock'
-                """,
-                user_id, application_number
-            )
-            
-            # Har bir materialni qaytarish
-            for material in technician_materials:
-                await conn.execute(
-                    """
-                    UPDATE material_and_technician 
-                    SET quantity = quantity + $1
-                    WHERE user_id = $2 AND material_id = $3
-                    """,
-                    material['quantity'], user_id, material['material_id']
-                )
-            
-            # Warehouse materiallarni ham qaytarish (agar texnikda mavjud bo'lsa)
-            warehouse_materials = await conn.fetch(
-                """
-                SELECT material_id, quantity
-                FROM material_requests 
-                WHERE user_id = $1 AND application_number = $2 AND source_type = 'warehouse'
-                """,
-                user_id, application_number
-            )
-            
-            for material in warehouse_materials:
-                # Texnikda bu material bor-yo'qligini tekshirish
-                current_qty = await conn.fetchval(
-                    """
-                    SELECT COALESCE(quantity, 0) 
-                    FROM material_and_technician 
-                    WHERE user_id = $1 AND material_id = $2
-                    """,
-                    user_id, material['material_id']
-                )
-                
-                if current_qty is not None:
-                    # Texnikda bu material bor, qaytarish
-                    await conn.execute(
-                        """
-                        UPDATE material_and_technician 
-                        SET quantity = quantity + $1
-                        WHERE user_id = $2 AND material_id = $3
-                        """,
-                        material['quantity'], user_id, material['material_id']
-                    )
+            await _return_consumed_materials(conn, user_id, application_number)
             
             logger.info(f"Returned materials to technician stock for user_id={user_id}, application_number={application_number}")
             
@@ -604,34 +544,12 @@ async def return_materials_to_technician_stock(
 
 
 # --- Omborga jo'natish: material_requests'ga QAYTA yozmaydi! ---
-async def pick_warehouse_user_rr(seed: int) -> int | None:
+async def pick_warehouse_user_rr(seed: Optional[int] = None) -> int | None:
     """
-    Omborchilar orasidan bitta foydalanuvchini round-robin usulida tanlaydi.
-    seed odatda applications_id bo'ladi.
+    Omborchilar orasidan bitta foydalanuvchini tanlaydi (vaznli round-robin,
+    database/basic/assignment.py). seed eski chaqiruvlar uchun qoldirilgan.
     """
-    conn = await _conn()
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT id
-            FROM users
-            WHERE role = 'warehouse'
-            ORDER BY id
-            """
-        )
-        print(f"DEBUG: Found {len(rows)} warehouse users")
-        if not rows:
-            print("DEBUG: No warehouse users found!")
-            return None
-        ids = [r["id"] for r in rows]
-        print(f"DEBUG: Warehouse user IDs: {ids}")
-        
-        # Round-robin logic
-        selected_id = ids[seed % len(ids)]
-        print(f"DEBUG: Selected warehouse user ID: {selected_id}")
-        return selected_id
-    finally:
-        await conn.close()
+    return await pick_recipient_id("warehouse", strategy="weighted_rr")
 
 
 async def send_selection_to_warehouse(
@@ -655,9 +573,7 @@ async def send_selection_to_warehouse(
             # STATUS O'ZGARMAYDI! Texnik davom ettiradi.
             # Faqat connections ga tarix yozamiz - omborchi material_requests dan ko'radi
             
-            print(f"DEBUG: Picking warehouse user for applications_id={applications_id}")
             warehouse_id = await pick_warehouse_user_rr(applications_id)
-            print(f"DEBUG: Selected warehouse_id: {warehouse_id}")
             
             if warehouse_id is not None:
                 conn_id  = applications_id if request_type == "connection"  else None
@@ -726,53 +642,17 @@ async def check_technician_material_availability(user_id: int, material_id: int,
 
 async def transfer_material_from_warehouse_to_technician(user_id: int, material_id: int, quantity: int) -> bool:
     """
-    Ombordan texnikka material o'tkazish
+    Ombordan texnikka material o'tkazish (stock_ledger orqali, shartli kamaytirish)
     """
-    conn = await _conn()
     try:
-        # Transaction boshlash
-        async with conn.transaction():
-            # Ombordagi material miqdorini tekshirish
-            warehouse_qty = await conn.fetchval(
-                """
-                SELECT COALESCE(quantity, 0) 
-                FROM materials 
-                WHERE id = $1
-                """,
-                material_id
-            )
-            
-            if warehouse_qty < quantity:
-                print(f"Insufficient warehouse quantity for material {material_id}. Available: {warehouse_qty}, Required: {quantity}")
-                return False
-            
-            # Ombordagi material miqdorini kamaytirish
-            await conn.execute(
-                """
-                UPDATE materials 
-                SET quantity = quantity - $2, updated_at = now()
-                WHERE id = $1
-                """,
-                material_id, quantity
-            )
-            
-            # Texnikka material qo'shish (UPSERT)
-            await conn.execute(
-                """
-                INSERT INTO material_and_technician (user_id, material_id, quantity)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (user_id, material_id) 
-                DO UPDATE SET quantity = material_and_technician.quantity + $3
-                """,
-                user_id, material_id, quantity
-            )
-            
-            return True
+        await issue_to_technician(user_id, {material_id: quantity})
+        return True
+    except InsufficientStock:
+        logger.warning(f"Insufficient warehouse quantity for material {material_id}. Required: {quantity}")
+        return False
     except Exception as e:
-        print(f"Error transferring material from warehouse to technician: {e}")
+        logger.error(f"Error transferring material from warehouse to technician: {e}")
         return False
-    finally:
-        await conn.close()
 
 async def get_technician_material_shortage_list(user_id: int, order_materials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -800,6 +680,6 @@ async def create_material_request_and_mark_in_warehouse(
     qty: int = 0,
     request_type: str = "connection",
 ) -> bool:
-    # material_requests ga QAYTA yozmaymiz; tanlov bosqichida upsert_material_selection ishlatiladi.
+    # material_requests ga QAYTA yozmaymiz; tanlov bosqichida upsert_material_cart ishlatiladi.
     uid = technician_user_id if technician_user_id is not None else technician_id
     return await send_selection_to_warehouse(applications_id, technician_user_id=uid, request_type=request_type)
@@ -1,15 +1,16 @@
 # database/technician/orders.py
-import asyncpg
 from typing import Optional
-from config import settings
+from database.connections import get_connection
+from database.basic.order_counters import invalidates_order_counters
 
 
 # ----------------- YORDAMCHI -----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 
 # ======================= CONNECTION ORDERS STATUS =======================
+@invalidates_order_counters
 async def cancel_technician_request(applications_id: int,
                                     technician_user_id: Optional[int] = None, *,
                                     technician_id: Optional[int] = None) -> None:
@@ -30,6 +31,7 @@ async def cancel_technician_request(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def accept_technician_work(applications_id: int,
                                  technician_user_id: Optional[int] = None, *,
                                  technician_id: Optional[int] = None) -> bool:
@@ -79,6 +81,7 @@ async def accept_technician_work(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def start_technician_work(applications_id: int,
                                 technician_user_id: Optional[int] = None, *,
                                 technician_id: Optional[int] = None) -> bool:
@@ -129,6 +132,7 @@ async def start_technician_work(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def finish_technician_work(applications_id: int,
                                  technician_user_id: Optional[int] = None, *,
                                  technician_id: Optional[int] = None) -> bool:
@@ -183,6 +187,7 @@ async def finish_technician_work(applications_id: int,
 
 
 # ======================= TECHNICIAN ORDERS STATUS =======================
+@invalidates_order_counters
 async def accept_technician_work_for_tech(applications_id: int,
                                           technician_user_id: Optional[int] = None, *,
                                           technician_id: Optional[int] = None) -> bool:
@@ -232,6 +237,7 @@ async def accept_technician_work_for_tech(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def start_technician_work_for_tech(applications_id: int,
                                          technician_user_id: Optional[int] = None, *,
                                          technician_id: Optional[int] = None) -> bool:
@@ -302,6 +308,7 @@ async def save_technician_diagnosis(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def cancel_technician_request_for_tech(applications_id: int,
                                              technician_user_id: Optional[int] = None, *,
                                              technician_id: Optional[int] = None) -> None:
@@ -317,6 +324,7 @@ async def cancel_technician_request_for_tech(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def finish_technician_work_for_tech(applications_id: int,
                                           technician_user_id: Optional[int] = None, *,
                                           technician_id: Optional[int] = None) -> bool:
@@ -371,6 +379,7 @@ async def finish_technician_work_for_tech(applications_id: int,
 
 
 # ======================= STAFF ORDERS STATUS =======================
+@invalidates_order_counters
 async def accept_technician_work_for_staff(applications_id: int,
                                           technician_user_id: Optional[int] = None, *,
                                           technician_id: Optional[int] = None) -> bool:
@@ -418,6 +427,7 @@ async def accept_technician_work_for_staff(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def start_technician_work_for_staff(applications_id: int,
                                          technician_user_id: Optional[int] = None, *,
                                          technician_id: Optional[int] = None) -> bool:
@@ -465,6 +475,7 @@ async def start_technician_work_for_staff(applications_id: int,
         await conn.close()
 
 
+@invalidates_order_counters
 async def finish_technician_work_for_staff(applications_id: int,
                                           technician_user_id: Optional[int] = None, *,
                                           technician_id: Optional[int] = None) -> bool:
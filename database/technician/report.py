@@ -1,26 +1,37 @@
 # database/technician/report.py
+# Texnik hisoboti: technician_daily_rollup (052 migratsiyasi) qatorlarini
+# davr kunlari bo'yicha qo'shish. Rollup jadvali bo'lmasa - eski usul
+# (connections tarixidan DISTINCT ON).
+import logging
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional, Tuple
+
 import asyncpg
-from config import settings
+
+from database.connections import get_connection
+from database.basic.schema import get_schema
+
+logger = logging.getLogger(__name__)
+
+# Rollup kunlari Asia/Tashkent bo'yicha (UTC+5, yozgi vaqt yo'q)
+_REPORT_TZ = timezone(timedelta(hours=5))
+_KINDS = ("connection", "technician", "staff")
+
+_ROLLUP_SQL = """
+    SELECT kind, status, SUM(orders)::int AS cnt
+    FROM technician_daily_rollup
+    WHERE technician_id = $1
+      AND ($2::date IS NULL OR day >= $2)
+      AND ($3::date IS NULL OR day <  $3)
+    GROUP BY kind, status
+    HAVING SUM(orders) <> 0
+"""
+
+_rollup_table = {"available": True}
 
 # ---------------- DB helpers ----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
-
-async def _pick_column(conn, table: str, candidates: list[str]) -> Optional[str]:
-    rows = await conn.fetch(
-        """
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = $1
-        """,
-        table,
-    )
-    cols = {r["column_name"] for r in rows}
-    for c in candidates:
-        if c in cols:
-            return c
-    return None
+    return await get_connection()
 
 async def _detect_columns_for_kind(kind: str) -> Tuple[str, str]:
     """
@@ -28,32 +39,30 @@ async def _detect_columns_for_kind(kind: str) -> Tuple[str, str]:
     Qaytaradi: (order_id_col, date_col)
       - order_id_col: connections dagi shu turga mos ID ustuni
       - date_col: updated_at bo'lsa o'sha, bo'lmasa created_at
+    Ustunlar sxema reyestridan olinadi (katalog so'rovi yo'q).
     """
-    conn = await _conn()
-    try:
-        if kind == "connection":
-            # sizda connection_id (typo) mavjud — birinchi bo'lib shuni tanlaymiz
-            order_col = await _pick_column(conn, "connections", ["connection_id", "connection_id"])
-            if not order_col:
-                raise RuntimeError("[connections] connection_id/connection_id topilmadi")
-        elif kind == "technician":
-            # technician_orders.id ga bog'lanadigan ustun nomi sxemaga ko'ra farq qilishi mumkin
-            order_col = await _pick_column(conn, "connections", ["technician_id", "technician_order_id", "tech_order_id"])
-            if not order_col:
-                raise RuntimeError("[connections] technician_order_id (technician_id/...) topilmadi")
-        elif kind == "staff":
-            order_col = await _pick_column(conn, "connections", ["staff_id"])
-            if not order_col:
-                raise RuntimeError("[connections] staff_id ustuni topilmadi")
-        else:
-            raise ValueError("kind must be connection|technician|staff")
+    schema = await get_schema()
+    if kind == "connection":
+        # sizda connection_id (typo) mavjud — birinchi bo'lib shuni tanlaymiz
+        order_col = schema.pick_column("connections", ["connection_id", "connection_id"])
+        if not order_col:
+            raise RuntimeError("[connections] connection_id/connection_id topilmadi")
+    elif kind == "technician":
+        # technician_orders.id ga bog'lanadigan ustun nomi sxemaga ko'ra farq qilishi mumkin
+        order_col = schema.pick_column("connections", ["technician_id", "technician_order_id", "tech_order_id"])
+        if not order_col:
+            raise RuntimeError("[connections] technician_order_id (technician_id/...) topilmadi")
+    elif kind == "staff":
+        order_col = schema.pick_column("connections", ["staff_id"])
+        if not order_col:
+            raise RuntimeError("[connections] staff_id ustuni topilmadi")
+    else:
+        raise ValueError("kind must be connection|technician|staff")
 
-        date_col = await _pick_column(conn, "connections", ["updated_at", "created_at"])
-        if not date_col:
-            raise RuntimeError("[connections] updated_at/created_at topilmadi")
-        return order_col, date_col
-    finally:
-        await conn.close()
+    date_col = schema.pick_column("connections", ["updated_at", "created_at"])
+    if not date_col:
+        raise RuntimeError("[connections] updated_at/created_at topilmadi")
+    return order_col, date_col
 
 # -------------- Core counter (FAQAT connections) --------------
 async def _count_from_connections_by_status(
@@ -176,12 +185,53 @@ async def _count_from_connections_by_status(
     finally:
         await conn.close()
 
+# -------------- Rollup --------------
+def _local_day(value: Optional[datetime]):
+    """Davr chegarasi (tz-aware) -> Toshkent sanasi; kun boshiga to'g'ri kelmasa yuqoriga."""
+    if value is None:
+        return None
+    local = value.astimezone(_REPORT_TZ)
+    day = local.date()
+    if local.time() != datetime.min.time():
+        day += timedelta(days=1)
+    return day
+
+
+async def count_statuses_by_kind(user_id: int, date_from, date_to) -> Dict[str, Dict[str, int]]:
+    """
+    Uchala tur uchun status -> arizalar soni, bitta so'rov bilan.
+
+    date_from/date_to - tz-aware (Toshkent kun chegaralari) yoki None.
+    """
+    result: Dict[str, Dict[str, int]] = {kind: {} for kind in _KINDS}
+    if _rollup_table["available"]:
+        conn = await _conn()
+        try:
+            rows = await conn.fetch(_ROLLUP_SQL, user_id, _local_day(date_from), _local_day(date_to))
+        except asyncpg.UndefinedTableError:
+            # 052 migratsiyasi qo'llanmagan
+            logger.warning("technician_daily_rollup missing, counting from connections")
+            _rollup_table["available"] = False
+        else:
+            for r in rows:
+                result.setdefault(r["kind"], {})[r["status"]] = int(r["cnt"])
+            return result
+        finally:
+            await conn.close()
+
+    for kind in _KINDS:
+        result[kind] = await _count_from_connections_by_status(
+            user_id=user_id, kind=kind, date_from=date_from, date_to=date_to
+        )
+    return result
+
+
 # -------------- Public API --------------
 async def count_connection_status(user_id: int, date_from, date_to) -> Dict[str, int]:
-    return await _count_from_connections_by_status(user_id=user_id, kind="connection",  date_from=date_from, date_to=date_to)
+    return (await count_statuses_by_kind(user_id, date_from, date_to))["connection"]
 
 async def count_technician_status(user_id: int, date_from, date_to) -> Dict[str, int]:
-    return await _count_from_connections_by_status(user_id=user_id, kind="technician", date_from=date_from, date_to=date_to)
+    return (await count_statuses_by_kind(user_id, date_from, date_to))["technician"]
 
 async def count_staff_status(user_id: int, date_from, date_to) -> Dict[str, int]:
-    return await _count_from_connections_by_status(user_id=user_id, kind="staff",       date_from=date_from, date_to=date_to)
+    return (await count_statuses_by_kind(user_id, date_from, date_to))["staff"]
@@ -0,0 +1,132 @@
+# database/warehouse/analytics.py
+# Ombor statistikasi: materials jadvali bo'yicha bitta o'tishli snapshot
+#
+# Avval bosh ko'rsatkichlar 7 ta ketma-ket so'rov, kunlik / haftalik /
+# oylik / yillik statistika esa har biri yana 2-3 ta so'rov edi (ba'zilari
+# DATE(created_at) = $1 ko'rinishida - indeks ishlamaydi). Endi hammasi
+# bitta SELECT'da FILTER (WHERE ...) agregatlari bilan hisoblanadi; davr
+# shartlari "ustun >= chegara" ko'rinishida (sargable).
+#
+# Snapshot inventar o'zgarguncha keshda turadi: materiallarni o'zgartiruvchi
+# funksiyalar invalidate_warehouse_stats() ni chaqiradi. TTL - kun
+# almashganda va boshqa yo'llar bilan kiritilgan o'zgarishlar uchun.
+
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Union
+
+from config import settings
+from database.connections import get_connection
+from utils.cache import TTLCache, MISSING
+
+# Kam qolgan material chegarasi (quantity <= LOW_STOCK_THRESHOLD)
+LOW_STOCK_THRESHOLD = 10
+
+_SNAPSHOT_SQL = """
+    WITH b AS (
+        SELECT CURRENT_DATE::timestamptz                  AS day_start,
+               date_trunc('week', CURRENT_DATE)::timestamptz  AS week_start,
+               date_trunc('month', CURRENT_DATE)::timestamptz AS month_start,
+               date_trunc('year', CURRENT_DATE)::timestamptz  AS year_start
+    )
+    SELECT
+        COUNT(*)                                                  AS total_materials,
+        COALESCE(SUM(m.quantity), 0)                              AS total_quantity,
+        COALESCE(SUM(m.quantity * COALESCE(m.price, 0)), 0)       AS total_value,
+        COUNT(*) FILTER (WHERE m.quantity <= $1)                  AS low_stock_count,
+        COUNT(*) FILTER (WHERE m.quantity = 0)                    AS out_of_stock_count,
+
+        COUNT(*) FILTER (WHERE m.created_at >= b.day_start)       AS daily_added,
+        COUNT(*) FILTER (WHERE m.updated_at >= b.day_start)       AS daily_updated,
+        COUNT(*) FILTER (WHERE m.created_at >= b.week_start)      AS weekly_added,
+        COUNT(*) FILTER (WHERE m.updated_at >= b.week_start)      AS weekly_updated,
+        COALESCE(SUM(m.quantity * COALESCE(m.price, 0))
+                 FILTER (WHERE m.created_at >= b.week_start), 0)  AS weekly_value,
+        COUNT(*) FILTER (WHERE m.created_at >= b.month_start)     AS monthly_added,
+        COUNT(*) FILTER (WHERE m.updated_at >= b.month_start)     AS monthly_updated,
+        COALESCE(SUM(m.quantity * COALESCE(m.price, 0))
+                 FILTER (WHERE m.created_at >= b.month_start), 0) AS monthly_value,
+        COUNT(*) FILTER (WHERE m.created_at >= b.year_start)      AS yearly_added,
+        COUNT(*) FILTER (WHERE m.updated_at >= b.year_start)      AS yearly_updated,
+        COALESCE(SUM(m.quantity * COALESCE(m.price, 0))
+                 FILTER (WHERE m.created_at >= b.year_start), 0)  AS yearly_value,
+
+        COALESCE(AVG(m.price), 0)                                 AS avg_price,
+        (array_agg(m.name ORDER BY m.quantity DESC))[1]           AS top_stock_name,
+        (array_agg(m.quantity ORDER BY m.quantity DESC))[1]       AS top_stock_quantity,
+        (array_agg(m.name ORDER BY m.price DESC)
+            FILTER (WHERE m.price IS NOT NULL))[1]                AS most_expensive_name,
+        MAX(m.price)                                              AS most_expensive_price,
+        (array_agg(m.name ORDER BY m.price ASC)
+            FILTER (WHERE m.price IS NOT NULL))[1]                AS cheapest_name,
+        MIN(m.price)                                              AS cheapest_price
+    FROM materials m
+    CROSS JOIN b
+"""
+
+_PERIOD_SQL = """
+    SELECT
+        COUNT(*) FILTER (WHERE created_at >= $1::date AND created_at < $2::date) AS added,
+        COUNT(*) FILTER (WHERE updated_at >= $1::date AND updated_at < $2::date) AS updated
+    FROM materials
+    WHERE (created_at >= $1::date AND created_at < $2::date)
+       OR (updated_at >= $1::date AND updated_at < $2::date)
+"""
+
+_snapshot = TTLCache(maxsize=1, ttl=settings.WAREHOUSE_STATS_TTL)
+
+
+def _as_date(value: Union[str, date]) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+async def get_warehouse_snapshot() -> Dict[str, Any]:
+    """Barcha ombor ko'rsatkichlari (keshdan yoki bitta so'rov bilan)."""
+    cached = _snapshot.get("all", MISSING)
+    if cached is not MISSING:
+        return cached
+
+    conn = await get_connection()
+    try:
+        row = await conn.fetchrow(_SNAPSHOT_SQL, LOW_STOCK_THRESHOLD)
+    finally:
+        await conn.close()
+
+    snap: Dict[str, Any] = {}
+    for key in ("total_materials", "total_quantity", "low_stock_count", "out_of_stock_count",
+                "daily_added", "daily_updated", "weekly_added", "weekly_updated",
+                "monthly_added", "monthly_updated", "yearly_added", "yearly_updated"):
+        snap[key] = int(row[key] or 0)
+    for key in ("total_value", "weekly_value", "monthly_value", "yearly_value", "avg_price"):
+        snap[key] = float(row[key] or 0)
+
+    snap["top_stock_material"] = (
+        {"name": row["top_stock_name"], "quantity": row["top_stock_quantity"]}
+        if row["top_stock_name"] is not None else None
+    )
+    snap["most_expensive"] = (
+        {"name": row["most_expensive_name"], "price": row["most_expensive_price"]}
+        if row["most_expensive_name"] is not None else None
+    )
+    snap["cheapest"] = (
+        {"name": row["cheapest_name"], "price": row["cheapest_price"]}
+        if row["cheapest_name"] is not None else None
+    )
+    _snapshot.set("all", snap)
+    return snap
+
+
+async def get_period_counts(date_from: Union[str, date], date_to: Optional[Union[str, date]] = None) -> Dict[str, int]:
+    """[date_from, date_to] kunlari oralig'ida qo'shilgan / yangilangan materiallar soni."""
+    start = _as_date(date_from)
+    end = _as_date(date_to) if date_to is not None else start
+    conn = await get_connection()
+    try:
+        row = await conn.fetchrow(_PERIOD_SQL, start, end + timedelta(days=1))
+    finally:
+        await conn.close()
+    return {"added": int(row["added"] or 0), "updated": int(row["updated"] or 0)}
+
+
+def invalidate_warehouse_stats() -> None:
+    """Snapshot'ni tashlash (material qo'shilganda / miqdori o'zgarganda)."""
+    _snapshot.clear()
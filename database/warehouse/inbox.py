@@ -1,11 +1,12 @@
 # database/warehouse/inbox.py
-import asyncpg
 from typing import List, Dict, Any, Optional
-from config import settings
+from database.connections import get_connection
+from database.warehouse.analytics import invalidate_warehouse_stats
+from database.basic.stock_ledger import issue_to_technician, consume_for_order, InsufficientStock
 
 async def _conn():
     """Database connection helper"""
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 # ==================== CONNECTION ORDERS ====================
 
@@ -691,9 +692,14 @@ async def get_all_warehouse_orders_count() -> Dict[str, int]:
 
 # ==================== HELPER FUNCTIONS ====================
 
-async def create_material_and_technician_entry(order_id: int, order_type: str) -> bool:
+async def create_material_and_technician_entry(order_id: int, order_type: str,
+                                              warehouse_user_id: Optional[int] = None) -> bool:
     """
     Ariza tasdiqlangandan so'ng material_and_technician jadvaliga yozish
+
+    Ombordan so'ralgan materiallar bitta savat sifatida stock_ledger orqali
+    texnikka beriladi va shu arizaga sarflanadi (hammasi yoki hech biri);
+    omborda yetmasa InsufficientStock.
     """
     conn = await _conn()
     try:
@@ -731,7 +737,8 @@ async def create_material_and_technician_entry(order_id: int, order_type: str) -
         # Material requests dan materiallarni olish
         material_requests = await conn.fetch(
             """
-            SELECT mr.material_id, mr.quantity, mr.application_number, mr.source_type
+            SELECT mr.user_id, mr.material_id, mr.quantity, mr.application_number, mr.source_type,
+                   COALESCE(mr.warehouse_approved, FALSE) AS warehouse_approved
             FROM material_requests mr
             WHERE mr.application_number = $1
             """,
@@ -742,83 +749,67 @@ async def create_material_and_technician_entry(order_id: int, order_type: str) -
             print(f"No material requests found for {order_type} order {order_id}")
             return True  
         
+        # Ombordan so'ralganlar tanlagan texnik bo'yicha savatga yig'iladi (texnikdagi
+        # materiallar tanlovda kamaytirilgan; avval tasdiqlanganlari qayta berilmaydi)
+        carts: Dict[int, Dict[int, int]] = {}
         for mr in material_requests:
-            material_id = mr['material_id']
-            quantity = mr['quantity']
-            source_type = mr.get('source_type', 'warehouse')
-            
-            if source_type == 'warehouse':
-                # Get material details for the new columns
-                material_info = await conn.fetchrow(
-                    "SELECT name, price FROM materials WHERE id = $1",
-                    material_id
+            if (mr['source_type'] or 'warehouse') != 'warehouse' or mr['warehouse_approved']:
+                continue
+            if mr['material_id'] is None or not mr['quantity'] or mr['quantity'] <= 0:
+                continue
+            cart = carts.setdefault(mr['user_id'] or technician_id, {})
+            cart[mr['material_id']] = cart.get(mr['material_id'], 0) + mr['quantity']
+
+        async with conn.transaction():
+            for tech_id, cart in carts.items():
+                # Shartli kamaytirish + texnikka qo'shish + stock_movements (bitta statement)
+                await issue_to_technician(
+                    tech_id, cart, actor_id=warehouse_user_id,
+                    application_number=application_number, conn=conn
+                )
+                # Material shu ariza uchun so'ralgan - texnikdan arizaga sarflanadi
+                # (bekor qilinsa _return_consumed_materials texnikka qaytaradi)
+                await consume_for_order(
+                    tech_id, cart, application_number,
+                    actor_id=warehouse_user_id, conn=conn
                 )
-                
-                if material_info:
-                    material_name = material_info['name']
-                    price = material_info['price'] or 0
-                    total_price = price * quantity
-                    
-                    # Check if entry exists
-                    existing = await conn.fetchrow(
-                        "SELECT id, quantity, total_price FROM material_and_technician WHERE user_id = $1 AND material_id = $2",
-                        technician_id, material_id
-                    )
-                    
-                    if existing:
-                        # Update existing entry - add quantity
-                        await conn.execute(
-                            """
-                            UPDATE material_and_technician 
-                            SET quantity = quantity + $1,
-                                application_number = $2,
-                                material_name = $3,
-                                price = $4,
-                                total_price = total_price + $5
-                            WHERE user_id = $6 AND material_id = $7
-                            """,
-                            quantity, application_number, material_name, price, total_price,
-                            technician_id, material_id
-                        )
-                    else:
-                        # Insert new entry
-                        await conn.execute(
-                            """
-                            INSERT INTO material_and_technician 
-                            (user_id, material_id, quantity, application_number, material_name, 
-                             material_unit, price, total_price, is_approved, request_type)
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                            """,
-                            technician_id, material_id, quantity, application_number, 
-                            material_name, 'dona', price, total_price, True, order_type
-                        )
-                
-                # Ombor zaxirasini kamaytirish
+                # Texnik yozuvidagi qo'shimcha ustunlar (nom, narx, ariza)
                 await conn.execute(
                     """
-                    UPDATE materials 
-                    SET quantity = GREATEST(0, quantity - $1)
-                    WHERE id = $2
+                    UPDATE material_and_technician t
+                    SET application_number = $2,
+                        material_name = m.name,
+                        material_unit = COALESCE(t.material_unit, 'dona'),
+                        price = COALESCE(m.price, 0),
+                        total_price = COALESCE(t.quantity, 0) * COALESCE(m.price, 0),
+                        is_approved = COALESCE(t.is_approved, TRUE),
+                        request_type = COALESCE(t.request_type, $3)
+                    FROM materials m
+                    WHERE t.user_id = $4 AND t.material_id = m.id AND m.id = ANY($1::int[])
                     """,
-                    quantity, material_id
+                    list(cart), application_number, order_type, tech_id
                 )
-            
+
             # warehouse_approved ni TRUE qilish
             await conn.execute(
                 """
                 UPDATE material_requests 
                 SET warehouse_approved = TRUE
-                WHERE application_number = $1 AND material_id = $2
+                WHERE application_number = $1 AND material_id = ANY($2::int[])
                 """,
-                application_number, material_id
+                application_number, list({mr['material_id'] for mr in material_requests})
             )
         
         return True
+    except InsufficientStock:
+        # Tasdiqlash bekor - chaqiruvchi xatoni ko'rsatadi
+        raise
     except Exception as e:
         print(f"Error creating material_and_technician entries: {e}")
         return False
     finally:
         await conn.close()
+        invalidate_warehouse_stats()
 
 # ==================== CONFIRMATION FUNCTIONS ====================
 
@@ -833,7 +824,7 @@ async def confirm_materials_and_update_status_for_connection(order_id: int, ware
         # Faqat materiallarni texnikka beramiz
         
         # Material_and_technician jadvaliga yozish va ombor zaxirasini kamaytirish
-        success = await create_material_and_technician_entry(order_id, "connection")
+        success = await create_material_and_technician_entry(order_id, "connection", warehouse_user_id)
         if not success:
             print(f"Failed to create material_and_technician entries for connection order {order_id}")
         
@@ -855,7 +846,7 @@ async def confirm_materials_and_update_status_for_technician(order_id: int, ware
         # Faqat materiallarni texnikka beramiz
         
         # Material_and_technician jadvaliga yozish va ombor zaxirasini kamaytirish
-        success = await create_material_and_technician_entry(order_id, "technician")
+        success = await create_material_and_technician_entry(order_id, "technician", warehouse_user_id)
         if not success:
             print(f"Failed to create material_and_technician entries for technician order {order_id}")
         
@@ -877,7 +868,7 @@ async def confirm_materials_and_update_status_for_staff(order_id: int, warehouse
         # Faqat materiallarni texnikka beramiz
         
         # Material_and_technician jadvaliga yozish va ombor zaxirasini kamaytirish
-        success = await create_material_and_technician_entry(order_id, "staff")
+        success = await create_material_and_technician_entry(order_id, "staff", warehouse_user_id)
         if not success:
             print(f"Failed to create material_and_technician entries for staff order {order_id}")
         
@@ -1,8 +1,9 @@
 # database/warehouse/materials.py
-import asyncpg
 from typing import Optional, Dict, Any, List
 from decimal import Decimal
-from config import settings
+from database.connections import get_connection
+from database.basic.search import search_materials as _search_materials
+from database.warehouse.analytics import invalidate_warehouse_stats
 
 # ---------- MATERIALLAR ASOSIY CRUD / SELEKTLAR ----------
 async def create_material(
@@ -12,7 +13,7 @@ async def create_material(
     description: Optional[str] = None,
     serial_number: Optional[str] = None,
 ) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -22,29 +23,17 @@ async def create_material(
             """,
             name, price, description, quantity, serial_number
         )
+        invalidate_warehouse_stats()
         return dict(row)
     finally:
         await conn.close()
 
 async def search_materials(search_term: str) -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT id, name, price, description, quantity, serial_number, created_at, updated_at
-            FROM materials
-            WHERE name ILIKE $1
-            ORDER BY name
-            LIMIT 20
-            """,
-            f"%{search_term}%"
-        )
-        return [dict(r) for r in rows]
-    finally:
-        await conn.close()
+    """Nomi yoki seriya raqami bo'yicha materiallar (pg_trgm, reytingli)."""
+    return await _search_materials(search_term, limit=20)
 
 async def get_all_materials() -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -58,7 +47,7 @@ async def get_all_materials() -> List[Dict[str, Any]]:
         await conn.close()
 
 async def get_material_by_id(material_id: int) -> Optional[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -73,7 +62,7 @@ async def get_material_by_id(material_id: int) -> Optional[Dict[str, Any]]:
         await conn.close()
 
 async def update_material_quantity(material_id: int, additional_quantity: int) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -84,12 +73,13 @@ async def update_material_quantity(material_id: int, additional_quantity: int) -
             """,
             material_id, additional_quantity
         )
+        invalidate_warehouse_stats()
         return dict(row)
     finally:
         await conn.close()
 
 async def update_material_name_description(material_id: int, name: str, description: Optional[str] = None) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -100,12 +90,13 @@ async def update_material_name_description(material_id: int, name: str, descript
             """,
             material_id, name, description
         )
+        invalidate_warehouse_stats()
         return dict(row)
     finally:
         await conn.close()
 
 async def get_low_stock_materials(threshold: int = 10) -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -121,7 +112,7 @@ async def get_low_stock_materials(threshold: int = 10) -> List[Dict[str, Any]]:
         await conn.close()
 
 async def get_out_of_stock_materials() -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -138,7 +129,7 @@ async def get_out_of_stock_materials() -> List[Dict[str, Any]]:
 # ---------- EXPORT FUNKSIYALARI ----------
 async def get_warehouse_inventory_for_export() -> List[Dict[str, Any]]:
     """Export uchun ombor inventarini olish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
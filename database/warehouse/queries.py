@@ -1,12 +1,11 @@
 # database/warehouse/queries.py
 
-import asyncpg
 from typing import List, Dict, Any
-from config import settings
+from database.connections import get_connection
 
 async def get_warehouse_inventory_for_export() -> List[Dict[str, Any]]:
     """Warehouse inventory export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -29,7 +28,7 @@ async def get_warehouse_inventory_for_export() -> List[Dict[str, Any]]:
 
 async def get_warehouse_statistics_for_export(filter_type: str = "all") -> Dict[str, Any]:
     """Warehouse statistics export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Build query based on filter type
         if filter_type == "low_stock":
@@ -1,5 +1,5 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from aiogram.types import Message, CallbackQuery, BufferedInputFile, FSInputFile
 from aiogram.fsm.context import FSMContext
 from filters.role_filter import RoleFilter
 from keyboards.admin_buttons import (
@@ -7,12 +7,16 @@ from keyboards.admin_buttons import (
     get_admin_export_formats_keyboard,
 )
 from utils.export_utils import ExportUtils
+from utils.export_stream import STREAM_FORMATS, stream_export_to_file
 from database.admin.export import (
     get_admin_users_for_export,
     get_admin_connection_orders_for_export,
     get_admin_technician_orders_for_export,
     get_admin_staff_orders_for_export,
     get_admin_statistics_for_export,
+    iter_admin_connection_orders_for_export,
+    iter_admin_technician_orders_for_export,
+    iter_admin_staff_orders_for_export,
 )
 from database.warehouse.queries import (
     get_warehouse_inventory_for_export,
@@ -244,6 +248,12 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
     # State ni tozalash
     await state.clear()
 
+    # Arizalar tarixi katta bo'lishi mumkin: CSV/XLSX cursor orqali
+    # vaqtinchalik faylga oqimli yoziladi va diskdan yuboriladi
+    if export_type in _STREAMED_EXPORTS and format_type in STREAM_FORMATS:
+        await _send_streamed_export(cb, export_type, format_type, lang)
+        return
+
     try:
         title = ""
         filename_base = "export"
@@ -313,16 +323,16 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
         export_utils = ExportUtils()
 
         if format_type == "csv":
-            file_data = export_utils.to_csv(raw_data, headers=headers if headers else None)
+            file_data = await export_utils.render_csv(raw_data, headers=headers if headers else None)
             file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.csv")
         elif format_type == "xlsx":
-            file_data = export_utils.generate_excel(raw_data, sheet_name="export", title=title)
+            file_data = await export_utils.render_excel(raw_data, sheet_name="export", title=title)
             file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.xlsx")
         elif format_type == "docx":
-            file_data = export_utils.generate_word(raw_data, title=title)
+            file_data = await export_utils.render_word(raw_data, title=title)
             file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.docx")
         elif format_type == "pdf":
-            file_data = export_utils.generate_pdf(raw_data, title=title)
+            file_data = await export_utils.render_pdf(raw_data, title=title)
             file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.pdf")
         else:
             await cb.answer("Format noto'g'ri", show_alert=True)
@@ -345,6 +355,36 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
         await cb.answer()
 
 
+_STREAMED_EXPORTS = {
+    "connection": (iter_admin_connection_orders_for_export, "Ulanish arizalari", "Заявки на подключение", "connection_orders"),
+    "technician": (iter_admin_technician_orders_for_export, "Texnik arizalar", "Технические заявки", "technician_orders"),
+    "staff": (iter_admin_staff_orders_for_export, "Xodim arizalari", "Заявки сотрудников", "staff_orders"),
+}
+
+
+async def _send_streamed_export(cb: CallbackQuery, export_type: str, format_type: str, lang: str):
+    iter_rows, title_uz, title_ru, filename_base = _STREAMED_EXPORTS[export_type]
+    title = title_uz if lang == "uz" else title_ru
+    path = None
+    try:
+        path = await stream_export_to_file(iter_rows(), format_type, title=title, sheet_name="export")
+        await cb.message.answer_document(
+            document=FSInputFile(path, filename=f"{filename_base}_{int(datetime.now().timestamp())}.{format_type}"),
+            caption=f"📤 {title} — {format_type.upper()}",
+        )
+        await cb.message.answer(
+            ("Yana qaysi bo'limni eksport qilamiz?" if lang == "uz" else "Что экспортируем дальше?"),
+            reply_markup=get_admin_export_types_keyboard(lang),
+        )
+    except Exception as e:
+        logger.error(f"Admin export error: {e}", exc_info=True)
+        await cb.message.answer("❌ Eksportda xatolik yuz berdi")
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+        await cb.answer()
+
+
 # Warehouse specific selections -> format selection
 @router.callback_query(F.data == "admin_export_warehouse_inventory")
 async def admin_export_wh_inventory(cb: CallbackQuery, state: FSMContext):
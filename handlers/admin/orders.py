@@ -1,6 +1,7 @@
 from aiogram import F, Router
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, InputMediaDocument, InputMediaVideo
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 from aiogram.exceptions import TelegramBadRequest
 from datetime import datetime
 import html
@@ -10,6 +11,7 @@ from database.admin.orders import (
     get_technician_orders,
     get_staff_orders
 )
+from database.basic.search import search_orders
 from database.basic.user import get_user_by_telegram_id
 from filters.role_filter import RoleFilter
 from keyboards.admin_buttons import get_applications_main_menu, get_admin_main_menu
@@ -21,6 +23,11 @@ router.message.filter(RoleFilter("admin"))
 
 logger = logging.getLogger(__name__)
 
+
+class OrderSearch(StatesGroup):
+    waiting_for_term = State()
+
+
 # ========== Media Type Detection Helper Functions ==========
 
 def _detect_media_kind(file_id: str | None, media_type: str | None = None) -> str | None:
@@ -767,4 +774,93 @@ async def send_connection_order_with_media_edit(cb: CallbackQuery, item: dict, l
                 pass  # Fall through to text edit
     
     # Edit as text message if media handling fails or no media
-    await cb.message.edit_text(text, reply_markup=keyboard, parse_mode='HTML')
\ No newline at end of file
+    await cb.message.edit_text(text, reply_markup=keyboard, parse_mode='HTML')
+
+
+# ========== Zayavka qidirish (ariza raqami yoki manzil) ==========
+
+ORDER_TYPE_NAMES = {
+    "uz": {"connection": "🔌 Ulanish", "technician": "🔧 Texnik", "staff": "👥 Xodim"},
+    "ru": {"connection": "🔌 Подключение", "technician": "🔧 Техническая", "staff": "👥 Сотрудник"},
+}
+
+def search_results_text(term: str, items: list, lang: str) -> str:
+    type_names = ORDER_TYPE_NAMES["ru" if lang == "ru" else "uz"]
+    lines = [
+        (f"🔎 <b>Qidiruv natijalari:</b> {esc(term)}\n" if lang == "uz"
+         else f"🔎 <b>Результаты поиска:</b> {esc(term)}\n")
+    ]
+    for item in items:
+        if item["order_type"] == "connection":
+            statuses = connection_status_names(lang)
+        else:
+            statuses = technician_status_names(lang)
+        status = statuses.get(item.get("status"), item.get("status") or "-")
+        created = fmt_dt(item["created_at"]) if item.get("created_at") else "-"
+        lines.append(
+            f"{type_names.get(item['order_type'], item['order_type'])} | "
+            f"<b>{esc(item.get('application_number') or item['id'])}</b>\n"
+            f"📍 {esc(item.get('address'))}\n"
+            f"{status} | 📅 {created}\n"
+        )
+    return "\n".join(lines)
+
+@router.message(F.text.in_(["🔎 Zayavka qidirish", "🔎 Поиск заявки"]))
+async def start_order_search(message: Message, state: FSMContext):
+    user = await get_user_by_telegram_id(message.from_user.id)
+    if not user or user.get("role") != "admin":
+        return
+    lang = await get_user_language(message.from_user.id) or "uz"
+
+    await state.set_state(OrderSearch.waiting_for_term)
+    await message.answer(
+        ("🔎 <b>Zayavka qidirish</b>\n\nAriza raqami yoki manzilni kiriting:\n\n❌ Bekor qilish uchun /cancel yozing"
+         if lang == "uz" else
+         "🔎 <b>Поиск заявки</b>\n\nВведите номер заявки или адрес:\n\n❌ Для отмены введите /cancel"),
+        parse_mode='HTML'
+    )
+
+@router.message(OrderSearch.waiting_for_term)
+async def process_order_search(message: Message, state: FSMContext):
+    lang = await get_user_language(message.from_user.id) or "uz"
+    term = (message.text or "").strip()
+
+    if term.lower() in ['/cancel', 'bekor qilish', 'cancel']:
+        await state.clear()
+        await message.answer(
+            ("❌ Qidiruv bekor qilindi." if lang == "uz" else "❌ Поиск отменен."),
+            reply_markup=get_applications_main_menu(lang)
+        )
+        return
+
+    if len(term) < 2:
+        await message.answer(
+            ("❗ Kamida 2 ta belgi kiriting." if lang == "uz" else "❗ Введите минимум 2 символа.")
+        )
+        return
+
+    try:
+        items = await search_orders(term, limit=10)
+    except Exception:
+        logger.exception("Order search failed")
+        await state.clear()
+        await message.answer(
+            ("❌ Qidirishda xatolik yuz berdi." if lang == "uz" else "❌ Ошибка при поиске."),
+            reply_markup=get_applications_main_menu(lang)
+        )
+        return
+
+    if not items:
+        await message.answer(
+            ("🔎 Hech narsa topilmadi. Boshqa so'rov kiriting yoki /cancel yozing."
+             if lang == "uz" else
+             "🔎 Ничего не найдено. Введите другой запрос или /cancel.")
+        )
+        return
+
+    await state.clear()
+    await message.answer(
+        search_results_text(term, items, lang),
+        parse_mode='HTML',
+        reply_markup=get_applications_main_menu(lang)
+    )
@@ -1,4 +1,5 @@
 from aiogram import Router, F
+from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from datetime import datetime
@@ -10,6 +11,11 @@ from database.admin.queries import (
     get_performance_metrics,
     get_database_info
 )
+from database.connections import get_pool_metrics
+from utils.render_pool import get_render_metrics
+from utils.outbound_queue import get_outbound_metrics
+from utils.db_budget import get_budget_summary
+from filters.role_filter import RoleFilter
 from keyboards.admin_buttons import get_system_status_keyboard
 from database.basic.language import get_user_language
 
@@ -191,6 +197,26 @@ async def system_performance_handler(callback: CallbackQuery):
         for staff in metrics['active_staff'][:5]:
             text += f"• {staff['full_name']} ({staff['role']}): {staff['activity_count']} faoliyat\n"
         
+        pool = get_pool_metrics()
+        text += ("\n🗄 **DB pool:**\n" if lang == "uz" else "\n🗄 **Пул БД:**\n")
+        text += (f"• Band: {pool['in_use']} / {pool['max_size']}, bo'sh: {pool['idle']}\n" if lang == "uz" else f"• Занято: {pool['in_use']} / {pool['max_size']}, свободно: {pool['idle']}\n")
+        text += (f"• Kutish: o'rtacha {pool['wait_time_avg_ms']:.1f} ms, maks {pool['wait_time_max_ms']:.1f} ms\n" if lang == "uz" else f"• Ожидание: среднее {pool['wait_time_avg_ms']:.1f} мс, макс {pool['wait_time_max_ms']:.1f} мс\n")
+        text += (f"• Timeoutlar: {pool['acquire_timeouts']}\n" if lang == "uz" else f"• Таймауты: {pool['acquire_timeouts']}\n")
+        
+        rp = get_render_metrics()
+        text += ("\n📄 **Hujjat generatsiyasi:**\n" if lang == "uz" else "\n📄 **Генерация документов:**\n")
+        text += (f"• Navbat: {rp['queue_depth']} / {rp['queue_max']}, bajarilmoqda: {rp['in_flight'] - rp['queue_depth']}\n" if lang == "uz" else f"• Очередь: {rp['queue_depth']} / {rp['queue_max']}, в работе: {rp['in_flight'] - rp['queue_depth']}\n")
+        text += (f"• Render: o'rtacha {rp['render_time_avg_ms']:.0f} ms, maks {rp['render_time_max_ms']:.0f} ms\n" if lang == "uz" else f"• Рендер: среднее {rp['render_time_avg_ms']:.0f} мс, макс {rp['render_time_max_ms']:.0f} мс\n")
+        text += (f"• Bajarildi: {rp['completed']}, xato: {rp['failed']}, rad etildi: {rp['rejected']}\n" if lang == "uz" else f"• Выполнено: {rp['completed']}, ошибок: {rp['failed']}, отклонено: {rp['rejected']}\n")
+        
+        ob = await get_outbound_metrics()
+        pending = ob['pending'] if ob['pending'] is not None else "?"
+        oldest = ob['oldest_pending_s'] or 0.0
+        text += ("\n📤 **Xabarlar navbati:**\n" if lang == "uz" else "\n📤 **Очередь сообщений:**\n")
+        text += (f"• Kutmoqda: {pending}, eng eskisi: {oldest:.0f} s, faol chatlar: {ob['active_chats']}\n" if lang == "uz" else f"• В очереди: {pending}, самое старое: {oldest:.0f} с, активных чатов: {ob['active_chats']}\n")
+        text += (f"• Kechikish: o'rtacha {ob['lag_avg_s']:.1f} s, maks {ob['lag_max_s']:.1f} s\n" if lang == "uz" else f"• Задержка: средняя {ob['lag_avg_s']:.1f} с, макс {ob['lag_max_s']:.1f} с\n")
+        text += (f"• Yuborildi: {ob['sent']}, qayta: {ob['retried']}, RetryAfter: {ob['retry_after']}, xato: {ob['failed']} (24 soat: {ob['failed_24h'] if ob['failed_24h'] is not None else '?'})\n" if lang == "uz" else f"• Отправлено: {ob['sent']}, повторов: {ob['retried']}, RetryAfter: {ob['retry_after']}, ошибок: {ob['failed']} (24ч: {ob['failed_24h'] if ob['failed_24h'] is not None else '?'})\n")
+        
         text += (f"\n🕐 Yangilangan: {datetime.now().strftime('%H:%M:%S')}" if lang == "uz" else f"\n🕐 Обновлено: {datetime.now().strftime('%H:%M:%S')}")
         
         await callback.message.edit_text(
@@ -325,3 +351,69 @@ async def system_refresh_handler(callback: CallbackQuery):
             (f"❌ Xatolik yuz berdi: {str(e)}" if lang == "uz" else f"❌ Произошла ошибка: {str(e)}"),
             reply_markup=get_system_status_keyboard(lang)
         )
+
+def _db_budget_text(lang: str) -> str:
+    """Update'lar DB byudjeti (so'rovlar / vaqt / ulanishlar persentillari)"""
+    summary = get_budget_summary()
+    text = ("📉 **DB byudjeti (update boshiga)**\n" if lang == "uz" else "📉 **Бюджет БД (на один update)**\n")
+    text += (f"Oxirgi {summary['updates']} / {summary['window']} update\n\n" if lang == "uz" else f"Последние {summary['updates']} / {summary['window']} update\n\n")
+    
+    if not summary['updates']:
+        text += ("Hali ma'lumot yo'q." if lang == "uz" else "Данных пока нет.")
+        return text
+    
+    rows = [
+        (("So'rovlar" if lang == "uz" else "Запросы"), summary['queries'], "{:.0f}"),
+        (("DB vaqti, ms" if lang == "uz" else "Время БД, мс"), summary['db_ms'], "{:.1f}"),
+        (("Ulanishlar" if lang == "uz" else "Подключения"), summary['conn_opens'], "{:.0f}"),
+        (("Umumiy, ms" if lang == "uz" else "Всего, мс"), summary['total_ms'], "{:.0f}"),
+    ]
+    for title, dist, fmt in rows:
+        text += (
+            f"• {title}: p50 {fmt.format(dist['p50'])}, p95 {fmt.format(dist['p95'])}, "
+            f"p99 {fmt.format(dist['p99'])}, maks {fmt.format(dist['max'])}\n"
+        )
+    
+    if summary['handlers']:
+        text += ("\n🏋️ **Eng og'ir handler'lar (p95):**\n" if lang == "uz" else "\n🏋️ **Самые тяжёлые обработчики (p95):**\n")
+        for h in summary['handlers']:
+            name = '.'.join(h['handler'].split('.')[-2:])
+            text += (
+                f"• `{name}` - {h['queries_p95']:.0f} so'rov, {h['db_ms_p95']:.1f} ms, {h['conn_opens_p95']:.0f} ulanish ({h['updates']})\n"
+                if lang == "uz" else
+                f"• `{name}` - {h['queries_p95']:.0f} запр., {h['db_ms_p95']:.1f} мс, {h['conn_opens_p95']:.0f} подкл. ({h['updates']})\n"
+            )
+    
+    if summary['slowest']:
+        slowest = summary['slowest']
+        text += ("\n🐢 **Eng sekin so'rov:**\n" if lang == "uz" else "\n🐢 **Самый медленный запрос:**\n")
+        text += f"• {slowest['ms']:.1f} ms - `{slowest['handler'].rsplit('.', 1)[-1]}`\n"
+        sql = slowest['sql'].replace('`', "'")
+        text += f"`{sql}`\n"
+    
+    text += (f"\n🕐 Yangilangan: {datetime.now().strftime('%H:%M:%S')}" if lang == "uz" else f"\n🕐 Обновлено: {datetime.now().strftime('%H:%M:%S')}")
+    return text
+
+@router.message(RoleFilter("admin"), Command("dbstats"))
+async def db_budget_command(message: Message):
+    """/dbstats - update'lar DB byudjeti"""
+    lang = await get_user_language(message.from_user.id) or "uz"
+    await message.answer(_db_budget_text(lang), parse_mode="Markdown")
+
+@router.callback_query(F.data == "system_db_budget")
+async def system_db_budget_handler(callback: CallbackQuery):
+    """Update'lar DB byudjeti"""
+    await callback.answer()
+    
+    lang = await get_user_language(callback.from_user.id) or "uz"
+    try:
+        await callback.message.edit_text(
+            _db_budget_text(lang),
+            reply_markup=get_system_status_keyboard(lang),
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        await callback.message.edit_text(
+            (f"❌ Xatolik yuz berdi: {str(e)}" if lang == "uz" else f"❌ Произошла ошибка: {str(e)}"),
+            reply_markup=get_system_status_keyboard(lang)
+        )
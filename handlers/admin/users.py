@@ -3,17 +3,15 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.state import State, StatesGroup
-import asyncpg
 import re
 import logging
-from config import settings
 from typing import Optional
 from filters.role_filter import RoleFilter
 from database.basic.user import (
     find_user_by_telegram_id,
-    find_user_by_phone,
     update_user_role
 )
+from database.basic.phone import find_user_by_phone
 from database.admin.users import (
     get_all_users_paginated,
     get_users_by_role_paginated,
@@ -28,6 +26,7 @@ from keyboards.admin_buttons import (
     get_admin_main_menu
 )
 from database.basic.language import get_user_language
+from database.connections import get_connection
 
 router = Router()
 router.message.filter(RoleFilter("admin")) 
@@ -129,7 +128,7 @@ async def process_user_search_for_block(message: Message, state: FSMContext):
     # Username bo'yicha qidirish
     elif search_text.startswith('@'):
         username = search_text[1:]  # @ belgisini olib tashlash
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             user_data = await conn.fetchrow(
                 "SELECT * FROM users WHERE username = $1", username
@@ -26,12 +26,13 @@ from states.call_center_states import staffConnectionOrderStates
 
 # === DB functions ===
 from database.call_center.orders import (
-    find_user_by_phone,
     staff_orders_create,
     get_or_create_tarif_by_code,
 )
+from database.basic.phone import find_user_by_phone
 from database.basic.user import ensure_user
 from database.basic.language import get_user_language  # <<< TIL
+from database.basic.region import REGION_CODE_TO_ID
 
 # === Role filter ===
 from filters.role_filter import RoleFilter
@@ -58,11 +59,6 @@ def normalize_phone(phone_raw: str) -> str | None:
 def strip_op_prefix_to_tariff(code: str | None) -> str | None:
     return "tariff_" + code[len("op_tariff_"):] if code and code.startswith("op_tariff_") else code
 
-REGION_CODE_TO_ID: dict[str, int] = {
-    "toshkent_city": 1, "toshkent_region": 2, "andijon": 3, "fergana": 4, "namangan": 5,
-    "sirdaryo": 6, "jizzax": 7, "samarkand": 8, "bukhara": 9, "navoi": 10,
-    "kashkadarya": 11, "surkhandarya": 12, "khorezm": 13, "karakalpakstan": 14,
-}
 
 def map_region_code_to_id(region_code: str | None) -> int | None:
     return REGION_CODE_TO_ID.get(region_code) if region_code else None
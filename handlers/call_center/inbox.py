@@ -11,6 +11,7 @@ from aiogram.filters import StateFilter
 from aiogram.exceptions import TelegramBadRequest
 from filters.role_filter import RoleFilter
 
+from database.basic.region import REGION_CODE_TO_ID
 from database.call_center.inbox import (
     get_operator_orders,
     get_operator_orders_count,
@@ -65,13 +66,6 @@ def region_title_from_id(rid) -> str:
         10: "Navoiy", 11: "Qashqadaryo", 12: "Surxondaryo", 13: "Xorazm", 14: "Qoraqalpog'iston"
     }
     
-    # String region kodlarini ID'ga aylantirish
-    REGION_CODE_TO_ID = {
-        "toshkent_city": 1, "toshkent_region": 2, "andijon": 3, "fergana": 4, "namangan": 5,
-        "sirdaryo": 6, "jizzax": 7, "samarkand": 8, "bukhara": 9, "navoi": 10,
-        "kashkadarya": 11, "surkhandarya": 12, "khorezm": 13, "karakalpakstan": 14,
-    }
-    
     if rid is None:
         return "-"
     
@@ -344,8 +338,9 @@ async def inbox_send_control(cq: CallbackQuery, state: FSMContext):
         )
         return
 
-    # Controller topamiz
-    controller_id = await get_any_controller_id()
+    # Controller topamiz (ariza regioni bo'yicha)
+    current = next((o for o in orders if o.get("id") == order_id), None)
+    controller_id = await get_any_controller_id(region=current.get("region") if current else None)
     if not controller_id:
         await cq.answer(
             "❌ Controller topilmadi. Admin bilan bog'laning."
@@ -444,8 +439,9 @@ async def inbox_close(cq: CallbackQuery, state: FSMContext):
         )
         return
 
-    # Controller users.id
-    controller_id = await get_any_controller_id()
+    # Controller users.id (ariza regioni bo'yicha)
+    current = next((o for o in orders if o.get("id") == order_id), None)
+    controller_id = await get_any_controller_id(region=current.get("region") if current else None)
     if not controller_id:
         await cq.answer(
             "❌ Controller topilmadi." if lang == "uz" else "❌ Контроллер не найден.",
@@ -24,6 +24,7 @@ from database.call_center.search import find_user_by_phone
 from database.basic.user import ensure_user
 from database.technician.call_center import staff_orders_create
 from database.basic.language import get_user_language  
+from database.basic.region import REGION_CODE_TO_ID
 
 # === Role filter ===
 from filters.role_filter import RoleFilter
@@ -48,11 +49,6 @@ def normalize_phone(phone_raw: str) -> str | None:
         return "+998" + digits
     return phone_raw if phone_raw.startswith("+") else ("+" + digits if digits else None)
 
-REGION_CODE_TO_ID = {
-    "toshkent_city": 1, "toshkent_region": 2, "andijon": 3, "fergana": 4, "namangan": 5,
-    "sirdaryo": 6, "jizzax": 7, "samarkand": 8, "bukhara": 9, "navoi": 10,
-    "kashkadarya": 11, "surkhandarya": 12, "khorezm": 13, "karakalpakstan": 14,
-}
 
 def map_region_code_to_id(region_code: str | None) -> int | None:
     if not region_code:
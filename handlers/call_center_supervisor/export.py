@@ -120,10 +120,10 @@ async def export_format_handler(cb: CallbackQuery, state: FSMContext):
                     if 'total_orders' in item:
                         stats_dict = item
                         break
-            file_content = export_utils.generate_statistics_export(stats_dict, format_type, f"Call Center Supervisor {export_type.title()}")
+            file_content = await export_utils.render_statistics_export(stats_dict, format_type, f"Call Center Supervisor {export_type.title()}")
         else:
             # For other types, use generate_orders_export
-            file_content = export_utils.generate_orders_export(data_rows, format_type, f"Call Center Supervisor {export_type.title()}")
+            file_content = await export_utils.render_orders_export(data_rows, format_type, f"Call Center Supervisor {export_type.title()}")
         
         if file_content:
             file = BufferedInputFile(file_content, filename=filename)
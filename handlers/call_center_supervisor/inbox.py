@@ -6,23 +6,24 @@ from typing import Optional, Dict, Any
 import html
 from datetime import datetime
 import logging
-import asyncpg
-from config import settings
 
 from filters.role_filter import RoleFilter
 from database.basic.language import get_user_language
+from database.basic.region import REGION_CODE_TO_ID
 from database.call_center_supervisor.inbox import (
     ccs_count_technician_orders,
-    ccs_fetch_technician_orders,
+    ccs_fetch_technician_card,
     ccs_count_staff_orders,
-    ccs_fetch_staff_orders,
+    ccs_fetch_staff_card,
     ccs_count_operator_orders,
-    ccs_fetch_operator_orders,
+    ccs_fetch_operator_card,
+    ccs_invalidate_inbox_cache,
     ccs_send_technician_to_operator,
     ccs_send_staff_to_operator,
     ccs_complete_technician_order,
     ccs_complete_staff_order
 )
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -138,11 +139,6 @@ async def _send_media_strict(target, file_id: str, caption: str, kb: InlineKeybo
 # =========================================================
 # Region mapping (id -> human title)
 # =========================================================
-REGION_CODE_TO_ID = {
-    "toshkent_city": 1, "toshkent_region": 2, "andijon": 3, "fergana": 4, "namangan": 5,
-    "sirdaryo": 6, "jizzax": 7, "samarkand": 8, "bukhara": 9, "navoi": 10,
-    "kashkadarya": 11, "surkhandarya": 12, "khorezm": 13, "karakalpakstan": 14,
-}
 REGION_TITLES = {
     "toshkent_city": "Toshkent shahri",
     "toshkent_region": "Toshkent viloyati",
@@ -189,6 +185,23 @@ def fmt_dt(dt) -> str:
 # =========================================================
 # Main Inbox Handler - Category Selection
 # =========================================================
+
+def _parse_nav(data: str) -> tuple[Optional[int], int]:
+    """Navigatsiya callback'i: "<prefix>:<order_id>:<idx>" -> (order_id, idx)"""
+    parts = data.split(":")
+    if len(parts) < 3:
+        # Eski formatdagi tugma (faqat idx) - navbat boshidan
+        return None, 0
+    return int(parts[1]), int(parts[2])
+
+def _nav_idx(row: dict, idx: int, total: int) -> int:
+    """Ko'rsatiladigan pozitsiya: chegaralarda kartaning qo'shnilariga moslanadi"""
+    if row.get("prev_id") is None:
+        return 0
+    if row.get("next_id") is None:
+        return max(0, total - 1)
+    return max(1, min(idx, total - 2))
+
 @router.message(F.text.in_(["📥 Inbox", "📥 Входящие"]))
 async def ccs_inbox(message: Message):
     """CCS inbox main handler - shows category selection"""
@@ -256,24 +269,20 @@ async def show_technician_orders(callback: CallbackQuery):
     """Show technician orders from controller"""
     await _show_technician_item_with_media(callback, idx=0, user_id=callback.from_user.id)
 
-async def _show_technician_item_with_media(target, idx: int, user_id: int):
+async def _show_technician_item_with_media(target, idx: int, user_id: int, order_id: Optional[int] = None):
     """Show technician order item with media support"""
     lang = await get_user_language(user_id) or "uz"
     
-    total = await ccs_count_technician_orders()
-    if total == 0:
+    row = await ccs_fetch_technician_card(order_id)
+    total = await ccs_count_technician_orders() if row else 0
+    if not row or total == 0:
         text = "📭 Texnik arizalar yo'q." if lang == "uz" else "📭 Технических заявок нет."
         if isinstance(target, Message):
             return await target.answer(text, parse_mode="HTML")
         return await target.message.edit_text(text, parse_mode="HTML")
     
-    idx = max(0, min(idx, total - 1))
-    row = await ccs_fetch_technician_orders(offset=idx, limit=1)
-    if not row:
-        idx = max(0, total - 1)
-        row = await ccs_fetch_technician_orders(offset=idx, limit=1)
-    
-    kb = _tech_kb(idx, total, row["id"], lang)
+    idx = _nav_idx(row, idx, total)
+    kb = _tech_kb(idx, total, row, lang)
     text = _format_technician_card(row, idx, total, lang)
     
     # Check if there's media to display
@@ -505,11 +514,11 @@ async def _show_technician_item_with_media(target, idx: int, user_id: int):
                 # If edit fails, send new message
                 return await target.message.answer(text, parse_mode="HTML", reply_markup=kb)
 
-def _tech_kb(idx: int, total: int, order_id: int, lang: str = "uz") -> InlineKeyboardMarkup:
+def _tech_kb(idx: int, total: int, row: dict, lang: str = "uz") -> InlineKeyboardMarkup:
     """Technician orders keyboard"""
-    prev_cb = f"ccs_tech_prev:{idx}"
-    next_cb = f"ccs_tech_next:{idx}"
-    send_to_operator_cb = f"ccs_tech_send_operator:{order_id}:{idx}"
+    prev_cb = f"ccs_tech_prev:{row.get('prev_id')}:{idx - 1}"
+    next_cb = f"ccs_tech_next:{row.get('next_id')}:{idx + 1}"
+    send_to_operator_cb = f"ccs_tech_send_operator:{row['id']}:{idx}"
     back_cb = "ccs_back_to_categories"
 
     texts = {
@@ -535,11 +544,11 @@ def _tech_kb(idx: int, total: int, order_id: int, lang: str = "uz") -> InlineKey
         pagination_row = []
         
         # Orqaga tugmasi - faqat boshida bo'lmasa
-        if idx > 0:
+        if row.get("prev_id") is not None:
             pagination_row.append(InlineKeyboardButton(text=t["back"], callback_data=prev_cb))
         
         # Oldinga tugmasi - faqat oxirida bo'lmasa
-        if idx < total - 1:
+        if row.get("next_id") is not None:
             pagination_row.append(InlineKeyboardButton(text=t["next"], callback_data=next_cb))
         
         if pagination_row:  # Agar kamida bitta tugma bo'lsa
@@ -609,14 +618,14 @@ def _format_technician_card(row: dict, idx: int, total: int, lang: str = "uz") -
 
 @router.callback_query(F.data.startswith("ccs_tech_prev:"))
 async def ccs_tech_prev(cb: CallbackQuery):
-    cur = int(cb.data.split(":")[1])
-    await _show_technician_item_with_media(cb, idx=cur - 1, user_id=cb.from_user.id)
+    order_id, idx = _parse_nav(cb.data)
+    await _show_technician_item_with_media(cb, idx=idx, user_id=cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_tech_next:"))
 async def ccs_tech_next(cb: CallbackQuery):
-    cur = int(cb.data.split(":")[1])
-    await _show_technician_item_with_media(cb, idx=cur + 1, user_id=cb.from_user.id)
+    order_id, idx = _parse_nav(cb.data)
+    await _show_technician_item_with_media(cb, idx=idx, user_id=cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 
@@ -630,10 +639,7 @@ async def ccs_tech_send_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     # Operatorlarni olish
-    import asyncpg
-    from config import settings
-    
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         operators = await conn.fetch("SELECT id, full_name, telegram_id FROM users WHERE role = 'callcenter_operator'")
         
@@ -700,20 +706,9 @@ async def ccs_tech_select_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     try:
-        # Ariza ma'lumotlarini olish
-        row = await ccs_fetch_technician_orders(offset=cur, limit=1)
-        if not row:
-            await cb.answer(
-                ("❌ Ariza topilmadi!" if lang == "uz" else "❌ Заявка не найдена!"), 
-                show_alert=True
-            )
-            return
-        
+        # Ariza navbatda ekanligi quyidagi UPDATE shartida tekshiriladi
         # Operator ma'lumotlarini olish
-        import asyncpg
-        from config import settings
-        
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             operator = await conn.fetchrow("SELECT id, full_name, telegram_id, language FROM users WHERE id = $1", operator_id)
             if not operator:
@@ -738,6 +733,8 @@ async def ccs_tech_select_operator(cb: CallbackQuery):
                 )
                 return
             
+            ccs_invalidate_inbox_cache()
+            
             # Sender ID ni telegram_id dan internal user ID ga o'tkazish
             sender_user = await conn.fetchrow("SELECT id FROM users WHERE telegram_id = $1", cb.from_user.id)
             if not sender_user:
@@ -832,7 +829,7 @@ async def ccs_tech_back_to_item(cb: CallbackQuery):
     order_id = int(order_id)
     cur = int(cur)
     
-    await _show_technician_item(cb, idx=cur, user_id=cb.from_user.id)
+    await _show_technician_item_with_media(cb, idx=cur, user_id=cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 
@@ -844,24 +841,20 @@ async def show_staff_orders(callback: CallbackQuery):
     """Show staff orders from operators"""
     await _show_staff_item(callback, idx=0, user_id=callback.from_user.id)
 
-async def _show_staff_item(target, idx: int, user_id: int):
+async def _show_staff_item(target, idx: int, user_id: int, order_id: Optional[int] = None):
     """Show staff order item"""
     lang = await get_user_language(user_id) or "uz"
     
-    total = await ccs_count_staff_orders()
-    if total == 0:
+    row = await ccs_fetch_staff_card(order_id)
+    total = await ccs_count_staff_orders() if row else 0
+    if not row or total == 0:
         text = "📭 Operator arizalari yo'q." if lang == "uz" else "📭 Заявок операторов нет."
         if isinstance(target, Message):
             return await target.answer(text, parse_mode="HTML")
         return await target.message.edit_text(text, parse_mode="HTML")
     
-    idx = max(0, min(idx, total - 1))
-    row = await ccs_fetch_staff_orders(offset=idx, limit=1)
-    if not row:
-        idx = max(0, total - 1)
-        row = await ccs_fetch_staff_orders(offset=idx, limit=1)
-    
-    kb = _staff_kb(idx, total, row["id"], lang)
+    idx = _nav_idx(row, idx, total)
+    kb = _staff_kb(idx, total, row, lang)
     text = _format_staff_card(row, idx, total, lang)
     
     if isinstance(target, Message):
@@ -869,11 +862,11 @@ async def _show_staff_item(target, idx: int, user_id: int):
     else:
         return await target.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
 
-def _staff_kb(idx: int, total: int, order_id: int, lang: str = "uz") -> InlineKeyboardMarkup:
+def _staff_kb(idx: int, total: int, row: dict, lang: str = "uz") -> InlineKeyboardMarkup:
     """Staff orders keyboard"""
-    prev_cb = f"ccs_staff_prev:{idx}"
-    next_cb = f"ccs_staff_next:{idx}"
-    send_to_operator_cb = f"ccs_staff_send_operator:{order_id}:{idx}"
+    prev_cb = f"ccs_staff_prev:{row.get('prev_id')}:{idx - 1}"
+    next_cb = f"ccs_staff_next:{row.get('next_id')}:{idx + 1}"
+    send_to_operator_cb = f"ccs_staff_send_operator:{row['id']}:{idx}"
     back_cb = "ccs_back_to_categories"
 
     texts = {
@@ -899,11 +892,11 @@ def _staff_kb(idx: int, total: int, order_id: int, lang: str = "uz") -> InlineKe
         pagination_row = []
         
         # Orqaga tugmasi - faqat boshida bo'lmasa
-        if idx > 0:
+        if row.get("prev_id") is not None:
             pagination_row.append(InlineKeyboardButton(text=t["back"], callback_data=prev_cb))
         
         # Oldinga tugmasi - faqat oxirida bo'lmasa
-        if idx < total - 1:
+        if row.get("next_id") is not None:
             pagination_row.append(InlineKeyboardButton(text=t["next"], callback_data=next_cb))
         
         if pagination_row:  # Agar kamida bitta tugma bo'lsa
@@ -992,14 +985,14 @@ def _format_staff_card(row: dict, idx: int, total: int, lang: str = "uz") -> str
 
 @router.callback_query(F.data.startswith("ccs_staff_prev:"))
 async def ccs_staff_prev(cb: CallbackQuery):
-    cur = int(cb.data.split(":")[1])
-    await _show_staff_item(cb, idx=cur - 1, user_id=cb.from_user.id)
+    order_id, idx = _parse_nav(cb.data)
+    await _show_staff_item(cb, idx=idx, user_id=cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_staff_next:"))
 async def ccs_staff_next(cb: CallbackQuery):
-    cur = int(cb.data.split(":")[1])
-    await _show_staff_item(cb, idx=cur + 1, user_id=cb.from_user.id)
+    order_id, idx = _parse_nav(cb.data)
+    await _show_staff_item(cb, idx=idx, user_id=cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_staff_send_operator:"))
@@ -1012,10 +1005,7 @@ async def ccs_staff_send_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     # Operatorlarni olish
-    import asyncpg
-    from config import settings
-    
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         operators = await conn.fetch("SELECT id, full_name, telegram_id FROM users WHERE role = 'callcenter_operator'")
         
@@ -1082,20 +1072,9 @@ async def ccs_staff_select_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     try:
-        # Ariza ma'lumotlarini olish
-        row = await ccs_fetch_staff_orders(offset=cur, limit=1)
-        if not row:
-            await cb.answer(
-                ("❌ Ariza topilmadi!" if lang == "uz" else "❌ Заявка не найдена!"), 
-                show_alert=True
-            )
-            return
-        
+        # Ariza navbatda ekanligi quyidagi UPDATE shartida tekshiriladi
         # Operator ma'lumotlarini olish
-        import asyncpg
-        from config import settings
-        
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             operator = await conn.fetchrow("SELECT id, full_name, telegram_id, language FROM users WHERE id = $1", operator_id)
             if not operator:
@@ -1120,6 +1099,8 @@ async def ccs_staff_select_operator(cb: CallbackQuery):
                 )
                 return
             
+            ccs_invalidate_inbox_cache()
+            
             # Sender ID ni telegram_id dan internal user ID ga o'tkazish
             sender_user = await conn.fetchrow("SELECT id FROM users WHERE telegram_id = $1", cb.from_user.id)
             if not sender_user:
@@ -1214,7 +1195,7 @@ async def ccs_staff_back_to_item(cb: CallbackQuery):
     order_id = int(order_id)
     cur = int(cur)
     
-    await _show_staff_item(cb, idx=cur, user_id=cb.from_user.id)
+    await _show_staff_item(cb, idx=cur, user_id=cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 
@@ -1228,12 +1209,12 @@ async def show_operator_orders(callback: CallbackQuery):
     """Call Center operator arizalarini ko'rsatish"""
     await _show_operator_item(callback, idx=0, user_id=callback.from_user.id)
 
-async def _show_operator_item(target, idx: int, user_id: int):
+async def _show_operator_item(target, idx: int, user_id: int, order_id: Optional[int] = None):
     """Operator arizalarini ko'rsatish"""
     lang = await get_user_language(user_id) or "uz"
     
     try:
-        row = await ccs_fetch_operator_orders(offset=idx, limit=1)
+        row = await ccs_fetch_operator_card(order_id)
         if not row:
             text = (
                 "📞 <b>Call Center operator arizalari</b>\n\n"
@@ -1290,6 +1271,7 @@ async def _show_operator_item(target, idx: int, user_id: int):
         
         # Navigation keyboard
         total_count = await ccs_count_operator_orders()
+        idx = _nav_idx(row, idx, total_count)
         
         # Paginatsiya tugmalari mantiqiy tarzda ko'rinadi
         keyboard_rows = []
@@ -1298,15 +1280,15 @@ async def _show_operator_item(target, idx: int, user_id: int):
             pagination_row = []
             
             # Orqaga tugmasi - faqat boshida bo'lmasa
-            if idx > 0:
-                pagination_row.append(InlineKeyboardButton(text="⬅️", callback_data=f"ccs_operator_prev:{idx}"))
+            if row.get("prev_id") is not None:
+                pagination_row.append(InlineKeyboardButton(text="⬅️", callback_data=f"ccs_operator_prev:{row['prev_id']}:{idx - 1}"))
             
             # O'rta qismda raqam ko'rsatish
             pagination_row.append(InlineKeyboardButton(text=f"{idx + 1}/{total_count}", callback_data="noop"))
             
             # Oldinga tugmasi - faqat oxirida bo'lmasa
-            if idx < total_count - 1:
-                pagination_row.append(InlineKeyboardButton(text="➡️", callback_data=f"ccs_operator_next:{idx}"))
+            if row.get("next_id") is not None:
+                pagination_row.append(InlineKeyboardButton(text="➡️", callback_data=f"ccs_operator_next:{row['next_id']}:{idx + 1}"))
             
             if pagination_row:  # Agar kamida bitta tugma bo'lsa
                 keyboard_rows.append(pagination_row)
@@ -1338,17 +1320,15 @@ async def _show_operator_item(target, idx: int, user_id: int):
 @router.callback_query(F.data.startswith("ccs_operator_prev:"))
 async def ccs_operator_prev(cb: CallbackQuery):
     """Operator arizalarida oldingi"""
-    _, idx = cb.data.split(":")
-    idx = max(0, int(idx) - 1)
-    await _show_operator_item(cb, idx, cb.from_user.id)
+    order_id, idx = _parse_nav(cb.data)
+    await _show_operator_item(cb, idx, cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_operator_next:"))
 async def ccs_operator_next(cb: CallbackQuery):
     """Operator arizalarida keyingi"""
-    _, idx = cb.data.split(":")
-    idx = int(idx) + 1
-    await _show_operator_item(cb, idx, cb.from_user.id)
+    order_id, idx = _parse_nav(cb.data)
+    await _show_operator_item(cb, idx, cb.from_user.id, order_id=order_id)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_operator_send_controller:"))
@@ -1361,10 +1341,12 @@ async def ccs_operator_send_controller(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     try:
-        import asyncpg
-        from config import settings
+        # Guruh xabari uchun ariza ma'lumotlari (yuborishdan oldin, kursor bo'yicha)
+        row = await ccs_fetch_operator_card(order_id)
+        if row and row["id"] != order_id:
+            row = None
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             # Ariza holatini yangilash
             result = await conn.execute("""
@@ -1381,12 +1363,13 @@ async def ccs_operator_send_controller(cb: CallbackQuery):
                 )
                 return
             
+            ccs_invalidate_inbox_cache()
+            
             # Guruhga xabar yuborish
             try:
                 from loader import bot
                 from utils.notification_service import send_group_notification_for_staff_order
                 
-                row = await ccs_fetch_operator_orders(offset=idx, limit=1)
                 if row:
                     await send_group_notification_for_staff_order(
                         bot=bot,
@@ -1409,8 +1392,8 @@ async def ccs_operator_send_controller(cb: CallbackQuery):
                 show_alert=True
             )
             
-            # Keyingi arizaga o'tish
-            await _show_operator_item(cb, idx, cb.from_user.id)
+            # Keyingi arizaga o'tish (yuborilgan ariza kursori undan keyingisini beradi)
+            await _show_operator_item(cb, idx, cb.from_user.id, order_id=order_id)
             
         finally:
             await conn.close()
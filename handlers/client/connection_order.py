@@ -1,7 +1,6 @@
 from datetime import datetime
 import logging
 import asyncio
-import asyncpg
 from aiogram import F, Router
 from aiogram.types import (
     Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup,
@@ -26,6 +25,7 @@ from database.basic.tariff import get_or_create_tarif_by_code
 from database.basic.language import get_user_language
 from database.client.orders import create_connection_order
 from loader import bot
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -345,7 +345,7 @@ async def confirm_connection_order_client(callback: CallbackQuery, state: FSMCon
             business_type=business_type
         )
 
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             result = await conn.fetchrow(
                 "SELECT application_number FROM connection_orders WHERE id = $1", 
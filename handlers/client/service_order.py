@@ -21,84 +21,18 @@ from states.client_states import ServiceOrderStates
 from database.basic.user import get_user_by_telegram_id, get_user_phone_by_telegram_id, update_user_phone_by_telegram_id
 from database.basic.language import get_user_language
 from database.client.orders import create_service_order
-from utils.directory_utils import setup_media_structure
 from config import settings
+from utils.outbound_queue import enqueue_message
+from utils.media_ingest import enqueue_media
 from loader import bot
-import os
 import asyncio
-import asyncpg
 from datetime import datetime
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 # ---------- Media fayllarini saqlash funksiyasi ----------
-async def save_service_media_file(file_id: str, media_type: str, user_id: int, order_id: int) -> str:
-    """Media faylini yuklab olish va saqlash"""
-    try:
-        # Media faylini olish
-        if media_type == 'photo':
-            file = await bot.get_file(file_id)
-        elif media_type == 'video':
-            file = await bot.get_file(file_id)
-        else:
-            return None
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_extension = 'jpg' if media_type == 'photo' else 'mp4'
-        file_name = f"technician_{order_id}_{user_id}_{timestamp}.{file_extension}"
-
-        setup_media_structure(settings.MEDIA_ROOT)
-
-        current_year = datetime.now().strftime('%Y')
-        current_month = datetime.now().strftime('%m')
-
-        media_dir = os.path.join(settings.MEDIA_ROOT, current_year, current_month, 'orders', 'attachments')
-        os.makedirs(media_dir, exist_ok=True)
-
-        file_path = os.path.join(media_dir, file_name)
-        await bot.download_file(file.file_path, file_path)
-
-        # Media faylini database ga saqlash
-        try:
-            # Fayl hajmini olish
-            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-
-            # Media faylini database ga saqlash (asyncpg bilan)
-            conn = await asyncpg.connect(settings.DB_URL)
-            try:
-                await conn.execute("""
-                    INSERT INTO media_files (
-                        file_path, file_type, file_size, original_name, mime_type,
-                        category, related_table, related_id, uploaded_by, is_active
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                """, 
-                    file_path,
-                    media_type,
-                    file_size,
-                    file_name,
-                    f'image/jpeg' if media_type == 'photo' else 'video/mp4',
-                    'service_attachment',
-                    'technician_orders',
-                    order_id,
-                    user_id,
-                    True
-                )
-
-                logger.info(f"Media file saved to database: {file_path}")
-
-            finally:
-                await conn.close()
-
-        except Exception as e:
-            logger.error(f"Could not save media file to database: {e}")
-
-        return file_path
-
-    except Exception as e:
-        logger.error(f"Error saving media file: {e}")
-        return None
-
 # ---------- Region nomlarini normallashtirish ----------
 REGION_CODE_TO_UZ: dict = {
     "toshkent_city": "Toshkent shahri",
@@ -514,7 +448,7 @@ async def finish_service_order(callback_or_message, state: FSMContext, lang: str
             business_type
         )
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             app_number_result = await conn.fetchrow(
                 "SELECT application_number FROM technician_orders WHERE id = $1",
@@ -541,16 +475,21 @@ async def finish_service_order(callback_or_message, state: FSMContext, lang: str
             await conn.close()
 
         if data.get('media_id') and data.get('media_type') and user.get('id') != 0:
-            media_path = await save_service_media_file(
-                data['media_id'],
-                data['media_type'],
-                user.get('id'),
-                request_id
-            )
-            if media_path:
-                logger.info(f"Media file saved: {media_path}")
-            else:
-                logger.warning(f"Failed to save media file for order {request_id}")
+            # Fayl fonda yuklab olinadi (utils/media_ingest.py) - ariza yaratish kutmaydi
+            try:
+                job_id = await enqueue_media(
+                    data['media_id'],
+                    data['media_type'],
+                    'technician_orders',
+                    request_id,
+                    uploaded_by=user.get('id')
+                )
+                if job_id:
+                    logger.info(f"Media ingest queued for order {request_id} (job {job_id})")
+                else:
+                    logger.info(f"Media for order {request_id} was not queued (type: {data['media_type']})")
+            except Exception as e:
+                logger.error(f"Failed to queue media file for order {request_id}: {e}")
 
         # Guruhga xabar (hozir UZda; xohlasangiz ru versiyasini ham shunday qo'shamiz)
         group_notification_sent = False
@@ -590,37 +529,27 @@ async def finish_service_order(callback_or_message, state: FSMContext, lang: str
                     f"{'='*30}"
                 )
 
-                if data.get('media_id'):
-                    if data.get('media_type') == 'photo':
-                        await bot.send_photo(
-                            chat_id=settings.ZAYAVKA_GROUP_ID,
-                            photo=data['media_id'],
-                            caption=group_msg,
-                            parse_mode='HTML'
-                        )
-                    elif data.get('media_type') == 'video':
-                        await bot.send_video(
-                            chat_id=settings.ZAYAVKA_GROUP_ID,
-                            video=data['media_id'],
-                            caption=group_msg,
-                            parse_mode='HTML'
-                        )
-                else:
-                    await bot.send_message(
-                        chat_id=settings.ZAYAVKA_GROUP_ID,
-                        text=group_msg,
+                # Navbatga qo'yiladi - fon dispatcher'i limitlarga rioya qilib yuboradi
+                group_id = settings.ZAYAVKA_GROUP_ID
+                if data.get('media_id') and data.get('media_type') in ('photo', 'video'):
+                    await enqueue_message(
+                        group_id, data['media_type'],
+                        **{data['media_type']: data['media_id']},
+                        caption=group_msg,
                         parse_mode='HTML'
                     )
+                elif not data.get('media_id'):
+                    await enqueue_message(group_id, 'message', text=group_msg, parse_mode='HTML')
 
                 if geo:
-                    await bot.send_location(
-                        settings.ZAYAVKA_GROUP_ID,
+                    await enqueue_message(
+                        group_id, 'location',
                         latitude=geo.latitude,
                         longitude=geo.longitude
                     )
                 
                 group_notification_sent = True
-                logger.info(f"Group notification sent successfully for service order {application_number}")
+                logger.info(f"Group notification queued for service order {application_number}")
 
             except Exception as group_error:
                 logger.error(f"Group notification error: {group_error}")
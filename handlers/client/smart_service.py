@@ -18,10 +18,10 @@ from database.basic.user import get_user_by_telegram_id
 from database.basic.language import get_user_language
 from database.client.orders import create_smart_service_order
 from config import settings
-from loader import bot
-import asyncpg
+from utils.outbound_queue import enqueue_message
 
 import logging
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -795,7 +795,7 @@ async def finish_smart_service_order(callback_or_message, state: FSMContext):
         order_id = await create_smart_service_order(order_data)
 
         if order_id:
-            conn = await asyncpg.connect(settings.DB_URL)
+            conn = await get_connection()
             try:
                 app_number_result = await conn.fetchrow(
                     "SELECT application_number FROM smart_service_orders WHERE id = $1",
@@ -835,13 +835,13 @@ async def finish_smart_service_order(callback_or_message, state: FSMContext):
                     )
                     
                     logger.info(f"Sending smart service group notification for order {application_number}")
-                    await bot.send_message(
-                        chat_id=settings.ZAYAVKA_GROUP_ID,
+                    await enqueue_message(
+                        settings.ZAYAVKA_GROUP_ID, 'message',
                         text=group_msg,
                         parse_mode='HTML'
                     )
                     group_notification_sent = True
-                    logger.info(f"Smart service group notification sent successfully for order {application_number}")
+                    logger.info(f"Smart service group notification queued for order {application_number}")
                     
                 except Exception as group_error:
                     logger.error(f"Smart service group notification error: {group_error}")
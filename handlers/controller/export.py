@@ -436,7 +436,7 @@ async def generate_excel(data: list, headers: list, title: str, filename: str) -
             dict_data.append(row_dict)
     
     # Use ExportUtils to generate Excel
-    output = ExportUtils.generate_excel(dict_data, title[:30], title)
+    output = await ExportUtils.render_excel(dict_data, title[:30], title)
     
     return BufferedInputFile(
         file=output.getvalue(),
@@ -445,74 +445,25 @@ async def generate_excel(data: list, headers: list, title: str, filename: str) -
 
 async def generate_csv(data: list, headers: list, title: str, filename: str) -> BufferedInputFile:
     """Generate CSV file from data"""
-    import io
-    import csv
-    
     # Convert data to list of dicts with only the specified headers
     dict_data = _rows_to_dicts(data, headers)
     
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=headers)
-    
-    # Write headers
-    writer.writeheader()
-    
-    # Write data rows
-    for row in dict_data:
-        writer.writerow(row)
+    content = await ExportUtils.render_table_csv(dict_data, headers)
     
     return BufferedInputFile(
-        file=output.getvalue(),
+        file=content,
         filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
     )
 
 async def generate_word(data: list, headers: list, title: str, filename: str) -> BufferedInputFile:
     """Generate Word file from data"""
-    from docx import Document
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    import io
-    
     # Convert data to list of dicts with only the specified headers
     dict_data = _rows_to_dicts(data, headers)
     
-    doc = Document()
-    
-    # Add title
-    title_para = doc.add_paragraph()
-    title_run = title_para.add_run(title)
-    title_run.bold = True
-    title_run.font.size = Pt(14)
-    title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add date
-    date_para = doc.add_paragraph()
-    date_run = date_para.add_run(f"Sana: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    date_run.italic = True
-    date_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    
-    # Add table
-    table = doc.add_table(rows=1, cols=len(headers))
-    table.style = 'Table Grid'
-    
-    # Add headers
-    hdr_cells = table.rows[0].cells
-    for i, header in enumerate(headers):
-        hdr_cells[i].text = header
-    
-    # Add data rows
-    for row in dict_data:
-        row_cells = table.add_row().cells
-        for i, header in enumerate(headers):
-            row_cells[i].text = str(row.get(header, ""))
-    
-    # Save to bytes
-    output = io.BytesIO()
-    doc.save(output)
-    output.seek(0)
+    content = await ExportUtils.render_table_word(dict_data, headers, title)
     
     return BufferedInputFile(
-        file=output.read(),
+        file=content,
         filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.docx"
     )
 
@@ -522,7 +473,7 @@ async def generate_pdf(data: list, headers: list, title: str, filename: str) ->
     dict_data = _rows_to_dicts(data, headers)
     
     # Use ExportUtils to generate PDF
-    output = ExportUtils.generate_pdf(dict_data, title)
+    output = await ExportUtils.render_pdf(dict_data, title)
     
     return BufferedInputFile(
         file=output.getvalue(),
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 
 from filters.role_filter import RoleFilter
 from database.controller.queries import fetch_controller_staff_activity_with_time_filter
-from database.basic.user import get_user_by_telegram_id
+from database.basic.language import get_user_language
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -190,10 +190,8 @@ def _build_report(lang: str, items: list, period: str) -> str:
     return text
 
 async def _get_lang(user_tg_id: int) -> str:
-    """User tilini olish"""
-    user = await get_user_by_telegram_id(user_tg_id)
-    lng = (user or {}).get("language")
-    return _norm_lang(lng)
+    """User tilini olish (umumiy til keshidan)"""
+    return _norm_lang(await get_user_language(user_tg_id))
 
 # ---------------- ENTRY ----------------
 
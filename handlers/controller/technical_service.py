@@ -30,7 +30,8 @@ from database.controller.orders import (
 from database.basic.user import ensure_user   # controller userini ensure
 
 # 🔑 tilni olish
-from database.basic.user import get_user_by_telegram_id
+from database.basic.language import get_user_language
+from database.basic.region import REGION_CODE_TO_ID
 
 # === Role filter ===
 from filters.role_filter import RoleFilter
@@ -114,19 +115,12 @@ def normalize_phone(phone_raw: str) -> str | None:
     if len(digits) == 9: return "+998" + digits
     return phone_raw if phone_raw.startswith("+") else ("+" + digits if digits else None)
 
-REGION_CODE_TO_ID = {
-    "toshkent_city": 1, "toshkent_region": 2, "andijon": 3, "fergana": 4, "namangan": 5,
-    "sirdaryo": 6, "jizzax": 7, "samarkand": 8, "bukhara": 9, "navoi": 10,
-    "kashkadarya": 11, "surkhandarya": 12, "khorezm": 13, "karakalpakstan": 14,
-}
-
 def map_region_code_to_id(region_code: str | None) -> int | None:
     if not region_code: return None
     return REGION_CODE_TO_ID.get(region_code)
 
 async def _get_lang_from_db(user_tg_id: int) -> str:
-    user = await get_user_by_telegram_id(user_tg_id)
-    return normalize_lang((user or {}).get("language"))
+    return normalize_lang(await get_user_language(user_tg_id))
 
 async def _lang(state: FSMContext, user_tg_id: int) -> str:
     data = await state.get_data()
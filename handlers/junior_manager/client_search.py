@@ -10,7 +10,8 @@ import re
 import logging
 
 from filters.role_filter import RoleFilter
-from database.basic.user import get_user_by_telegram_id, find_user_by_phone
+from database.basic.user import get_user_by_telegram_id
+from database.basic.phone import find_user_by_phone
 from database.junior_manager.orders import (
     get_client_order_history,
     get_client_order_count,
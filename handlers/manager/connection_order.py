@@ -30,8 +30,10 @@ from database.manager.orders import (
     staff_orders_create,
     ensure_user_manager,
 )
-from database.basic.user import get_user_by_telegram_id, find_user_by_phone
+from database.basic.user import get_user_by_telegram_id
+from database.basic.phone import find_user_by_phone
 from database.basic.tariff import get_or_create_tarif_by_code
+from database.basic.region import REGION_CODE_TO_ID
 
 # === Role filter ===
 from filters.role_filter import RoleFilter
@@ -78,23 +80,6 @@ def conn_type_display(lang: str, ctype: str | None) -> str:
         return "Физическое лицо" if key == "b2c" else "Юридическое лицо"
     return "Jismoniy shaxs" if key == "b2c" else "Yuridik shaxs"
 
-REGION_CODE_TO_ID: dict[str, int] = {
-    "toshkent_city": 1,
-    "toshkent_region": 2,
-    "andijon": 3,
-    "fergana": 4,
-    "namangan": 5,
-    "sirdaryo": 6,
-    "jizzax": 7,
-    "samarkand": 8,
-    "bukhara": 9,
-    "navoi": 10,
-    "kashkadarya": 11,
-    "surkhandarya": 12,
-    "khorezm": 13,
-    "karakalpakstan": 14,
-}
-
 REGION_CODE_TO_NAME = {
     "uz": {
         "toshkent_city": "Toshkent shahri",
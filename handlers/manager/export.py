@@ -255,25 +255,25 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
             if format_type == "csv":
                 if not raw_data:
                     raise ValueError("No data to export")
-                file_data = export_utils.to_csv(raw_data, headers=headers)
+                file_data = await export_utils.render_csv(raw_data, headers=headers)
                 file_to_send = BufferedInputFile(
                     file_data.getvalue(), 
                     filename=f"export_{int(datetime.now().timestamp())}.csv"
                 )
             elif format_type == "xlsx":
-                file_data = export_utils.generate_excel(raw_data, sheet_name=export_type, title=title)
+                file_data = await export_utils.render_excel(raw_data, sheet_name=export_type, title=title)
                 file_to_send = BufferedInputFile(
                     file_data.getvalue(), 
                     filename=f"export_{int(datetime.now().timestamp())}.xlsx"
                 )
             elif format_type == "docx":
-                file_data = export_utils.generate_word(raw_data, title=title)
+                file_data = await export_utils.render_word(raw_data, title=title)
                 file_to_send = BufferedInputFile(
                     file_data.getvalue(), 
                     filename=f"export_{int(datetime.now().timestamp())}.docx"
                 )
             elif format_type == "pdf":
-                file_data = export_utils.generate_pdf(raw_data, title=title)
+                file_data = await export_utils.render_pdf(raw_data, title=title)
                 file_to_send = BufferedInputFile(
                     file_data.getvalue(), 
                     filename=f"export_{int(datetime.now().timestamp())}.pdf"
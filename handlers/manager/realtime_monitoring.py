@@ -20,7 +20,7 @@ from database.manager.monitoring import (
     get_workflow_history,  # NEW
 )
 # 🔑 Tilni DB'dan olish uchun:
-from database.basic.user import get_user_by_telegram_id
+from database.basic.language import get_user_language
 
 router = Router()
 router.message.filter(RoleFilter("manager"))
@@ -136,8 +136,7 @@ def _human_duration(delta: timedelta, lang: str) -> str:
 
 # ---- Lang helpers ----
 async def _get_lang_from_db(user_tg_id: int) -> str:
-    user = await get_user_by_telegram_id(user_tg_id)
-    return normalize_lang((user or {}).get("language"))
+    return normalize_lang(await get_user_language(user_tg_id))
 
 async def _lang(state: FSMContext, user_tg_id: int) -> str:
     data = await state.get_data()
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 
 from filters.role_filter import RoleFilter
 from database.manager.orders import fetch_staff_activity_with_time_filter
-from database.basic.user import get_user_by_telegram_id
+from database.basic.language import get_user_language
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -194,10 +194,8 @@ def _build_report(lang: str, items: list[dict], period: str = "total") -> str:
     return "\n".join(lines)
 
 async def _get_lang(user_tg_id: int) -> str:
-    # users jadvalidan language olib, 'uz'/'ru' ga normalize qilamiz
-    user = await get_user_by_telegram_id(user_tg_id)
-    lng = (user or {}).get("language")
-    return _norm_lang(lng)
+    # umumiy til keshidan olib, 'uz'/'ru' ga normalize qilamiz
+    return _norm_lang(await get_user_language(user_tg_id))
 
 # ---------------- ENTRY ----------------
 
@@ -28,7 +28,9 @@ from database.manager.orders import (
     staff_orders_technician_create,
     ensure_user_manager,
 )
-from database.basic.user import get_user_by_telegram_id, find_user_by_phone
+from database.basic.user import get_user_by_telegram_id
+from database.basic.phone import find_user_by_phone
+from database.basic.region import REGION_CODE_TO_ID
 
 # === Role filter ===
 from filters.role_filter import RoleFilter
@@ -68,23 +70,6 @@ def normalize_lang(v: str | None) -> str:
         return "uz"
     return "uz"
 
-REGION_CODE_TO_ID: dict[str, int] = {
-    "toshkent_city": 1,
-    "toshkent_region": 2,
-    "andijon": 3,
-    "fergana": 4,
-    "namangan": 5,
-    "sirdaryo": 6,
-    "jizzax": 7,
-    "samarkand": 8,
-    "bukhara": 9,
-    "navoi": 10,
-    "kashkadarya": 11,
-    "surkhandarya": 12,
-    "khorezm": 13,
-    "karakalpakstan": 14,
-}
-
 REGION_CODE_TO_NAME = {
     "uz": {
         "toshkent_city": "Toshkent shahri",
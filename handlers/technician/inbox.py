@@ -8,8 +8,8 @@ from database.basic.user import find_user_by_telegram_id
 from database.technician.materials import fetch_technician_materials
 from loader import bot
 import logging
-import asyncpg
-from config import settings
+from database.connections import get_connection
+from database.basic.order_counters import invalidate_order_counters
 
 logger = logging.getLogger(__name__)
 
@@ -72,11 +72,10 @@ from datetime import datetime
 import html
 
 from filters.role_filter import RoleFilter
-from database.basic.user import get_user_by_telegram_id
+from database.basic.language import get_user_language
 from keyboards.client_buttons import get_rating_keyboard
 from database.technician import (
     # Ulanish (connection_orders) oqimi
-    fetch_technician_inbox,
     cancel_technician_request,
     accept_technician_work,
     start_technician_work,
@@ -90,21 +89,22 @@ from database.technician import (
     fetch_materials_not_assigned_to_technician,
     fetch_material_by_id,
     fetch_assigned_qty,
-    upsert_material_selection,
+    upsert_material_cart,
     upsert_material_request_and_decrease_stock,
 
     # Texnik xizmat (technician_orders) oqimi
-    fetch_technician_inbox_tech,
     accept_technician_work_for_tech,
     start_technician_work_for_tech,
     save_technician_diagnosis,
     finish_technician_work_for_tech,
     
     # Xodim arizalari (staff_orders) oqimi
-    fetch_technician_inbox_staff,
     accept_technician_work_for_staff,
     start_technician_work_for_staff,
     finish_technician_work_for_staff,
+
+    # Inbox kartalari (FSM'da faqat ID'lar)
+    fetch_technician_inbox_card,
 )
 
 # =====================
@@ -237,13 +237,11 @@ def t(key: str, lang: str = "uz", **kwargs) -> str:
     return val.format(**kwargs) if kwargs else val
 
 async def resolve_lang(user_id: int, fallback: str = "uz") -> str:
-    """Foydalanuvchi tilini DB'dan olish: users.lang ('uz'|'ru') bo‘lsa ishlatiladi."""
+    """Foydalanuvchi tilini umumiy til keshidan olish ('uz'|'ru'), bo'lmasa fallback."""
     try:
-        u = await find_user_by_telegram_id(user_id)
-        if u:
-            lang = (u.get("lang") or u.get("user_lang") or u.get("language") or "").lower()
-            if lang in ("uz", "ru"):
-                return lang
+        lang = (await get_user_language(user_id) or "").lower()
+        if lang in ("uz", "ru"):
+            return lang
     except Exception:
         pass
     return fallback
@@ -271,8 +269,9 @@ def _preserve_mode_clear(state: FSMContext, keep_keys: list[str] | None = None):
         data = await state.get_data()
         mode = data.get("tech_mode")
         lang = data.get("lang")
-        inbox = data.get("tech_inbox")
+        cursor = data.get("tech_cursor")
         idx = data.get("tech_idx")
+        total = data.get("tech_total")
         current_application_id = data.get("current_application_id")
         
         kept: dict = {}
@@ -285,8 +284,9 @@ def _preserve_mode_clear(state: FSMContext, keep_keys: list[str] | None = None):
         payload = {
             "tech_mode": mode,
             "lang": lang,
-            "tech_inbox": inbox,
+            "tech_cursor": cursor,
             "tech_idx": idx,
+            "tech_total": total,
             "current_application_id": current_application_id
         }
         payload.update(kept)
@@ -450,20 +450,22 @@ def short_view_text(item: dict, idx: int, total: int, lang: str = "uz", mode: st
         base += "\n" + t("pager", lang, i=idx + 1, n=total)
         return base
 
+def _materials_summary(selected: list[dict]) -> str:
+    if not selected:
+        return ""
+    
+    summary = "\n\n📦 <b>Tanlangan mahsulotlar:</b>\n"
+    for mat in selected:
+        qty = mat['qty']
+        name = mat['name']
+        source = "🧑‍🔧 O'zimda" if mat.get('source_type') == 'technician_stock' else "🏢 Ombordan"
+        summary += f"• {esc(name)} — {qty} dona [{source}]\n"
+    return summary
+
 async def get_selected_materials_summary(user_id: int, application_number: str, lang: str) -> str:
     """Get summary of selected materials for display in inbox"""
     try:
-        selected = await fetch_selected_materials_for_request(user_id, application_number)
-        if not selected:
-            return ""
-        
-        summary = "\n\n📦 <b>Tanlangan mahsulotlar:</b>\n"
-        for mat in selected:
-            qty = mat['qty']
-            name = mat['name']
-            source = "🧑‍🔧 O'zimda" if mat.get('source_type') == 'technician_stock' else "🏢 Ombordan"
-            summary += f"• {esc(name)} — {qty} dona [{source}]\n"
-        return summary
+        return _materials_summary(await fetch_selected_materials_for_request(user_id, application_number))
     except Exception:
         return ""
 
@@ -473,8 +475,12 @@ async def short_view_text_with_materials(item: dict, idx: int, total: int, user_
     
     req_id = item.get("id")
     if req_id:
-        app_number = await get_application_number(req_id, mode)
-        materials_summary = await get_selected_materials_summary(user_id, app_number, lang)
+        if "materials" in item:
+            # Inbox kartasi: materiallar karta bilan bitta so'rovda kelgan
+            materials_summary = _materials_summary(item["materials"])
+        else:
+            app_number = await get_application_number(req_id, mode)
+            materials_summary = await get_selected_materials_summary(user_id, app_number, lang)
         if materials_summary:
             # Insert materials before pager
             pager_start = base_text.rfind(t("pager", lang, i=idx + 1, n=total))
@@ -584,11 +590,9 @@ async def get_client_data_for_notification(request_id: int, request_type: str):
     """
     Client ma'lumotlarini olish notification uchun.
     """
-    from database.connections import get_connection_url
-    import asyncpg
     
     try:
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             if request_type == "connection":
                 query = """
@@ -643,10 +647,8 @@ async def get_used_materials_info(request_id: int, request_type: str, client_lan
     Ishlatilgan materiallar haqida ma'lumot olish.
     """
     try:
-        from database.connections import get_connection_url
-        import asyncpg
         
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             # Get application_number from the order tables
             app_number_query = """
@@ -708,10 +710,8 @@ async def get_diagnosis_info(request_id: int, request_type: str, client_lang: st
         if request_type != "technician":
             return ""
             
-        from database.connections import get_connection_url
-        import asyncpg
         
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             query = """
                 SELECT description
@@ -783,13 +783,13 @@ async def action_keyboard(item_id: int, index: int, total: int, status: str, mod
     """
     rows: list[list[InlineKeyboardButton]] = []
     
-    # Paginatsiya (agar bir nechta ariza bo'lsa)
-    if total > 1:
+    # Paginatsiya: kartadagi qo'shni ariza ID'lari bo'yicha (keyset)
+    if item and total > 1:
         nav = []
-        if index > 0:
-            nav.append(InlineKeyboardButton(text=t("prev", lang), callback_data=f"tech_inbox_prev_{index}"))
-        if index < total - 1:
-            nav.append(InlineKeyboardButton(text=t("next", lang), callback_data=f"tech_inbox_next_{index}"))
+        if item.get("prev_id"):
+            nav.append(InlineKeyboardButton(text=t("prev", lang), callback_data=f"tech_inbox_prev_{item['prev_id']}"))
+        if item.get("next_id"):
+            nav.append(InlineKeyboardButton(text=t("next", lang), callback_data=f"tech_inbox_next_{item['next_id']}"))
         if nav:
             rows.append(nav)
     
@@ -831,13 +831,21 @@ async def action_keyboard(item_id: int, index: int, total: int, status: str, mod
     
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
-def _dedup_by_id(items: list[dict]) -> list[dict]:
-    seen = set(); out = []
-    for it in items:
-        i = it.get("id")
-        if i in seen: continue
-        seen.add(i); out.append(it)
-    return out
+async def _inbox_card(state: FSMContext, mode: str, technician_id: int, order_id: int | None = None):
+    """
+    Inbox kartasini bitta so'rov bilan olish (fetch_technician_inbox_card).
+    FSM'da faqat kursor (tech_cursor - joriy ariza ID), pozitsiya va jami soni
+    saqlanadi. Ariza inboxdan chiqib ketgan bo'lsa, birinchi karta ko'rsatiladi.
+    Qaytaradi: (item | None, idx, total).
+    """
+    item = await fetch_technician_inbox_card(mode, technician_id, order_id)
+    if item is None and order_id is not None:
+        item = await fetch_technician_inbox_card(mode, technician_id)
+    if item is None:
+        await state.update_data(tech_cursor=None, tech_idx=0, tech_total=0)
+        return None, 0, 0
+    await state.update_data(tech_cursor=item["id"], tech_idx=item["position"], tech_total=item["total"])
+    return item, item["position"], item["total"]
 
 def tech_category_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
     a, b, c = T["sections_keyboard"][lang]
@@ -1115,7 +1123,7 @@ async def tech_open_inbox(message: Message, state: FSMContext):
     if not user or user.get("role") != "technician":
         return
     lang = await resolve_lang(message.from_user.id, fallback=("ru" if message.text == "📥 Входящие" else "uz"))
-    await state.update_data(tech_mode=None, tech_inbox=[], tech_idx=0, lang=lang)
+    await state.update_data(tech_mode=None, tech_cursor=None, tech_idx=0, tech_total=0, lang=lang)
     await message.answer(t("choose_section", lang), reply_markup=tech_category_keyboard(lang))
 
 # ====== Kategoriya handlerlari ======
@@ -1134,17 +1142,16 @@ async def tech_cat_connection(cb: CallbackQuery, state: FSMContext):
     except:
         pass
 
-    items = _dedup_by_id(await fetch_technician_inbox(technician_id=user["id"], limit=50, offset=0))
-    await state.update_data(tech_mode="connection", tech_inbox=items, tech_idx=0, lang=lang)
-    if not items:
+    await state.update_data(tech_mode="connection", lang=lang)
+    item, idx, total = await _inbox_card(state, "connection", user["id"])
+    if not item:
         sent_msg = await bot.send_message(cb.message.chat.id, t("empty_connection", lang), reply_markup=InlineKeyboardMarkup(inline_keyboard=[]))
         await track_message(state, sent_msg.message_id)
         return
     
     # Connection arizalarida rasmlar bo'lmaydi, shuning uchun oddiy send
-    item = items[0]; total = len(items)
-    text = await short_view_text_with_materials(item, 0, total, user["id"], lang, mode="connection")
-    kb = await action_keyboard(item.get("id"), 0, total, item.get("status", ""), mode="connection", lang=lang, item=item)
+    text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode="connection")
+    kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode="connection", lang=lang, item=item)
     sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
     await track_message(state, sent_msg.message_id)
 
@@ -1163,15 +1170,15 @@ async def tech_cat_tech(cb: CallbackQuery, state: FSMContext):
     except:
         pass
 
-    items = _dedup_by_id(await fetch_technician_inbox_tech(technician_id=user["id"], limit=50, offset=0))
-    await state.update_data(tech_mode="technician", tech_inbox=items, tech_idx=0, lang=lang)
-    if not items:
+    await state.update_data(tech_mode="technician", lang=lang)
+    item, idx, total = await _inbox_card(state, "technician", user["id"])
+    if not item:
         sent_msg = await bot.send_message(cb.message.chat.id, t("empty_tech", lang), reply_markup=InlineKeyboardMarkup(inline_keyboard=[]))
         await track_message(state, sent_msg.message_id)
         return
     
     # Texnik xizmat arizalarida rasmlar bo'lishi mumkin - render_item ishlatamiz
-    await render_item(cb.message, items[0], 0, len(items), lang, "technician", user["id"], state)
+    await render_item(cb.message, item, idx, total, lang, "technician", user["id"], state)
 
 @router.callback_query(F.data == "tech_inbox_cat_operator")
 async def tech_cat_operator(cb: CallbackQuery, state: FSMContext):
@@ -1188,17 +1195,16 @@ async def tech_cat_operator(cb: CallbackQuery, state: FSMContext):
     except:
         pass
 
-    items = _dedup_by_id(await fetch_technician_inbox_staff(technician_id=user["id"], limit=50, offset=0))
-    await state.update_data(tech_mode="staff", tech_inbox=items, tech_idx=0, lang=lang)
-    if not items:
+    await state.update_data(tech_mode="staff", lang=lang)
+    item, idx, total = await _inbox_card(state, "staff", user["id"])
+    if not item:
         sent_msg = await bot.send_message(cb.message.chat.id, t("empty_staff", lang), reply_markup=InlineKeyboardMarkup(inline_keyboard=[]))
         await track_message(state, sent_msg.message_id)
         return
     
     # Staff arizalarida rasmlar yo'q - oddiy send
-    item = items[0]; total = len(items)
-    text = await short_view_text_with_materials(item, 0, total, user["id"], lang, mode="staff")
-    kb = await action_keyboard(item.get("id"), 0, total, item.get("status", ""), mode="staff", lang=lang, item=item)
+    text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode="staff")
+    kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode="staff", lang=lang, item=item)
     sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
     await track_message(state, sent_msg.message_id)
 
@@ -1212,14 +1218,10 @@ async def tech_prev(cb: CallbackQuery, state: FSMContext):
         return await cb.answer(t("no_perm", lang), show_alert=True)
     
     mode = st.get("tech_mode", "connection")
-    items = _dedup_by_id(st.get("tech_inbox", []))
-    if not items:
-        return await cb.answer(t("empty_inbox", lang))
-    total = len(items)
-    idx = int(cb.data.replace("tech_inbox_prev_", "")) - 1
-    if idx < 0 or idx >= total:
+    try:
+        target_id = int(cb.data.replace("tech_inbox_prev_", ""))
+    except ValueError:
         return await cb.answer(t("reached_start", lang))
-    await state.update_data(tech_inbox=items, tech_idx=idx)
     
     # Purge tracked messages and delete current message
     await purge_tracked_messages(state, cb.message.chat.id)
@@ -1228,14 +1230,20 @@ async def tech_prev(cb: CallbackQuery, state: FSMContext):
     except:
         pass
     
+    item, idx, total = await _inbox_card(state, mode, user["id"], target_id)
+    if not item:
+        sent_msg = await bot.send_message(cb.message.chat.id, t("empty_inbox", lang))
+        await track_message(state, sent_msg.message_id)
+        return
+    
     # Modga qarab render qilish
     if mode == "technician":
         # Technician mode - rasmlar bor, render_item
-        await render_item(cb.message, items[idx], idx, total, lang, mode, user["id"], state)
+        await render_item(cb.message, item, idx, total, lang, mode, user["id"], state)
     else:
         # Connection/staff mode - rasmlar yo'q, oddiy send
-        text = await short_view_text_with_materials(items[idx], idx, total, user["id"], lang, mode)
-        kb = await action_keyboard(items[idx].get("id"), idx, total, items[idx].get("status", ""), mode=mode, lang=lang, item=items[idx])
+        text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode)
+        kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode=mode, lang=lang, item=item)
         sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
         await track_message(state, sent_msg.message_id)
 
@@ -1248,14 +1256,10 @@ async def tech_next(cb: CallbackQuery, state: FSMContext):
         return await cb.answer(t("no_perm", lang), show_alert=True)
     
     mode = st.get("tech_mode", "connection")
-    items = _dedup_by_id(st.get("tech_inbox", []))
-    if not items:
-        return await cb.answer(t("empty_inbox", lang))
-    total = len(items)
-    idx = int(cb.data.replace("tech_inbox_next_", "")) + 1
-    if idx < 0 or idx >= total:
+    try:
+        target_id = int(cb.data.replace("tech_inbox_next_", ""))
+    except ValueError:
         return await cb.answer(t("reached_end", lang))
-    await state.update_data(tech_inbox=items, tech_idx=idx)
     
     # Purge tracked messages and delete current message
     await purge_tracked_messages(state, cb.message.chat.id)
@@ -1264,14 +1268,20 @@ async def tech_next(cb: CallbackQuery, state: FSMContext):
     except:
         pass
     
+    item, idx, total = await _inbox_card(state, mode, user["id"], target_id)
+    if not item:
+        sent_msg = await bot.send_message(cb.message.chat.id, t("empty_inbox", lang))
+        await track_message(state, sent_msg.message_id)
+        return
+    
     # Modga qarab render qilish
     if mode == "technician":
         # Technician mode - rasmlar bor, render_item
-        await render_item(cb.message, items[idx], idx, total, lang, mode, user["id"], state)
+        await render_item(cb.message, item, idx, total, lang, mode, user["id"], state)
     else:
         # Connection/staff mode - rasmlar yo'q, oddiy send
-        text = await short_view_text_with_materials(items[idx], idx, total, user["id"], lang, mode)
-        kb = await action_keyboard(items[idx].get("id"), idx, total, items[idx].get("status", ""), mode=mode, lang=lang, item=items[idx])
+        text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode)
+        kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode=mode, lang=lang, item=item)
         sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
         await track_message(state, sent_msg.message_id)
 
@@ -1298,11 +1308,9 @@ async def tech_accept(cb: CallbackQuery, state: FSMContext):
         # Controller'ga notification yuboramiz (texnik qabul qildi)
         try:
             from utils.notification_service import send_role_notification
-            from database.connections import get_connection_url
-            import asyncpg
             
             # Controller'ning telegram_id ni olamiz (connections jadvalidan)
-            conn = await asyncpg.connect(get_connection_url())
+            conn = await get_connection()
             try:
                 # Get controller who assigned this order to technician
                 controller_info = None
@@ -1353,15 +1361,9 @@ async def tech_accept(cb: CallbackQuery, state: FSMContext):
     except:
         pass
 
-    items = _dedup_by_id((await state.get_data()).get("tech_inbox", []))
-    idx = int((await state.get_data()).get("tech_idx", 0))
-    for it in items:
-        if it.get("id") == req_id:
-            it["status"] = "in_technician"
-            break
-    await state.update_data(tech_inbox=items)
-    total = len(items)
-    item = items[idx] if 0 <= idx < total else items[0]
+    item, idx, total = await _inbox_card(state, mode, user["id"], req_id)
+    if not item:
+        return await cb.answer(t("empty_inbox", lang))
     
     # Modga qarab render qilish
     if mode == "technician":
@@ -1414,16 +1416,9 @@ async def tech_start(cb: CallbackQuery, state: FSMContext):
         pass
 
     # Inbox'ni yangilash
-    items = _dedup_by_id((await state.get_data()).get("tech_inbox", []))
-    idx = int((await state.get_data()).get("tech_idx", 0))
-    for it in items:
-        if it.get("id") == req_id:
-            it["status"] = "in_technician_work"
-            break
-    await state.update_data(tech_inbox=items)
-
-    total = len(items)
-    item = items[idx] if 0 <= idx < total else items[0]
+    item, idx, total = await _inbox_card(state, mode, user["id"], req_id)
+    if not item:
+        return await cb.answer(t("empty_inbox", lang))
     
     # Ariza ko'rinishini yangilash
     if mode == "technician":
@@ -1463,7 +1458,7 @@ async def tech_diag_text(msg: Message, state: FSMContext):
         mode = st.get("tech_mode", "connection")
         if mode == "staff":
             # Staff arizalar uchun staff_orders jadvaliga yozish (faqat technician type uchun)
-            conn = await asyncpg.connect(settings.DB_URL)
+            conn = await get_connection()
             try:
                 await conn.execute(
                     """
@@ -1504,25 +1499,7 @@ async def tech_diag_text(msg: Message, state: FSMContext):
     await clear_temp_contexts(state)
 
     # Diagnostika tugaganidan so'ng, ariza ko'rinishini yangilash
-    items = _dedup_by_id((await state.get_data()).get("tech_inbox", []))
-    idx = int((await state.get_data()).get("tech_idx", 0))
-    total = len(items)
-    
-    # Agar items bo'sh bo'lsa, oddiy xabar yuboramiz
-    if not items:
-        # Inline tugmalar yaratish
-        kb = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text=t("warehouse", lang), callback_data=f"tech_add_more_{req_id}"),
-                InlineKeyboardButton(text=t("review", lang), callback_data=f"tech_review_{req_id}"),
-            ]
-        ])
-        
-        sent_msg = await msg.answer(diag_text, reply_markup=kb, parse_mode="HTML")
-        await track_message(state, sent_msg.message_id)
-        return
-    
-    item = items[idx] if 0 <= idx < total else items[0]
+    item, idx, total = await _inbox_card(state, mode, user["id"], req_id)
     
     # Item'da diagnostika maydonini yangilash
     if item:
@@ -1698,7 +1675,7 @@ async def tech_qty_cancel(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -1782,11 +1759,8 @@ async def tech_qty_entered(msg: Message, state: FSMContext):
     # Material tanlovini darhol saqlash
     try:
         mode = st.get("tech_mode", "connection")
-        await upsert_material_selection(
-            user_id=user["id"],
-            application_id=req_id,
-            material_id=material_id,
-            qty=qty,
+        await upsert_material_cart(
+            user["id"], req_id, {material_id: qty},
             request_type=mode,
             source_type=source_type
         )
@@ -1801,7 +1775,7 @@ async def tech_qty_entered(msg: Message, state: FSMContext):
     except Exception:
         pass
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -1855,8 +1829,7 @@ async def tech_qty_entered(msg: Message, state: FSMContext):
     # Build text with order details + selected materials
     # Joriy inbox state ni saqlab qolish
     current_idx = st.get("tech_idx", 0)
-    current_inbox = st.get("tech_inbox", [])
-    total_items = len(current_inbox)
+    total_items = int(st.get("tech_total") or 0)
     
     original_text = short_view_text(item, current_idx, total_items, lang, mode)
     
@@ -1909,7 +1882,7 @@ async def tech_back_to_order(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -1997,7 +1970,7 @@ async def tech_back_to_materials(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -2143,7 +2116,7 @@ async def tech_add_more(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -2232,7 +2205,7 @@ async def tech_review(cb: CallbackQuery, state: FSMContext):
     # Material_issued ga yozmaslik - faqat Yakunlash bosganda yoziladi!
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -2362,15 +2335,17 @@ async def tech_confirm_warehouse(cb: CallbackQuery, state: FSMContext):
         if success:
             try:
                 from loader import bot
-                from database.connections import _conn
                 
                 # Warehouse user'ni topish
-                conn = await _conn()
-                warehouse_user = await conn.fetchrow("""
-                    SELECT telegram_id, language FROM users 
-                    WHERE role = 'warehouse' 
-                    ORDER BY id ASC LIMIT 1
-                """)
+                conn = await get_connection()
+                try:
+                    warehouse_user = await conn.fetchrow("""
+                        SELECT telegram_id, language FROM users 
+                        WHERE role = 'warehouse' 
+                        ORDER BY id ASC LIMIT 1
+                    """)
+                finally:
+                    await conn.close()
                 
                 if warehouse_user:
                     # Application number olish
@@ -2404,7 +2379,7 @@ async def tech_confirm_warehouse(cb: CallbackQuery, state: FSMContext):
             
             # Show finish/cancel/back buttons
             # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-            conn = await asyncpg.connect(settings.DB_URL)
+            conn = await get_connection()
             try:
                 if mode == "technician":
                     query = """
@@ -2547,7 +2522,7 @@ async def tech_cancellation_note(msg: Message, state: FSMContext):
         logger.error(f"Error restoring materials on cancel: {e}")
     
     # Arizani bekor qilish va sababni saqlash
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             await conn.execute(
@@ -2567,10 +2542,9 @@ async def tech_cancellation_note(msg: Message, state: FSMContext):
             )
     finally:
         await conn.close()
+    invalidate_order_counters()
     
     # Inbox'dan o'chirish va keyingi arizani ko'rsatish (state tozalashdan oldin!)
-    items = _dedup_by_id(st.get("tech_inbox", []))
-    items = [it for it in items if it.get("id") != req_id]
     
     # Purge tracked messages and delete user's text input
     await purge_tracked_messages(state, msg.chat.id)
@@ -2586,11 +2560,11 @@ async def tech_cancellation_note(msg: Message, state: FSMContext):
     await msg.answer(t("cancel_success", lang))
     
     # Keyingi arizani ko'rsatish
-    if items:
-        await state.update_data(tech_inbox=items, tech_idx=0, tech_mode=mode, lang=lang)
-        item = items[0]
-        text = await short_view_text_with_materials(item, 0, len(items), user["id"], lang, mode)
-        kb = await action_keyboard(item.get("id"), 0, len(items), item.get("status", ""), mode=mode, lang=lang, item=item)
+    await state.update_data(tech_mode=mode, lang=lang)
+    item, idx, total = await _inbox_card(state, mode, user["id"])
+    if item:
+        text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode)
+        kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode=mode, lang=lang, item=item)
         sent_msg = await msg.answer(text, reply_markup=kb, parse_mode="HTML")
         await track_message(state, sent_msg.message_id)
     else:
@@ -2931,11 +2905,8 @@ async def custom_qty_entered(msg: Message, state: FSMContext):
         # Texnikka biriktirilmagan material uchun faqat tanlov saqlash
         try:
             mode = st.get("tech_mode", "connection")
-            await upsert_material_selection(
-                user_id=user["id"],
-                application_id=req_id,
-                material_id=material_id,
-                qty=qty,
+            await upsert_material_cart(
+                user["id"], req_id, {material_id: qty},
                 request_type=mode,
                 source_type="warehouse"  # Unassigned materials are from warehouse
             )
@@ -2980,11 +2951,9 @@ async def custom_qty_entered(msg: Message, state: FSMContext):
     try:
         mode = st.get("tech_mode", "connection")
         source_type = ctx.get("source_type", "warehouse") 
-        await upsert_material_selection(
-            user_id=user["id"],
-            applications_id=req_id,
-            material_id=material_id,
-            qty=qty,
+        # Yangilangan savat shu chaqiruvning o'zidan qaytadi
+        selected = await upsert_material_cart(
+            user["id"], req_id, {material_id: qty},
             request_type=mode,
             source_type=source_type
         )
@@ -2994,7 +2963,6 @@ async def custom_qty_entered(msg: Message, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     app_number = await get_application_number(req_id, mode)
     
-    selected = await fetch_selected_materials_for_request(user["id"], app_number)
     lines = [t("saved_selection", lang) + "\n", f"{t('order_id', lang)} {esc(app_number)}", t("selected_products", lang)]
     for it in selected:
         qty_txt = f"{_qty_of(it)} {'dona' if lang=='uz' else 'шт'}"
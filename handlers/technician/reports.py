@@ -27,11 +27,7 @@ def _get_tashkent_tz():
     return dt.timezone(dt.timedelta(hours=5), 'Asia/Tashkent')
 
 from database.basic.user import find_user_by_telegram_id
-from database.technician.report import (
-    count_connection_status,
-    count_technician_status,
-    count_staff_status,
-)
+from database.technician.report import count_statuses_by_kind
 
 router = Router()
 
@@ -129,14 +125,12 @@ async def _build_and_send_report(message_or_cb, lang: str, user_id: int, range_k
     if range_key == "all":
         label_local = tr("Jami davr", "Весь период", lang)
 
-    # 2) DB so‘rovlar — faqat connections
-    conn_raw = await count_connection_status(user_id, df_utc, dt_utc)   
-    tech_raw = await count_technician_status(user_id, df_utc, dt_utc)   
-    staff_raw = await count_staff_status(user_id, df_utc, dt_utc)         
+    # 2) DB so‘rov — kunlik rollup bo'yicha, uchala tur birga
+    by_kind = await count_statuses_by_kind(user_id, df_utc, dt_utc)
 
-    conn = _normalize_stats(conn_raw or {})
-    tch  = _normalize_stats(tech_raw or {})
-    staff = _normalize_stats(staff_raw or {})
+    conn = _normalize_stats(by_kind.get("connection") or {})
+    tch  = _normalize_stats(by_kind.get("technician") or {})
+    staff = _normalize_stats(by_kind.get("staff") or {})
 
     # 3) Matn
     header  = tr("📊 <b>Hisobotlarim</b>", "📊 <b>Мои отчеты</b>", lang)
@@ -209,7 +209,7 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
         
         # Generate file based on format
         if format_type == "csv":
-            file_content = ExportUtils.generate_csv(formatted_data)
+            file_content = await ExportUtils.render_csv(formatted_data)
             filename = ExportUtils.get_filename_with_timestamp(filename_base, "csv")
             document = BufferedInputFile(
                 file_content.getvalue(),
@@ -217,23 +217,23 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
             )
         elif format_type == "xlsx":
             if lang == "ru":
-                file_content = ExportUtils.generate_excel(formatted_data, "Данные склада", title)
+                file_content = await ExportUtils.render_excel(formatted_data, "Данные склада", title)
             else:
-                file_content = ExportUtils.generate_excel(formatted_data, "Ombor Ma'lumotlari", title)
+                file_content = await ExportUtils.render_excel(formatted_data, "Ombor Ma'lumotlari", title)
             filename = ExportUtils.get_filename_with_timestamp(filename_base, "xlsx")
             document = BufferedInputFile(
                 file_content.getvalue(),
                 filename=filename
             )
         elif format_type == "docx":
-            file_content = ExportUtils.generate_word(formatted_data, title)
+            file_content = await ExportUtils.render_word(formatted_data, title)
             filename = ExportUtils.get_filename_with_timestamp(filename_base, "docx")
             document = BufferedInputFile(
                 file_content.getvalue(),
                 filename=filename
             )
         elif format_type == "pdf":
-            file_content = ExportUtils.generate_pdf(formatted_data, title)
+            file_content = await ExportUtils.render_pdf(formatted_data, title)
             filename = ExportUtils.get_filename_with_timestamp(filename_base, "pdf")
             document = BufferedInputFile(
                 file_content.getvalue(),
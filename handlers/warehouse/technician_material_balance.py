@@ -4,7 +4,7 @@ from aiogram.fsm.context import FSMContext
 import logging
 
 from database.warehouse.users import get_users_by_role
-from database.technician.materials import fetch_technician_materials
+from database.basic.stock_ledger import fetch_holder_balances, TECHNICIAN
 from database.basic.user import find_user_by_telegram_id, get_user_by_id
 from database.basic.language import get_user_language
 from keyboards.warehouse_buttons import get_warehouse_main_menu
@@ -155,8 +155,8 @@ async def show_technician_balance(callback: CallbackQuery, state: FSMContext):
         await callback.answer(("❌ Texnik topilmadi!" if lang == "uz" else "❌ Техник не найден!"), show_alert=True)
         return
     
-    # Texnikning materiallarini olish
-    tech_materials = await fetch_technician_materials(tech_id)
+    # Texnikning materiallarini olish (qoldiqlar ko'rinishidan)
+    tech_materials = await fetch_holder_balances(TECHNICIAN, tech_id)
     
     full_name = (technician.get('full_name') or '').strip() or f"ID: {tech_id}"
     
@@ -170,18 +170,18 @@ async def show_technician_balance(callback: CallbackQuery, state: FSMContext):
         total_value = 0
         for material in tech_materials:
             price = material.get('price', 0) or 0
-            quantity = material.get('stock_quantity', 0) or 0
+            quantity = material.get('quantity', 0) or 0
             material_value = price * quantity
             total_value += material_value
             
             message_text += (
                 f"📦 **{material['name']}**\n"
-                f"   • Miqdor: {material['stock_quantity']} dona\n"
+                f"   • Miqdor: {quantity} dona\n"
                 f"   • Narxi: {price:,} so'm\n"
                 f"   • Qiymati: {material_value:,} so'm\n\n"
                 if lang == "uz" else
                 f"📦 **{material['name']}**\n"
-                f"   • Количество: {material['stock_quantity']} шт.\n"
+                f"   • Количество: {quantity} шт.\n"
                 f"   • Цена: {price:,} сум\n"
                 f"   • Стоимость: {material_value:,} сум\n\n"
             )
@@ -3,7 +3,8 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 import logging
 
-from database.warehouse.materials import get_all_materials, search_materials, get_material_by_id
+from database.warehouse.materials import get_all_materials, get_material_by_id
+from database.basic.stock_ledger import issue_to_technician, InsufficientStock
 from database.technician.materials import fetch_technician_materials, fetch_assigned_qty
 from database.basic.user import find_user_by_telegram_id, get_user_by_id
 from database.warehouse.users import get_users_by_role
@@ -299,44 +300,16 @@ async def confirm_assignment(callback: CallbackQuery, state: FSMContext):
             await callback.answer(("❌ Omborda yetarli material yo'q!" if lang == "uz" else "❌ На складе недостаточно материала!"), show_alert=True)
             return
         
-        # Material berishni amalga oshirish
-        import asyncpg
-        from config import settings
-        
-        conn = await asyncpg.connect(settings.DB_URL)
+        # Material berishni amalga oshirish (shartli kamaytirish + jurnal)
+        warehouse_user = await find_user_by_telegram_id(callback.from_user.id)
         try:
-            async with conn.transaction():
-                # Ombordagi materialni kamaytirish
-                await conn.execute(
-                    "UPDATE materials SET quantity = quantity - $1 WHERE id = $2",
-                    quantity, material_id
-                )
-                
-                # Texnikka material berish (material_and_technician jadvaliga qo'shish)
-                # First check if record exists
-                existing_record = await conn.fetchrow(
-                    "SELECT id, quantity FROM material_and_technician WHERE user_id = $1 AND material_id = $2",
-                    tech_id, material_id
-                )
-                
-                if existing_record:
-                    # Update existing record
-                    await conn.execute(
-                        "UPDATE material_and_technician SET quantity = quantity + $1 WHERE id = $2",
-                        quantity, existing_record['id']
-                    )
-                else:
-                    # Insert new record
-                    await conn.execute(
-                        "INSERT INTO material_and_technician (user_id, material_id, quantity) VALUES ($1, $2, $3)",
-                        tech_id, material_id, quantity
-                    )
-        except asyncpg.UniqueViolationError as e:
-            # Handle unique constraint violation
-            await callback.answer(
-                ("❌ Bu material allaqachon texnikka berilgan!" if lang == "uz" else "❌ Этот материал уже выдан технику!"), 
-                show_alert=True
+            await issue_to_technician(
+                tech_id, {material_id: quantity},
+                actor_id=(warehouse_user or {}).get('id'),
             )
+        except InsufficientStock:
+            # Tekshiruvdan keyin boshqa o'tkazma qoldiqni kamaytirgan bo'lishi mumkin
+            await callback.answer(("❌ Omborda yetarli material yo'q!" if lang == "uz" else "❌ На складе недостаточно материала!"), show_alert=True)
             return
         except Exception as db_error:
             # Handle other database errors
@@ -345,8 +318,6 @@ async def confirm_assignment(callback: CallbackQuery, state: FSMContext):
                 show_alert=True
             )
             return
-        finally:
-            await conn.close()
         
         full_name = (technician.get('full_name') or '').strip() or f"ID: {tech_id}"
         
@@ -9,6 +9,7 @@ def get_system_status_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
     performance_text = "⚡ Ishlash ko'rsatkichlari" if lang == "uz" else "⚡ Показатели производительности"
     activity_text = "🔄 So'nggi faoliyat" if lang == "uz" else "🔄 Последняя активность"
     database_text = "💾 Ma'lumotlar bazasi" if lang == "uz" else "💾 База данных"
+    db_budget_text = "📉 DB byudjeti" if lang == "uz" else "📉 Бюджет БД"
     refresh_text = "🔄 Yangilash" if lang == "uz" else "🔄 Обновить"
     close_text = "❌ Yopish" if lang == "uz" else "❌ Закрыть"
     
@@ -23,9 +24,10 @@ def get_system_status_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
         ],
         [
             InlineKeyboardButton(text=database_text, callback_data="system_database"),
-            InlineKeyboardButton(text=refresh_text, callback_data="system_refresh")
+            InlineKeyboardButton(text=db_budget_text, callback_data="system_db_budget")
         ],
         [
+            InlineKeyboardButton(text=refresh_text, callback_data="system_refresh"),
             InlineKeyboardButton(text=close_text, callback_data="system_close")
         ]
     ]
@@ -189,11 +191,13 @@ def get_applications_main_menu(lang: str = "uz") -> ReplyKeyboardMarkup:
     connection_text = "🔌 Ulanish zayavkalari" if lang == "uz" else "🔌 Заявки на подключение"
     technician_text = "🔧 Texnik zayavkalar" if lang == "uz" else "🔧 Технические заявки"
     staff_text = "👥 Xodim zayavkalari" if lang == "uz" else "👥 Заявки сотрудников"
+    search_text = "🔎 Zayavka qidirish" if lang == "uz" else "🔎 Поиск заявки"
     back_text = "◀️ Orqaga" if lang == "uz" else "◀️ Назад"
 
     keyboard = [
         [KeyboardButton(text=technician_text), KeyboardButton(text=connection_text)],
-        [KeyboardButton(text=staff_text), KeyboardButton(text=back_text)]
+        [KeyboardButton(text=staff_text), KeyboardButton(text=search_text)],
+        [KeyboardButton(text=back_text)]
     ]
 
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
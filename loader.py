@@ -7,9 +7,17 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.session.aiohttp import AiohttpSession
 from aiohttp import ClientTimeout, TCPConnector
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from config import settings
-from middlewares import ErrorHandlingMiddleware
+from middlewares import (
+    ErrorHandlingMiddleware,
+    UserIdentityMiddleware,
+    DbBudgetMiddleware,
+    DbBudgetHandlerMiddleware,
+)
+from database.connections import init_pool
+from database.basic.fsm_storage import create_fsm_storage
+from utils.error_store import ErrorStoreHandler, get_error_store
+from utils.log_pipeline import JsonFormatter, start_log_pipeline
 import os
 
 # =========================================================
@@ -32,6 +40,9 @@ def setup_logging():
     # BOT.LOG - Barcha bot faoliyatlari (INFO daraja)
     # =========================================================
     
+    # LOG_FORMAT=json bo'lsa fayllarga bir qatorli JSON yoziladi (terminal - matn)
+    file_formatter = JsonFormatter() if settings.LOG_FORMAT.lower() == "json" else None
+    
     # Bot log uchun formatter
     bot_formatter = logging.Formatter(
         "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
@@ -46,7 +57,7 @@ def setup_logging():
         encoding="utf-8"
     )
     bot_file_handler.setLevel(logging.INFO)
-    bot_file_handler.setFormatter(bot_formatter)
+    bot_file_handler.setFormatter(file_formatter or bot_formatter)
     
     # Bot log console handler (terminalga ham chiqarish)
     bot_console_handler = logging.StreamHandler(sys.stdout)
@@ -71,7 +82,7 @@ def setup_logging():
         encoding="utf-8"
     )
     error_file_handler.setLevel(logging.WARNING)
-    error_file_handler.setFormatter(error_formatter)
+    error_file_handler.setFormatter(file_formatter or error_formatter)
     
     # Error log console handler (terminalga ham chiqarish)
     error_console_handler = logging.StreamHandler(sys.stderr)
@@ -82,11 +93,19 @@ def setup_logging():
     # LOGGER'LARNI SOZLASH
     # =========================================================
     
-    # Root logger'ga handler'lar qo'shish
-    root_logger.addHandler(bot_file_handler)
-    root_logger.addHandler(bot_console_handler)
-    root_logger.addHandler(error_file_handler)
-    root_logger.addHandler(error_console_handler)
+    # Root logger'da faqat QueueHandler: yozish (fayl, terminal, SQLite)
+    # QueueListener fon oqimida bajariladi - event loop I/O kutmaydi
+    root_logger.addHandler(start_log_pipeline(
+        [
+            bot_file_handler,
+            bot_console_handler,
+            error_file_handler,
+            error_console_handler,
+            # ERROR yozuvlarining strukturali nusxasi (admin xatolar ekrani uchun)
+            ErrorStoreHandler(get_error_store(os.path.join(log_dir, "errors.sqlite3"))),
+        ],
+        sampling=settings.LOG_SAMPLING,
+    ))
     root_logger.setLevel(logging.INFO)
     
     # =========================================================
@@ -117,10 +136,8 @@ def setup_logging():
     # WARNINGS'LARNI LOG QILISH
     # =========================================================
     
-    # Warnings'larni log qilish uchun handler
+    # py.warnings root (navbat) orqali errors.log ga tushadi - alohida handler kerak emas
     warnings_logger = logging.getLogger("py.warnings")
-    warnings_logger.addHandler(error_file_handler)
-    warnings_logger.addHandler(error_console_handler)
     warnings_logger.setLevel(logging.WARNING)
     
     # =========================================================
@@ -220,6 +237,9 @@ dp = _LazyProxy()
 
 async def create_bot_and_dp() -> tuple[Bot, Dispatcher]:
     """Running event loop ichida Bot va Dispatcher ni yaratadi."""
+    # Jarayon uchun yagona DB pool (main() oxirida close_pool() bilan yopiladi)
+    await init_pool()
+
     # Use simple integer timeout for aiogram compatibility
     session = AiohttpSession(timeout=30)
 
@@ -228,13 +248,22 @@ async def create_bot_and_dp() -> tuple[Bot, Dispatcher]:
         session=session,
         default=DefaultBotProperties(parse_mode="HTML")
     )
-    real_dp = Dispatcher(storage=MemoryStorage())
+    # FSM holati bazada saqlanadi (restartdan keyin ham, bir nechta worker uchun ham)
+    real_dp = Dispatcher(storage=create_fsm_storage())
 
     # Middleware'ni qo'shish
     real_dp.update.middleware(ErrorHandlingMiddleware(bot=real_bot))
+    # Update boshiga DB so'rovlari / ulanishlarini o'lchash - eng birinchi outer middleware
+    real_dp.update.outer_middleware(DbBudgetMiddleware())
+    real_dp.message.middleware(DbBudgetHandlerMiddleware())
+    real_dp.callback_query.middleware(DbBudgetHandlerMiddleware())
+    # users qatorini update boshiga bir marta (keshdan) yuklash - RoleFilter uchun
+    real_dp.update.outer_middleware(UserIdentityMiddleware())
 
     logger.info("Bot va Dispatcher muvaffaqiyatli yaratildi!")
     logger.info("ErrorHandlingMiddleware qo'shildi!")
+    logger.info("UserIdentityMiddleware qo'shildi!")
+    logger.info("DbBudgetMiddleware qo'shildi!")
 
     # Legacy proxy obyektlarni to'ldirish
     bot._set(real_bot)
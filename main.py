@@ -2,6 +2,11 @@ import asyncio
 import sys
 import logging
 from loader import create_bot_and_dp
+from database.connections import close_pool
+from utils.render_pool import shutdown_render_pool
+from utils.outbound_queue import start_outbound_dispatcher, stop_outbound_dispatcher
+from utils.media_ingest import start_media_ingest_worker, stop_media_ingest_worker
+from utils.db_budget import start_budget_reporter, stop_budget_reporter
 from handlers import router as handlers_router
 from utils.directory_utils import setup_media_structure, setup_static_structure
 
@@ -18,6 +23,9 @@ except Exception as e:
     sys.exit(1)
 
 async def main():
+    bot, dp = await create_bot_and_dp()
+    dp.include_router(handlers_router)
+    
     # Server qayta ishga tushganda material recovery
     try:
         from database.technician.materials import recover_technician_materials_after_crash, recover_warehouse_materials_after_crash
@@ -27,8 +35,19 @@ async def main():
     except Exception as e:
         logger.error(f"Material recovery failed: {e}")
     
-    bot, dp = await create_bot_and_dp()
-    dp.include_router(handlers_router)
+    # Sxema reyestri: hot path'da information_schema so'ralmasligi uchun
+    try:
+        from database.basic.schema import refresh_schema
+        await refresh_schema()
+    except Exception as e:
+        logger.error(f"Schema registry load failed: {e}")
+
+    # Navbatdagi chiquvchi xabarlarni yuboruvchi fon vazifasi
+    start_outbound_dispatcher(bot)
+    # Ariza ilovalarini fonda yuklab olish
+    start_media_ingest_worker(bot)
+    # Update'lar DB budget'ining davriy log xulosasi
+    start_budget_reporter()
     
     # Pollingni barqaror qilish uchun backoff bilan qayta urinib ko'rish
     base_delay = 1
@@ -55,6 +74,16 @@ async def main():
             except Exception:
                 pass
             logger.info("Bot session closed")
+    
+    await stop_budget_reporter()
+    await stop_media_ingest_worker()
+    await stop_outbound_dispatcher()
+    try:
+        await bot.session.close()
+    except Exception:
+        pass
+    shutdown_render_pool()
+    await close_pool()
 
 if __name__ == "__main__":
     try:
@@ -1,3 +1,5 @@
 from middlewares.error_handler import ErrorHandlingMiddleware
+from middlewares.user_identity import UserIdentityMiddleware
+from middlewares.db_budget import DbBudgetMiddleware, DbBudgetHandlerMiddleware
 
-__all__ = ["ErrorHandlingMiddleware"]
\ No newline at end of file
+__all__ = ["ErrorHandlingMiddleware", "UserIdentityMiddleware", "DbBudgetMiddleware", "DbBudgetHandlerMiddleware"]
@@ -0,0 +1,50 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from utils.db_budget import begin_update, current_budget, end_update
+
+
+class DbBudgetMiddleware(BaseMiddleware):
+    """Har bir update uchun DB so'rovlari, vaqti va ulanishlarini o'lchaydi.
+
+    Outer middleware sifatida dp.update ga eng birinchi ulanadi - shunda
+    UserIdentityMiddleware va RoleFilter'lar qilgan so'rovlar ham hisobga
+    kiradi. Natija utils/db_budget oynasiga yoziladi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Handler topilmasa (yoki hali aniqlanmagan bo'lsa) update turi yoziladi
+        name = f"update:{event.event_type}" if isinstance(event, Update) else type(event).__name__
+        budget, token = begin_update(name)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            end_update(budget, token, time.perf_counter() - started)
+
+
+class DbBudgetHandlerMiddleware(BaseMiddleware):
+    """Tanlangan handler nomini joriy update budget'iga yozadi.
+
+    Inner middleware sifatida dp.message / dp.callback_query ga ulanadi
+    (ichki router'larga ham tarqaladi), data["handler"] faqat shu bosqichda ma'lum.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        budget = current_budget()
+        handler_object = data.get("handler")
+        if budget is not None and handler_object is not None:
+            callback = handler_object.callback
+            budget.handler = f"{callback.__module__}.{getattr(callback, '__qualname__', callback)}"
+        return await handler(event, data)
@@ -0,0 +1,31 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from database.basic.user import get_cached_user_by_telegram_id
+from database.basic.language import get_user_language
+
+
+class UserIdentityMiddleware(BaseMiddleware):
+    """Har bir update uchun users qatorini bir marta yuklab, data["user"] ga qo'yadi.
+
+    Qator TTL/LRU keshdan olinadi, shuning uchun RoleFilter'lar zanjiri
+    update boshiga ko'pi bilan bitta (kesh tegsa - nol) DB murojaati qiladi.
+    Foydalanuvchi tili ham data["lang"] ga ('uz' | 'ru') qo'yiladi - u
+    umumiy til keshidan olinadi, handler'lar uni parametr sifatida olishi mumkin.
+    Outer middleware sifatida dp.update ga ulanadi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user: User = data.get("event_from_user")
+        if from_user is not None and not from_user.is_bot:
+            data["user"] = await get_cached_user_by_telegram_id(from_user.id)
+            data["lang"] = await get_user_language(from_user.id) or "uz"
+        else:
+            data["user"] = None
+            data["lang"] = "uz"
+        return await handler(event, data)
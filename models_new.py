@@ -47,16 +47,17 @@ class BusinessType(Enum):
 
 class OrderBase:
     """Base class for all order types with common fields"""
-    _counters: ClassVar[dict] = {}  # Separate counter for each prefix
     _prefix: ClassVar[str] = ""  # Should be overridden by subclasses
     
     @classmethod
-    def generate_application_number(cls, business_type: BusinessType) -> str:
-        """Generate application number in format: PREFIX-BUSINESS_TYPE-NUMBER"""
-        if cls._prefix not in cls._counters:
-            cls._counters[cls._prefix] = 0
-        cls._counters[cls._prefix] += 1
-        return f"{cls._prefix}-{business_type.value}-{cls._counters[cls._prefix]}"
+    async def generate_application_number(cls, conn, business_type: BusinessType) -> str:
+        """Generate application number in format: PREFIX-BUSINESS_TYPE-NUMBER.
+
+        Raqam application_number_counters jadvalidagi prefiks hisoblagichidan
+        olinadi (jarayonlar o'rtasida umumiy va parallel insertlarda yagona).
+        """
+        from database.basic.application_number import allocate_application_number
+        return await allocate_application_number(conn, f"{cls._prefix}-{business_type.value}")
 
 class TechnicianOrderStatus(Enum):
     """
@@ -1,10 +1,10 @@
 # services/akt_service.py
 import os
+import logging
 import hashlib
 from datetime import datetime
 from typing import Dict, Any, List
 from pathlib import Path
-from aiogram.types import FSInputFile
 from database.akt_queries import (
     get_akt_data_by_request_id, 
     get_materials_for_akt, 
@@ -15,6 +15,13 @@ from database.akt_queries import (
 )
 from utils.word_generator import AKTGenerator
 from config import settings
+from database.connections import get_connection
+from utils.outbound_queue import enqueue_message, register_outbound_hook
+
+logger = logging.getLogger(__name__)
+
+AKT_SENT_HOOK = "akt_sent"
+AKT_FAILED_HOOK = "akt_failed"
 
 class AKTService:
     def __init__(self):
@@ -27,17 +34,17 @@ class AKTService:
         request_type: "connection" | "technician" | "staff"
         """
         try:
-            print(f"Starting AKT pipeline for {request_type} request {request_id}")
+            logger.debug(f"Starting AKT pipeline for {request_type} request {request_id}")
 
             # 1) Idempotentlik: avval bor-yo'qligini tekshiramiz
             if await check_akt_exists(request_id, request_type):
-                print(f"AKT already exists for {request_type} request {request_id}")
+                logger.debug(f"AKT already exists for {request_type} request {request_id}")
                 return
 
             # 2) Ma'lumotlar
             data = await get_akt_data_by_request_id(request_id, request_type)
             if not data:
-                print(f"No data found for {request_type} request {request_id}")
+                logger.warning(f"No data found for {request_type} request {request_id}")
                 return
 
             # (Ixtiyoriy) Qo‘shimcha rekvizitlar bo‘sh bo‘lsa, default berib yuboramiz
@@ -97,27 +104,25 @@ class AKTService:
 
             # 6) Shablonsiz AKT yaratish
             generator = AKTGenerator()
-            success = generator.generate_akt(data, materials, file_path)
+            success = await generator.render_akt(data, materials, file_path)
             if not success:
-                print(f"Failed to generate AKT for {request_type} request {request_id}")
+                logger.error(f"Failed to generate AKT for {request_type} request {request_id}")
                 return
 
-            print(f"AKT generated successfully: {file_path}")
+            logger.info(f"AKT generated successfully: {file_path}")
 
             # 7) Hash
             file_hash = self._calculate_file_hash(file_path)
 
             # 8) Bazaga yozish
             await create_akt_document(request_id, request_type, akt_number, file_path, file_hash)
-            print("AKT document saved to database")
+            logger.info("AKT document saved to database")
 
             # 9) Mijozga yuborish
             await self._send_to_client(bot, request_id, request_type, file_path, akt_number, data)
 
         except Exception as e:
-            print(f"Error in AKT pipeline for {request_type} request {request_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error in AKT pipeline for {request_type} request {request_id}: {e}")
 
     async def _send_to_client(self, bot, request_id: int, request_type: str, file_path: str, akt_number: str, data: Dict[str, Any]):
         try:
@@ -138,33 +143,39 @@ class AKTService:
                 )
 
                 doc_path = Path(file_path)
-                input_file = FSInputFile(doc_path, filename=doc_path.name)
-                
-                # AKT ni media sifatida yuborish (rating keyboard yo'q)
-                sent_message = await bot.send_document(
-                    chat_id=client_telegram_id,
-                    document=input_file,
+                meta = {
+                    'request_id': request_id,
+                    'request_type': request_type,
+                    'file_path': file_path,
+                    'akt_number': akt_number,
+                }
+
+                # AKT navbat orqali yuboriladi (rating keyboard yo'q); media'ga
+                # saqlash va sent belgisi yuborilgandan keyin hook'da bajariladi
+                await enqueue_message(
+                    client_telegram_id, 'document',
+                    dedup_key=f"akt:{request_type}:{request_id}",
+                    on_sent=AKT_SENT_HOOK,
+                    on_failed=AKT_FAILED_HOOK,
+                    meta=meta,
+                    document_path=str(doc_path),
+                    filename=doc_path.name,
                     caption=caption,
                     parse_mode='HTML'
                 )
-
-                # AKT ni media ichida saqlash
-                await self._save_akt_to_media_storage(request_id, request_type, file_path, sent_message)
-
-                await mark_akt_sent(request_id, request_type, datetime.now())
-                print(f"AKT sent to client {client_telegram_id}")
+                logger.info(f"AKT queued for client {client_telegram_id}")
             else:
                 await self._send_to_manager_group(bot, file_path, akt_number, request_id, request_type)
 
         except Exception as e:
-            print(f"Error sending AKT to client: {e}")
+            logger.error(f"Error sending AKT to client: {e}")
             await self._send_to_manager_group(bot, file_path, akt_number, request_id, request_type)
 
     async def _send_to_manager_group(self, bot, file_path: str, akt_number: str, request_id: int, request_type: str):
         try:
             manager_group_id = getattr(settings, 'MANAGER_GROUP_ID', None)
             if not manager_group_id:
-                print("Manager group ID not configured")
+                logger.warning("Manager group ID not configured")
                 return
 
             workflow_type_text = {
@@ -181,18 +192,17 @@ class AKTService:
             )
 
             doc_path = Path(file_path)
-            input_file = FSInputFile(doc_path, filename=doc_path.name)
-            
-            await bot.send_document(
-                chat_id=manager_group_id,
-                document=input_file,
+            await enqueue_message(
+                manager_group_id, 'document',
+                document_path=str(doc_path),
+                filename=doc_path.name,
                 caption=caption,
                 parse_mode='HTML'
             )
 
-            print(f"AKT sent to manager group {manager_group_id}")
+            logger.info(f"AKT queued for manager group {manager_group_id}")
         except Exception as e:
-            print(f"Error sending AKT to manager group: {e}")
+            logger.error(f"Error sending AKT to manager group: {e}")
 
     def _get_rating_keyboard(self, request_id: int, request_type: str):
         from keyboards.client_buttons import get_rating_keyboard
@@ -226,20 +236,18 @@ class AKTService:
             # Database'ga media ma'lumotlarini saqlash
             await self._save_akt_media_info(request_id, request_type, str(media_file_path), sent_message)
             
-            print(f"AKT saved to media storage: {media_file_path}")
+            logger.info(f"AKT saved to media storage: {media_file_path}")
             
         except Exception as e:
-            print(f"Error saving AKT to media storage: {e}")
+            logger.error(f"Error saving AKT to media storage: {e}")
 
     async def _save_akt_media_info(self, request_id: int, request_type: str, media_file_path: str, sent_message):
         """
         AKT media ma'lumotlarini database'ga saqlash (mavjud akt_documents jadvaliga).
         """
         try:
-            from database.connections import get_connection_url
-            import asyncpg
             
-            conn = await asyncpg.connect(get_connection_url())
+            conn = await get_connection()
             try:
                 # Get application_number from the order tables
                 app_number_query = """
@@ -252,7 +260,7 @@ class AKTService:
                 """
                 app_number_result = await conn.fetchrow(app_number_query, request_id)
                 if not app_number_result:
-                    print(f"Error: No application_number found for request_id {request_id}")
+                    logger.error(f"Error: No application_number found for request_id {request_id}")
                     return
                 
                 application_number = app_number_result['application_number']
@@ -270,9 +278,28 @@ class AKTService:
                 await conn.close()
                 
         except Exception as e:
-            print(f"Error saving AKT media info: {e}")
+            logger.error(f"Error saving AKT media info: {e}")
 
     def _calculate_file_hash(self, file_path: str) -> str:
         with open(file_path, 'rb') as f:
             import hashlib
             return hashlib.sha256(f.read()).hexdigest()
+
+
+async def _on_akt_sent(bot, meta: Dict[str, Any], sent_message) -> None:
+    """AKT mijozga yetkazilgandan keyin: media ichida saqlash va sent belgisi."""
+    service = AKTService()
+    await service._save_akt_to_media_storage(meta['request_id'], meta['request_type'], meta['file_path'], sent_message)
+    await mark_akt_sent(meta['request_id'], meta['request_type'], datetime.now())
+
+
+async def _on_akt_failed(bot, meta: Dict[str, Any], error) -> None:
+    """Mijozga yuborib bo'lmadi - AKT manager guruhiga yuboriladi."""
+    logger.error(f"Error sending AKT to client: {error}")
+    await AKTService()._send_to_manager_group(
+        bot, meta['file_path'], meta['akt_number'], meta['request_id'], meta['request_type']
+    )
+
+
+register_outbound_hook(AKT_SENT_HOOK, _on_akt_sent)
+register_outbound_hook(AKT_FAILED_HOOK, _on_akt_failed)
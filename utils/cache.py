@@ -0,0 +1,59 @@
+# utils/cache.py
+# Jarayon ichidagi oddiy TTL + LRU kesh (DB'ga takroriy murojaatlarni kamaytirish uchun)
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Keshda yo'q kalitni keshlangan ``None`` dan ajratish uchun belgi
+MISSING = object()
+
+
+class TTLCache:
+    """Cheklangan hajmli, muddati o'tadigan kesh.
+
+    Har bir yozuv ``ttl`` soniyadan so'ng eskiradi; hajm ``maxsize`` dan
+    oshsa eng kam ishlatilgan yozuv chiqarib tashlanadi. ``None`` qiymat ham
+    keshlanadi (masalan, bazada yo'q foydalanuvchi), shu sababli ``get``
+    yo'q kalit uchun ``default`` qaytaradi (``MISSING`` berish mumkin).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, MISSING)
+        if item is MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] >= time.monotonic()
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
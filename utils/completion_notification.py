@@ -9,6 +9,7 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 from database.basic.user import get_user_by_telegram_id
 from keyboards.client_buttons import get_rating_keyboard
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -126,11 +127,9 @@ async def get_client_data_for_notification(request_id: int, request_type: str):
     """
     Client ma'lumotlarini olish notification uchun.
     """
-    from database.connections import get_connection_url
-    import asyncpg
     
     try:
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             if request_type == "connection":
                 query = """
@@ -185,10 +184,8 @@ async def get_used_materials_info(request_id: int, request_type: str, client_lan
     Ishlatilgan materiallar haqida ma'lumot olish.
     """
     try:
-        from database.connections import get_connection_url
-        import asyncpg
         
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             # Application number ni olish
             if request_type == "connection":
@@ -272,10 +269,8 @@ async def get_diagnosis_info(request_id: int, request_type: str, client_lang: st
         if request_type != "technician":
             return ""
             
-        from database.connections import get_connection_url
-        import asyncpg
         
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             query = """
                 SELECT description_ish
@@ -305,10 +300,8 @@ async def get_total_materials_cost(request_id: int, request_type: str, client_la
     Materiallar jami narxini olish.
     """
     try:
-        from database.connections import get_connection_url
-        import asyncpg
         
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             # Application number ni olish
             if request_type == "connection":
@@ -358,10 +351,8 @@ async def get_total_materials_cost(request_id: int, request_type: str, client_la
 async def get_application_number_for_notification(request_id: int, request_type: str) -> str:
     """Get application_number from database for notification"""
     try:
-        import asyncpg
-        from config import settings
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             if request_type == "technician":
                 query = """
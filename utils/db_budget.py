@@ -0,0 +1,235 @@
+# utils/db_budget.py
+# Har bir Telegram update'ning DB "narxi": so'rovlar soni, DB vaqti, ulanishlar
+#
+# DbBudgetMiddleware update boshida UpdateBudget ochadi va uni ContextVar'ga
+# qo'yadi; database/connections.py dagi PooledConnection har bir so'rov va
+# ulanish olishni shu yerga yozadi (budget yo'q bo'lsa - fon vazifalari,
+# skriptlar - hech narsa yozilmaydi). Update tugagach natija oxirgi
+# DB_BUDGET_WINDOW ta update'lik aylanma oynaga tushadi.
+#
+# Oynadan:
+#   get_budget_summary()  - p50/p95/p99 va handler'lar kesimi (admin /dbstats)
+#   start_budget_reporter() - har DB_BUDGET_LOG_INTERVAL soniyada log xulosasi
+# DB_BUDGET_MAX_QUERIES dan ko'p so'rov qilgan update darhol WARNING beradi.
+
+import asyncio
+import logging
+import math
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Log va ekranda SQL matni shu uzunlikkacha qisqartiriladi
+_SQL_PREVIEW = 160
+
+
+class UpdateBudget:
+    """Bitta update davomida yig'ilgan DB ko'rsatkichlari."""
+
+    __slots__ = ("handler", "queries", "db_time", "conn_opens", "acquire_wait",
+                 "slowest_sql", "slowest_time")
+
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.queries = 0
+        self.db_time = 0.0
+        self.conn_opens = 0
+        self.acquire_wait = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.slowest_time = 0.0
+
+    def add_query(self, sql: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_sql = sql
+
+    def add_connection(self, waited: float) -> None:
+        self.conn_opens += 1
+        self.acquire_wait += waited
+
+
+class BudgetSample(NamedTuple):
+    handler: str
+    queries: int
+    db_ms: float
+    conn_opens: int
+    total_ms: float
+    slowest_ms: float
+    slowest_sql: Optional[str]
+
+
+_current: ContextVar[Optional[UpdateBudget]] = ContextVar("db_budget", default=None)
+_samples: Deque[BudgetSample] = deque(maxlen=settings.DB_BUDGET_WINDOW)
+_reporter: Optional[asyncio.Task] = None
+
+
+def _preview(sql: Optional[str]) -> Optional[str]:
+    if sql is None:
+        return None
+    text = " ".join(sql.split())
+    return text if len(text) <= _SQL_PREVIEW else text[:_SQL_PREVIEW] + "..."
+
+
+# ---------- connections.py dan chaqiriladi ----------
+
+def current_budget() -> Optional[UpdateBudget]:
+    return _current.get()
+
+
+def record_query(sql: str, elapsed: float) -> None:
+    budget = _current.get()
+    if budget is not None:
+        budget.add_query(sql, elapsed)
+
+
+def record_connection(waited: float) -> None:
+    budget = _current.get()
+    if budget is not None:
+        budget.add_connection(waited)
+
+
+# ---------- middleware'dan chaqiriladi ----------
+
+def begin_update(handler: str):
+    """Yangi budget ochib ContextVar'ga qo'yish; end_update() uchun token qaytaradi."""
+    budget = UpdateBudget(handler)
+    return budget, _current.set(budget)
+
+
+def end_update(budget: UpdateBudget, token, total_time: float) -> BudgetSample:
+    """Budget'ni yopish va oynaga qo'shish."""
+    _current.reset(token)
+    sample = BudgetSample(
+        handler=budget.handler,
+        queries=budget.queries,
+        db_ms=budget.db_time * 1000,
+        conn_opens=budget.conn_opens,
+        total_ms=total_time * 1000,
+        slowest_ms=budget.slowest_time * 1000,
+        slowest_sql=budget.slowest_sql,
+    )
+    _samples.append(sample)
+    if settings.DB_BUDGET_MAX_QUERIES and sample.queries > settings.DB_BUDGET_MAX_QUERIES:
+        logger.warning(
+            "DB budget exceeded by %s: %s queries, %s connections, %.1f ms in DB; slowest %.1f ms: %s",
+            sample.handler, sample.queries, sample.conn_opens, sample.db_ms,
+            sample.slowest_ms, _preview(sample.slowest_sql),
+        )
+    return sample
+
+
+# ---------- xulosa ----------
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank persentil (saralangan ro'yxat uchun)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def get_budget_summary(top: int = 5) -> Dict[str, Any]:
+    """Oynadagi update'lar bo'yicha persentillar va eng "qimmat" handler'lar."""
+    samples = list(_samples)
+    by_handler: Dict[str, List[BudgetSample]] = {}
+    for s in samples:
+        by_handler.setdefault(s.handler, []).append(s)
+
+    handlers = []
+    for name, items in by_handler.items():
+        queries = sorted(s.queries for s in items)
+        slowest = max(items, key=lambda s: s.slowest_ms)
+        handlers.append({
+            "handler": name,
+            "updates": len(items),
+            "queries_p50": _percentile(queries, 50),
+            "queries_p95": _percentile(queries, 95),
+            "db_ms_p95": _percentile(sorted(s.db_ms for s in items), 95),
+            "conn_opens_p95": _percentile(sorted(s.conn_opens for s in items), 95),
+            "slowest_ms": slowest.slowest_ms,
+            "slowest_sql": _preview(slowest.slowest_sql),
+        })
+    handlers.sort(key=lambda h: (-h["queries_p95"], -h["db_ms_p95"]))
+
+    slowest = max(samples, key=lambda s: s.slowest_ms) if samples else None
+    return {
+        "updates": len(samples),
+        "window": _samples.maxlen,
+        "queries": _distribution([s.queries for s in samples]),
+        "db_ms": _distribution([s.db_ms for s in samples]),
+        "conn_opens": _distribution([s.conn_opens for s in samples]),
+        "total_ms": _distribution([s.total_ms for s in samples]),
+        "slowest": {
+            "handler": slowest.handler,
+            "ms": slowest.slowest_ms,
+            "sql": _preview(slowest.slowest_sql),
+        } if slowest is not None and slowest.slowest_sql else None,
+        "handlers": handlers[:top],
+    }
+
+
+def format_budget_summary(summary: Dict[str, Any]) -> str:
+    """Log uchun bir qatorli xulosa."""
+    q, db, conns = summary["queries"], summary["db_ms"], summary["conn_opens"]
+    text = (
+        f"DB budget over {summary['updates']} updates: "
+        f"queries p50={q['p50']:.0f} p95={q['p95']:.0f} p99={q['p99']:.0f} max={q['max']:.0f}; "
+        f"db_ms p50={db['p50']:.1f} p95={db['p95']:.1f} p99={db['p99']:.1f}; "
+        f"conns p95={conns['p95']:.0f}"
+    )
+    if summary["handlers"]:
+        worst = summary["handlers"][0]
+        text += f"; heaviest {worst['handler']} (queries p95={worst['queries_p95']:.0f})"
+    if summary["slowest"]:
+        text += f"; slowest {summary['slowest']['ms']:.1f} ms in {summary['slowest']['handler']}"
+    return text
+
+
+async def _report_loop(interval: float) -> None:
+    last_logged = None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            newest = _samples[-1] if _samples else None
+            # Yangi update bo'lmagan bo'lsa bir xil xulosani takrorlamaymiz
+            if newest is None or newest is last_logged:
+                continue
+            last_logged = newest
+            logger.info(format_budget_summary(get_budget_summary()))
+        except Exception as e:
+            logger.error(f"DB budget report failed: {e}")
+
+
+def start_budget_reporter() -> None:
+    """Davriy log xulosasini boshlash (main.py; DB_BUDGET_LOG_INTERVAL=0 - o'chirilgan)."""
+    global _reporter
+    interval = settings.DB_BUDGET_LOG_INTERVAL
+    if interval > 0 and _reporter is None:
+        _reporter = asyncio.create_task(_report_loop(interval), name="db-budget-reporter")
+
+
+async def stop_budget_reporter() -> None:
+    global _reporter
+    task, _reporter = _reporter, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,283 @@
+# utils/error_store.py
+# Xatolar uchun strukturali, indeksli ombor (logs/errors.sqlite3)
+#
+# errors.log matn sifatida qoladi (odam o'qishi uchun), lekin admin
+# ekranlari va statistika shu yerdan o'qiydi: har bir xato bitta qator
+# (append-only), error_type / user_id / context bo'yicha indekslar va
+# yozish paytida oshiriladigan agregat hisoblagichlar (error_counters).
+# Shuning uchun "so'nggi N ta" yoki "tur bo'yicha" so'rovlar log hajmiga
+# emas, natija hajmiga bog'liq.
+#
+# Yozish ErrorStoreHandler (logging.Handler) orqali - ERROR darajadagi
+# har qanday log yozuvi omborga tushadi; log_error() ma'lumotlari
+# record.error_data sifatida to'liq saqlanadi.
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Asosiy ustunlar; qolgan maydonlar (additional_data) extra JSON'ga
+_CORE_FIELDS = ("timestamp", "error_type", "error_message", "context", "user_id", "traceback")
+
+
+class ErrorStore:
+    """SQLite'dagi append-only xatolar jurnali + hisoblagichlar."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS errors (
+                id             INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at     REAL NOT NULL,
+                timestamp      TEXT NOT NULL,
+                error_type     TEXT COLLATE NOCASE,
+                error_message  TEXT,
+                context        TEXT,
+                user_id        INTEGER,
+                traceback      TEXT,
+                extra          TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_errors_type ON errors(error_type COLLATE NOCASE, id);
+            CREATE INDEX IF NOT EXISTS idx_errors_user ON errors(user_id, id);
+            CREATE INDEX IF NOT EXISTS idx_errors_context ON errors(context, id);
+            CREATE INDEX IF NOT EXISTS idx_errors_created ON errors(created_at);
+
+            CREATE TABLE IF NOT EXISTS error_counters (
+                dimension  TEXT NOT NULL,
+                key        TEXT NOT NULL,
+                count      INTEGER NOT NULL DEFAULT 0,
+                last_seen  TEXT,
+                PRIMARY KEY (dimension, key)
+            );
+            """
+        )
+
+    # ---------- Yozish ----------
+
+    def append(self, error_data: Dict[str, Any]) -> int:
+        """Bitta xatoni yozish va hisoblagichlarni oshirish; yangi qator ID'si."""
+        data = dict(error_data)
+        timestamp = str(data.get("timestamp") or datetime.now().isoformat())
+        user_id = data.get("user_id")
+        try:
+            user_id = int(user_id) if user_id is not None else None
+        except (TypeError, ValueError):
+            user_id = None
+        extra = {k: v for k, v in data.items() if k not in _CORE_FIELDS}
+        row = (
+            time.time(),
+            timestamp,
+            data.get("error_type") or "Unknown",
+            data.get("error_message"),
+            data.get("context") or "",
+            user_id,
+            data.get("traceback"),
+            json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+        )
+        counters = [("total", "all")]
+        for dimension, value in (("type", row[2]), ("context", row[4]), ("user", user_id)):
+            if value not in (None, ""):
+                counters.append((dimension, str(value)))
+
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                cur = self._db.execute(
+                    """
+                    INSERT INTO errors(created_at, timestamp, error_type, error_message,
+                                       context, user_id, traceback, extra)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    row,
+                )
+                self._db.executemany(
+                    """
+                    INSERT INTO error_counters(dimension, key, count, last_seen)
+                    VALUES (?, ?, 1, ?)
+                    ON CONFLICT(dimension, key)
+                    DO UPDATE SET count = count + 1, last_seen = excluded.last_seen
+                    """,
+                    [(d, k, timestamp) for d, k in counters],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            return cur.lastrowid
+
+    # ---------- O'qish ----------
+
+    @staticmethod
+    def _as_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        item = {field: row[field] for field in _CORE_FIELDS}
+        item["id"] = row["id"]
+        if row["extra"]:
+            try:
+                item.update(json.loads(row["extra"]))
+            except ValueError:
+                pass
+        return item
+
+    def recent(
+        self,
+        limit: int = 50,
+        *,
+        error_type: Optional[str] = None,
+        user_id: Optional[int] = None,
+        context: Optional[str] = None,
+        before_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        So'nggi ``limit`` ta xato (eskidan yangiga tartibda).
+
+        Filtrlar indeks bo'yicha; ``before_id`` - oldingi sahifaning eng
+        kichik ID'si (keyset sahifalash).
+        """
+        where, params = [], []
+        if error_type:
+            where.append("error_type = ?")
+            params.append(error_type)
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(int(user_id))
+        if context:
+            where.append("context = ?")
+            params.append(context)
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(int(before_id))
+        sql = "SELECT * FROM errors"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [self._as_dict(r) for r in reversed(rows)]
+
+    def statistics(self, top: int = 20) -> Dict[str, Any]:
+        """Yig'ma statistika hisoblagichlardan (jadvalni o'qimasdan)."""
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT dimension, key, count FROM error_counters
+                WHERE dimension <> 'user'
+                ORDER BY dimension, count DESC
+                """
+            ).fetchall()
+            users = self._db.execute(
+                "SELECT COUNT(*) FROM error_counters WHERE dimension = 'user'"
+            ).fetchone()[0]
+        stats: Dict[str, Any] = {
+            "total_errors": 0,
+            "error_types": {},
+            "users_with_errors": users,
+            "contexts": {},
+        }
+        for r in rows:
+            if r["dimension"] == "total":
+                stats["total_errors"] = r["count"]
+            elif r["dimension"] == "type" and len(stats["error_types"]) < top:
+                stats["error_types"][r["key"]] = r["count"]
+            elif r["dimension"] == "context" and len(stats["contexts"]) < top:
+                stats["contexts"][r["key"]] = r["count"]
+        return stats
+
+    # ---------- Tozalash ----------
+
+    def prune(self, days: int) -> int:
+        """``days`` kundan eski xatolarni o'chirish; hisoblagichlar qayta hisoblanadi."""
+        cutoff = time.time() - days * 24 * 60 * 60
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                deleted = self._db.execute("DELETE FROM errors WHERE created_at < ?", (cutoff,)).rowcount
+                if deleted:
+                    self._db.execute("DELETE FROM error_counters")
+                    self._db.execute(
+                        """
+                        INSERT INTO error_counters(dimension, key, count, last_seen)
+                        SELECT 'total', 'all', COUNT(*), MAX(timestamp) FROM errors
+                        UNION ALL
+                        SELECT 'type', error_type, COUNT(*), MAX(timestamp) FROM errors GROUP BY error_type
+                        UNION ALL
+                        SELECT 'context', context, COUNT(*), MAX(timestamp) FROM errors
+                        WHERE context <> '' GROUP BY context
+                        UNION ALL
+                        SELECT 'user', CAST(user_id AS TEXT), COUNT(*), MAX(timestamp) FROM errors
+                        WHERE user_id IS NOT NULL GROUP BY user_id
+                        """
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class ErrorStoreHandler(logging.Handler):
+    """ERROR va undan yuqori log yozuvlarini ErrorStore'ga yozadi."""
+
+    def __init__(self, store: "ErrorStore", level: int = logging.ERROR):
+        super().__init__(level)
+        self.store = store
+
+    @staticmethod
+    def record_to_error(record: logging.LogRecord) -> Dict[str, Any]:
+        data = getattr(record, "error_data", None)
+        if data:
+            return data
+        # QueueHandler orqali kelgan yozuvda exc_info yo'q - exc_type_name/exc_text bor
+        if record.exc_info:
+            error_type = record.exc_info[0].__name__
+            tb = "".join(traceback.format_exception(*record.exc_info))
+        else:
+            error_type = getattr(record, "exc_type_name", None) or record.levelname
+            tb = record.exc_text
+        return {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "error_type": error_type,
+            "error_message": record.getMessage(),
+            "context": record.name,
+            "user_id": None,
+            "traceback": tb,
+        }
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.store.append(self.record_to_error(record))
+        except Exception:
+            self.handleError(record)
+
+
+_store: Optional[ErrorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_error_store(path: str = os.path.join("logs", "errors.sqlite3")) -> ErrorStore:
+    """Jarayon bo'yicha yagona ErrorStore."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ErrorStore(path)
+    return _store
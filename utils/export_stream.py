@@ -0,0 +1,149 @@
+# utils/export_stream.py
+# Katta eksportlar uchun oqimli (streaming) CSV / XLSX yozish
+#
+# Qatorlar server-side cursor'dan (database.connections.iter_rows) partiyalab
+# keladi va darhol vaqtinchalik faylga yoziladi: CSV - oddiy yozish,
+# XLSX - openpyxl write-only rejimi. Shu sababli xotira qatorlar soniga
+# bog'liq emas; tayyor fayl Telegram'ga diskdan (FSInputFile) yuboriladi.
+# Har bir partiyani yozish asyncio.to_thread() orqali bajariladi.
+
+import asyncio
+import csv
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from utils.export_utils import ExportUtils
+
+STREAM_FORMATS = ("csv", "xlsx")
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class _CsvStreamWriter:
+    def __init__(self, path: str):
+        self._fh = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = None
+        self._fields: Optional[List[str]] = None
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        if self._writer is None:
+            self._fields = list(rows[0].keys())
+            self._writer = csv.writer(self._fh, lineterminator="\n")
+            self._writer.writerow([ExportUtils._normalize_string(h) for h in self._fields])
+        norm = ExportUtils._normalize_string
+        self._writer.writerows([norm(row.get(k, "")) for k in self._fields] for row in rows)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class _XlsxStreamWriter:
+    """openpyxl write-only workbook: qatorlar xotirada emas, ichki temp faylda saqlanadi."""
+
+    def __init__(self, path: str, sheet_name: str, title: Optional[str]):
+        self._path = path
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(title=sheet_name[:31] or "Data")
+        self._title = title
+        self._fields: Optional[List[str]] = None
+
+    def _start(self, first_batch: List[Dict[str, Any]]) -> None:
+        norm = ExportUtils._normalize_string
+        self._fields = list(first_batch[0].keys())
+        headers = [norm(h) for h in self._fields]
+
+        # Write-only rejimda ustun kengliklari qatorlardan oldin beriladi:
+        # sarlavha va birinchi partiya bo'yicha hisoblanadi
+        for col_num, header in enumerate(headers, 1):
+            max_length = len(header)
+            for row in first_batch:
+                max_length = max(max_length, min(len(norm(row.get(self._fields[col_num - 1]))), 100))
+            self._ws.column_dimensions[get_column_letter(col_num)].width = min(max(max_length + 2, 10), 50)
+
+        if self._title:
+            cell = WriteOnlyCell(self._ws, value=self._title)
+            cell.font = Font(size=16, bold=True)
+            cell.alignment = Alignment(horizontal="center")
+            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            self._ws.append([cell])
+            self._ws.append([])
+
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(self._ws, value=header)
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+            cell.alignment = Alignment(horizontal="center")
+            header_cells.append(cell)
+        self._ws.append(header_cells)
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        if self._fields is None:
+            self._start(rows)
+        norm = ExportUtils._normalize_string
+        for row in rows:
+            values = []
+            for key in self._fields:
+                value = row.get(key)
+                if isinstance(value, datetime) and value.tzinfo is not None:
+                    value = value.replace(tzinfo=None)
+                values.append(norm(value))
+            self._ws.append(values)
+
+    def close(self) -> None:
+        if self._fields is None and self._title:
+            self._ws.append([self._title])
+        self._wb.save(self._path)
+
+
+async def stream_export_to_file(
+    rows: AsyncIterator[Dict[str, Any]],
+    format_type: str,
+    title: Optional[str] = None,
+    sheet_name: str = "Data",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> str:
+    """Qatorlarni partiyalab vaqtinchalik faylga yozadi va fayl yo'lini qaytaradi.
+
+    Faylni yuborgandan keyin chaqiruvchi uni o'chirishi kerak (os.remove).
+    """
+    if format_type not in STREAM_FORMATS:
+        raise ValueError(f"Streaming export format not supported: {format_type}")
+
+    fd, path = tempfile.mkstemp(prefix="export_", suffix=f".{format_type}")
+    os.close(fd)
+    if format_type == "csv":
+        writer = _CsvStreamWriter(path)
+    else:
+        writer = _XlsxStreamWriter(path, sheet_name, title)
+
+    try:
+        batch: List[Dict[str, Any]] = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await asyncio.to_thread(writer.write_batch, batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(writer.write_batch, batch)
+        await asyncio.to_thread(writer.close)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        os.remove(path)
+        raise
+    finally:
+        # Cursor ulanishini pool'ga qaytarish (iteratsiya erta to'xtagan bo'lsa ham)
+        aclose = getattr(rows, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return path
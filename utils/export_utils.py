@@ -18,6 +18,14 @@ from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
+from utils.render_pool import render
+
+
+def _plain_rows(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """asyncpg.Record va boshqa mapping'larni worker jarayoniga uzatish uchun dict'ga aylantirish."""
+    return [r if type(r) is dict else dict(r) for r in (data or [])]
+
+
 class ExportUtils:
     """Utility class for exporting data in various formats"""
     
@@ -331,6 +339,53 @@ class ExportUtils:
         output.seek(0)
         return output
     
+    @staticmethod
+    def generate_table_csv(rows: List[Dict[str, Any]], headers: List[str]) -> bytes:
+        """Berilgan ustunlar tartibida CSV (controller eksporti uchun)."""
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=headers)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+        return output.getvalue().encode('utf-8')
+
+    @staticmethod
+    def generate_table_word(rows: List[Dict[str, Any]], headers: List[str], title: str) -> bytes:
+        """Sarlavha, sana va ustunlar jadvali bilan Word hujjat (controller eksporti uchun)."""
+        from docx.shared import Pt
+
+        doc = Document()
+
+        # Add title
+        title_para = doc.add_paragraph()
+        title_run = title_para.add_run(title)
+        title_run.bold = True
+        title_run.font.size = Pt(14)
+        title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        # Add date
+        date_para = doc.add_paragraph()
+        date_run = date_para.add_run(f"Sana: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+        date_run.italic = True
+        date_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+
+        # Add table
+        table = doc.add_table(rows=1, cols=len(headers))
+        table.style = 'Table Grid'
+
+        hdr_cells = table.rows[0].cells
+        for i, header in enumerate(headers):
+            hdr_cells[i].text = header
+
+        for row in rows:
+            row_cells = table.add_row().cells
+            for i, header in enumerate(headers):
+                row_cells[i].text = str(row.get(header, ""))
+
+        output = io.BytesIO()
+        doc.save(output)
+        return output.getvalue()
+
     @staticmethod
     def get_filename_with_timestamp(base_name: str, extension: str) -> str:
         """Generate filename with timestamp"""
@@ -470,4 +525,36 @@ class ExportUtils:
                 return None
         except Exception as e:
             print(f"Statistics export generation error: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    # ---- Async API: generatsiya render pool'da bajariladi (event loop bloklanmaydi) ----
+
+    @staticmethod
+    async def render_csv(data: List[Dict[str, Any]], headers: List[str] = None) -> io.StringIO:
+        return await render(ExportUtils.to_csv, _plain_rows(data), headers)
+
+    @staticmethod
+    async def render_excel(data: List[Dict[str, Any]], sheet_name: str = "Data", title: str = None) -> io.BytesIO:
+        return await render(ExportUtils.generate_excel, _plain_rows(data), sheet_name, title)
+
+    @staticmethod
+    async def render_word(data: List[Dict[str, Any]], title: str = "Export Hisoboti") -> io.BytesIO:
+        return await render(ExportUtils.generate_word, _plain_rows(data), title)
+
+    @staticmethod
+    async def render_pdf(data: List[Dict[str, Any]], title: str = "Export Hisoboti") -> io.BytesIO:
+        return await render(ExportUtils.generate_pdf, _plain_rows(data), title)
+
+    @staticmethod
+    async def render_table_csv(rows: List[Dict[str, Any]], headers: List[str]) -> bytes:
+        return await render(ExportUtils.generate_table_csv, _plain_rows(rows), list(headers))
+
+    @staticmethod
+    async def render_table_word(rows: List[Dict[str, Any]], headers: List[str], title: str) -> bytes:
+        return await render(ExportUtils.generate_table_word, _plain_rows(rows), list(headers), title)
+
+    async def render_orders_export(self, orders_data: List[Dict[str, Any]], format_type: str, title: str) -> bytes:
+        return await render(self.generate_orders_export, _plain_rows(orders_data), format_type, title)
+
+    async def render_statistics_export(self, stats_data: Dict[str, Any], format_type: str, title: str) -> bytes:
+        return await render(self.generate_statistics_export, stats_data, format_type, title)
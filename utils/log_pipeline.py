@@ -0,0 +1,113 @@
+# utils/log_pipeline.py
+# Bloklamaydigan logging: QueueHandler -> QueueListener (fon oqimi)
+#
+# Root logger'da faqat bitta QueueHandler bo'ladi: logger.info() chaqiruvi
+# yozuvni navbatga qo'yadi xolos, fayl / terminal / SQLite'ga yozish
+# QueueListener oqimida bajariladi - event loop disk I/O kutmaydi.
+#
+# Qo'shimcha:
+#   JsonFormatter  - fayllar uchun bir qatorli JSON (LOG_FORMAT=json)
+#   SamplingFilter - shovqinli logger'larning DEBUG/INFO yozuvlaridan faqat
+#                    bir ulushini o'tkazadi (LOG_SAMPLING={"prefix": 0.1}),
+#                    tashlangan yozuvlar navbatga ham tushmaydi.
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Har bir yozuv - bitta JSON qator."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        error_data = getattr(record, "error_data", None)
+        if error_data:
+            data["error"] = error_data
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Logger nomi prefiksi bo'yicha DEBUG/INFO yozuvlarini tanlab o'tkazish."""
+
+    def __init__(self, rates: Dict[str, float], max_level: int = logging.INFO):
+        super().__init__()
+        # Eng uzun prefiks birinchi tekshiriladi
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self.max_level = max_level
+
+    def _rate(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _LogQueueHandler(QueueHandler):
+    """Yozuvni navbatga tayyorlash: xabar va traceback matnga aylantiriladi."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Standart prepare() traceback'ni xabarga qo'shib yuboradi; bu yerda
+        # u exc_text'da alohida qoladi (formatterlar va ErrorStore uchun)
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_type_name = record.exc_info[0].__name__
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def start_log_pipeline(
+    handlers: Iterable[logging.Handler],
+    sampling: Optional[Dict[str, float]] = None,
+) -> QueueHandler:
+    """Handler'larni fon oqimiga o'tkazish; root uchun QueueHandler qaytaradi."""
+    global _listener
+    stop_log_pipeline()
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _LogQueueHandler(log_queue)
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def stop_log_pipeline() -> None:
+    """Navbatdagi yozuvlarni yozib tugatib, fon oqimini to'xtatish."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_log_pipeline)
@@ -0,0 +1,378 @@
+# utils/media_ingest.py
+# Ariza ilovalarini (foto / video) fonda yuklab olish (046_media_ingest_jobs.sql)
+#
+# Ariza yaratish handler'i bot.get_file / download_file ni kutmaydi:
+# enqueue_media() faqat media_ingest_jobs ga file_id yozadi. Fon worker'i:
+#   - vazifalarni FOR UPDATE SKIP LOCKED bilan partiyalab oladi;
+#   - fayllarni MEDIA_INGEST_CONCURRENCY tagacha parallel yuklab oladi;
+#   - sha256 xesh bo'yicha deduplikatsiya qiladi: bir xil fayl (media_files
+#     yoki shu partiyada) bo'lsa diskka qayta yozilmaydi, mavjud yo'l ishlatiladi;
+#   - media_files qatorlarini bitta so'rov bilan qo'shadi va vazifalarni yopadi.
+#
+# media_ingest_jobs jadvali bo'lmasa (046 qo'llanmagan) enqueue_media() faylni
+# eski usulda darhol yuklab oladi va media_files ga yozadi.
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+# media_type -> (kengaytma, mime)
+_MEDIA_TYPES = {
+    "photo": ("jpg", "image/jpeg"),
+    "video": ("mp4", "video/mp4"),
+}
+
+STALE_CLAIM_SECONDS = 600
+MAX_BACKOFF = 600
+POLL_INTERVAL = 2.0
+
+_worker: Optional["MediaIngestWorker"] = None
+
+# 046 migratsiyasi qo'llanmagan bazada navbatsiz (inline) ishlaymiz
+_jobs_table = {"available": True}
+
+
+async def enqueue_media(
+    file_id: str,
+    media_type: str,
+    related_table: str,
+    related_id: int,
+    uploaded_by: Optional[int] = None,
+    category: str = "service_attachment",
+) -> Optional[int]:
+    """Telegram faylini yuklab olish vazifasini navbatga qo'yadi (vazifa id'si).
+
+    Navbat jadvali yo'q bo'lsa fayl darhol yuklab olinadi va None qaytadi.
+    """
+    if media_type not in _MEDIA_TYPES:
+        return None
+    job_id = None
+    if _jobs_table["available"]:
+        conn = await get_connection()
+        try:
+            job_id = await conn.fetchval(
+                """
+                INSERT INTO media_ingest_jobs
+                    (file_id, media_type, category, related_table, related_id, uploaded_by)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                RETURNING id
+                """,
+                file_id, media_type, category, related_table, related_id, uploaded_by
+            )
+        except asyncpg.UndefinedTableError:
+            logger.warning("media_ingest_jobs table missing, downloading media inline")
+            _jobs_table["available"] = False
+        finally:
+            await conn.close()
+    if job_id is None:
+        if _worker is None:
+            raise RuntimeError("media_ingest_jobs table missing and media ingest worker not started")
+        await _worker.ingest_inline(file_id, media_type, category, related_table, related_id, uploaded_by)
+        return None
+    if _worker is not None:
+        _worker.wakeup()
+    return job_id
+
+
+def _media_dir() -> str:
+    now = datetime.now()
+    path = os.path.join(settings.MEDIA_ROOT, now.strftime("%Y"), now.strftime("%m"), "orders", "attachments")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _file_sha256(path: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class MediaIngestWorker:
+    """media_ingest_jobs navbatini qayta ishlovchi fon vazifasi."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._semaphore = asyncio.Semaphore(max(1, settings.MEDIA_INGEST_CONCURRENCY))
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="media-ingest")
+
+    def wakeup(self) -> None:
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+
+    async def ingest_inline(self, file_id: str, media_type: str, category: str,
+                            related_table: str, related_id: int, uploaded_by: Optional[int]) -> str:
+        """Navbatsiz: faylni darhol yuklab olib media_files ga yozadi (046 qo'llanmagan baza)."""
+        ext, mime = _MEDIA_TYPES[media_type]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_name = f"technician_{related_id}_{uploaded_by}_{timestamp}.{ext}"
+        file_path = os.path.join(_media_dir(), file_name)
+        async with self._semaphore:
+            file = await self.bot.get_file(file_id)
+            await self.bot.download_file(file.file_path, file_path)
+        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                INSERT INTO media_files (
+                    file_path, file_type, file_size, original_name, mime_type,
+                    category, related_table, related_id, uploaded_by, is_active
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                """,
+                file_path, media_type, file_size, file_name, mime,
+                category, related_table, related_id, uploaded_by, True
+            )
+        finally:
+            await conn.close()
+        logger.info(f"Media file saved inline: {file_path}")
+        return file_path
+
+    # --- DB ---
+
+    async def _recover_stale(self) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                UPDATE media_ingest_jobs
+                SET status = 'pending', claimed_at = NULL
+                WHERE status = 'running'
+                  AND claimed_at < NOW() - make_interval(secs => $1::float8)
+                """,
+                float(STALE_CLAIM_SECONDS)
+            )
+        finally:
+            await conn.close()
+
+    async def _claim(self, limit: int) -> List[Dict[str, Any]]:
+        conn = await get_connection()
+        try:
+            rows = await conn.fetch(
+                """
+                UPDATE media_ingest_jobs j
+                SET status = 'running', claimed_at = NOW()
+                FROM (
+                    SELECT id FROM media_ingest_jobs
+                    WHERE status = 'pending' AND available_at <= NOW()
+                    ORDER BY id
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                ) c
+                WHERE j.id = c.id
+                RETURNING j.id, j.file_id, j.media_type, j.category, j.related_table,
+                          j.related_id, j.uploaded_by, j.attempts
+                """,
+                limit
+            )
+        finally:
+            await conn.close()
+        return sorted((dict(r) for r in rows), key=lambda r: r["id"])
+
+    async def _fail(self, job: Dict[str, Any], error: str, permanent: bool) -> None:
+        attempts = job["attempts"] + 1
+        give_up = permanent or attempts >= settings.MEDIA_INGEST_MAX_ATTEMPTS
+        delay = min(MAX_BACKOFF, 10 * 2 ** (attempts - 1))
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                UPDATE media_ingest_jobs
+                SET status = CASE WHEN $3 THEN 'failed' ELSE 'pending' END,
+                    attempts = attempts + 1,
+                    last_error = $2,
+                    claimed_at = NULL,
+                    finished_at = CASE WHEN $3 THEN NOW() ELSE NULL END,
+                    available_at = NOW() + make_interval(secs => $4::float8)
+                WHERE id = $1
+                """,
+                job["id"], error[:1000], give_up, float(delay)
+            )
+        finally:
+            await conn.close()
+        if give_up:
+            logger.error(f"Media ingest job {job['id']} failed: {error}")
+        else:
+            logger.warning(f"Media ingest job {job['id']} retry in {delay}s: {error}")
+
+    # --- yuklab olish ---
+
+    async def _download(self, job: Dict[str, Any], media_dir: str) -> Optional[Dict[str, Any]]:
+        """Faylni vaqtinchalik yo'lga yuklaydi; xesh va hajmni qaytaradi."""
+        tmp_path = os.path.join(media_dir, f".ingest-{job['id']}.part")
+        async with self._semaphore:
+            try:
+                file = await self.bot.get_file(job["file_id"])
+                await self.bot.download_file(file.file_path, tmp_path)
+                content_hash, size = await asyncio.to_thread(_file_sha256, tmp_path)
+            except TelegramBadRequest as e:
+                # file_id yaroqsiz yoki fayl juda katta - qayta urinish foyda bermaydi
+                _remove_quietly(tmp_path)
+                await self._fail(job, str(e), permanent=True)
+                return None
+            except Exception as e:
+                _remove_quietly(tmp_path)
+                await self._fail(job, str(e), permanent=False)
+                return None
+        return {"job": job, "tmp_path": tmp_path, "hash": content_hash, "size": size}
+
+    async def _process(self, jobs: List[Dict[str, Any]]) -> None:
+        media_dir = _media_dir()
+        results = [
+            r for r in await asyncio.gather(*(self._download(job, media_dir) for job in jobs))
+            if r is not None
+        ]
+        if not results:
+            return
+
+        try:
+            conn = await get_connection()
+            try:
+                existing = {
+                    row["content_hash"]: row["file_path"]
+                    for row in await conn.fetch(
+                        """
+                        SELECT DISTINCT ON (content_hash) content_hash, file_path
+                        FROM media_files
+                        WHERE content_hash = ANY($1::text[])
+                        ORDER BY content_hash, id
+                        """,
+                        list({r["hash"] for r in results})
+                    )
+                    if os.path.exists(row["file_path"])
+                }
+
+                records = []
+                deduplicated = 0
+                for r in results:
+                    job = r["job"]
+                    ext, mime = _MEDIA_TYPES[job["media_type"]]
+                    stored_path = existing.get(r["hash"])
+                    if stored_path is not None:
+                        _remove_quietly(r["tmp_path"])
+                        deduplicated += 1
+                    else:
+                        stored_path = os.path.join(media_dir, f"{r['hash']}.{ext}")
+                        if os.path.exists(stored_path):
+                            _remove_quietly(r["tmp_path"])
+                        else:
+                            os.replace(r["tmp_path"], stored_path)
+                        existing[r["hash"]] = stored_path
+
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    original_name = f"technician_{job['related_id']}_{job['uploaded_by']}_{timestamp}.{ext}"
+                    records.append((
+                        stored_path, job["media_type"], r["size"], original_name, mime,
+                        job["category"], job["related_table"], job["related_id"],
+                        job["uploaded_by"], True, r["hash"],
+                    ))
+
+                async with conn.transaction():
+                    await conn.executemany(
+                        """
+                        INSERT INTO media_files (
+                            file_path, file_type, file_size, original_name, mime_type,
+                            category, related_table, related_id, uploaded_by, is_active,
+                            content_hash
+                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                        """,
+                        records
+                    )
+                    await conn.execute(
+                        """
+                        UPDATE media_ingest_jobs
+                        SET status = 'done', finished_at = NOW(), attempts = attempts + 1,
+                            claimed_at = NULL, last_error = NULL
+                        WHERE id = ANY($1::bigint[])
+                        """,
+                        [r["job"]["id"] for r in results]
+                    )
+            finally:
+                await conn.close()
+        except Exception as e:
+            # Vazifalar navbatga qaytadi; kontent-manzilli fayl diskda qolsa keyingi safar qayta ishlatiladi
+            for r in results:
+                _remove_quietly(r["tmp_path"])
+                await self._fail(r["job"], str(e), permanent=False)
+            return
+
+        logger.info("Media ingest: %s file(s) stored, %s deduplicated", len(results), deduplicated)
+
+    async def _loop(self) -> None:
+        logger.info("Media ingest worker started")
+        try:
+            await self._recover_stale()
+        except Exception as e:
+            logger.error(f"Media ingest stale recovery failed: {e}")
+
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                jobs = await self._claim(settings.MEDIA_INGEST_BATCH_SIZE)
+                if jobs:
+                    started = time.perf_counter()
+                    await self._process(jobs)
+                    logger.debug("Media ingest batch of %s took %.2fs", len(jobs), time.perf_counter() - started)
+                    continue
+            except asyncpg.UndefinedTableError:
+                logger.warning("media_ingest_jobs table missing, media ingest worker idle")
+                await asyncio.sleep(60)
+            except Exception as e:
+                logger.error(f"Media ingest worker error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Media ingest worker stopped")
+
+
+def start_media_ingest_worker(bot: Bot) -> MediaIngestWorker:
+    """Bot yaratilgandan keyin chaqiriladi (main.py)."""
+    global _worker
+    if _worker is None:
+        _worker = MediaIngestWorker(bot)
+        _worker.start()
+    return _worker
+
+
+async def stop_media_ingest_worker() -> None:
+    """Joriy partiyani tugatib worker'ni to'xtatadi (pool yopilishidan oldin)."""
+    global _worker
+    worker, _worker = _worker, None
+    if worker is not None:
+        await worker.stop()
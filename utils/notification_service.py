@@ -4,6 +4,8 @@ from aiogram import Bot
 from typing import Optional, Dict, Any
 import logging
 from datetime import datetime
+from database.connections import get_connection
+from utils.outbound_queue import enqueue_message
 
 logger = logging.getLogger(__name__)
 
@@ -87,13 +89,15 @@ async def send_cross_role_notification(
         order_type_text = format_order_type_text(order_type, lang)
         message = build_transfer_notification(order_type_text, application_number, int(current_load or 0), lang)
 
-        await bot.send_message(
-            chat_id=recipient_telegram_id,
+        # Bir ariza bo'yicha hali yuborilmagan bildirishnoma bo'lsa, eng oxirgisi qoladi
+        await enqueue_message(
+            recipient_telegram_id, "message",
+            dedup_key=f"xrole:{recipient_telegram_id}:{order_type}:{application_number}" if application_number else None,
             text=message,
             parse_mode="HTML",
         )
         logger.info(
-            f"Role-change notification sent to {recipient_telegram_id} | type={order_type} | app={application_number} | load={current_load}"
+            f"Role-change notification queued for {recipient_telegram_id} | type={order_type} | app={application_number} | load={current_load}"
         )
         return True
     except Exception as e:
@@ -146,14 +150,14 @@ async def send_role_notification(
         else:
             message = f"📬 <b>Yangi {order_type_text} arizasi</b>\n\n🆔 {order_id}\n\n📊 Sizda yana <b>{current_load}ta</b> ariza bor"
         
-        # Xabarni yuborish (state'ga ta'sir qilmaydi)
-        await bot.send_message(
-            chat_id=recipient_telegram_id,
+        # Xabarni navbatga qo'yish (state'ga ta'sir qilmaydi)
+        await enqueue_message(
+            recipient_telegram_id, "message",
             text=message,
             parse_mode="HTML"
         )
         
-        logger.info(f"Notification sent to {recipient_telegram_id} for order {order_id}")
+        logger.info(f"Notification queued for {recipient_telegram_id} for order {order_id}")
         return True
         
     except Exception as e:
@@ -281,14 +285,14 @@ async def send_group_notification_for_staff_order(
             )
         
         # Xabarni guruhga yuborish
-        logger.info(f"Sending message to group {settings.ZAYAVKA_GROUP_ID}")
-        await bot.send_message(
-            chat_id=settings.ZAYAVKA_GROUP_ID,
+        logger.info(f"Queueing message to group {settings.ZAYAVKA_GROUP_ID}")
+        await enqueue_message(
+            settings.ZAYAVKA_GROUP_ID, "message",
             text=message,
             parse_mode="HTML"
         )
         
-        logger.info(f"Group notification sent for staff order {order_id} created by {creator_role}")
+        logger.info(f"Group notification queued for staff order {order_id} created by {creator_role}")
         return True
         
     except Exception as e:
@@ -312,11 +316,9 @@ async def get_recipient_load(
     Returns:
         Aktiv arizalar soni
     """
-    from database.connections import get_connection_url
-    import asyncpg
     
     try:
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             if role == "junior_manager":
                 # Junior manager uchun connection_orders hisoblaymiz
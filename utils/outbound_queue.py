@@ -0,0 +1,540 @@
+# utils/outbound_queue.py
+# Telegram'ga chiquvchi xabarlar navbati (outbound_messages, 045_outbound_messages.sql)
+#
+# Handler'lar bot.send_* ni to'g'ridan-to'g'ri kutmaydi: enqueue_message()
+# xabarni jadvalga yozadi va darhol qaytadi. Fon dispatcher'i:
+#   - qatorlarni FOR UPDATE SKIP LOCKED bilan oladi (bir nechta worker xavfsiz);
+#   - global limit (token bucket, OUTBOX_GLOBAL_RATE xabar/s) va chat limiti
+#     (shaxsiy chat - OUTBOX_PRIVATE_RATE xabar/s, guruh - OUTBOX_GROUP_PER_MINUTE
+#     xabar/daqiqa) ga rioya qiladi;
+#   - bitta chat xabarlari navbat tartibida, ketma-ket yuboriladi;
+#   - RetryAfter'da chatni to'xtatib, xabarni retry_after dan keyin qayta
+#     rejalashtiradi; boshqa vaqtinchalik xatolarda backoff bilan qayta urinadi;
+#   - dedup_key bir xil kutilayotgan xabarlarni bittaga birlashtiradi.
+#
+# Yuborilgandan / butunlay muvaffaqiyatsiz bo'lgandan keyingi ishlar
+# (masalan AKT'ni media'ga saqlash) register_outbound_hook() bilan
+# ro'yxatdan o'tgan nomli hook'lar orqali bajariladi - ular jarayon qayta
+# ishga tushganda ham jadvaldagi nom bo'yicha topiladi.
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+    TelegramNotFound,
+    TelegramRetryAfter,
+)
+from aiogram.types import FSInputFile
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+# method -> Bot metodi
+_METHODS = {
+    "message": "send_message",
+    "photo": "send_photo",
+    "video": "send_video",
+    "location": "send_location",
+    "document": "send_document",
+}
+
+# Chat limiti shu vaqtdan uzoq kuttirsa, qolgan xabarlar navbatga qaytariladi
+MAX_INLINE_WAIT = 5.0
+# 'sending' holatida shuncha vaqt qolgan qatorlar (jarayon yiqilgan) qaytariladi
+STALE_CLAIM_SECONDS = 300
+# Yuborilgan / failed qatorlarni tozalash oralig'i (soniya)
+PURGE_INTERVAL = 3600
+# Vaqtinchalik xatodan keyingi maksimal kutish (soniya)
+MAX_BACKOFF = 300
+
+Hook = Callable[[Bot, Dict[str, Any], Any], Awaitable[None]]
+_hooks: Dict[str, Hook] = {}
+
+_metrics: Dict[str, float] = {
+    "enqueued": 0,
+    "coalesced": 0,
+    "sent": 0,
+    "failed": 0,
+    "retried": 0,
+    "retry_after": 0,
+    "lag_total": 0.0,
+    "lag_max": 0.0,
+}
+
+_dispatcher: Optional["OutboundDispatcher"] = None
+
+
+def register_outbound_hook(name: str, hook: Hook) -> None:
+    """Nomli hook: ``hook(bot, meta, result)``; result - yuborilgan Message yoki xato matni."""
+    _hooks[name] = hook
+
+
+class _TokenBucket:
+    """Global yuborish limiti: sekundiga ``rate`` ta, ``burst`` gacha to'planadi."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, 0.1)
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _chat_interval(chat_id: int) -> float:
+    # Manfiy id - guruh / kanal
+    if chat_id < 0:
+        return 60.0 / max(settings.OUTBOX_GROUP_PER_MINUTE, 1)
+    return 1.0 / max(settings.OUTBOX_PRIVATE_RATE, 0.1)
+
+
+async def enqueue_message(
+    chat_id: int,
+    method: str,
+    *,
+    dedup_key: Optional[str] = None,
+    on_sent: Optional[str] = None,
+    on_failed: Optional[str] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    delay: float = 0,
+    **payload: Any,
+) -> Optional[int]:
+    """Xabarni navbatga qo'yadi va qator id'sini qaytaradi.
+
+    ``payload`` - Bot.send_* argumentlari (chat_id'siz), JSON'ga yoziladigan
+    qiymatlar bo'lishi kerak. Hujjat diskdan yuborilsa ``document_path``
+    (va ixtiyoriy ``filename``) beriladi.
+    """
+    if method not in _METHODS:
+        raise ValueError(f"Unsupported outbound method: {method}")
+
+    conn = await get_connection()
+    try:
+        row = await conn.fetchrow(
+            """
+            INSERT INTO outbound_messages AS m
+                (chat_id, method, payload, dedup_key, on_sent, on_failed, meta, available_at)
+            VALUES ($1, $2, $3::jsonb, $4, $5, $6, $7::jsonb,
+                    NOW() + make_interval(secs => $8::float8))
+            ON CONFLICT (dedup_key) WHERE status = 'pending' AND dedup_key IS NOT NULL
+            DO UPDATE SET payload = EXCLUDED.payload,
+                          on_sent = EXCLUDED.on_sent,
+                          on_failed = EXCLUDED.on_failed,
+                          meta = EXCLUDED.meta
+            RETURNING id, (xmax = 0) AS inserted
+            """,
+            chat_id, method, json.dumps(payload, ensure_ascii=False), dedup_key,
+            on_sent, on_failed, json.dumps(meta or {}, ensure_ascii=False), float(delay)
+        )
+    except asyncpg.UndefinedTableError:
+        # Migratsiya hali qo'llanmagan: eski usulda darhol yuboramiz
+        logger.warning("outbound_messages table missing, sending %s to %s inline", method, chat_id)
+        if _dispatcher is None:
+            raise
+        await _dispatcher.send_inline(chat_id, method, payload, on_sent, on_failed, meta or {})
+        return None
+    finally:
+        await conn.close()
+
+    if row["inserted"]:
+        _metrics["enqueued"] += 1
+    else:
+        _metrics["coalesced"] += 1
+    if _dispatcher is not None:
+        _dispatcher.wakeup()
+    return row["id"]
+
+
+async def _send(bot: Bot, chat_id: int, method: str, payload: Dict[str, Any]):
+    kwargs = dict(payload)
+    path = kwargs.pop("document_path", None)
+    filename = kwargs.pop("filename", None)
+    if path is not None:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        kwargs["document"] = FSInputFile(path, filename=filename or os.path.basename(path))
+    return await getattr(bot, _METHODS[method])(chat_id=chat_id, **kwargs)
+
+
+async def _run_hook(bot: Bot, name: Optional[str], meta: Dict[str, Any], result: Any) -> None:
+    if not name:
+        return
+    hook = _hooks.get(name)
+    if hook is None:
+        logger.warning("Outbound hook not registered: %s", name)
+        return
+    try:
+        await hook(bot, meta, result)
+    except Exception as e:
+        logger.error(f"Outbound hook {name} failed: {e}")
+
+
+class OutboundDispatcher:
+    """outbound_messages navbatini yuboruvchi fon vazifasi."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._bucket = _TokenBucket(settings.OUTBOX_GLOBAL_RATE, settings.OUTBOX_GLOBAL_RATE)
+        self._chat_next: Dict[int, float] = {}
+        self._chat_tasks: Dict[int, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="outbound-dispatcher")
+
+    def wakeup(self) -> None:
+        self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        tasks = list(self._chat_tasks.values())
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # --- DB ---
+
+    async def _recover_stale(self) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                UPDATE outbound_messages
+                SET status = 'pending', claimed_at = NULL
+                WHERE status = 'sending'
+                  AND claimed_at < NOW() - make_interval(secs => $1::float8)
+                """,
+                float(STALE_CLAIM_SECONDS)
+            )
+        finally:
+            await conn.close()
+
+    async def _claim(self, limit: int, busy_chats: List[int]) -> List[Dict[str, Any]]:
+        conn = await get_connection()
+        try:
+            rows = await conn.fetch(
+                """
+                UPDATE outbound_messages m
+                SET status = 'sending', claimed_at = NOW()
+                FROM (
+                    SELECT id FROM outbound_messages
+                    WHERE status = 'pending'
+                      AND available_at <= NOW()
+                      AND chat_id <> ALL($2::bigint[])
+                    ORDER BY id
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                ) c
+                WHERE m.id = c.id
+                RETURNING m.id, m.chat_id, m.method, m.payload::text AS payload,
+                          m.on_sent, m.on_failed, m.meta::text AS meta,
+                          m.attempts, m.created_at,
+                          EXTRACT(EPOCH FROM (NOW() - m.created_at)) AS age
+                """,
+                limit, busy_chats
+            )
+        finally:
+            await conn.close()
+        result = []
+        for r in rows:
+            item = dict(r)
+            item["payload"] = json.loads(item["payload"])
+            item["meta"] = json.loads(item["meta"])
+            result.append(item)
+        result.sort(key=lambda r: r["id"])
+        return result
+
+    async def _mark_sent(self, msg_id: int) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                UPDATE outbound_messages
+                SET status = 'sent', finished_at = NOW(), attempts = attempts + 1, last_error = NULL
+                WHERE id = $1
+                """,
+                msg_id
+            )
+        finally:
+            await conn.close()
+
+    async def _mark_failed(self, msg_id: int, error: str) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                UPDATE outbound_messages
+                SET status = 'failed', finished_at = NOW(), attempts = attempts + 1, last_error = $2
+                WHERE id = $1
+                """,
+                msg_id, error[:1000]
+            )
+        finally:
+            await conn.close()
+
+    async def _release(self, ids: List[int], delay: float, error: Optional[str] = None,
+                       bump_first: bool = False) -> None:
+        """Qatorlarni navbatga qaytaradi; bump_first - birinchisi uchun urinish hisoblanadi."""
+        if not ids:
+            return
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                UPDATE outbound_messages
+                SET status = 'pending',
+                    claimed_at = NULL,
+                    available_at = NOW() + make_interval(secs => $2::float8),
+                    attempts = attempts + CASE WHEN $4 AND id = $5 THEN 1 ELSE 0 END,
+                    last_error = CASE WHEN id = $5 THEN COALESCE($3, last_error) ELSE last_error END
+                WHERE id = ANY($1::bigint[]) AND status = 'sending'
+                """,
+                ids, float(delay), error, bump_first, ids[0]
+            )
+        finally:
+            await conn.close()
+
+    async def _migrate_chat(self, old_chat_id: int, new_chat_id: int) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                "UPDATE outbound_messages SET chat_id = $2 WHERE chat_id = $1 AND status IN ('pending', 'sending')",
+                old_chat_id, new_chat_id
+            )
+        finally:
+            await conn.close()
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                DELETE FROM outbound_messages
+                WHERE status IN ('sent', 'failed')
+                  AND finished_at < NOW() - make_interval(days => $1)
+                """,
+                settings.OUTBOX_RETENTION_DAYS
+            )
+        finally:
+            await conn.close()
+
+    # --- yuborish ---
+
+    async def send_inline(self, chat_id: int, method: str, payload: Dict[str, Any],
+                          on_sent: Optional[str], on_failed: Optional[str], meta: Dict[str, Any]) -> None:
+        """Navbatsiz yuborish (jadval yo'q bo'lganda), limitlar baribir qo'llanadi."""
+        await self._bucket.acquire()
+        try:
+            message = await _send(self.bot, chat_id, method, payload)
+        except Exception as e:
+            await _run_hook(self.bot, on_failed, meta, str(e))
+            raise
+        await _run_hook(self.bot, on_sent, meta, message)
+
+    async def _run_chat(self, chat_id: int, rows: List[Dict[str, Any]]) -> None:
+        interval = _chat_interval(chat_id)
+        i = 0
+        try:
+            while i < len(rows):
+                row = rows[i]
+                wait = self._chat_next.get(chat_id, 0.0) - time.monotonic()
+                if wait > MAX_INLINE_WAIT:
+                    await self._release([r["id"] for r in rows[i:]], wait)
+                    return
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self._bucket.acquire()
+                self._chat_next[chat_id] = time.monotonic() + interval
+
+                try:
+                    message = await _send(self.bot, chat_id, row["method"], row["payload"])
+                except TelegramRetryAfter as e:
+                    _metrics["retry_after"] += 1
+                    self._chat_next[chat_id] = time.monotonic() + e.retry_after
+                    logger.warning("RetryAfter %ss for chat %s, message %s rescheduled",
+                                   e.retry_after, chat_id, row["id"])
+                    await self._release([r["id"] for r in rows[i:]], e.retry_after, f"RetryAfter {e.retry_after}")
+                    return
+                except TelegramMigrateToChat as e:
+                    logger.info("Chat %s migrated to %s", chat_id, e.migrate_to_chat_id)
+                    await self._release([r["id"] for r in rows[i:]], 0)
+                    await self._migrate_chat(chat_id, e.migrate_to_chat_id)
+                    return
+                except (TelegramForbiddenError, TelegramNotFound, TelegramBadRequest, FileNotFoundError) as e:
+                    # Qayta urinish foyda bermaydi (bot bloklangan, chat yo'q, noto'g'ri so'rov)
+                    _metrics["failed"] += 1
+                    logger.error(f"Outbound message {row['id']} to {chat_id} failed: {e}")
+                    await self._mark_failed(row["id"], str(e))
+                    await _run_hook(self.bot, row["on_failed"], row["meta"], str(e))
+                    i += 1
+                    continue
+                except Exception as e:
+                    attempts = row["attempts"] + 1
+                    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                        _metrics["failed"] += 1
+                        logger.error(f"Outbound message {row['id']} to {chat_id} gave up after {attempts} attempts: {e}")
+                        await self._mark_failed(row["id"], str(e))
+                        await _run_hook(self.bot, row["on_failed"], row["meta"], str(e))
+                        i += 1
+                        continue
+                    _metrics["retried"] += 1
+                    delay = min(MAX_BACKOFF, 5 * 2 ** (attempts - 1))
+                    logger.warning(f"Outbound message {row['id']} to {chat_id} retry in {delay}s: {e}")
+                    # Chat ichidagi tartib buzilmasligi uchun keyingilari ham kutadi
+                    await self._release([r["id"] for r in rows[i:]], delay, str(e), bump_first=True)
+                    return
+
+                lag = time.monotonic() - row["_claimed"] + float(row["age"] or 0)
+                _metrics["sent"] += 1
+                _metrics["lag_total"] += lag
+                if lag > _metrics["lag_max"]:
+                    _metrics["lag_max"] = lag
+                await self._mark_sent(row["id"])
+                await _run_hook(self.bot, row["on_sent"], row["meta"], message)
+                i += 1
+        except asyncio.CancelledError:
+            await self._release([r["id"] for r in rows[i:]], 0)
+            raise
+        except Exception as e:
+            logger.error(f"Outbound chat worker {chat_id} error: {e}")
+            await self._release([r["id"] for r in rows[i:]], 5, str(e))
+
+    def _spawn(self, chat_id: int, rows: List[Dict[str, Any]]) -> None:
+        task = asyncio.create_task(self._run_chat(chat_id, rows))
+        self._chat_tasks[chat_id] = task
+
+        def _done(_task: asyncio.Task, chat_id: int = chat_id) -> None:
+            self._chat_tasks.pop(chat_id, None)
+            self._wakeup.set()
+
+        task.add_done_callback(_done)
+
+    async def _loop(self) -> None:
+        logger.info("Outbound dispatcher started")
+        try:
+            await self._recover_stale()
+        except Exception as e:
+            logger.error(f"Outbound stale recovery failed: {e}")
+
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                if len(self._chat_tasks) < settings.OUTBOX_MAX_CHATS:
+                    rows = await self._claim(settings.OUTBOX_BATCH_SIZE, list(self._chat_tasks.keys()))
+                    claimed = time.monotonic()
+                    by_chat: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+                    for row in rows:
+                        row["_claimed"] = claimed
+                        by_chat[row["chat_id"]].append(row)
+                    for chat_id, chat_rows in by_chat.items():
+                        self._spawn(chat_id, chat_rows)
+                    if len(rows) >= settings.OUTBOX_BATCH_SIZE:
+                        # Navbatda yana bor - kutmasdan davom etamiz
+                        await asyncio.sleep(0)
+                        continue
+                await self._maybe_purge()
+            except asyncpg.UndefinedTableError:
+                logger.warning("outbound_messages table missing, dispatcher idle")
+                await asyncio.sleep(60)
+            except Exception as e:
+                logger.error(f"Outbound dispatcher error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Outbound dispatcher stopped")
+
+
+def start_outbound_dispatcher(bot: Bot) -> OutboundDispatcher:
+    """Bot yaratilgandan keyin chaqiriladi (main.py)."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboundDispatcher(bot)
+        _dispatcher.start()
+    return _dispatcher
+
+
+async def stop_outbound_dispatcher() -> None:
+    """Joriy yuborishlarni tugatib dispatcher'ni to'xtatadi (pool yopilishidan oldin)."""
+    global _dispatcher
+    dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        await dispatcher.stop()
+
+
+async def get_outbound_metrics() -> Dict[str, Any]:
+    """Navbat chuqurligi, kechikish (lag) va yuborish hisoblagichlari (admin status ekrani uchun)."""
+    sent = int(_metrics["sent"])
+    result: Dict[str, Any] = {
+        "enqueued": int(_metrics["enqueued"]),
+        "coalesced": int(_metrics["coalesced"]),
+        "sent": sent,
+        "failed": int(_metrics["failed"]),
+        "retried": int(_metrics["retried"]),
+        "retry_after": int(_metrics["retry_after"]),
+        "lag_avg_s": (_metrics["lag_total"] / sent) if sent else 0.0,
+        "lag_max_s": _metrics["lag_max"],
+        "active_chats": len(_dispatcher._chat_tasks) if _dispatcher is not None else 0,
+        "pending": None,
+        "oldest_pending_s": None,
+        "failed_24h": None,
+    }
+    try:
+        conn = await get_connection()
+        try:
+            row = await conn.fetchrow(
+                """
+                SELECT
+                    COUNT(*) FILTER (WHERE status IN ('pending', 'sending')) AS pending,
+                    EXTRACT(EPOCH FROM (NOW() - MIN(created_at) FILTER (
+                        WHERE status IN ('pending', 'sending')))) AS oldest_pending_s,
+                    COUNT(*) FILTER (WHERE status = 'failed'
+                                       AND finished_at >= NOW() - INTERVAL '24 hours') AS failed_24h
+                FROM outbound_messages
+                WHERE status IN ('pending', 'sending')
+                   OR (status = 'failed' AND finished_at >= NOW() - INTERVAL '24 hours')
+                """
+            )
+        finally:
+            await conn.close()
+        result["pending"] = int(row["pending"] or 0)
+        result["oldest_pending_s"] = float(row["oldest_pending_s"] or 0)
+        result["failed_24h"] = int(row["failed_24h"] or 0)
+    except Exception as e:
+        logger.warning(f"Outbound metrics query failed: {e}")
+    return result
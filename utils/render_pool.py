@@ -0,0 +1,137 @@
+# utils/render_pool.py
+# Hujjat generatsiyasi (XLSX / DOCX / PDF / AKT) uchun alohida jarayonlar pool'i
+#
+# openpyxl, python-docx va reportlab CPU'ni band qiladi; ular event loop
+# ichida ishlasa, katta eksport paytida boshqa foydalanuvchilarning
+# update'lari kutib qoladi. Bu yerda render funksiyalari ProcessPoolExecutor
+# ichida bajariladi, navbat esa RENDER_QUEUE_MAX bilan cheklangan.
+#
+# Render qilinadigan funksiya modul darajasidagi (pickle qilinadigan) oddiy
+# funksiya yoki staticmethod bo'lishi kerak.
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+
+# Navbat holati va render vaqtlari
+_metrics: Dict[str, float] = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "render_time_total": 0.0,
+    "render_time_max": 0.0,
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+}
+
+
+class RenderQueueFull(RuntimeError):
+    """Render navbati to'lgan - so'rovni keyinroq takrorlash kerak."""
+
+
+def _timed_call(func: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Any, float, float]:
+    """Worker jarayonida bajariladi: natija, boshlanish vaqti va render davomiyligi."""
+    started = time.time()
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, started, time.perf_counter() - t0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        workers = max(1, settings.RENDER_WORKERS)
+        if settings.RENDER_USE_PROCESSES:
+            # fork emas: bot jarayonida event loop, asyncpg va log oqimi bor -
+            # fork qilingan worker qulflangan mutex bilan qolib ketishi mumkin
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        logger.info(
+            "Render pool yaratildi (workers=%s, processes=%s, queue_max=%s)",
+            workers, settings.RENDER_USE_PROCESSES, settings.RENDER_QUEUE_MAX,
+        )
+    return _executor
+
+
+async def render(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """``func(*args, **kwargs)`` ni render pool'da bajaradi va natijasini qaytaradi.
+
+    Bajarilayotgan va navbatdagi vazifalar soni RENDER_WORKERS +
+    RENDER_QUEUE_MAX ga yetgan bo'lsa RenderQueueFull ko'tariladi.
+    """
+    if _metrics["in_flight"] >= settings.RENDER_WORKERS + settings.RENDER_QUEUE_MAX:
+        _metrics["rejected"] += 1
+        logger.warning("Render navbati to'lgan (%s), %s rad etildi",
+                       int(_metrics["in_flight"]), getattr(func, "__qualname__", func))
+        raise RenderQueueFull("render queue is full")
+
+    loop = asyncio.get_running_loop()
+    _metrics["submitted"] += 1
+    _metrics["in_flight"] += 1
+    submitted_at = time.time()
+    try:
+        result, started_at, elapsed = await loop.run_in_executor(
+            _get_executor(), partial(_timed_call, func, args, kwargs)
+        )
+    except Exception:
+        _metrics["failed"] += 1
+        raise
+    finally:
+        _metrics["in_flight"] -= 1
+
+    waited = max(0.0, started_at - submitted_at)
+    _metrics["completed"] += 1
+    _metrics["render_time_total"] += elapsed
+    _metrics["wait_time_total"] += waited
+    if elapsed > _metrics["render_time_max"]:
+        _metrics["render_time_max"] = elapsed
+    if waited > _metrics["wait_time_max"]:
+        _metrics["wait_time_max"] = waited
+    if elapsed > 5:
+        logger.info("Sekin render: %s %.2fs", getattr(func, "__qualname__", func), elapsed)
+    return result
+
+
+def shutdown_render_pool(wait: bool = True) -> None:
+    """Pool'ni to'xtatadi (bot to'xtaganda chaqiriladi)."""
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+        logger.info("Render pool yopildi")
+
+
+def get_render_metrics() -> Dict[str, Any]:
+    """Navbat chuqurligi va render vaqtlari (admin status ekrani uchun)."""
+    completed = int(_metrics["completed"])
+    in_flight = int(_metrics["in_flight"])
+    return {
+        "workers": settings.RENDER_WORKERS,
+        "queue_max": settings.RENDER_QUEUE_MAX,
+        "in_flight": in_flight,
+        "queue_depth": max(0, in_flight - settings.RENDER_WORKERS),
+        "submitted": int(_metrics["submitted"]),
+        "completed": completed,
+        "failed": int(_metrics["failed"]),
+        "rejected": int(_metrics["rejected"]),
+        "render_time_avg_ms": (_metrics["render_time_total"] / completed * 1000) if completed else 0.0,
+        "render_time_max_ms": _metrics["render_time_max"] * 1000,
+        "wait_time_avg_ms": (_metrics["wait_time_total"] / completed * 1000) if completed else 0.0,
+        "wait_time_max_ms": _metrics["wait_time_max"] * 1000,
+    }
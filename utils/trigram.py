@@ -0,0 +1,117 @@
+# utils/trigram.py
+# pg_trgm bilan mos trigram hisoblash va xotiradagi trigram indeksi
+#
+# Asosiy qidiruv PostgreSQL pg_trgm (GIN indekslar) orqali ishlaydi
+# (database/basic/search.py). Bazada pg_trgm kengaytmasi bo'lmasa yoki
+# DB'siz tekshirishda shu modul ishlatiladi: trigramlar pg_trgm qoidasi
+# bo'yicha olinadi (kichik harf, so'zlar alohida, "  so'z " to'ldirish),
+# shuning uchun ball (score) taxminan bir xil chiqadi.
+
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# pg_trgm.word_similarity_threshold standart qiymati (<% operatori)
+DEFAULT_THRESHOLD = 0.6
+
+
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """Matn trigramlari (pg_trgm show_trgm() bilan bir xil qoida)."""
+    result: Set[str] = set()
+    for word in _WORD_RE.findall((text or "").lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return frozenset(result)
+
+
+def similarity(a: Optional[str], b: Optional[str]) -> float:
+    """pg_trgm similarity(): umumiy trigramlar / barcha trigramlar."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def word_similarity(query: Optional[str], text: Optional[str]) -> float:
+    """word_similarity() ga yaqin qiymat: so'rov trigramlarining matnda uchragan ulushi.
+
+    pg_trgm matnning eng mos uzluksiz qismini qidiradi; bu yerda esa
+    butun matn olinadi - natija pg_trgm qiymatidan biroz yuqori bo'lishi mumkin.
+    """
+    tq = trigrams(query)
+    if not tq:
+        return 0.0
+    return len(tq & trigrams(text)) / len(tq)
+
+
+class TrigramIndex:
+    """Hujjatlar (bir nechta matn maydoni) bo'yicha xotiradagi trigram indeksi."""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._fields: Dict[Hashable, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def add(self, doc_id: Hashable, fields: Iterable[Optional[str]]) -> None:
+        values = tuple((f or "") for f in fields)
+        if doc_id in self._fields:
+            self.remove(doc_id)
+        self._fields[doc_id] = values
+        for value in values:
+            for tri in trigrams(value):
+                self._postings[tri].add(doc_id)
+
+    def remove(self, doc_id: Hashable) -> None:
+        values = self._fields.pop(doc_id, None)
+        if values is None:
+            return
+        for value in values:
+            for tri in trigrams(value):
+                docs = self._postings.get(tri)
+                if docs is not None:
+                    docs.discard(doc_id)
+                    if not docs:
+                        del self._postings[tri]
+
+    def score(self, doc_id: Hashable, query: str) -> float:
+        """SQL'dagi ball bilan bir xil: eng yaxshi maydon o'xshashligi + 1 (substring bo'lsa)."""
+        values = self._fields.get(doc_id, ())
+        q = query.lower()
+        best = max((word_similarity(query, v) for v in values), default=0.0)
+        if any(q in v.lower() for v in values):
+            best += 1.0
+        return best
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> List[Tuple[Hashable, float]]:
+        """(doc_id, score) ro'yxati, ball bo'yicha kamayish tartibida."""
+        query = (query or "").strip()
+        if not query:
+            return []
+        q_trgms = trigrams(query)
+
+        candidates: Set[Hashable] = set()
+        for tri in q_trgms:
+            candidates |= self._postings.get(tri, set())
+        if len(q_trgms) < 3:
+            # Juda qisqa so'rov (1-2 harf) - trigramlar kam, substring bo'yicha tekshiramiz
+            q = query.lower()
+            candidates |= {d for d, vals in self._fields.items() if any(q in v.lower() for v in vals)}
+
+        scored = []
+        for doc_id in candidates:
+            s = self.score(doc_id, query)
+            if s >= threshold:
+                scored.append((doc_id, s))
+        scored.sort(key=lambda item: (-item[1], str(item[0])))
+        return scored[offset:offset + limit]
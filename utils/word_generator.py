@@ -5,6 +5,8 @@ from docx.oxml.ns import qn
 from typing import Dict, Any, List
 from datetime import datetime
 
+from utils.render_pool import render
+
 def _fmt_money(v) -> str:
     try:
         return f"{float(v):,.0f}".replace(",", " ")
@@ -20,6 +22,10 @@ class AKTGenerator:
     def __init__(self):
         pass
 
+    async def render_akt(self, data: Dict[str, Any], materials: List[Dict[str, Any]], output_path: str) -> bool:
+        """generate_akt() ni render pool'da bajaradi (event loop bloklanmaydi)."""
+        return await render(self.generate_akt, dict(data), [dict(m) for m in (materials or [])], output_path)
+
     def generate_akt(self, data: Dict[str, Any], materials: List[Dict[str, Any]], output_path: str) -> bool:
         try:
             doc = Document()